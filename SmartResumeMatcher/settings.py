@@ -171,3 +171,166 @@ LOGOUT_REDIRECT_URL = 'login'          # after logout
 
 # Add your Gemini API key
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', 'api key ')
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT')  # e.g. a local stub server; None for Google's
+GEMINI_MODEL_NAMES = [              # tried in order; the first working one is kept per process
+    'models/gemini-2.0-flash',
+    'models/gemini-2.0-flash-001',
+    'models/gemini-pro-latest',
+    'models/gemini-flash-latest',
+]
+GEMINI_MODEL_TTL_SECONDS = 3600     # re-validate the chosen model (metadata lookup only) this often
+GEMINI_CIRCUIT_MAX_FAILURES = 3     # consecutive failed requests before a model is skipped
+GEMINI_CIRCUIT_OPEN_SECONDS = 60    # how long it is skipped
+
+# ---------------------------
+# Embedding matching
+# ---------------------------
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_WARMUP = True             # load + encode once at startup in web workers
+EMBEDDING_SKIP_MODEL_LOAD = False   # or SRM_SKIP_MODEL_LOAD=1 in the environment
+EMBEDDING_LOAD_RETRY_SECONDS = 300  # after a failed model load, wait this long before retrying
+EMBEDDING_DIM = 384                 # all-MiniLM-L6-v2
+EMBEDDING_MODEL_VERSION = 1         # bump when the same model name gets new weights
+# Model being rolled out by `manage.py backfill_embeddings`; matching keeps serving
+# EMBEDDING_MODEL_NAME until that model is switched in, e.g.
+# {'name': 'all-mpnet-base-v2', 'version': 1, 'dim': 768}
+EMBEDDING_NEXT_MODEL = None
+EMBEDDING_MAX_BATCH_SIZE = 32       # texts per micro-batch
+EMBEDDING_MAX_WAIT_MS = 10          # how long a batch waits to fill up
+EMBEDDING_TIMEOUT_SECONDS = 60
+EMBEDDING_STORAGE_DTYPE = 'float32' # or 'float16' to halve row size
+EMBEDDING_MATRIX_MAX_MB = 512       # keep the resume matrix resident up to this size
+EMBEDDING_BLOCK_ROWS = 8192         # rows scored per block
+RECRUITER_SHORTLIST_SIZE = 500      # candidates kept per job before pagination
+
+# ---------------------------
+# Approximate nearest-neighbour index
+# ---------------------------
+ANN_ENABLED = True
+ANN_INDEX_DIR = BASE_DIR / 'indexes'
+ANN_MIN_ROWS = 50000                # exact scan below this many rows
+ANN_DEFAULT_NPROBE = 32             # inverted lists scanned per query (at least)
+ANN_NPROBE_FRACTION = 0.04          # ...or this share of nlist if more; ~0.99 recall@10
+ANN_SAVE_EVERY = 100                # flush to disk after this many updates, when a worker idles, and at exit
+
+# ---------------------------
+# Background resume ingestion
+# ---------------------------
+RESUME_INGESTION_ASYNC = True       # queue uploads for `manage.py run_ingestion_workers`
+INGESTION_MAX_ATTEMPTS = 3
+INGESTION_RETRY_BASE_SECONDS = 2    # backoff doubles on each retry
+INGESTION_TASK_TIMEOUT_SECONDS = 600  # requeue tasks stuck running this long
+
+# ---------------------------
+# Cross-process index sync
+# ---------------------------
+# Rows saved in one process (e.g. an ingestion worker) reach the in-memory
+# matrices and indexes of the others through the IndexChange log
+INDEX_SYNC_ENABLED = True
+INDEX_SYNC_SECONDS = 1.0            # how often a process checks the log, at most
+INDEX_SYNC_OVERLAP_SECONDS = 10     # log entries re-read in case they committed out of id order
+INDEX_SYNC_MAX_ROWS = 5000          # more changes than this reload the structures from the DB instead
+INDEX_CHANGE_RETENTION_SECONDS = 86400  # idle ingestion workers delete older log entries
+
+# ---------------------------
+# Skills taxonomy
+# ---------------------------
+SKILLS_TAXONOMY_PATH = BASE_DIR / 'ai_engine' / 'data' / 'skills_taxonomy.json'
+SKILLS_INDEX_DIR = BASE_DIR / 'indexes' / 'skills'   # rebuilt when the taxonomy file changes
+
+# ---------------------------
+# Hybrid scoring
+# ---------------------------
+MATCH_RANKING_MODE = 'hybrid'       # or 'dense' for embeddings only
+HYBRID_SCORE_WEIGHTS = {'dense': 0.6, 'skills': 0.25, 'bm25': 0.15}
+HYBRID_CANDIDATES = 1000            # nearest embeddings, BM25 hits and skill matches kept, each
+
+# ---------------------------
+# Resume keyword search (inverted index)
+# ---------------------------
+RESUME_TEXT_INDEX_DIR = BASE_DIR / 'indexes' / 'resume_text'
+RESUME_TEXT_INDEX_FLUSH_DOCS = 100      # resumes in the shared write-ahead log per new segment
+RESUME_TEXT_INDEX_FLUSH_SECONDS = 30    # or flush once the oldest logged resume is this old
+RESUME_TEXT_INDEX_MERGE_FACTOR = 8      # merge in the background at this many segments
+
+# ---------------------------
+# Resume text extraction
+# ---------------------------
+RESUME_TEXT_CHAR_BUDGET = 50000     # stop reading a file after this many characters (0 = no limit)
+PDF_EXTRACT_WORKERS = 4             # process pool for large PDFs; 0 or 1 reads pages in-process
+PDF_PARALLEL_MIN_PAGES = 12         # use the pool from this many pages
+PDF_PAGES_PER_TASK = 4              # pages extracted per pool task
+
+# ---------------------------
+# Parsed resume cache (content-addressed)
+# ---------------------------
+# Uploads are SHA-256 hashed while they stream in; identical files reuse the cached parse
+FILE_UPLOAD_HANDLERS = [
+    'ai_engine.upload_handlers.HashingMemoryFileUploadHandler',
+    'ai_engine.upload_handlers.HashingTemporaryFileUploadHandler',
+]
+PARSE_CACHE_ENABLED = True
+PARSE_CACHE_MAX_MB = 256            # least recently used entries are evicted beyond this
+
+# ---------------------------
+# Embedding cache
+# ---------------------------
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_VERSION = 1         # bump to ignore everything cached so far
+EMBEDDING_CACHE_MEMORY_MB = 64      # in-process LRU
+EMBEDDING_CACHE_PATH = BASE_DIR / 'indexes' / 'embedding_cache.sqlite3'   # shared on-disk level; None to disable
+EMBEDDING_CACHE_DISK_MB = 1024
+
+# ---------------------------
+# Materialized match scores
+# ---------------------------
+MATCH_SCORES_ENABLED = True         # refresh MatchScore when a resume is processed or a job posted
+MATCH_SCORE_TOP_N = 100             # pairs kept per resume and per job
+MATCH_SCORE_POOL_FACTOR = 3         # a new job rescores this many times N candidate resumes; a new resume checks as many jobs
+
+# ---------------------------
+# Batch match API (/api/ai/match/batch/)
+# ---------------------------
+MATCH_BATCH_MAX_IDS = 1000          # resume IDs and job IDs per call (matrix is at most this squared)
+MATCH_BATCH_MAX_PAIRS = 100000      # explicit pairs per call
+# Bearer keys for service callers (comma-separated in the env); they may score every resume
+MATCH_BATCH_API_KEYS = [key for key in os.getenv('MATCH_BATCH_API_KEYS', '').split(',') if key]
+
+# ---------------------------
+# Long-document (chunked) embeddings
+# ---------------------------
+EMBEDDING_CHUNKING_ENABLED = True   # resumes are embedded per window; `embedding` is the mean of the windows
+EMBEDDING_CHUNK_WORDS = 160         # window size in whitespace tokens (stays under the model's 256 word pieces)
+EMBEDDING_CHUNK_OVERLAP = 40        # tokens shared by neighbouring windows
+EMBEDDING_MAX_CHUNKS = 32           # windows kept per document
+
+# ---------------------------
+# Quantized in-memory matrices
+# ---------------------------
+EMBEDDING_MATRIX_DTYPE = 'float32'  # or 'int8': 4x smaller resident job/resume matrices, float re-scoring;
+                                    # saves memory only. benchmark_ann, 384 dims, 1 core, rescore factor 4:
+                                    #   100k rows: 146.5 MB -> 37.8 MB, top-10 p50 20.3 -> 30.7 ms
+                                    #   300k rows: 439.5 MB -> 113.3 MB, top-10 p50 58.0 -> 70.0 ms
+                                    # recall@10 after re-scoring 1.000 in both runs
+EMBEDDING_QUANTIZED_RESCORE_FACTOR = 4  # int8 candidates re-scored with float vectors per result
+EMBEDDING_QUANTIZED_FLOAT_CACHE_ROWS = 10000  # LRU float rows kept for re-scoring (~1.5 KB each at 384 dims)
+
+# ---------------------------
+# Shared memory-mapped matrices
+# ---------------------------
+EMBEDDING_MATRIX_STORE = 'memory'   # or 'mmap': one append-only float32 file per host, shared by all workers
+VECTOR_STORE_DIR = BASE_DIR / 'indexes' / 'vectors'
+VECTOR_STORE_COMPACT_RATIO = 0.25   # compact once this share of the rows is superseded or deleted
+VECTOR_STORE_COMPACT_MIN_ROWS = 1000
+
+# ---------------------------
+# spaCy NER for skill extraction
+# ---------------------------
+SPACY_NER_ENABLED = True
+SPACY_MODEL = 'en_core_web_sm'
+# Components not loaded: only `ner` is used (en_core_web_sm's ner has its own
+# token-to-vector layer; keep 'tok2vec' loaded for pipelines whose ner listens to it)
+SPACY_EXCLUDE = ['tok2vec', 'tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'senter']
+SPACY_CHAR_BUDGET = 50000           # characters of each document NER reads (0 = all)
+SPACY_BATCH_SIZE = 64               # documents per nlp.pipe batch
+SPACY_N_PROCESS = 1                 # nlp.pipe processes (import_resumes --nlp-processes overrides)
@@ -1,3 +1,31 @@
 from django.contrib import admin
+from .models import IngestionTask, ParsedDocument, CacheCounter, MatchScore, IndexChange
 
-# Register your models here.
+@admin.register(IngestionTask)
+class IngestionTaskAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'resume', 'job', 'status', 'attempts', 'worker', 'created_at', 'finished_at']
+    readonly_fields = ['timings', 'error']
+    list_filter = ['status', 'kind']
+
+
+@admin.register(ParsedDocument)
+class ParsedDocumentAdmin(admin.ModelAdmin):
+    list_display = ['content_hash', 'embedding_model', 'size_bytes', 'hits', 'created_at', 'last_used_at']
+    search_fields = ['content_hash']
+    exclude = ['embedding']
+
+@admin.register(CacheCounter)
+class CacheCounterAdmin(admin.ModelAdmin):
+    list_display = ['name', 'hits', 'misses', 'evictions', 'hit_rate']
+
+
+@admin.register(MatchScore)
+class MatchScoreAdmin(admin.ModelAdmin):
+    list_display = ['resume', 'job', 'score', 'updated_at']
+    raw_id_fields = ['resume', 'job']
+
+
+@admin.register(IndexChange)
+class IndexChangeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'key', 'row_id', 'origin', 'created_at']
+    list_filter = ['key']
@@ -0,0 +1,470 @@
+import atexit
+import os
+import re
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+from .matrix import normalize_rows, top_k_indices, blocked_top_k
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are only serialized within one process
+    fcntl = None
+
+# Rows assigned to centroids per step; bounds the (rows x nlist) score block
+ASSIGN_CHUNK_ROWS = 8192
+
+
+def default_nlist(n_rows):
+    """Rule-of-thumb number of inverted lists for n_rows vectors"""
+    return int(max(1, min(n_rows, 4 * np.sqrt(max(n_rows, 1)))))
+
+
+def default_nprobe(nlist):
+    """Lists to scan per query: ANN_DEFAULT_NPROBE, or ANN_NPROBE_FRACTION of nlist if larger.
+
+    Scaling with nlist keeps the scanned share of the corpus, and so recall,
+    roughly constant as the index grows.
+    """
+    from django.conf import settings
+
+    floor = getattr(settings, 'ANN_DEFAULT_NPROBE', 32)
+    fraction = getattr(settings, 'ANN_NPROBE_FRACTION', 0.04)
+    return int(max(1, floor, np.ceil(nlist * fraction)))
+
+
+class IVFIndex:
+    """Inverted-file (IVF-Flat) index over L2-normalized float32 vectors.
+
+    Vectors are bucketed by their nearest k-means centroid. A query only scans
+    the `nprobe` closest buckets, so nprobe is the recall/latency knob.
+    Each bucket is an (ids, vectors) tuple replaced whole on writes, so a
+    search running without the lock always sees matching ids and vectors.
+    """
+
+    def __init__(self, centroids):
+        self.centroids = normalize_rows(centroids)
+        self.nlist, self.dim = self.centroids.shape
+        self._lock = threading.Lock()
+        empty = (np.empty(0, dtype=np.int64), np.empty((0, self.dim), dtype=np.float32))
+        self._lists = [empty] * self.nlist
+        self._where = {}
+        self._pending = {}  # pk -> vector (None when removed) not yet saved to disk
+        self._remote = {}   # same, for rows other processes wrote; their writer saves them
+
+    @property
+    def pending_writes(self):
+        return len(self._pending)
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, pk):
+        return int(pk) in self._where
+
+    @classmethod
+    def train(cls, vectors, nlist=None, n_iter=10, max_samples=100000, seed=0):
+        """Fit centroids with spherical k-means on a sample of vectors"""
+        vectors = normalize_rows(vectors)
+        n = vectors.shape[0]
+        nlist = min(nlist or default_nlist(n), n)
+        rng = np.random.default_rng(seed)
+
+        sample = vectors
+        if n > max_samples:
+            sample = vectors[np.sort(rng.choice(n, max_samples, replace=False))]
+
+        centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+        for _ in range(n_iter):
+            assign = _assign(sample, centroids)
+            sums, counts = _bucket_sums(sample, assign, nlist)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty buckets from random sample points
+                sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()))]
+            centroids = normalize_rows(sums)
+
+        return cls(centroids)
+
+    @classmethod
+    def build(cls, ids, vectors, nlist=None, **train_kwargs):
+        """Train on vectors and add them all"""
+        index = cls.train(vectors, nlist=nlist, **train_kwargs)
+        index.add(ids, vectors)
+        return index
+
+    @classmethod
+    def from_matrix(cls, matrix, nlist=None, block_rows=8192, max_samples=100000, seed=0):
+        """Train on a sample of an embedding matrix and add it block by block.
+
+        Only the sample and one block at a time are float copies, so an int8
+        or memory-mapped matrix is never expanded whole.
+        """
+        n = len(matrix)
+        ids = matrix.ids
+        if n > max_samples:
+            ids = ids[np.sort(np.random.default_rng(seed).choice(n, max_samples, replace=False))]
+        index = cls.train(matrix.rows_for(ids)[1], nlist=nlist or default_nlist(n), max_samples=max_samples,
+                          seed=seed)
+        index.add_blocks(matrix.iter_blocks(block_rows))
+        return index
+
+    def add_blocks(self, blocks):
+        """Bulk-add (ids, vectors) blocks of new ids with one concatenation per list"""
+        parts = [[] for _ in range(self.nlist)]
+        for ids, vectors in blocks:
+            ids = np.asarray(ids, dtype=np.int64)
+            vectors = normalize_rows(vectors)
+            assign = _assign(vectors, self.centroids)
+            order = np.argsort(assign, kind='stable')
+            bounds = np.searchsorted(assign[order], np.arange(self.nlist + 1))
+            for list_no in np.flatnonzero(np.diff(bounds)).tolist():
+                rows = order[bounds[list_no]:bounds[list_no + 1]]
+                parts[list_no].append((ids[rows], vectors[rows]))
+
+        with self._lock:
+            for list_no, blocks_of_list in enumerate(parts):
+                if not blocks_of_list:
+                    continue
+                list_ids, list_vecs = self._lists[list_no]
+                new_ids = np.concatenate([list_ids] + [block_ids for block_ids, _ in blocks_of_list])
+                self._lists[list_no] = (new_ids,
+                                        np.concatenate([list_vecs] + [vecs for _, vecs in blocks_of_list]))
+                for pk in new_ids[list_ids.shape[0]:].tolist():
+                    self._where[pk] = list_no
+
+    def add(self, ids, vectors):
+        """Bulk-add rows; ids already present are replaced"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.shape[0] == 0:
+            return
+        vectors = normalize_rows(vectors)
+        assign = _assign(vectors, self.centroids)
+
+        with self._lock:
+            stale = [pk for pk in ids.tolist() if pk in self._where]
+            for pk in stale:
+                self._remove_locked(pk)
+
+            order = np.argsort(assign, kind='stable')
+            bounds = np.searchsorted(assign[order], np.arange(self.nlist + 1))
+            for list_no in range(self.nlist):
+                rows = order[bounds[list_no]:bounds[list_no + 1]]
+                if rows.shape[0] == 0:
+                    continue
+                list_ids, list_vecs = self._lists[list_no]
+                self._lists[list_no] = (np.concatenate([list_ids, ids[rows]]),
+                                        np.concatenate([list_vecs, vectors[rows]]))
+                for pk in ids[rows].tolist():
+                    self._where[pk] = list_no
+
+    def upsert(self, pk, vector, remote=False):
+        """Insert or replace a single row, remembered until the next save"""
+        self.upsert_many([pk], np.asarray(vector, dtype=np.float32).reshape(1, -1), remote=remote)
+
+    def upsert_many(self, ids, vectors, remote=False):
+        """Insert or replace rows, remembered until the next save.
+
+        remote=True is for rows another process wrote: they are kept across
+        reloads but left for that process to save.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        self.add(ids, vectors)
+        with self._lock:
+            for pk, vector in zip(ids, vectors):
+                self._remember(int(pk), vector, remote)
+
+    def remove(self, pk, remote=False):
+        with self._lock:
+            self._remove_locked(int(pk))
+            self._remember(int(pk), None, remote)
+
+    def _remember(self, pk, vector, remote):
+        mine, theirs = (self._remote, self._pending) if remote else (self._pending, self._remote)
+        mine[pk] = vector
+        theirs.pop(pk, None)
+
+    def replay(self, pending, remote=False):
+        """Re-apply another copy's unsaved writes on top of this one"""
+        upserts = [(pk, vec) for pk, vec in pending.items() if vec is not None]
+        if upserts:
+            self.upsert_many([pk for pk, _ in upserts], np.vstack([vec for _, vec in upserts]), remote=remote)
+        for pk, vec in pending.items():
+            if vec is None:
+                self.remove(pk, remote=remote)
+
+    def replay_remote(self, remote):
+        """Re-apply another copy's rows from other processes that this one does not hold yet"""
+        self.replay({pk: vec for pk, vec in remote.items() if not self._holds(pk, vec)}, remote=True)
+
+    def _holds(self, pk, vector):
+        list_no = self._where.get(pk)
+        if vector is None or list_no is None:
+            return vector is None and list_no is None
+        ids, vecs = self._lists[list_no]
+        return np.allclose(vecs[np.flatnonzero(ids == pk)[0]], normalize_rows(vector)[0], atol=1e-6)
+
+    def _remove_locked(self, pk):
+        list_no = self._where.pop(pk, None)
+        if list_no is None:
+            return False
+        ids, vecs = self._lists[list_no]
+        keep = ids != pk
+        self._lists[list_no] = (ids[keep], vecs[keep])
+        return True
+
+    def search(self, query, k=10, nprobe=32):
+        """Return [(id, similarity), ...] for the approximate top-k rows"""
+        q = normalize_rows(np.asarray(query, dtype=np.float32).ravel())[0]
+        if q.shape[0] != self.dim:
+            print(f"❌ Query dim {q.shape[0]} does not match index dim {self.dim}")
+            return []
+        probe = top_k_indices(self.centroids @ q, max(1, min(nprobe, self.nlist)))
+        lists = self._lists
+        blocks = (block for block in (lists[i] for i in probe) if block[0].shape[0])
+        return blocked_top_k(q, blocks, k)
+
+    def save(self, path):
+        """Persist atomically as a single .npz file (callers sharing path hold index_file_lock)"""
+        with self._lock:
+            sizes = np.array([ids.shape[0] for ids, _ in self._lists], dtype=np.int64)
+            ids = np.concatenate([ids for ids, _ in self._lists])
+            vectors = np.concatenate([vecs for _, vecs in self._lists])
+            self._pending = {}
+            self._remote = {}
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, centroids=self.centroids, sizes=sizes, ids=ids, vectors=vectors)
+        os.replace(tmp_path, path)
+        print(f"✅ Saved ANN index with {ids.shape[0]} rows to {path}")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            index = cls(data['centroids'])
+            offsets = np.concatenate([[0], np.cumsum(data['sizes'])])
+            ids, vectors = data['ids'], data['vectors']
+
+        for list_no in range(index.nlist):
+            start, end = offsets[list_no], offsets[list_no + 1]
+            index._lists[list_no] = (ids[start:end], vectors[start:end])
+            for pk in ids[start:end].tolist():
+                index._where[pk] = list_no
+        print(f"✅ Loaded ANN index with {len(index)} rows from {path}")
+        return index
+
+
+def _bucket_sums(vectors, assign, nlist):
+    """Per-bucket vector sums and counts via one sort + reduceat"""
+    order = np.argsort(assign, kind='stable')
+    counts = np.bincount(assign, minlength=nlist)
+    sums = np.zeros((nlist, vectors.shape[1]), dtype=np.float32)
+    filled = np.flatnonzero(counts)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+    sums[filled] = np.add.reduceat(vectors[order], starts, axis=0)
+    return sums, counts
+
+
+def _assign(vectors, centroids):
+    """Nearest centroid for each row, computed in bounded chunks"""
+    assign = np.empty(vectors.shape[0], dtype=np.int64)
+    for start in range(0, vectors.shape[0], ASSIGN_CHUNK_ROWS):
+        block = vectors[start:start + ASSIGN_CHUNK_ROWS]
+        assign[start:start + ASSIGN_CHUNK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+
+# Per-process indexes, loaded lazily from ANN_INDEX_DIR. Every process keeps
+# its own copy; _loaded records which version of the file each copy came from
+# so a copy is reloaded (with its unsaved writes replayed) once another
+# process saves, and saves merge with the file instead of overwriting it.
+# Unsaved writes are flushed when the process exits.
+_indexes = {}
+_loaded = {}
+_indexes_lock = threading.RLock()
+_flush_registered = False
+
+
+def _file_version(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns  # replaced, not rewritten, on save
+
+
+@contextmanager
+def index_file_lock(path):
+    """Exclusive lock on an index file across processes while it is merged and saved"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f"{path}.lock", 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def index_path(key, tag=None):
+    """Index file for key and model tag, so a new model's index can be built before it serves"""
+    from django.conf import settings
+    from .model_registry import model_tag
+
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', tag or model_tag())
+    return os.path.join(str(settings.ANN_INDEX_DIR), f"{key}.{slug}.ivf.npz")
+
+
+def get_index(key):
+    """Return the on-disk ANN index for key, or None if ANN is off or unbuilt"""
+    from django.conf import settings
+
+    if not getattr(settings, 'ANN_ENABLED', True):
+        return None
+    path = index_path(key)
+    version = _file_version(path)
+    if key in _indexes and _loaded.get(key) == version:
+        return _indexes[key]
+    global _flush_registered
+    with _indexes_lock:
+        if key not in _indexes or _loaded.get(key) != version:
+            _reload(key, path, version)
+        if not _flush_registered:
+            atexit.register(flush_indexes)
+            _flush_registered = True
+    return _indexes[key]
+
+
+def _reload(key, path, version):
+    """Load the file version of key's index, keeping this process's unsaved writes"""
+    index = None
+    if version is not None:
+        try:
+            index = IVFIndex.load(path)
+        except Exception as e:
+            print(f"❌ Error loading ANN index {path}: {e}")
+    previous = _indexes.get(key)
+    if index is not None and previous is not None:
+        index.replay_remote(previous._remote)
+        index.replay(previous._pending)
+    _indexes[key] = index
+    _loaded[key] = version
+
+
+def save_index(key):
+    """Write this process's copy of key's index, first merging saves from other processes"""
+    path = index_path(key)
+    with _indexes_lock, index_file_lock(path):
+        version = _file_version(path)
+        if _loaded.get(key) != version:
+            _reload(key, path, version)
+        index = _indexes.get(key)
+        if index is None:
+            return
+        index.save(path)
+        _loaded[key] = _file_version(path)
+
+
+def flush_indexes():
+    """Save every loaded index with unsaved writes (worker shutdown, process exit)"""
+    for key, index in list(_indexes.items()):
+        if index is not None and index.pending_writes:
+            try:
+                save_index(key)
+            except Exception as e:
+                print(f"❌ Error saving ANN index {key}: {e}")
+
+
+def set_index(key, index, save=True):
+    """Install a freshly built index for this process (and on disk)"""
+    path = index_path(key)
+    with _indexes_lock:
+        if save:
+            with index_file_lock(path):
+                index.save(path)
+        _indexes[key] = index
+        _loaded[key] = _file_version(path)
+
+
+def build_index(key, nlist=None, tag=None):
+    """Build and persist an ANN index from the current embedding matrix.
+
+    With the tag of a model that is not serving yet, the index is built from
+    its backfilled embeddings and only written to disk.
+    """
+    from jobs.models import Job
+    from resumes.models import Resume
+    from .matrix import EmbeddingMatrix, get_job_matrix, get_resume_matrix
+    from .model_registry import model_tag
+
+    serving = tag is None or tag == model_tag()
+    if serving:
+        matrix = {'jobs': get_job_matrix, 'resumes': get_resume_matrix}[key]()
+    else:
+        model = {'jobs': Job, 'resumes': Resume}[key]
+        matrix = EmbeddingMatrix.from_queryset(model.objects.all(), tag=tag)
+    if len(matrix) == 0:
+        print(f"⚠️ No {key} embeddings to index")
+        return None
+    index = IVFIndex.from_matrix(matrix, nlist=nlist)
+    if serving:
+        set_index(key, index)
+    else:
+        with index_file_lock(index_path(key, tag)):
+            index.save(index_path(key, tag))
+    return index
+
+
+def search_or_none(key, query, k, nprobe=None):
+    """Approximate search when an index is worth using, else None (caller scans exactly)"""
+    from django.conf import settings
+
+    index = get_index(key)
+    if index is None or len(index) < getattr(settings, 'ANN_MIN_ROWS', 50000):
+        return None
+    nprobe = nprobe or default_nprobe(index.nlist)
+    return index.search(query, k=k, nprobe=nprobe)
+
+
+def sync_index(key, pk, embedding, remote=False):
+    """Apply a saved/deleted row to the ANN index and flush it periodically.
+
+    remote=True applies a row another process wrote to an index already
+    loaded here; that process saves it.
+    """
+    index = _index_to_sync(key, remote)
+    if index is None:
+        return
+    if embedding is None:
+        index.remove(pk, remote=remote)
+    else:
+        index.upsert(pk, embedding, remote=remote)
+    if not remote:
+        _maybe_save(key, index)
+
+
+def sync_index_many(key, ids, vectors, remote=False):
+    """Apply a batch of saved rows (bulk imports) to the ANN index"""
+    index = _index_to_sync(key, remote)
+    if index is None or not len(ids):
+        return
+    index.upsert_many(ids, vectors, remote=remote)
+    if not remote:
+        _maybe_save(key, index)
+
+
+def _index_to_sync(key, remote):
+    if remote and _indexes.get(key) is None:
+        return None
+    return get_index(key)
+
+
+def _maybe_save(key, index):
+    from django.conf import settings
+
+    if index.pending_writes >= getattr(settings, 'ANN_SAVE_EVERY', 100):
+        save_index(key)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AiEngineConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_engine'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .model_registry import should_warm_up, warm_up
+
+        if should_warm_up():
+            warm_up()
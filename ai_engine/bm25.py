@@ -0,0 +1,249 @@
+import math
+import re
+import threading
+from collections import Counter
+import numpy as np
+
+# Keeps tech tokens such as c++, c#, node.js and ci/cd in one piece
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./][a-z0-9+#]+)*")
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers him his how i if in into is it its itself just me more most my no nor not of off on once only
+or other our ours out over own same she should so some such than that the their theirs them then there
+these they this those through to too under until up very was we were what when where which while who
+whom why will with would you your yours
+""".split())
+
+
+def tokenize(text):
+    """Lowercased word tokens without stopwords"""
+    if not text:
+        return []
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _grown(array, needed):
+    """array, or a copy with room for at least `needed` rows (capacity doubles)"""
+    if needed <= array.shape[0]:
+        return array
+    grown = np.empty(max(needed, 2 * array.shape[0], 16), dtype=array.dtype)
+    grown[:array.shape[0]] = array
+    return grown
+
+
+class BM25Index:
+    """In-memory Okapi BM25 over a set of documents, scored with NumPy.
+
+    Postings are per-term arrays of (row, term frequency) in row order.
+    Arrays are over-allocated and filled in place, so adding a document
+    costs O(its terms) amortized; updating one marks its old row dead and
+    appends a new one. Once `compact_ratio` of the rows are dead, live
+    rows are renumbered and dead postings dropped in one pass.
+
+    Readers never lock: the state is swapped as a whole on compaction, and
+    appends only write past the lengths a reader has already taken.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, compact_ratio=0.2):
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        # (doc ids, doc lengths, alive flags, rows used), {term: (rows, tfs, count)}
+        self._state = ((np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32),
+                        np.empty(0, dtype=bool), 0), {})
+        self._row = {}
+
+    def __len__(self):
+        return len(self._row)
+
+    @classmethod
+    def build(cls, docs, **kwargs):
+        """Build from an iterable of (doc_id, text) in one pass"""
+        index = cls(**kwargs)
+        doc_ids, doc_len, postings = [], [], {}
+        for row, (doc_id, text) in enumerate(docs):
+            counts = Counter(tokenize(text))
+            doc_ids.append(doc_id)
+            doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                rows, tfs = postings.setdefault(term, ([], []))
+                rows.append(row)
+                tfs.append(tf)
+
+        docs_state = (np.asarray(doc_ids, dtype=np.int64), np.asarray(doc_len, dtype=np.float32),
+                      np.ones(len(doc_ids), dtype=bool), len(doc_ids))
+        index._state = (docs_state, {
+            term: (np.asarray(rows, dtype=np.int64), np.asarray(tfs, dtype=np.float32), len(rows))
+            for term, (rows, tfs) in postings.items()
+        })
+        index._row = {int(pk): row for row, pk in enumerate(doc_ids)}
+        print(f"✅ Built BM25 index over {len(doc_ids)} documents, {len(postings)} terms")
+        return index
+
+    def upsert(self, doc_id, text):
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self._remove_locked(doc_id)
+            (doc_ids, doc_len, alive, n), postings = self._state
+            doc_ids, doc_len, alive = (_grown(a, n + 1) for a in (doc_ids, doc_len, alive))
+            doc_ids[n], doc_len[n], alive[n] = doc_id, sum(counts.values()), True
+            for term, tf in counts.items():
+                rows, tfs, count = postings.get(term, (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), 0))
+                rows, tfs = _grown(rows, count + 1), _grown(tfs, count + 1)
+                rows[count], tfs[count] = n, tf
+                postings[term] = (rows, tfs, count + 1)
+            self._state = ((doc_ids, doc_len, alive, n + 1), postings)
+            self._row[int(doc_id)] = n
+            self._maybe_compact()
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove_locked(doc_id)
+            self._maybe_compact()
+
+    def _remove_locked(self, doc_id):
+        row = self._row.pop(int(doc_id), None)
+        if row is not None:
+            self._state[0][2][row] = False
+
+    def _maybe_compact(self):
+        n = self._state[0][3]
+        if n >= 64 and n - len(self._row) > self.compact_ratio * n:
+            self._compact_locked()
+
+    def compact(self):
+        """Renumber live rows from 0 and drop dead rows and postings"""
+        with self._lock:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        (doc_ids, doc_len, alive, n), postings = self._state
+        live = alive[:n].copy()
+        new_row = np.cumsum(live) - 1
+        compacted = {}
+        for term, (rows, tfs, count) in postings.items():
+            keep = live[rows[:count]]
+            if keep.any():
+                compacted[term] = (new_row[rows[:count][keep]], tfs[:count][keep], int(keep.sum()))
+        live_ids = doc_ids[:n][live]
+        self._state = ((live_ids, doc_len[:n][live], np.ones(live_ids.shape[0], dtype=bool), live_ids.shape[0]),
+                       compacted)
+        self._row = {int(pk): row for row, pk in enumerate(live_ids.tolist())}
+
+    def scores(self, query_terms):
+        """BM25 score of every live document as (doc_ids, scores)"""
+        (doc_ids, doc_len, alive, n), postings = self._state
+        doc_ids, doc_len, alive = doc_ids[:n], doc_len[:n], alive[:n]
+        scores = np.zeros(n, dtype=np.float32)
+        n_docs = int(alive.sum())
+        if n_docs == 0:
+            return doc_ids[alive], scores[alive]
+
+        avgdl = float(doc_len[alive].mean()) or 1.0
+        for term, qtf in Counter(query_terms).items():
+            posting = postings.get(term)
+            if posting is None:
+                continue
+            rows, tfs, count = posting
+            # Rows are ascending; drop any appended after this snapshot's n
+            count = int(np.searchsorted(rows[:count], n))
+            rows, tfs = rows[:count], tfs[:count]
+            df = int(alive[rows].sum())
+            if df == 0:
+                continue
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = tfs + self.k1 * (1 - self.b + self.b * doc_len[rows] / avgdl)
+            scores[rows] += qtf * idf * tfs * (self.k1 + 1) / norm
+        return doc_ids[alive], scores[alive]
+
+    def weights_for(self, doc_terms):
+        """{term: weight} of a document with these terms under the current statistics.
+
+        A query's BM25 score for that document is sum(qtf * weight) over the
+        query's terms (see weighted_score), so one document can be scored
+        against many queries without a scan of the index per query.
+        """
+        (_, doc_len, alive, n), postings = self._state
+        alive = alive[:n]
+        n_docs = int(alive.sum())
+        counts = Counter(doc_terms)
+        if n_docs == 0 or not counts:
+            return {}
+        avgdl = float(doc_len[:n][alive].mean()) or 1.0
+        length_norm = self.k1 * (1 - self.b + self.b * sum(counts.values()) / avgdl)
+        weights = {}
+        for term, tf in counts.items():
+            posting = postings.get(term)
+            if posting is None:
+                continue
+            rows, _, count = posting
+            count = int(np.searchsorted(rows[:count], n))
+            df = int(alive[rows[:count]].sum())
+            if df == 0:
+                continue
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            weights[term] = idf * tf * (self.k1 + 1) / (tf + length_norm)
+        return weights
+
+    def top_k(self, query_terms, k):
+        """[(doc_id, score), ...] for the k best documents with a positive score"""
+        from .matrix import top_k_indices
+
+        doc_ids, scores = self.scores(query_terms)
+        best = top_k_indices(scores, k)
+        return [(int(doc_ids[i]), float(scores[i])) for i in best if scores[i] > 0]
+
+
+def weighted_score(query_terms, weights):
+    """BM25 score of a query for the document whose weights_for these are"""
+    return float(sum(qtf * weights.get(term, 0.0) for term, qtf in Counter(query_terms).items()))
+
+
+def _job_docs():
+    from jobs.models import Job
+    return Job.objects.values_list('id', 'description')
+
+
+def _resume_docs():
+    from resumes.models import Resume
+    return Resume.objects.values_list('id', 'text')
+
+
+# (doc_id, text) source for each index
+INDEX_SOURCES = {'jobs': _job_docs, 'resumes': _resume_docs}
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_bm25_index(key):
+    """Per-process BM25 index over job descriptions or resume text, caught up with other processes' saves"""
+    from .index_sync import catch_up, track
+
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is None:
+                track(key)
+                index = BM25Index.build(INDEX_SOURCES[key]().iterator(chunk_size=2000))
+                _indexes[key] = index
+    else:
+        catch_up(key)
+    return index
+
+
+def loaded_bm25_index(key):
+    return _indexes.get(key)
+
+
+def invalidate_bm25_index(key=None):
+    """Forget a built index (or all of them) so the next call rebuilds it from the DB"""
+    with _indexes_lock:
+        if key is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(key, None)
@@ -0,0 +1,133 @@
+import struct
+import numpy as np
+
+# Binary embedding layout (little-endian):
+#   4s  magic   b'SRME'
+#   B   version
+#   B   dtype code (see DTYPES)
+#   H   reserved
+#   I   dimension
+# followed by `dimension` raw values. The 12-byte header keeps the payload
+# 4-byte aligned so np.frombuffer can view it without copying.
+MAGIC = b'SRME'
+VERSION = 1
+HEADER = struct.Struct('<4sBBHI')
+
+DTYPES = {
+    1: np.dtype('<f4'),
+    2: np.dtype('<f2'),
+}
+DTYPE_CODES = {dtype: code for code, dtype in DTYPES.items()}
+
+# Stacked vectors (e.g. per-chunk embeddings of one document) use the same
+# layout with their own magic and a row count: 4s B B H I(rows) I(dimension),
+# followed by rows * dimension values in row-major order (16-byte header).
+MATRIX_MAGIC = b'SRMC'
+MATRIX_HEADER = struct.Struct('<4sBBHII')
+
+
+class EmbeddingFormatError(ValueError):
+    """Raised when a stored embedding blob is not in the binary format"""
+
+
+def encode_embedding(vector, dtype='float32'):
+    """Serialize a 1-D vector as header + raw float32/float16 values"""
+    dtype = np.dtype(dtype).newbyteorder('<')
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    values = np.ascontiguousarray(np.asarray(vector).ravel(), dtype=dtype)
+    return HEADER.pack(MAGIC, VERSION, DTYPE_CODES[dtype], 0, values.shape[0]) + values.tobytes()
+
+
+def decode_embedding(blob):
+    """Zero-copy view of an encoded embedding (read-only, stored dtype)"""
+    if len(blob) < HEADER.size:
+        raise EmbeddingFormatError("Embedding blob shorter than header")
+    magic, version, code, _, dim = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise EmbeddingFormatError("Embedding blob has no SRME header")
+    if version != VERSION:
+        raise EmbeddingFormatError(f"Unsupported embedding format version {version}")
+    dtype = DTYPES.get(code)
+    if dtype is None:
+        raise EmbeddingFormatError(f"Unknown embedding dtype code {code}")
+    if len(blob) != HEADER.size + dim * dtype.itemsize:
+        raise EmbeddingFormatError("Embedding blob length does not match header")
+    return np.frombuffer(blob, dtype=dtype, count=dim, offset=HEADER.size)
+
+
+def encode_embedding_matrix(vectors, dtype='float32'):
+    """Serialize a 2-D array (one vector per row) as header + raw row-major values"""
+    dtype = np.dtype(dtype).newbyteorder('<')
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    values = np.ascontiguousarray(np.atleast_2d(np.asarray(vectors)), dtype=dtype)
+    rows, dim = values.shape
+    return MATRIX_HEADER.pack(MATRIX_MAGIC, VERSION, DTYPE_CODES[dtype], 0, rows, dim) + values.tobytes()
+
+
+def decode_embedding_matrix(blob):
+    """Zero-copy (rows, dimension) view of an encoded embedding matrix"""
+    if len(blob) < MATRIX_HEADER.size:
+        raise EmbeddingFormatError("Embedding matrix blob shorter than header")
+    magic, version, code, _, rows, dim = MATRIX_HEADER.unpack_from(blob)
+    if magic != MATRIX_MAGIC:
+        raise EmbeddingFormatError("Embedding matrix blob has no SRMC header")
+    if version != VERSION:
+        raise EmbeddingFormatError(f"Unsupported embedding format version {version}")
+    dtype = DTYPES.get(code)
+    if dtype is None:
+        raise EmbeddingFormatError(f"Unknown embedding dtype code {code}")
+    if len(blob) != MATRIX_HEADER.size + rows * dim * dtype.itemsize:
+        raise EmbeddingFormatError("Embedding matrix blob length does not match header")
+    return np.frombuffer(blob, dtype=dtype, count=rows * dim, offset=MATRIX_HEADER.size).reshape(rows, dim)
+
+
+def is_encoded(blob):
+    """Whether a blob is already in the binary format"""
+    return bool(blob) and bytes(blob[:4]) == MAGIC
+
+
+def convert_embeddings(model, convert, batch_size=500):
+    """Rewrite every embedding of `model` through `convert` in streaming batches.
+
+    Used by the data migrations; `convert` returns the new blob or None to
+    leave the row untouched. Only (id, embedding) pairs are read, in chunks.
+    """
+    batch, converted = [], 0
+    rows = model.objects.exclude(embedding__isnull=True).values_list('id', 'embedding')
+    for pk, blob in rows.iterator(chunk_size=batch_size):
+        new_blob = convert(blob)
+        if new_blob is None:
+            continue
+        batch.append(model(id=pk, embedding=new_blob))
+        if len(batch) >= batch_size:
+            model.objects.bulk_update(batch, ['embedding'])
+            converted += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, ['embedding'])
+        converted += len(batch)
+    return converted
+
+
+def pickled_to_binary(blob):
+    """Legacy pickle blob -> binary format (None if already converted or unreadable)"""
+    import pickle
+
+    if not blob or is_encoded(blob):
+        return None
+    try:
+        return encode_embedding(pickle.loads(bytes(blob)))
+    except Exception as e:
+        print(f"❌ Skipping unreadable legacy embedding: {e}")
+        return None
+
+
+def binary_to_pickled(blob):
+    """Binary format -> legacy pickle blob, for reversing the migration"""
+    import pickle
+
+    if not is_encoded(blob):
+        return None
+    return pickle.dumps(np.array(decode_embedding(blob), dtype=np.float32))
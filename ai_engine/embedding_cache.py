@@ -0,0 +1,280 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from .codec import encode_embedding, decode_embedding
+
+COUNTER_NAME = 'embeddings'
+
+
+def cache_key(model_name, text):
+    """SHA-256 of model name, cache version and the normalized text that gets encoded.
+
+    `text` must already be truncated the way the encoder sees it
+    (embeddings.prepare_text), so texts that differ only past the
+    truncation point or in whitespace share an entry.
+    """
+    normalized = unicodedata.normalize('NFC', ' '.join(text.split()))
+    version = getattr(settings, 'EMBEDDING_CACHE_VERSION', 1)
+    return hashlib.sha256(f"{model_name}\0{version}\0{normalized}".encode('utf-8')).digest()
+
+
+class MemoryLRU:
+    """Thread-safe LRU of key -> float32 vector, bounded by total bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+            return vector
+
+    def put(self, key, vector):
+        vector = np.array(vector, dtype=np.float32)  # own copy, read-only to callers
+        vector.setflags(write=False)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self._entries[key] = vector
+            self.bytes += vector.nbytes
+            while self.bytes > self.max_bytes and self._entries:
+                _, dropped = self._entries.popitem(last=False)
+                self.bytes -= dropped.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+class DiskCache:
+    """SQLite-backed second level shared by every process on the host"""
+
+    def __init__(self, path, max_bytes):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connect(self):
+        # One connection per thread (and per process after a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings ('
+            ' key BLOB PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)')
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get_many(self, keys):
+        """{key: vector} for the keys that are stored"""
+        if not keys:
+            return {}
+        conn = self._connect()
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ','.join('?' * len(chunk))
+            for key, blob in conn.execute(f'SELECT key, vector FROM embeddings WHERE key IN ({marks})', chunk):
+                found[bytes(key)] = decode_embedding(blob)
+        if found:
+            conn.executemany('UPDATE embeddings SET last_used = ? WHERE key = ?',
+                             [(time.time(), key) for key in found])
+        return found
+
+    def put_many(self, items, model_name):
+        """Store [(key, vector), ...]; trims least recently used rows now and then"""
+        if not items:
+            return
+        conn = self._connect()
+        now = time.time()
+        conn.executemany(
+            'INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)',
+            [(key, model_name, encode_embedding(vector), now) for key, vector in items],
+        )
+        self._writes += len(items)
+        if self._writes >= 1000:
+            self._writes = 0
+            self.trim()
+
+    def trim(self):
+        """Delete least recently used rows until the store is under max_bytes"""
+        conn = self._connect()
+        size = conn.execute('SELECT COALESCE(SUM(LENGTH(vector)), 0), COUNT(*) FROM embeddings').fetchone()
+        total, count = size
+        if total <= self.max_bytes or not count:
+            return 0
+        excess_rows = int(count * (1 - 0.9 * self.max_bytes / total)) + 1
+        conn.execute('DELETE FROM embeddings WHERE key IN '
+                     '(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)', (excess_rows,))
+        print(f"🔄 Trimmed {excess_rows} embeddings from the disk cache")
+        return excess_rows
+
+    def stats(self):
+        conn = self._connect()
+        total, count = conn.execute('SELECT COALESCE(SUM(LENGTH(vector)), 0), COUNT(*) FROM embeddings').fetchone()
+        return {'entries': count, 'bytes': total}
+
+    def clear(self):
+        self._connect().execute('DELETE FROM embeddings')
+
+
+class EmbeddingCache:
+    """Two-level embedding cache: in-process LRU in front of a SQLite store.
+
+    Counters are kept per process and periodically added to the shared
+    CacheCounter('embeddings') row, so totals across workers are available.
+    """
+
+    def __init__(self, memory_bytes, disk_path=None, disk_bytes=0, flush_every=100):
+        self.memory = MemoryLRU(memory_bytes)
+        self.disk = DiskCache(disk_path, disk_bytes) if disk_path else None
+        self.flush_every = flush_every
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._unflushed = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    def get_many(self, model_name, texts):
+        """Look up texts; returns (keys, {index: vector}) for the cached ones"""
+        keys = [cache_key(model_name, text) for text in texts]
+        found, missing = {}, []
+        for i, key in enumerate(keys):
+            vector = self.memory.get(key)
+            if vector is not None:
+                found[i] = vector
+            else:
+                missing.append(i)
+        memory_hits = len(found)
+
+        disk_hits = 0
+        if missing and self.disk is not None:
+            try:
+                stored = self.disk.get_many([keys[i] for i in missing])
+            except sqlite3.Error as e:
+                print(f"⚠️ Embedding disk cache unavailable: {e}")
+                stored = {}
+            for i in missing:
+                vector = stored.get(keys[i])
+                if vector is not None:
+                    found[i] = vector
+                    self.memory.put(keys[i], vector)  # may evict it at once when the budget is small
+                    disk_hits += 1
+
+        self._count(memory_hits, disk_hits, len(texts) - len(found))
+        return keys, found
+
+    def put_many(self, model_name, keys, vectors):
+        items = [(key, vector) for key, vector in zip(keys, vectors) if vector is not None]
+        for key, vector in items:
+            self.memory.put(key, vector)
+        if self.disk is not None:
+            try:
+                self.disk.put_many(items, model_name)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not write embedding disk cache: {e}")
+
+    def _count(self, memory_hits, disk_hits, misses):
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.disk_hits += disk_hits
+            self.misses += misses
+            self._unflushed['hits'] += memory_hits + disk_hits
+            self._unflushed['misses'] += misses
+            due = sum(self._unflushed.values()) >= self.flush_every
+        if due:
+            self.flush_counters()
+
+    def flush_counters(self):
+        from .parse_cache import bump_counter
+
+        with self._lock:
+            pending, self._unflushed = self._unflushed, {'hits': 0, 'misses': 0}
+        try:
+            for field, amount in pending.items():
+                if amount:
+                    bump_counter(COUNTER_NAME, field, amount)
+        except Exception as e:
+            print(f"⚠️ Could not record embedding cache counters: {e}")
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        stats = {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            'memory_entries': len(self.memory),
+            'memory_bytes': self.memory.bytes,
+            'memory_evictions': self.memory.evictions,
+        }
+        if self.disk is not None:
+            disk = self.disk.stats()
+            stats['disk_entries'], stats['disk_bytes'] = disk['entries'], disk['bytes']
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Process-wide embedding cache, or None when EMBEDDING_CACHE_ENABLED is off"""
+    global _cache
+    if not getattr(settings, 'EMBEDDING_CACHE_ENABLED', True):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(
+                    memory_bytes=getattr(settings, 'EMBEDDING_CACHE_MEMORY_MB', 64) * 1024 * 1024,
+                    disk_path=getattr(settings, 'EMBEDDING_CACHE_PATH', None),
+                    disk_bytes=getattr(settings, 'EMBEDDING_CACHE_DISK_MB', 1024) * 1024 * 1024,
+                )
+    return _cache
+
+
+def embedding_cache_stats():
+    """This process's cache stats plus the totals recorded by all processes"""
+    from .models import CacheCounter
+
+    cache = get_embedding_cache()
+    if cache is None:
+        return {'enabled': False}
+    cache.flush_counters()
+    stats = {'enabled': True, 'process': cache.stats()}
+    counter = CacheCounter.objects.filter(name=COUNTER_NAME).first()
+    if counter is not None:
+        stats['all_processes'] = {
+            'hits': counter.hits,
+            'misses': counter.misses,
+            'hit_rate': round(counter.hit_rate, 4),
+        }
+    return stats
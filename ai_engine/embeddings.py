@@ -1,53 +1,188 @@
-from sentence_transformers import SentenceTransformer
+from django.conf import settings
 import numpy as np
-import pickle
 import os
 
-# Initialize model
-try:
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    print("✅ Embedding model loaded successfully")
-except Exception as e:
-    print(f"❌ Error loading embedding model: {e}")
-    model = None
+from .codec import (
+    encode_embedding, decode_embedding, encode_embedding_matrix, decode_embedding_matrix, EmbeddingFormatError,
+)
+from .model_registry import get_model, model_tag
+from .encoder_service import get_encoder
+from .embedding_cache import get_embedding_cache
+
+def prepare_text(text):
+    """Clean and truncate text before encoding"""
+    return ' '.join(text.split()[:512])  # Limit text length
 
 def get_embedding(text):
     """Generate embedding for text"""
+    model = get_model() if text else None
     if not model or not text:
         print("❌ No model or text for embedding")
         return None
     
-    # Clean and prepare text
-    clean_text = ' '.join(text.split()[:512])  # Limit text length
-    
     try:
-        embedding = model.encode(clean_text)
+        prepared = prepare_text(text)
+        cache = get_embedding_cache()
+        if cache is not None:
+            keys, found = cache.get_many(model_tag(), [prepared])
+            if found:
+                return found[0]
+
+        # Concurrent callers are micro-batched into one model.encode call
+        timeout = getattr(settings, 'EMBEDDING_TIMEOUT_SECONDS', 60)
+        embedding = get_encoder().submit(prepared).result(timeout=timeout)
         print(f"✅ Generated embedding of shape: {embedding.shape}")
+        if cache is not None:
+            cache.put_many(model_tag(), keys, [embedding])
         return embedding
     except Exception as e:
         print(f"❌ Error generating embedding: {e}")
         return None
 
+def get_embeddings(texts, batch_size=None, spec=None):
+    """Generate embeddings for many texts in one batched call (None for empty texts).
+
+    spec selects another model than the serving one ({'name', 'version', 'dim'},
+    see model_registry.next_model); it is encoded directly, not micro-batched.
+    """
+    tag = model_tag(spec)
+    serving = spec is None or tag == model_tag()
+    results = [None] * len(texts)
+    todo = [(i, prepare_text(t)) for i, t in enumerate(texts) if t]
+    model = get_model(None if serving else spec['name'])
+    if not todo or model is None:
+        return results
+
+    try:
+        cache = get_embedding_cache()
+        if cache is not None:
+            keys, found = cache.get_many(tag, [t for _, t in todo])
+            for j, vector in found.items():
+                results[todo[j][0]] = vector
+            todo_keys = [keys[j] for j in range(len(todo)) if j not in found]
+            todo = [item for j, item in enumerate(todo) if j not in found]
+            if not todo:
+                return results
+
+        if serving:
+            vectors = get_encoder().encode_many([t for _, t in todo], batch_size=batch_size)
+        else:
+            vectors = list(model.encode([t for _, t in todo], batch_size=batch_size or 32))
+        for (i, _), vector in zip(todo, vectors):
+            results[i] = vector
+        print(f"✅ Generated {len(todo)} embeddings in one batch")
+        if cache is not None:
+            cache.put_many(tag, todo_keys, vectors)
+    except Exception as e:
+        print(f"❌ Error generating embeddings: {e}")
+    return results
+
+def chunking_enabled():
+    return getattr(settings, 'EMBEDDING_CHUNKING_ENABLED', True)
+
+def chunk_text(text, size=None, overlap=None, max_chunks=None):
+    """Split text into windows of `size` whitespace tokens, `overlap` shared between neighbours.
+
+    The model only reads the first ~256 word pieces of its input, so long
+    documents are embedded window by window. Only the first max_chunks
+    windows are kept.
+    """
+    size = max(1, size or getattr(settings, 'EMBEDDING_CHUNK_WORDS', 160))
+    overlap = getattr(settings, 'EMBEDDING_CHUNK_OVERLAP', 40) if overlap is None else overlap
+    overlap = min(max(0, overlap), size - 1)
+    max_chunks = max_chunks or getattr(settings, 'EMBEDDING_MAX_CHUNKS', 32)
+    words = text.split()
+    if not words:
+        return []
+    starts = range(0, max(len(words) - overlap, 1), size - overlap)
+    return [' '.join(words[start:start + size]) for start in starts[:max_chunks]]
+
+def pool_chunks(vectors):
+    """Document vector from its chunk vectors: the mean of the L2-normalized chunks"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).mean(axis=0)
+
+def embed_documents(texts, batch_size=None, spec=None):
+    """[(pooled vector, chunk matrix), ...] per text; (None, None) where it could not be encoded.
+
+    The chunks of all texts go through one get_embeddings call, so the model
+    sees full batches however long or short the individual documents are.
+    """
+    chunked = [chunk_text(t) if t else [] for t in texts]
+    vectors = get_embeddings([c for chunks in chunked for c in chunks], batch_size=batch_size, spec=spec)
+    results, start = [], 0
+    for chunks in chunked:
+        part = vectors[start:start + len(chunks)]
+        start += len(chunks)
+        if not part or any(v is None for v in part):
+            results.append((None, None))
+            continue
+        matrix = np.vstack(part).astype(np.float32)
+        results.append((pool_chunks(matrix), matrix))
+    return results
+
+def embed_document(text):
+    """(pooled vector, chunk matrix) for one document; no chunk matrix with chunking disabled"""
+    if not chunking_enabled():
+        return get_embedding(text), None
+    return embed_documents([text])[0]
+
 def store_embedding(model_instance, embedding):
     """Store embedding in model instance"""
     if embedding is not None:
         try:
-            model_instance.embedding = pickle.dumps(embedding)  # ✅ FIXED: singular 'embedding'
+            dtype = getattr(settings, 'EMBEDDING_STORAGE_DTYPE', 'float32')
+            model_instance.embedding = encode_embedding(embedding, dtype=dtype)
+            model_instance.embedding_model = model_tag()
             print("✅ Embedding stored in model instance")
         except Exception as e:
             print(f"❌ Error storing embedding: {e}")
 
+def store_chunk_embeddings(model_instance, chunks):
+    """Store per-chunk vectors next to the pooled embedding (None clears them)"""
+    if chunks is None:
+        model_instance.chunk_embeddings = None
+        model_instance.chunk_embedding_model = ''
+        return
+    dtype = getattr(settings, 'EMBEDDING_STORAGE_DTYPE', 'float32')
+    model_instance.chunk_embeddings = encode_embedding_matrix(chunks, dtype=dtype)
+    model_instance.chunk_embedding_model = model_tag()
+
 def load_embedding(serialized):
-    """Load embedding from serialized data"""
+    """Load embedding from serialized data (read-only, zero-copy view)"""
     if serialized:
         try:
-            embedding = pickle.loads(serialized)
-            print("✅ Embedding loaded from serialized data")
-            return embedding
-        except Exception as e:
+            return decode_embedding(serialized)
+        except EmbeddingFormatError as e:
             print(f"❌ Error loading embedding: {e}")
     return None
 
+def served_embedding(instance, tag=None):
+    """The instance's vector for the serving model, or None.
+
+    During a model rollout the vector may still sit in next_embedding
+    (see backfill_embeddings); rows tagged with another model are not served.
+    """
+    tag = tag or model_tag()
+    if instance.embedding_model == tag:
+        return load_embedding(instance.embedding)
+    if getattr(instance, 'next_embedding_model', '') == tag:
+        return load_embedding(instance.next_embedding)
+    return None
+
+def served_chunks(instance, tag=None):
+    """The instance's per-chunk vectors (chunks x dim) for the serving model, or None"""
+    tag = tag or model_tag()
+    if not getattr(instance, 'chunk_embeddings', None) or instance.chunk_embedding_model != tag:
+        return None
+    try:
+        return decode_embedding_matrix(instance.chunk_embeddings)
+    except EmbeddingFormatError as e:
+        print(f"❌ Error loading chunk embeddings: {e}")
+        return None
+
 def cosine_similarity(a, b):
     """Compute cosine similarity between two vectors"""
     if a is None or b is None:
@@ -75,8 +210,8 @@ def compute_match_score(resume, job):
         print(f"🔍 Computing match between Resume {resume.id} and Job {job.id}")
         
         # ✅ FIXED: Use singular 'embedding' instead of 'embeddings'
-        r_emb = load_embedding(resume.embedding)
-        j_emb = load_embedding(job.embedding)
+        r_emb = served_embedding(resume)
+        j_emb = served_embedding(job)
         
         if r_emb is None or j_emb is None:
             print("❌ Missing embeddings for match calculation")
@@ -92,14 +227,35 @@ def compute_match_score(resume, job):
         print(f"❌ Error computing match score: {e}")
         return 0.0
 
+def _skill_keys(skills):
+    """{skill ID (or normalized name if unknown): canonical name} for a skill list"""
+    from .taxonomy import get_taxonomy, normalize_skill
+
+    taxonomy = get_taxonomy()
+    skills = [str(s) for s in skills]
+    keys = {}
+    for raw, skill_id in zip(skills, taxonomy.lookup_many(skills)):
+        if skill_id is not None:
+            keys.setdefault(skill_id, taxonomy.name(skill_id))
+        else:
+            keys.setdefault(normalize_skill(raw), normalize_skill(raw))
+    return keys
+
 def get_missing_skills(resume_skills, job_skills):
     """Find skills missing from resume that are required for job"""
     if not resume_skills or not job_skills:
         return []
     
-    resume_skills_lower = [str(s).lower() for s in resume_skills]
-    job_skills_lower = [str(s).lower() for s in job_skills]
-    
-    missing_skills = [skill for skill in job_skills_lower if skill not in resume_skills_lower]
+    # Compare taxonomy IDs so aliases ("k8s" vs "kubernetes") count as the same skill
+    resume_keys = _skill_keys(resume_skills)
+    missing_skills = [name for key, name in _skill_keys(job_skills).items() if key not in resume_keys]
     print(f"✅ Missing skills analysis: {len(missing_skills)} skills missing")
-    return missing_skills
\ No newline at end of file
+    return missing_skills
+
+def get_skill_overlap(resume_skills, job_skills):
+    """Find job skills that the resume already covers"""
+    if not resume_skills or not job_skills:
+        return []
+
+    resume_keys = _skill_keys(resume_skills)
+    return [name for key, name in _skill_keys(job_skills).items() if key in resume_keys]
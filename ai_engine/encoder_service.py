@@ -0,0 +1,107 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from django.conf import settings
+
+from .model_registry import get_model, default_model_name
+
+
+class EmbeddingBatcher:
+    """Collects concurrent encode requests into micro-batches.
+
+    Callers get a Future back from submit(). A single background thread
+    waits for the first request, keeps collecting for up to max_wait_ms or
+    until max_batch_size texts are queued, then runs one model.encode(batch).
+    """
+
+    def __init__(self, model_name=None, max_batch_size=32, max_wait_ms=10):
+        self.model_name = model_name or default_model_name()
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+
+    def submit(self, text):
+        """Queue one text; the Future resolves to its embedding"""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((text, future))
+        return future
+
+    def encode_many(self, texts, batch_size=None):
+        """Encode an already-collected list in one call, bypassing the queue"""
+        model = get_model(self.model_name)
+        if model is None:
+            raise RuntimeError(f"Embedding model {self.model_name} is not available")
+        if not texts:
+            return []
+        return list(model.encode(list(texts), batch_size=batch_size or self.max_batch_size))
+
+    def _ensure_worker(self):
+        # Re-spawn after fork: threads do not survive into gunicorn workers
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                vectors = self.encode_many([text for text, _ in batch], batch_size=len(batch))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_encoder(model_name=None):
+    """Process-wide batcher for a model, configured from settings"""
+    model_name = model_name or default_model_name()
+    encoder = _encoders.get(model_name)
+    if encoder is None:
+        with _encoders_lock:
+            encoder = _encoders.get(model_name)
+            if encoder is None:
+                encoder = EmbeddingBatcher(
+                    model_name,
+                    max_batch_size=getattr(settings, 'EMBEDDING_MAX_BATCH_SIZE', 32),
+                    max_wait_ms=getattr(settings, 'EMBEDDING_MAX_WAIT_MS', 10),
+                )
+                _encoders[model_name] = encoder
+    return encoder
@@ -1,10 +1,33 @@
 import google.generativeai as genai
 import os
+import threading
+import time
 from django.conf import settings
 
+DEFAULT_MODEL_NAMES = [
+    'models/gemini-2.0-flash',
+    'models/gemini-2.0-flash-001',
+    'models/gemini-pro-latest',
+    'models/gemini-flash-latest',
+]
+
+
+class GeminiUnavailable(RuntimeError):
+    """Raised when no configured Gemini model can serve a request"""
+
+
+_configured = None  # (pid, api key, endpoint) genai was configured with
+_configure_lock = threading.Lock()
+
+
 # Configure Gemini
 def configure_gemini():
-    """Configure Gemini AI with API key"""
+    """Configure Gemini AI with API key, once per process.
+
+    GEMINI_API_ENDPOINT points the client at another host (e.g. a local stub
+    server in tests); it then talks REST instead of gRPC.
+    """
+    global _configured
     try:
         api_key = getattr(settings, 'GEMINI_API_KEY', None)
         if not api_key:
@@ -14,47 +37,168 @@ def configure_gemini():
             print("⚠️ GEMINI_API_KEY not found. AI features will be disabled.")
             return False
         
-        genai.configure(api_key=api_key)
-        print("✅ Gemini AI configured successfully")
+        endpoint = getattr(settings, 'GEMINI_API_ENDPOINT', None)
+        state = (os.getpid(), api_key, endpoint)
+        if _configured == state:
+            return True
+        with _configure_lock:
+            if _configured != state:
+                if endpoint:
+                    genai.configure(api_key=api_key, transport='rest', client_options={'api_endpoint': endpoint})
+                else:
+                    genai.configure(api_key=api_key)
+                _configured = state
+                get_model_selector().reset()
+                print("✅ Gemini AI configured successfully")
         return True
     except Exception as e:
         print(f"❌ Gemini configuration failed: {e}")
         return False
 
+
+class ModelSelector:
+    """Picks the Gemini model to use, without a test prompt per request.
+
+    The first candidate whose metadata says it supports generateContent is
+    remembered for `ttl` seconds. Each model has a circuit breaker: after
+    `max_failures` consecutive failed requests it is skipped for
+    `open_seconds`, then gets one trial request (half-open).
+    """
+
+    def __init__(self, model_names, ttl=3600, max_failures=3, open_seconds=60):
+        self.model_names = list(model_names)
+        self.ttl = ttl
+        self.max_failures = max_failures
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._resolved = None       # (name, resolved at)
+            self._models = {}           # name -> shared GenerativeModel
+            self._failures = {}         # name -> consecutive failures
+            self._open_until = {}       # name -> monotonic time the circuit closes again
+
+    def _available(self, name, now):
+        return self._open_until.get(name, 0) <= now
+
+    def _validate(self, name):
+        """Metadata lookup only; no tokens are generated"""
+        info = genai.get_model(name)
+        methods = getattr(info, 'supported_generation_methods', None) or ['generateContent']
+        return 'generateContent' in methods
+
+    def _model(self, name):
+        model = self._models.get(name)
+        if model is None:
+            model = self._models[name] = genai.GenerativeModel(name)
+        return model
+
+    def candidates(self):
+        """Model names to try in order: the resolved one first, then the rest whose circuit is closed"""
+        now = time.monotonic()
+        with self._lock:
+            resolved = self._resolved
+            if resolved and now - resolved[1] < self.ttl and self._available(resolved[0], now):
+                first = [resolved[0]]
+            else:
+                self._resolved = None
+                first = []
+            return first + [n for n in self.model_names if n not in first and self._available(n, now)]
+
+    def resolve(self, skip=()):
+        """Name of the model to use, re-validated at most every ttl seconds"""
+        for name in self.candidates():
+            if name in skip:
+                continue
+            with self._lock:
+                if self._resolved and self._resolved[0] == name:
+                    return name
+            try:
+                if not self._validate(name):
+                    print(f"⚠️ Model {name} does not support generateContent")
+                    self.record_failure(name, trip=True)
+                    continue
+            except Exception as e:
+                print(f"❌ Model {name} failed: {e}")
+                self.record_failure(name)
+                continue
+            with self._lock:
+                self._resolved = (name, time.monotonic())
+            print(f"✅ Using model: {name}")
+            return name
+        raise GeminiUnavailable("No compatible AI model found")
+
+    def record_success(self, name):
+        with self._lock:
+            self._failures.pop(name, None)
+            self._open_until.pop(name, None)
+
+    def record_failure(self, name, trip=False):
+        with self._lock:
+            failures = self._failures.get(name, 0) + 1
+            self._failures[name] = failures
+            half_open = name in self._open_until  # tripped before and not recovered yet
+            if trip or half_open or failures >= self.max_failures:
+                self._open_until[name] = time.monotonic() + self.open_seconds
+                self._failures[name] = 0
+                print(f"⚠️ Circuit open for {name} for {self.open_seconds}s")
+            if self._resolved and self._resolved[0] == name:
+                self._resolved = None
+
+    def generate(self, prompt):
+        """Send prompt to the resolved model, falling over to the next one on errors"""
+        last_error, tried = None, set()
+        for _ in range(len(self.model_names)):
+            try:
+                name = self.resolve(skip=tried)
+            except GeminiUnavailable:
+                if last_error is None:
+                    raise
+                break
+            try:
+                response = self._model(name).generate_content(prompt)
+                text = response.text
+            except Exception as e:
+                print(f"❌ Model {name} failed: {e}")
+                self.record_failure(name)
+                tried.add(name)
+                last_error = e
+                continue
+            self.record_success(name)
+            return text
+        raise GeminiUnavailable(f"AI service error: {last_error}")
+
+
+_selector = None
+_selector_lock = threading.Lock()
+
+
+def get_model_selector():
+    """Process-wide ModelSelector configured from settings"""
+    global _selector
+    if _selector is None:
+        with _selector_lock:
+            if _selector is None:
+                _selector = ModelSelector(
+                    getattr(settings, 'GEMINI_MODEL_NAMES', DEFAULT_MODEL_NAMES),
+                    ttl=getattr(settings, 'GEMINI_MODEL_TTL_SECONDS', 3600),
+                    max_failures=getattr(settings, 'GEMINI_CIRCUIT_MAX_FAILURES', 3),
+                    open_seconds=getattr(settings, 'GEMINI_CIRCUIT_OPEN_SECONDS', 60),
+                )
+    return _selector
+
+
+def generate_text(prompt):
+    """Response text for prompt from the selected Gemini model; raises GeminiUnavailable"""
+    if not configure_gemini():
+        raise GeminiUnavailable("AI service unavailable. Please check your API key.")
+    return get_model_selector().generate(prompt)
+
 def generate_interview_questions_with_answers(job_title, job_description, resume_skills, num_questions=8):
     """Generate interview questions with suggested answers and keywords"""
-    if not configure_gemini():
-        return [{
-            "question": "AI service unavailable. Please check your API key.",
-            "suggested_answer": "",
-            "keywords": []
-        }]
-    
     try:
-        model_names = [
-            'models/gemini-2.0-flash',
-            'models/gemini-2.0-flash-001', 
-            'models/gemini-pro-latest',
-        ]
-        
-        model = None
-        for model_name in model_names:
-            try:
-                model = genai.GenerativeModel(model_name)
-                test_response = model.generate_content("Say 'OK'")
-                if test_response.text:
-                    print(f"✅ Using model: {model_name}")
-                    break
-            except Exception:
-                continue
-        
-        if not model:
-            return [{
-                "question": "No compatible AI model found.",
-                "suggested_answer": "",
-                "keywords": []
-            }]
-        
         prompt = f"""
         Generate {num_questions} interview questions for a {job_title} position.
         
@@ -75,11 +219,17 @@ def generate_interview_questions_with_answers(job_title, job_description, resume
         Make questions specific to embedded systems, IoT, and electronics.
         """
         
-        response = model.generate_content(prompt)
-        print(f"✅ Raw AI response with answers: {response.text[:300]}...")
+        text = generate_text(prompt)
+        print(f"✅ Raw AI response with answers: {text[:300]}...")
         
-        return parse_questions_with_answers(response.text, num_questions)
+        return parse_questions_with_answers(text, num_questions)
         
+    except GeminiUnavailable as e:
+        return [{
+            "question": str(e),
+            "suggested_answer": "",
+            "keywords": []
+        }]
     except Exception as e:
         print(f"❌ Question generation with answers failed: {e}")
         return [{
@@ -162,37 +312,7 @@ def generate_fallback_questions_with_answers(count):
 
 def generate_career_insights(resume_skills, job_title=None, job_description=None, job_skills=None, job_market_trends=None):
     """Generate personalized career insights using Gemini"""
-    if not configure_gemini():
-        return {"error": "🤖 AI service is currently unavailable. Please check your API key."}
-    
     try:
-        # ✅ USE ACTUAL AVAILABLE MODELS FROM YOUR LIST
-        model_names = [
-            'models/gemini-2.0-flash',
-            'models/gemini-2.0-flash-001', 
-            'models/gemini-pro-latest',
-            'models/gemini-flash-latest',
-        ]
-        
-        model = None
-        successful_model = None
-        
-        for model_name in model_names:
-            try:
-                model = genai.GenerativeModel(model_name)
-                # Test with a simple prompt
-                test_response = model.generate_content("Say 'OK'")
-                if test_response.text:
-                    successful_model = model_name
-                    print(f"✅ Using model: {model_name}")
-                    break
-            except Exception as e:
-                print(f"❌ Model {model_name} failed: {e}")
-                continue
-        
-        if not model:
-            return {"error": "❌ No compatible AI model found"}
-        
         # Build dynamic prompt based on available job info
         prompt = f"""
         Analyze this skill set and provide career insights for an Electronics/Computer Engineering student:
@@ -237,9 +357,10 @@ def generate_career_insights(resume_skills, job_title=None, job_description=None
         if job_title:
             prompt += f"\n\nFocus specifically on preparing for the {job_title} role and bridging any skill gaps."
         
-        response = model.generate_content(prompt)
-        return parse_career_insights(response.text)
+        return parse_career_insights(generate_text(prompt))
         
+    except GeminiUnavailable as e:
+        return {"error": f"🤖 {e}"}
     except Exception as e:
         print(f"❌ Career insights generation failed: {e}")
         return {"error": f"AI service error: {str(e)}"}
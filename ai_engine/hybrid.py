@@ -0,0 +1,209 @@
+import numpy as np
+from django.conf import settings
+
+from .bm25 import get_bm25_index, tokenize, weighted_score
+from .embeddings import served_embedding
+from .matrix import dense_top_k, dense_vectors, get_job_matrix, normalize_rows, top_k_indices
+from .skill_bits import get_job_bit_matrix, get_resume_bit_matrix, decode_bits
+
+# The final score is a weighted mix of three signals, each scaled to 0..1:
+#   dense  - cosine similarity of the embeddings (negative clipped to 0)
+#   skills - share of the job's skills the resume has, from the bitsets
+#   bm25   - keyword relevance, divided by the best BM25 score in the candidate set
+# Candidates are the HYBRID_CANDIDATES best rows by each signal: the nearest
+# embeddings (found like dense ranking finds them, through the ANN index or a
+# scan within the RAM budget), the best BM25 hits and the best skill coverage.
+# Only those rows are scored on all three signals.
+DEFAULT_WEIGHTS = {'dense': 0.6, 'skills': 0.25, 'bm25': 0.15}
+
+
+def hybrid_weights():
+    """Configured weights, normalized to sum to 1"""
+    weights = dict(DEFAULT_WEIGHTS)
+    weights.update(getattr(settings, 'HYBRID_SCORE_WEIGHTS', {}))
+    total = sum(weights.values()) or 1.0
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def combine(dense, skills, bm25, weights=None, use_dense=True):
+    """Weighted 0-100 score from component arrays. Without embeddings the
+    dense weight is spread over the other two signals."""
+    weights = dict(weights or hybrid_weights())
+    if not use_dense:
+        rest = weights['skills'] + weights['bm25'] or 1.0
+        weights = {'dense': 0.0, 'skills': weights['skills'] / rest, 'bm25': weights['bm25'] / rest}
+    dense, skills, bm25 = (np.asarray(a, dtype=np.float64) for a in (dense, skills, bm25))
+    total = (weights['dense'] * np.clip(dense, 0.0, 1.0)
+             + weights['skills'] * skills
+             + weights['bm25'] * bm25)
+    return np.round(100.0 * total, 2)
+
+
+def _values_at(ids, values, wanted):
+    """values of `wanted` ids in an (ids, values) pair of arrays, 0 where absent"""
+    out = np.zeros(wanted.shape[0], dtype=np.float32)
+    if ids.shape[0] == 0 or wanted.shape[0] == 0:
+        return out
+    order = np.argsort(ids, kind='stable')
+    pos = np.minimum(np.searchsorted(ids, wanted, sorter=order), ids.shape[0] - 1)
+    hit = ids[order[pos]] == wanted
+    out[hit] = values[order[pos[hit]]]
+    return out
+
+
+def _best_ids(ids, scores, limit, allowed=None):
+    """Ids of the `limit` best positive scores, among `allowed` ids if given"""
+    if allowed is not None:
+        keep = np.isin(ids, allowed)
+        ids, scores = ids[keep], scores[keep]
+    best = top_k_indices(scores, limit)
+    return ids[best[scores[best] > 0]]
+
+
+def hybrid_scores(key, query_embedding, query_bits, query_text, only=None, everything=False, nprobe=None,
+                  bm25=None):
+    """Hybrid scores of one query against its candidate jobs or resumes.
+
+    Returns (ids, scores, dense, skills, bm25) arrays aligned by row. `only`
+    restricts the candidates to those ids (e.g. a skill filter or keyword
+    search result) and scores all of them when there are at most
+    HYBRID_CANDIDATES; `everything` scores every job (jobs only, their
+    matrix is always resident). nprobe is passed to the ANN search. bm25
+    is the index's (ids, raw scores) for query_text if the caller has it.
+    """
+    limit = getattr(settings, 'HYBRID_CANDIDATES', 1000)
+    bit_matrix = get_job_bit_matrix() if key == 'jobs' else get_resume_bit_matrix()
+    # Coverage always means "share of the job's skills": rows are jobs when
+    # ranking jobs, and the query is the job when ranking resumes.
+    bit_ids, coverage = bit_matrix.coverage(query_bits, rows_required=(key == 'jobs'))
+    bm25_ids, bm25_raw = bm25 if bm25 is not None else get_bm25_index(key).scores(tokenize(query_text))
+    use_dense = query_embedding is not None
+
+    near_ids, near_sims = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    allowed = None if only is None else np.unique(np.asarray(list(only), dtype=np.int64))
+    if everything:
+        matrix = get_job_matrix()
+        ids = np.union1d(np.union1d(matrix.ids, bit_ids), bm25_ids)
+    elif allowed is not None and allowed.shape[0] <= limit:
+        ids = allowed
+    else:
+        if use_dense:
+            ranked = dense_top_k(key, query_embedding, limit, nprobe=nprobe, allowed=allowed)
+            near_ids = np.asarray([pk for pk, _ in ranked], dtype=np.int64)
+            near_sims = np.asarray([sim for _, sim in ranked], dtype=np.float32)
+        ids = np.union1d(np.union1d(near_ids, _best_ids(bm25_ids, bm25_raw, limit, allowed)),
+                         _best_ids(bit_ids, coverage, limit, allowed))
+
+    dense = np.zeros(ids.shape[0], dtype=np.float32)
+    if use_dense and ids.shape[0]:
+        # Similarities the nearest-neighbour search already computed are reused
+        known = np.isin(ids, near_ids)
+        dense[known] = _values_at(near_ids, near_sims, ids[known])
+        found_ids, vectors = dense_vectors(key, ids[~known])
+        if found_ids.shape[0]:
+            q = normalize_rows(np.asarray(query_embedding, dtype=np.float32).ravel())[0]
+            if vectors.shape[1] == q.shape[0]:
+                dense[np.searchsorted(ids, found_ids)] = normalize_rows(vectors) @ q
+
+    skills = _values_at(bit_ids, coverage.astype(np.float32), ids)
+    bm25 = _values_at(bm25_ids, bm25_raw, ids)
+    if bm25.shape[0] and bm25.max() > 0:
+        bm25 /= bm25.max()
+
+    return ids, combine(dense, skills, bm25, use_dense=use_dense), dense, skills, bm25
+
+
+def breakdown_at(parts, i):
+    """{'dense', 'skills', 'bm25'} of row i of hybrid_scores' component arrays"""
+    dense, skills, bm25 = parts
+    return {
+        'dense': round(float(dense[i]), 4),
+        'skills': round(float(skills[i]), 4),
+        'bm25': round(float(bm25[i]), 4),
+    }
+
+
+def hybrid_rank(key, query_embedding, query_bits, query_text, k, only=None, nprobe=None):
+    """Rank jobs or resumes for one query by hybrid score.
+
+    Returns [(id, score, {'dense', 'skills', 'bm25'}), ...], best first.
+    """
+    ids, scores, *parts = hybrid_scores(key, query_embedding, query_bits, query_text, only=only, nprobe=nprobe)
+    return [(int(ids[i]), float(scores[i]), breakdown_at(parts, i)) for i in top_k_indices(scores, k)]
+
+
+def rank_jobs_hybrid(resume, k=10, nprobe=None):
+    """Best jobs for a resume as {'job', 'similarity', 'score', 'breakdown', 'missing_skills'} dicts"""
+    from jobs.models import Job
+
+    resume_bits = decode_bits(resume.skill_bits)
+    ranked = hybrid_rank('jobs', served_embedding(resume), resume_bits, resume.text, k, nprobe=nprobe)
+    ranked_ids = [pk for pk, _, _ in ranked]
+    jobs = Job.objects.in_bulk(ranked_ids)
+    missing = get_job_bit_matrix().missing(resume_bits, only=ranked_ids)
+    results = []
+    for pk, score, breakdown in ranked:
+        job = jobs.get(pk)
+        if job is None:
+            continue
+        results.append({
+            'job': job,
+            'similarity': breakdown['dense'],
+            'score': score,
+            'breakdown': breakdown,
+            'missing_skills': missing.get(pk, []),
+        })
+    print(f"✅ Hybrid-ranked {len(results)} jobs for resume {resume.id}")
+    return results
+
+
+def rank_resumes_hybrid(job, limit=None, only=None, nprobe=None):
+    """Shortlist resumes for a job as [(resume_id, similarity, score), ...]"""
+    limit = limit or getattr(settings, 'RECRUITER_SHORTLIST_SIZE', 500)
+    query_text = f"{job.title} {job.description}"
+    ranked = hybrid_rank('resumes', served_embedding(job), decode_bits(job.skill_bits),
+                         query_text, limit, only=only, nprobe=nprobe)
+    print(f"✅ Hybrid-shortlisted {len(ranked)} resumes for job {job.id}")
+    return [(pk, breakdown['dense'], score) for pk, score, breakdown in ranked]
+
+
+def hybrid_match_score(resume, job, bm25_weights=None):
+    """Hybrid score of one resume/job pair as {'score', 'dense', 'skills', 'bm25'}.
+
+    BM25 is scaled by the best-scoring job for this resume, so a job that is
+    the closest keyword match in the corpus gets the full BM25 weight.
+    That takes a scan of every job, unless bm25_weights (the job's
+    BM25Index.weights_for) are given and the resume has a stored bm25_norm:
+    the scale is then max(bm25_norm, this pair's BM25).
+    """
+    r_emb = served_embedding(resume)
+    j_emb = served_embedding(job)
+    use_dense = r_emb is not None and j_emb is not None
+    dense = 0.0
+    if use_dense and r_emb.shape == j_emb.shape:
+        dense = float(normalize_rows(r_emb)[0] @ normalize_rows(j_emb)[0])
+
+    resume_bits, job_bits = decode_bits(resume.skill_bits), decode_bits(job.skill_bits)
+    required = job_bits.bit_count()
+    skills = (resume_bits & job_bits).bit_count() / required if required else 0.0
+
+    bm25 = 0.0
+    norm = getattr(resume, 'bm25_norm', None)
+    if bm25_weights is not None and norm is not None:
+        raw = weighted_score(tokenize(resume.text), bm25_weights)
+        if raw > 0:
+            bm25 = raw / max(norm, raw)
+    else:
+        doc_ids, bm25_scores = get_bm25_index('jobs').scores(tokenize(resume.text))
+        if bm25_scores.shape[0] and bm25_scores.max() > 0:
+            hit = np.flatnonzero(doc_ids == job.id)
+            if hit.shape[0]:
+                bm25 = float(bm25_scores[hit[0]] / bm25_scores.max())
+
+    score = combine(dense, skills, bm25, use_dense=use_dense)
+    return {
+        'score': float(score),
+        'dense': round(dense, 4),
+        'skills': round(skills, 4),
+        'bm25': round(bm25, 4),
+    }
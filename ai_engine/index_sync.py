@@ -0,0 +1,173 @@
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+# Each process keeps its own copies of the embedding matrices, BM25 indexes
+# and skill-bit matrices, and post_save only updates the copies of the process
+# that saved the row. Every save or delete therefore also appends (key, row id)
+# to the IndexChange table. A process that holds a copy applies the entries
+# past its high-water mark (at most every INDEX_SYNC_SECONDS, or on demand)
+# by re-reading those rows, so resumes parsed by the ingestion workers reach
+# the web processes without a restart. Entries of the last
+# INDEX_SYNC_OVERLAP_SECONDS are read again, because an id allocated before
+# a smaller one may be committed after it; applying a row twice is harmless.
+
+_marks = {}       # key -> highest IndexChange id applied in this process
+_seen = {}        # key -> {change id: monotonic time} of the overlap window
+_checked = {}     # key -> monotonic time of the last check
+_synced_at = {}   # key -> wall time of the last successful check
+_lock = threading.RLock()
+_applying = threading.local()  # set while applying, so the getters it reaches do not re-enter
+_last_prune = 0.0
+
+
+def sync_enabled():
+    return getattr(settings, 'INDEX_SYNC_ENABLED', True)
+
+
+def origin():
+    """host:pid of this process, recorded on its changes"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def record_changes(key, pks):
+    """Log saved or deleted rows of key for the other processes"""
+    from .models import IndexChange
+
+    if not sync_enabled() or not pks:
+        return
+    me = origin()
+    IndexChange.objects.bulk_create([IndexChange(key=key, row_id=int(pk), origin=me) for pk in pks], batch_size=500)
+
+
+def record_reset(key):
+    """Log that every row of key changed (e.g. bulk updates that send no signals); readers reload"""
+    from .models import IndexChange
+
+    if sync_enabled():
+        IndexChange.objects.create(key=key, row_id=None, origin=origin())
+
+
+def latest_change_id():
+    from .models import IndexChange
+    return IndexChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def track(key):
+    """Start following key's changes; called before a copy is loaded from the DB"""
+    if not sync_enabled() or key in _marks:
+        return
+    with _lock:
+        if key not in _marks:
+            _marks[key] = latest_change_id()
+            _seen[key] = {}
+            _checked[key] = time.monotonic()
+            _synced_at[key] = time.time()
+
+
+def catch_up(key, force=False):
+    """Apply rows other processes saved or deleted since the last check; returns how many.
+
+    Throttled to one query per INDEX_SYNC_SECONDS unless force. Does nothing
+    until a copy for key has been loaded in this process.
+    """
+    if not sync_enabled() or key not in _marks or getattr(_applying, 'active', False):
+        return 0
+    interval = getattr(settings, 'INDEX_SYNC_SECONDS', 1.0)
+    if not force and time.monotonic() - _checked.get(key, 0.0) < interval:
+        return 0
+    with _lock:
+        if not force and time.monotonic() - _checked.get(key, 0.0) < interval:
+            return 0
+        _checked[key] = time.monotonic()
+        _applying.active = True
+        try:
+            return _catch_up_locked(key)
+        finally:
+            _applying.active = False
+
+
+def _catch_up_locked(key):
+    from .models import IndexChange
+
+    overlap = getattr(settings, 'INDEX_SYNC_OVERLAP_SECONDS', 10)
+    retention = getattr(settings, 'INDEX_CHANGE_RETENTION_SECONDS', 86400)
+    now = time.monotonic()
+    seen = {cid: at for cid, at in _seen[key].items() if now - at < 2 * overlap}
+    changes = list(
+        IndexChange.objects
+        .filter(Q(id__gt=_marks[key]) | Q(created_at__gte=timezone.now() - timedelta(seconds=overlap)), key=key)
+        .order_by('id')
+        .values_list('id', 'row_id', 'origin')
+    )
+    me = origin()
+    new = [(cid, row_id) for cid, row_id, writer in changes if cid not in seen and writer != me]
+    stale = time.time() - _synced_at[key] > retention - overlap  # entries we never read may be pruned
+
+    if stale or any(row_id is None for _, row_id in new) or len(new) > getattr(settings, 'INDEX_SYNC_MAX_ROWS', 5000):
+        reload_copies(key)
+        applied = len(new)
+        print(f"🔄 Reloading {key} indexes from the DB: too many changes since the last sync")
+    else:
+        applied = apply_changes(key, sorted({row_id for _, row_id in new}))
+        if applied:
+            print(f"🔄 Applied {applied} {key} rows saved by other processes")
+
+    for cid, _, _ in changes:
+        seen.setdefault(cid, now)
+    _seen[key] = seen
+    if changes:
+        _marks[key] = max(_marks[key], changes[-1][0])
+    _synced_at[key] = time.time()
+    return applied
+
+
+def apply_changes(key, row_ids, chunk=500):
+    """Re-read rows of key and apply them (or their deletion) to this process's copies"""
+    from .signals import MATRIX_MODELS, SYNCED_FIELDS, apply_rows
+
+    model = MATRIX_MODELS[key]
+    for start in range(0, len(row_ids), chunk):
+        ids = row_ids[start:start + chunk]
+        rows = list(model.objects.filter(id__in=ids).only('id', *SYNCED_FIELDS[model]))
+        found = {row.pk for row in rows}
+        apply_rows(model, rows, removed=[pk for pk in ids if pk not in found], remote=True)
+    return len(row_ids)
+
+
+def reload_copies(key):
+    """Drop this process's copies of key so they are rebuilt from the DB on next use"""
+    from .bm25 import invalidate_bm25_index
+    from .matrix import invalidate_matrix, shared_matrix_enabled
+    from .skill_bits import invalidate_bit_matrix
+
+    if not shared_matrix_enabled():  # the shared store is one copy for every process
+        invalidate_matrix(key)
+    invalidate_bit_matrix(key)
+    invalidate_bm25_index(key)
+
+
+def prune_changes(force=False):
+    """Delete log entries older than INDEX_CHANGE_RETENTION_SECONDS (at most once a minute)"""
+    from .models import IndexChange
+
+    global _last_prune
+    if not force and time.monotonic() - _last_prune < 60:
+        return 0
+    _last_prune = time.monotonic()
+    retention = getattr(settings, 'INDEX_CHANGE_RETENTION_SECONDS', 86400)
+    deleted, _ = IndexChange.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=retention)).delete()
+    return deleted
+
+
+def forget():
+    """Stop following every key (tests, or after a fork)"""
+    with _lock:
+        for state in (_marks, _seen, _checked, _synced_at):
+            state.clear()
@@ -0,0 +1,237 @@
+import os
+import socket
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from resumes.models import Resume
+from .ann import flush_indexes
+from .index_sync import prune_changes
+from .models import IngestionTask
+
+
+def enqueue_resume(resume):
+    """Mark a resume pending and queue it for a background worker"""
+    Resume.objects.filter(pk=resume.pk).update(status=Resume.STATUS_PENDING)
+    resume.status = Resume.STATUS_PENDING
+    task = IngestionTask.objects.create(
+        resume=resume,
+        available_at=timezone.now(),
+        max_attempts=getattr(settings, 'INGESTION_MAX_ATTEMPTS', 3),
+    )
+    print(f"📥 Queued resume {resume.id} as ingestion task {task.id}")
+    return task
+
+
+def submit_resume(resume):
+    """Process a fresh upload: queue it, or parse inline if async ingestion is off"""
+    if getattr(settings, 'RESUME_INGESTION_ASYNC', True):
+        return enqueue_resume(resume)
+
+    from .parsers import parse_and_store_resume
+    parse_and_store_resume(resume)
+    return None
+
+
+def submit_job_scores(job):
+    """Materialize a posted job's match scores: queued for a worker, or inline if async ingestion is off"""
+    from .match_store import materialization_enabled, refresh_job
+
+    if not materialization_enabled():
+        return None
+    if not getattr(settings, 'RESUME_INGESTION_ASYNC', True):
+        refresh_job(job)
+        return None
+    task = IngestionTask.objects.create(
+        kind=IngestionTask.KIND_JOB_SCORES,
+        job=job,
+        available_at=timezone.now(),
+        max_attempts=getattr(settings, 'INGESTION_MAX_ATTEMPTS', 3),
+    )
+    print(f"📥 Queued match scores of job {job.id} as ingestion task {task.id}")
+    return task
+
+
+def enqueue_scores(resume_ids=(), job_ids=()):
+    """Queue match score refreshes for rows written in bulk (imports, backfills).
+
+    Runs them inline when async ingestion is off. Returns the number queued.
+    """
+    from .match_store import materialization_enabled, refresh_resume, refresh_job
+
+    if not materialization_enabled():
+        return 0
+    if not getattr(settings, 'RESUME_INGESTION_ASYNC', True):
+        for resume in Resume.objects.filter(id__in=list(resume_ids)).defer('file'):
+            refresh_resume(resume)
+        from jobs.models import Job
+        for job in Job.objects.filter(id__in=list(job_ids)):
+            refresh_job(job)
+        return 0
+    now = timezone.now()
+    max_attempts = getattr(settings, 'INGESTION_MAX_ATTEMPTS', 3)
+    tasks = [IngestionTask(kind=IngestionTask.KIND_RESUME_SCORES, resume_id=pk, available_at=now,
+                           max_attempts=max_attempts) for pk in resume_ids]
+    tasks += [IngestionTask(kind=IngestionTask.KIND_JOB_SCORES, job_id=pk, available_at=now,
+                            max_attempts=max_attempts) for pk in job_ids]
+    IngestionTask.objects.bulk_create(tasks, batch_size=500)
+    if tasks:
+        print(f"📥 Queued match score refreshes for {len(tasks)} rows")
+    return len(tasks)
+
+
+def requeue_stale_tasks():
+    """Put back tasks whose worker died mid-run; fail those with no attempts left"""
+    timeout = getattr(settings, 'INGESTION_TASK_TIMEOUT_SECONDS', 600)
+    now = timezone.now()
+    stale = IngestionTask.objects.filter(
+        status=IngestionTask.STATUS_RUNNING, started_at__lt=now - timedelta(seconds=timeout),
+    )
+    with transaction.atomic():
+        exhausted = list(stale.filter(attempts__gte=F('max_attempts')).values_list('id', 'kind', 'resume_id'))
+        failed = 0
+        for task_id, kind, resume_id in exhausted:
+            # Conditional on status, so a task finishing right now is not overwritten
+            if IngestionTask.objects.filter(id=task_id, status=IngestionTask.STATUS_RUNNING).update(
+                    status=IngestionTask.STATUS_FAILED, finished_at=now, worker='',
+                    error=f"Timed out after {timeout}s on the last attempt"):
+                if kind == IngestionTask.KIND_RESUME:  # score refreshes leave the resume's status alone
+                    Resume.objects.filter(pk=resume_id).update(status=Resume.STATUS_FAILED)
+                failed += 1
+        if failed:
+            print(f"❌ {failed} stale ingestion tasks had no attempts left and were failed")
+        return stale.filter(attempts__lt=F('max_attempts')).update(
+            status=IngestionTask.STATUS_QUEUED, available_at=now, worker='')
+
+
+def claim_next_task(worker_id):
+    """Atomically claim the oldest due task, or return None.
+
+    The claim is a conditional UPDATE on status, so two workers racing for
+    the same row cannot both win, on SQLite as well as on PostgreSQL.
+    """
+    now = timezone.now()
+    candidates = (
+        IngestionTask.objects
+        .filter(status=IngestionTask.STATUS_QUEUED, available_at__lte=now)
+        .order_by('available_at', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    for task_id in candidates:
+        claimed = IngestionTask.objects.filter(id=task_id, status=IngestionTask.STATUS_QUEUED).update(
+            status=IngestionTask.STATUS_RUNNING,
+            worker=worker_id,
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return IngestionTask.objects.select_related('resume', 'job').get(id=task_id)
+    return None
+
+
+def run_task(task):
+    """Process one claimed task, recording per-stage timings and retrying on failure"""
+    from .parsers import process_resume, timed_stage
+    from .match_store import refresh_resume, refresh_job
+
+    resume = task.resume if task.kind == IngestionTask.KIND_RESUME else None
+    if resume is not None:
+        Resume.objects.filter(pk=resume.pk).update(status=Resume.STATUS_PROCESSING)
+        resume.status = Resume.STATUS_PROCESSING
+
+    timings = {}
+    start = time.perf_counter()
+    try:
+        if task.kind == IngestionTask.KIND_JOB_SCORES:
+            with timed_stage(timings, 'match_scores'):
+                refresh_job(task.job)
+        elif task.kind == IngestionTask.KIND_RESUME_SCORES:
+            with timed_stage(timings, 'match_scores'):
+                refresh_resume(task.resume)
+        else:
+            process_resume(resume, timings)
+    except Exception as e:
+        timings['total'] = round(time.perf_counter() - start, 4)
+        _record_failure(task, resume, timings, e)
+        return False
+
+    timings['total'] = round(time.perf_counter() - start, 4)
+    task.status = IngestionTask.STATUS_DONE
+    task.timings = timings
+    task.error = ''
+    task.finished_at = timezone.now()
+    task.save(update_fields=['status', 'timings', 'error', 'finished_at'])
+    print(f"✅ Ingestion task {task.id} done in {timings['total']}s {timings}")
+    return True
+
+
+def _record_failure(task, resume, timings, error):
+    task.timings = timings
+    task.error = f"{type(error).__name__}: {error}"
+    if task.attempts < task.max_attempts:
+        # Exponential backoff: 2s, 4s, 8s, ...
+        backoff = getattr(settings, 'INGESTION_RETRY_BASE_SECONDS', 2) * (2 ** (task.attempts - 1))
+        task.status = IngestionTask.STATUS_QUEUED
+        task.available_at = timezone.now() + timedelta(seconds=backoff)
+        resume_status = Resume.STATUS_PENDING
+        print(f"⚠️ Ingestion task {task.id} failed (attempt {task.attempts}), retrying in {backoff}s: {error}")
+    else:
+        task.status = IngestionTask.STATUS_FAILED
+        task.finished_at = timezone.now()
+        resume_status = Resume.STATUS_FAILED
+        print(f"❌ Ingestion task {task.id} failed permanently: {error}")
+
+    with transaction.atomic():
+        task.save(update_fields=['status', 'timings', 'error', 'available_at', 'finished_at'])
+        if resume is not None:
+            Resume.objects.filter(pk=resume.pk).update(status=resume_status)
+
+
+def _flush_text_index():
+    from .inverted_index import loaded_inverted_index
+    index = loaded_inverted_index()
+    if index is not None:
+        index.flush()
+
+
+def run_worker(worker_id=None, poll_interval=1.0, max_tasks=None, stop_event=None):
+    """Claim and run tasks until stopped; returns the number of tasks run"""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    print(f"👷 Ingestion worker {worker_id} started")
+    while not (stop_event and stop_event.is_set()):
+        if max_tasks is not None and processed >= max_tasks:
+            break
+        requeue_stale_tasks()
+        task = claim_next_task(worker_id)
+        if task is None:
+            _flush_text_index()  # idle: turn the text index WAL into a segment
+            flush_indexes()  # and save the ANN writes of the tasks just run
+            prune_changes()
+            time.sleep(poll_interval)
+            continue
+        run_task(task)
+        processed += 1
+    _flush_text_index()
+    flush_indexes()
+    print(f"👷 Ingestion worker {worker_id} stopped after {processed} tasks")
+    return processed
+
+
+def resume_status(resume):
+    """Status payload for polling: resume state plus its latest task"""
+    task = resume.ingestion_tasks.order_by('-id').first()
+    payload = {"resume_id": resume.id, "status": resume.status}
+    if task:
+        payload["task"] = {
+            "id": task.id,
+            "status": task.status,
+            "attempts": task.attempts,
+            "max_attempts": task.max_attempts,
+            "timings": task.timings,
+            "error": task.error,
+        }
+    return payload
@@ -0,0 +1,735 @@
+import atexit
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+from .bm25 import tokenize
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+# Segment file layout:
+#   header  magic, version, generation, doc count, dictionary offset
+#   postings for each term, back to back (varints, see encode_postings)
+#   doc IDs of the segment (delta varints)
+#   dictionary JSON {"terms": {term: [offset, length]}, "docs": [offset, length]}
+SEGMENT_MAGIC = b'SRII'
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = struct.Struct('<4sB3xQQQ')
+
+
+class QuerySyntaxError(ValueError):
+    pass
+
+
+# -- varint / postings codec ------------------------------------------------
+
+def encode_varints(values):
+    """Unsigned ints -> LEB128 bytes (7 bits per byte, high bit = more follow),
+    encoded for the whole array at once"""
+    values = np.asarray(values, dtype=np.uint64)
+    if values.shape[0] == 0:
+        return b''
+    lengths = np.ones(values.shape[0], dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        lengths += rest > 0
+        rest >>= np.uint64(7)
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max())):
+        rows = np.flatnonzero(lengths > k)
+        byte = (values[rows] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = np.where(lengths[rows] > k + 1, 0x80, 0).astype(np.uint64)
+        out[starts[rows] + k] = byte | more
+    return out.tobytes()
+
+
+def decode_varints(buf, start=0, end=None):
+    """LEB128 bytes -> uint64 array"""
+    end = len(buf) if end is None else end
+    data = np.frombuffer(buf, dtype=np.uint8, count=end - start, offset=start)
+    if data.shape[0] == 0:
+        return np.empty(0, dtype=np.uint64)
+    last = np.flatnonzero((data & 0x80) == 0)
+    firsts = np.concatenate([[0], last[:-1] + 1])
+    shift = np.arange(data.shape[0]) - np.repeat(firsts, last - firsts + 1)
+    payload = (data & 0x7F).astype(np.uint64) << (7 * shift).astype(np.uint64)
+    return np.add.reduceat(payload, firsts)
+
+
+def encode_deltas(sorted_values):
+    return encode_varints(np.diff(np.asarray(sorted_values, dtype=np.int64), prepend=0))
+
+
+def decode_deltas(buf, start=0, end=None):
+    return np.cumsum(decode_varints(buf, start, end)).tolist()
+
+
+def encode_postings(postings):
+    """[(doc_id, positions), ...] sorted by doc_id -> bytes.
+
+    Layout: doc count, then per doc: doc-ID gap, position count and the
+    position gaps. Gaps keep most numbers under 128, i.e. one byte each.
+    """
+    values, previous_doc = [len(postings)], 0
+    for doc_id, positions in postings:
+        values.append(doc_id - previous_doc)
+        values.append(len(positions))
+        previous_pos = 0
+        for position in positions:
+            values.append(position - previous_pos)
+            previous_pos = position
+        previous_doc = doc_id
+    return encode_varints(values)
+
+
+def decode_postings(buf, start=0, end=None):
+    values = decode_varints(buf, start, end).tolist()
+    postings, i, doc_id = [], 1, 0
+    for _ in range(values[0] if values else 0):
+        doc_id += values[i]
+        count = values[i + 1]
+        i += 2
+        positions, position = [], 0
+        for gap in values[i:i + count]:
+            position += gap
+            positions.append(position)
+        i += count
+        postings.append((doc_id, positions))
+    return postings
+
+
+def term_positions(text):
+    """{term: [token positions]} for a document"""
+    positions = {}
+    for position, term in enumerate(tokenize(text)):
+        positions.setdefault(term, []).append(position)
+    return positions
+
+
+# -- segments ---------------------------------------------------------------
+
+class Segment:
+    """Immutable on-disk segment, memory-mapped for reads"""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.generation, n_docs, dict_offset = SEGMENT_HEADER.unpack_from(self._mmap, 0)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            raise ValueError(f"{path} is not a resume text index segment")
+        dictionary = json.loads(self._mmap[dict_offset:].decode('utf-8'))
+        self._terms = dictionary['terms']
+        offset, length = dictionary['docs']
+        self.doc_ids = np.cumsum(decode_varints(self._mmap, offset, offset + length)).astype(np.int64)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @property
+    def terms(self):
+        return self._terms.keys()
+
+    def postings(self, term):
+        entry = self._terms.get(term)
+        if entry is None:
+            return []
+        offset, length = entry
+        return decode_postings(self._mmap, offset, offset + length)
+
+    def close(self):
+        self._mmap.close()
+
+    @staticmethod
+    def write(path, generation, postings, doc_ids):
+        """Write {term: [(doc_id, positions)] sorted by doc} atomically"""
+        tmp_path = f"{path}.tmp"
+        terms = {}
+        with open(tmp_path, 'wb') as f:
+            f.write(b'\0' * SEGMENT_HEADER.size)
+            offset = SEGMENT_HEADER.size
+            for term in sorted(postings):
+                blob = encode_postings(postings[term])
+                f.write(blob)
+                terms[term] = [offset, len(blob)]
+                offset += len(blob)
+            docs_blob = encode_deltas(sorted(doc_ids))
+            f.write(docs_blob)
+            dictionary = {'terms': terms, 'docs': [offset, len(docs_blob)]}
+            dict_offset = offset + len(docs_blob)
+            f.write(json.dumps(dictionary, separators=(',', ':')).encode('utf-8'))
+            f.seek(0)
+            f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, generation, len(doc_ids), dict_offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+# -- query parsing ----------------------------------------------------------
+
+QUERY_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|(-?)([^\s()"]+))')
+OPERATORS = ('AND', 'OR', 'NOT')
+
+
+def _lex(query):
+    tokens, pos = [], 0
+    query = query.strip()
+    while pos < len(query):
+        match = QUERY_TOKEN_RE.match(query, pos)
+        if match is None or match.end() == pos:
+            raise QuerySyntaxError(f"Unexpected input at position {pos}")
+        pos = match.end()
+        lparen, rparen, phrase, minus, word = match.groups()
+        if lparen:
+            tokens.append(('(', None))
+        elif rparen:
+            tokens.append((')', None))
+        elif phrase is not None:
+            tokens.append(('phrase', phrase))
+        elif word in OPERATORS and not minus:
+            tokens.append((word, None))
+        else:
+            if minus:
+                tokens.append(('NOT', None))
+            tokens.append(('phrase', word))
+    return tokens
+
+
+def parse_query(query):
+    """Parse a recruiter query into a tree of ('and'|'or', [nodes]),
+    ('not', node) and ('phrase', [terms]) tuples.
+
+    Syntax: words and "quoted phrases", AND / OR / NOT (upper case), -word,
+    and parentheses. Adjacent terms are ANDed; AND binds tighter than OR.
+    """
+    tokens = _lex(query)
+    if not tokens:
+        raise QuerySyntaxError("Empty query")
+    pos = 0
+
+    def peek():
+        return tokens[pos][0] if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_or():
+        nodes = [parse_and()]
+        while peek() == 'OR':
+            take()
+            nodes.append(parse_and())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+    def parse_and():
+        nodes = [parse_unary()]
+        while peek() not in (None, 'OR', ')'):
+            if peek() == 'AND':
+                take()
+            nodes.append(parse_unary())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+    def parse_unary():
+        if peek() == 'NOT':
+            take()
+            return ('not', parse_unary())
+        if peek() == '(':
+            take()
+            node = parse_or()
+            if peek() != ')':
+                raise QuerySyntaxError("Missing closing parenthesis")
+            take()
+            return node
+        if peek() == 'phrase':
+            return ('phrase', tokenize(take()[1]))
+        raise QuerySyntaxError(f"Unexpected {peek() or 'end of query'}")
+
+    node = parse_or()
+    if pos != len(tokens):
+        raise QuerySyntaxError(f"Unexpected {peek()}")
+    return node
+
+
+# -- index ------------------------------------------------------------------
+
+def _owned_masks(segments, tombstones):
+    """Per segment, a mask over its doc_ids of the documents it owns.
+
+    A document belongs to the newest segment holding it unless a tombstone
+    at that generation or later removed it. Computed over all segments at
+    once with NumPy rather than a dict of every document.
+    """
+    if not segments:
+        return []
+    ids = np.concatenate([segment.doc_ids for segment in segments])
+    generations = np.concatenate([np.full(len(segment), segment.generation, dtype=np.int64)
+                                  for segment in segments])
+    # Segments are in generation order, so an id's last occurrence is its newest
+    _, first_from_end = np.unique(ids[::-1], return_index=True)
+    owned = np.zeros(ids.shape[0], dtype=bool)
+    owned[ids.shape[0] - 1 - first_from_end] = True
+    if tombstones:
+        dead_ids = np.fromiter(tombstones.keys(), dtype=np.int64, count=len(tombstones))
+        dead_gens = np.fromiter(tombstones.values(), dtype=np.int64, count=len(tombstones))
+        order = np.argsort(dead_ids)
+        dead_ids, dead_gens = dead_ids[order], dead_gens[order]
+        pos = np.minimum(np.searchsorted(dead_ids, ids), dead_ids.shape[0] - 1)
+        removed_at = np.where(dead_ids[pos] == ids, dead_gens[pos], -1)
+        owned &= generations > removed_at
+    return np.split(owned, np.cumsum([len(segment) for segment in segments])[:-1])
+
+
+class InvertedIndex:
+    """Positional inverted index over resume text, stored as on-disk segments.
+
+    Every add and remove is appended to a shared write-ahead log (WAL)
+    under a file lock, so it is durable and visible to every process at
+    once; each process replays the log's tail into an in-memory overlay
+    before reading. Once the log holds flush_docs documents or is
+    flush_seconds old, whichever process notices writes it out as a small
+    segment and starts a new log. A background thread merges segments once
+    there are too many. A document belongs to the newest segment holding
+    it; removals of segment documents are tombstones recorded in the
+    manifest until a merge drops the document for good.
+    """
+
+    def __init__(self, index_dir, flush_docs=100, flush_seconds=30, merge_factor=8):
+        self.index_dir = str(index_dir)
+        self.flush_docs = flush_docs
+        self.flush_seconds = flush_seconds
+        self.merge_factor = merge_factor
+        self._lock = threading.RLock()
+        self._dir_lock = threading.Lock()  # flock does not exclude threads sharing a process
+        self._held = threading.local()
+        self._segments = []
+        self._owned = []
+        self._live = None
+        self._manifest = None
+        self._manifest_mtime = None
+        self._wal_name = None
+        self._wal_offset = 0
+        self._wal_started = None
+        self._overlay = {}
+        self._merge_thread = None
+        os.makedirs(self.index_dir, exist_ok=True)
+        with self._lock:
+            self._sync()
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._live_ids())
+
+    # -- manifest ----------------------------------------------------------
+
+    @property
+    def _manifest_path(self):
+        return os.path.join(self.index_dir, 'manifest.json')
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the index directory across processes (re-entrant per thread)"""
+        if getattr(self._held, 'depth', 0):
+            self._held.depth += 1
+            try:
+                yield
+            finally:
+                self._held.depth -= 1
+            return
+        with self._dir_lock, open(os.path.join(self.index_dir, '.lock'), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            self._held.depth = 1
+            try:
+                yield
+            finally:
+                self._held.depth = 0
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {'next_generation': 1, 'segments': [], 'tombstones': {}}
+        manifest['tombstones'] = {int(k): v for k, v in manifest['tombstones'].items()}
+        manifest.setdefault('wal', f"{manifest['next_generation']:08d}.wal")  # older manifests had none
+        return manifest
+
+    def _write_manifest(self, manifest):
+        tmp_path = f"{self._manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+        self._manifest_mtime = None
+
+    def _sync(self):
+        """Catch up with the manifest and the WAL (callers hold self._lock)"""
+        with self._file_lock():  # a flush or merge may delete files the old manifest lists
+            self._refresh()
+            self._read_wal()
+
+    def _refresh(self):
+        """Reopen segments if another writer (or merge) changed the manifest"""
+        try:
+            stat = os.stat(self._manifest_path)
+            mtime = (stat.st_ino, stat.st_mtime_ns)  # replaced, not rewritten, on change
+        except OSError:
+            mtime = None
+        if mtime == self._manifest_mtime and self._manifest is not None:
+            return
+        open_segments = {segment.name: segment for segment in self._segments}
+        segments = []
+        manifest = self._read_manifest()
+        for entry in sorted(manifest['segments'], key=lambda s: s['generation']):
+            segment = open_segments.pop(entry['name'], None)
+            if segment is None:
+                segment = Segment(os.path.join(self.index_dir, entry['name']))
+            segments.append(segment)
+        for segment in open_segments.values():
+            segment.close()
+
+        if manifest['wal'] != self._wal_name:
+            # The previous log was flushed into a segment: start over on the new one
+            self._wal_name, self._wal_offset, self._wal_started, self._overlay = manifest['wal'], 0, None, {}
+        self._segments, self._owned = segments, _owned_masks(segments, manifest['tombstones'])
+        self._manifest, self._manifest_mtime, self._live = manifest, mtime, None
+
+    # -- write-ahead log ---------------------------------------------------
+
+    @property
+    def _wal_path(self):
+        return os.path.join(self.index_dir, self._wal_name)
+
+    def _read_wal(self):
+        """Replay WAL records appended since the last read into the overlay"""
+        try:
+            with open(self._wal_path, 'rb') as f:
+                f.seek(self._wal_offset)
+                data = f.read()
+        except OSError:
+            return
+        end = data.rfind(b'\n') + 1  # a record is only complete once its newline is written
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # the torn tail of a writer killed mid-append
+            if self._wal_started is None:
+                self._wal_started = record['t']
+            if 'remove' in record:
+                self._overlay[record['remove']] = None
+            else:
+                self._overlay[record['add']] = record['terms']
+        self._wal_offset += end
+        if end:
+            self._live = None
+
+    def _append_wal(self, records):
+        now = time.time()
+        with open(self._wal_path, 'a+b') as f:
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')  # end a record torn by a killed writer
+            f.write(b''.join(
+                json.dumps({**record, 't': now}, separators=(',', ':')).encode('utf-8') + b'\n'
+                for record in records
+            ))
+            f.flush()
+
+    # -- writes ------------------------------------------------------------
+
+    def add(self, doc_id, text):
+        """Index (or re-index) a document; visible to every process at once"""
+        self.add_many([(doc_id, text)])
+
+    def add_many(self, docs):
+        """Index (doc_id, text) pairs with one locked WAL append"""
+        records = [{'add': int(doc_id), 'terms': term_positions(text)} for doc_id, text in docs]
+        if not records:
+            return
+        with self._lock:
+            with self._file_lock():
+                self._refresh()
+                self._append_wal(records)
+                self._read_wal()
+            self._maybe_flush()
+
+    def remove(self, doc_id):
+        doc_id = int(doc_id)
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._append_wal([{'remove': doc_id}])
+            self._read_wal()
+            if self._segment_owner(doc_id) is not None:
+                manifest = self._read_manifest()
+                manifest['tombstones'][doc_id] = manifest['next_generation'] - 1
+                self._write_manifest(manifest)
+                self._refresh()
+
+    def _segment_owner(self, doc_id):
+        """Index of the segment owning doc_id, or None"""
+        for i in range(len(self._segments) - 1, -1, -1):
+            doc_ids = self._segments[i].doc_ids
+            pos = np.searchsorted(doc_ids, doc_id)
+            if pos < doc_ids.shape[0] and doc_ids[pos] == doc_id:
+                return i if self._owned[i][pos] else None
+        return None
+
+    def _maybe_flush(self):
+        docs = sum(1 for terms in self._overlay.values() if terms is not None)
+        if docs >= self.flush_docs or (
+                self._wal_started is not None and time.time() - self._wal_started >= self.flush_seconds):
+            self.flush()
+
+    def flush(self):
+        """Write the WAL's documents as a new segment and start a new WAL"""
+        with self._lock, self._file_lock():
+            self._sync()
+            if not self._overlay:
+                return
+            docs = {doc_id: terms for doc_id, terms in self._overlay.items() if terms is not None}
+            manifest = self._read_manifest()
+            generation = manifest['next_generation']
+            old_wal = self._wal_path
+            name = None
+            if docs:
+                postings = {}
+                for doc_id in sorted(docs):
+                    for term, positions in docs[doc_id].items():
+                        postings.setdefault(term, []).append((doc_id, positions))
+                name = f"{generation:08d}-{uuid.uuid4().hex[:8]}.seg"
+                Segment.write(os.path.join(self.index_dir, name), generation, postings, list(docs))
+                manifest['segments'].append({'name': name, 'generation': generation})
+            manifest['next_generation'] = generation + 1
+            manifest['wal'] = f"{generation + 1:08d}-{uuid.uuid4().hex[:8]}.wal"
+            self._write_manifest(manifest)
+            try:
+                os.remove(old_wal)
+            except OSError:
+                pass
+            if name:
+                print(f"✅ Flushed {len(docs)} resumes to text index segment {name}")
+            self._refresh()
+            self._maybe_merge()
+
+    def _maybe_merge(self):
+        if len(self._segments) < self.merge_factor:
+            return
+        if self._merge_thread is not None and self._merge_thread.is_alive():
+            return
+        self._merge_thread = threading.Thread(target=self.merge, name='text-index-merge', daemon=True)
+        self._merge_thread.start()
+
+    def merge(self):
+        """Merge every current segment into one, dropping dead documents"""
+        with self._file_lock():
+            snapshot = self._read_manifest()
+        if len(snapshot['segments']) < 2:
+            return
+
+        entries = sorted(snapshot['segments'], key=lambda s: s['generation'])
+        segments = [Segment(os.path.join(self.index_dir, e['name'])) for e in entries]
+        tombstones = snapshot['tombstones']
+        owned = _owned_masks(segments, tombstones)
+
+        postings = {}
+        for segment, segment_owned in zip(segments, owned):
+            for term in segment.terms:
+                term_postings = segment.postings(term)
+                docs = np.fromiter((d for d, _ in term_postings), dtype=np.int64, count=len(term_postings))
+                keep = segment_owned[np.searchsorted(segment.doc_ids, docs)]
+                live = [entry for entry, alive in zip(term_postings, keep.tolist()) if alive]
+                if live:
+                    postings.setdefault(term, []).extend(live)
+        for term_postings in postings.values():
+            term_postings.sort()
+        live_ids = np.concatenate([segment.doc_ids[mask] for segment, mask in zip(segments, owned)])
+        generation = entries[-1]['generation']
+        name = f"{generation:08d}-{uuid.uuid4().hex[:8]}.seg"
+        Segment.write(os.path.join(self.index_dir, name), generation, postings, live_ids.tolist())
+        for segment in segments:
+            segment.close()
+
+        merged = {e['name'] for e in entries}
+        with self._file_lock():
+            manifest = self._read_manifest()
+            if not merged <= {e['name'] for e in manifest['segments']}:
+                # Another process merged or rebuilt meanwhile; keep its result
+                os.remove(os.path.join(self.index_dir, name))
+                return
+            manifest['segments'] = [{'name': name, 'generation': generation}] + [
+                e for e in manifest['segments'] if e['name'] not in merged
+            ]
+            # Tombstones taken into account by the merge are no longer needed
+            manifest['tombstones'] = {
+                doc_id: gen for doc_id, gen in manifest['tombstones'].items()
+                if tombstones.get(doc_id) != gen
+            }
+            self._write_manifest(manifest)
+        for entry in entries:
+            try:
+                os.remove(os.path.join(self.index_dir, entry['name']))
+            except OSError:
+                pass  # still mapped elsewhere (Windows); removed by the next rebuild
+        print(f"✅ Merged {len(entries)} text index segments into {name} ({live_ids.shape[0]} resumes)")
+        with self._lock:
+            self._sync()
+
+    def rebuild(self, docs):
+        """Replace the whole index with one segment built from (doc_id, text) pairs"""
+        postings, doc_ids = {}, []
+        for doc_id, text in docs:
+            doc_ids.append(doc_id)
+            for term, positions in term_positions(text).items():
+                postings.setdefault(term, []).append((doc_id, positions))
+        for term_postings in postings.values():
+            term_postings.sort()
+
+        with self._lock, self._file_lock():
+            old = self._read_manifest()
+            generation = old['next_generation']
+            name = f"{generation:08d}-{uuid.uuid4().hex[:8]}.seg"
+            Segment.write(os.path.join(self.index_dir, name), generation, postings, doc_ids)
+            self._write_manifest({
+                'next_generation': generation + 1,
+                'segments': [{'name': name, 'generation': generation}],
+                'tombstones': {},
+                'wal': f"{generation + 1:08d}-{uuid.uuid4().hex[:8]}.wal",
+            })
+            for path in [os.path.join(self.index_dir, e['name']) for e in old['segments']] + \
+                    [os.path.join(self.index_dir, old['wal'])]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._sync()
+        print(f"✅ Rebuilt resume text index: {len(doc_ids)} resumes, {len(postings)} terms")
+
+    # -- reads -------------------------------------------------------------
+
+    def _live_ids(self):
+        """Set of every live document ID, built on demand (NOT queries, len)"""
+        if self._live is None:
+            live = set()
+            for segment, owned in zip(self._segments, self._owned):
+                live.update(segment.doc_ids[owned].tolist())
+            for doc_id, terms in self._overlay.items():
+                if terms is None:
+                    live.discard(doc_id)
+                else:
+                    live.add(doc_id)
+            self._live = live
+        return self._live
+
+    def _postings(self, term):
+        """{doc_id: positions} of live documents containing term"""
+        result = {}
+        for segment, owned in zip(self._segments, self._owned):
+            term_postings = segment.postings(term)
+            if not term_postings:
+                continue
+            docs = np.fromiter((d for d, _ in term_postings), dtype=np.int64, count=len(term_postings))
+            keep = owned[np.searchsorted(segment.doc_ids, docs)]
+            for (doc_id, positions), alive in zip(term_postings, keep.tolist()):
+                if alive and doc_id not in self._overlay:
+                    result[doc_id] = positions
+        for doc_id, terms in self._overlay.items():
+            if terms is not None and term in terms:
+                result[doc_id] = terms[term]
+        return result
+
+    def _phrase(self, terms, universe):
+        if not terms:
+            return set(universe())  # only stopwords: no constraint
+        postings = [self._postings(term) for term in terms]
+        docs = set(postings[0])
+        for term_postings in postings[1:]:
+            docs &= term_postings.keys()
+        if len(terms) == 1:
+            return docs
+        matches = set()
+        for doc_id in docs:
+            following = [set(p[doc_id]) for p in postings[1:]]
+            if any(all(start + i + 1 in positions for i, positions in enumerate(following))
+                   for start in postings[0][doc_id]):
+                matches.add(doc_id)
+        return matches
+
+    def _evaluate(self, node, universe):
+        kind = node[0]
+        if kind == 'phrase':
+            return self._phrase(node[1], universe)
+        if kind == 'not':
+            return universe() - self._evaluate(node[1], universe)
+        if kind == 'or':
+            result = set()
+            for child in node[1]:
+                result |= self._evaluate(child, universe)
+            return result
+        # 'and': intersect the positive clauses, then subtract the negated ones
+        positive = [child for child in node[1] if child[0] != 'not']
+        result = self._evaluate(positive[0], universe) if positive else set(universe())
+        for child in positive[1:]:
+            if not result:
+                break
+            result &= self._evaluate(child, universe)
+        for child in node[1]:
+            if child[0] == 'not' and result:
+                result -= self._evaluate(child[1], universe)
+        return result
+
+    def search(self, query):
+        """Sorted IDs of resumes matching a boolean/phrase query"""
+        node = parse_query(query)
+        with self._lock:
+            self._sync()
+            self._maybe_flush()
+            # The universe of live IDs is only built for NOT and stopword-only clauses
+            return sorted(self._evaluate(node, self._live_ids))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_inverted_index():
+    """Process-wide resume text index under RESUME_TEXT_INDEX_DIR"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = InvertedIndex(
+                    settings.RESUME_TEXT_INDEX_DIR,
+                    flush_docs=getattr(settings, 'RESUME_TEXT_INDEX_FLUSH_DOCS', 100),
+                    flush_seconds=getattr(settings, 'RESUME_TEXT_INDEX_FLUSH_SECONDS', 30),
+                    merge_factor=getattr(settings, 'RESUME_TEXT_INDEX_MERGE_FACTOR', 8),
+                )
+                atexit.register(_index.flush)
+    return _index
+
+
+def loaded_inverted_index():
+    return _index
+
+
+def search_resumes(query):
+    """IDs of resumes matching a recruiter keyword/boolean query"""
+    return get_inverted_index().search(query)
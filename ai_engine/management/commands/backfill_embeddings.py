@@ -0,0 +1,173 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from ai_engine.codec import encode_embedding
+from ai_engine.embeddings import get_embeddings, chunking_enabled, embed_documents
+from ai_engine.index_sync import record_reset
+from ai_engine.ingestion import enqueue_scores
+from ai_engine.model_registry import active_model, model_tag, next_model
+from ai_engine.signals import sync_saved_rows
+from jobs.models import Job
+from resumes.models import Resume
+
+# Model and the text field its embedding is computed from
+TARGETS = {'resumes': (Resume, 'text'), 'jobs': (Job, 'description')}
+
+
+def stale_rows(model, tag):
+    """Rows with text but no embedding for tag in either column"""
+    text_field = dict(TARGETS.values())[model]
+    return (
+        model.objects.exclude(**{text_field: ''})
+        .exclude(embedding_model=tag, embedding__isnull=False)
+        .exclude(next_embedding_model=tag, next_embedding__isnull=False)
+    )
+
+
+def promote(model, tag):
+    """Move next_embedding into embedding for rows whose vector for tag sits there"""
+    moved = (
+        model.objects.filter(next_embedding_model=tag, next_embedding__isnull=False)
+        .exclude(embedding_model=tag)
+        .update(embedding=F('next_embedding'), embedding_model=F('next_embedding_model'))
+    )
+    model.objects.exclude(next_embedding_model='').update(next_embedding=None, next_embedding_model='')
+    return moved
+
+
+class Command(BaseCommand):
+    help = "Re-encode stored embeddings with a new model in the background, without touching the served ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help="resumes and/or jobs (default: both)")
+        parser.add_argument('--model', default=None,
+                            help="Model name (default: EMBEDDING_NEXT_MODEL, else the serving model)")
+        parser.add_argument('--model-version', type=int, default=1, help="Version of --model")
+        parser.add_argument('--dim', type=int, default=None, help="Embedding dimension of --model")
+        parser.add_argument('--batch-size', type=int, default=512, help="Rows read and written per batch")
+        parser.add_argument('--embed-batch', type=int, default=64, help="Texts per model.encode batch")
+        parser.add_argument('--max-rate', type=float, default=None, help="Throttle to this many rows/s")
+        parser.add_argument('--sleep', type=float, default=0.0, help="Pause between batches, in seconds")
+        parser.add_argument('--limit', type=int, default=None, help="Stop after this many rows per target")
+        parser.add_argument('--promote', action='store_true',
+                            help="After switching EMBEDDING_MODEL_NAME to the new model, move its "
+                                 "backfilled vectors into the main embedding column")
+
+    def handle(self, *args, **options):
+        options['targets'] = options['targets'] or list(TARGETS)
+        unknown = set(options['targets']) - set(TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown targets: {', '.join(sorted(unknown))}")
+        if options['promote']:
+            tag = model_tag()
+            for key in options['targets']:
+                model = TARGETS[key][0]
+                moved = promote(model, tag)
+                self.stdout.write(self.style.SUCCESS(f"Promoted {moved} {key} embeddings to {tag}"))
+                if moved:
+                    record_reset(key)  # running processes reload their matrices from the DB
+                    self.stdout.write("Every match score changes with the model: run refresh_match_scores.")
+                left = stale_rows(model, tag).count()
+                if left:
+                    self.stdout.write(self.style.WARNING(
+                        f"{left} {key} still have no {tag} embedding; run backfill_embeddings again"
+                    ))
+            return
+
+        spec = self._target_spec(options)
+        tag = model_tag(spec)
+        serving = tag == model_tag()
+        self.stdout.write(f"Backfilling {tag} embeddings (serving {model_tag()})")
+        for key in options['targets']:
+            self._backfill(key, spec, tag, options)
+
+        if serving:
+            self.stdout.write("Run with --promote to move the backfilled vectors into the main column.")
+        else:
+            self.stdout.write(
+                f"When every row is done: build_ann_index --next-model, set EMBEDDING_MODEL_NAME/"
+                f"EMBEDDING_MODEL_VERSION/EMBEDDING_DIM to {tag}, deploy, then backfill_embeddings --promote."
+            )
+
+    @staticmethod
+    def _target_spec(options):
+        if options['model']:
+            if not options['dim']:
+                raise CommandError("--dim is required with --model")
+            return {'name': options['model'], 'version': options['model_version'], 'dim': options['dim']}
+        # Without a next model this catches up rows the serving model has not encoded
+        return next_model() or active_model()
+
+    def _backfill(self, key, spec, tag, options):
+        model, text_field = TARGETS[key]
+        dtype = getattr(settings, 'EMBEDDING_STORAGE_DTYPE', 'float32')
+        total = stale_rows(model, tag).count()
+        if options['limit']:
+            total = min(total, options['limit'])
+        if not total:
+            self.stdout.write(f"✅ All {key} already have {tag} embeddings")
+            return
+
+        # Keyset pagination: rows created while this runs are picked up as the cursor advances
+        last_pk, done, failed = 0, 0, 0
+        started = time.perf_counter()
+        while done + failed < total:
+            size = min(options['batch_size'], total - done - failed)
+            batch = list(
+                stale_rows(model, tag).filter(pk__gt=last_pk).order_by('pk').values_list('pk', text_field)[:size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+
+            texts = [text for _, text in batch]
+            if model is Resume and chunking_enabled():
+                # Same pooled chunk vector as process_resume; chunk vectors are not kept
+                # for the next model, so max-sim matching uses the pooled one until re-parsed
+                vectors = [pooled for pooled, _ in embed_documents(texts, batch_size=options['embed_batch'], spec=spec)]
+            else:
+                vectors = get_embeddings(texts, batch_size=options['embed_batch'], spec=spec)
+            rows = []
+            for (pk, _), vector in zip(batch, vectors):
+                if vector is None:
+                    failed += 1
+                    continue
+                if len(vector) != spec['dim']:
+                    raise CommandError(f"{spec['name']} returned {len(vector)}-dim vectors, expected {spec['dim']}")
+                rows.append(model(pk=pk, next_embedding=encode_embedding(vector, dtype=dtype),
+                                  next_embedding_model=tag))
+            model.objects.bulk_update(rows, ['next_embedding', 'next_embedding_model'])
+            done += len(rows)
+            if tag == model_tag() and rows:
+                # Catching up the serving model: these vectors are served right away, but
+                # bulk_update sends no signals, so sync them and rescore their matches here
+                pks = [row.pk for row in rows]
+                sync_saved_rows(model, model.objects.filter(pk__in=pks))
+                enqueue_scores(**{'resume_ids' if model is Resume else 'job_ids': pks})
+
+            elapsed = time.perf_counter() - started
+            rate = done / elapsed if elapsed else 0.0
+            eta = (total - done - failed) / rate if rate else 0.0
+            self.stdout.write(
+                f"🔄 {key}: {done}/{total} re-embedded ({100 * done / total:.1f}%), "
+                f"{rate:.1f} rows/s, ETA {eta:.0f}s"
+            )
+            self._throttle(started, done + failed, options)
+
+        left = stale_rows(model, tag).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {done} {key} in {time.perf_counter() - started:.1f}s "
+            f"({failed} failed, {left} still without {tag})"
+        ))
+
+    @staticmethod
+    def _throttle(started, processed, options):
+        pause = options['sleep']
+        if options['max_rate']:
+            # Sleep until the average rate is back under the cap
+            pause = max(pause, processed / options['max_rate'] - (time.perf_counter() - started))
+        if pause > 0:
+            time.sleep(pause)
@@ -0,0 +1,90 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from ai_engine.ann import IVFIndex
+from ai_engine.matrix import EmbeddingMatrix, normalize_rows, top_k_indices
+from ai_engine.quantization import QuantizedMatrix
+
+
+def synthetic_vectors(n, dim, n_clusters, rng, chunk=100000):
+    """Clustered unit vectors; uniform noise has no structure for IVF to exploit"""
+    centers = rng.standard_normal((n_clusters, dim), dtype=np.float32)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, chunk):
+        size = min(chunk, n - start)
+        labels = rng.integers(0, n_clusters, size)
+        out[start:start + size] = centers[labels] + 0.6 * rng.standard_normal((size, dim), dtype=np.float32)
+    return normalize_rows(out)
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+
+class Command(BaseCommand):
+    help = "Report recall@k and p50/p99 latency of the ANN index versus the exact scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000', help="Comma-separated corpus sizes")
+        parser.add_argument('--dim', type=int, default=384)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--nprobe', default='1,4,8,16,32', help="Comma-separated nprobe values")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--rescore-factor', type=int, default=4,
+                            help="int8 scan: candidates re-scored in float per result")
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        dim, k, n_queries = options['dim'], options['k'], options['queries']
+        nprobes = [int(x) for x in options['nprobe'].split(',')]
+
+        self.stdout.write(f"{'rows':>9} {'method':>12} {'recall@' + str(k):>10} {'p50 ms':>9} {'p99 ms':>9}")
+        for n in [int(x) for x in options['sizes'].split(',')]:
+            vectors = synthetic_vectors(n, dim, max(16, n // 500), rng)
+            queries = vectors[rng.choice(n, n_queries, replace=False)]
+            queries = normalize_rows(queries + 0.3 * rng.standard_normal(queries.shape, dtype=np.float32))
+            ids = np.arange(n, dtype=np.int64)
+
+            exact = EmbeddingMatrix(ids, vectors)
+            truth, timings = [], []
+            for q in queries:
+                start = time.perf_counter()
+                truth.append({pk for pk, _ in exact.top_k(q, k)})
+                timings.append(time.perf_counter() - start)
+            self._report(n, 'exact', 1.0, timings)
+
+            # int8 first stage, then float re-scoring of k x factor candidates (ids are row numbers)
+            quantized = QuantizedMatrix(ids, vectors)
+            hits, timings = 0, []
+            for q, expected in zip(queries, truth):
+                start = time.perf_counter()
+                candidates = np.asarray([pk for pk, _ in quantized.top_k(q, k * options['rescore_factor'])])
+                found = candidates[top_k_indices(vectors[candidates] @ q, k)]
+                timings.append(time.perf_counter() - start)
+                hits += len(expected & set(found.tolist()))
+            self._report(n, 'int8', hits / (k * n_queries), timings)
+            self.stdout.write(f"{n:>9} {'memory MB':>12} {'':>10} {exact.vectors.nbytes / 2**20:>9.1f} "
+                              f"{quantized.nbytes / 2**20:>9.1f}  (float32 vs int8)")
+            del quantized
+
+            start = time.perf_counter()
+            index = IVFIndex.build(ids, vectors)
+            self.stdout.write(f"{n:>9} {'build':>12} {'':>10} {(time.perf_counter() - start) * 1000:>9.0f} {'':>9}"
+                              f"  ({index.nlist} lists)")
+            del exact
+
+            for nprobe in nprobes:
+                hits, timings = 0, []
+                for q, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    found = index.search(q, k=k, nprobe=nprobe)
+                    timings.append(time.perf_counter() - start)
+                    hits += len(expected & {pk for pk, _ in found})
+                self._report(n, f"nprobe={nprobe}", hits / (k * n_queries), timings)
+
+    def _report(self, n, method, recall, timings):
+        self.stdout.write(
+            f"{n:>9} {method:>12} {recall:>10.3f} {percentile_ms(timings, 50):>9.2f} {percentile_ms(timings, 99):>9.2f}"
+        )
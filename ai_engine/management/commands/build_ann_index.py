@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_engine.ann import build_index
+from ai_engine.model_registry import model_tag, next_model
+
+
+class Command(BaseCommand):
+    help = "Build and persist the ANN index for resume and/or job embeddings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help="resumes and/or jobs (default: both)")
+        parser.add_argument('--nlist', type=int, default=None, help="Number of inverted lists (default: 4*sqrt(n))")
+        parser.add_argument('--next-model', action='store_true',
+                            help="Index the backfilled EMBEDDING_NEXT_MODEL embeddings instead of the serving ones")
+
+    def handle(self, *args, **options):
+        targets = options['targets'] or ['resumes', 'jobs']
+        if set(targets) - {'resumes', 'jobs'}:
+            raise CommandError("Targets must be resumes and/or jobs")
+        tag = None
+        if options['next_model']:
+            if next_model() is None:
+                raise CommandError("EMBEDDING_NEXT_MODEL is not set")
+            tag = model_tag(next_model())
+        for key in targets:
+            index = build_index(key, nlist=options['nlist'], tag=tag)
+            if index is None:
+                self.stdout.write(self.style.WARNING(f"Skipped {key}: no embeddings"))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Built {key} index: {len(index)} rows in {index.nlist} lists"
+                ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai_engine.inverted_index import get_inverted_index
+from resumes.models import Resume
+
+
+class Command(BaseCommand):
+    help = "Rebuild the resume keyword search index from Resume.text, or merge its segments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--merge', action='store_true', help="Only merge existing segments into one")
+
+    def handle(self, *args, **options):
+        index = get_inverted_index()
+        start = time.perf_counter()
+        if options['merge']:
+            index.flush()
+            index.merge()
+        else:
+            docs = Resume.objects.exclude(text='').values_list('id', 'text')
+            index.rebuild(docs.iterator(chunk_size=2000))
+        self.stdout.write(self.style.SUCCESS(
+            f"Resume text index holds {len(index)} resumes ({time.perf_counter() - start:.1f}s)"
+        ))
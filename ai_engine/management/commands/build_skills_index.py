@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ai_engine.taxonomy import SkillTaxonomy
+
+
+class Command(BaseCommand):
+    help = "Compile the skills taxonomy file into the memory-mapped lookup index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=None, help="Taxonomy JSON (default: SKILLS_TAXONOMY_PATH)")
+        parser.add_argument('--index-dir', default=None, help="Output directory (default: SKILLS_INDEX_DIR)")
+
+    def handle(self, *args, **options):
+        source = str(options['source'] or settings.SKILLS_TAXONOMY_PATH)
+        index_dir = str(options['index_dir'] or settings.SKILLS_INDEX_DIR)
+        meta = SkillTaxonomy.build_index(source, index_dir)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {meta['aliases']} aliases into {index_dir}"))
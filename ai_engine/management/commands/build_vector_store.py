@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_engine.model_registry import model_tag, next_model
+from ai_engine.vector_store import SharedEmbeddingMatrix, store_dir
+from jobs.models import Job
+from resumes.models import Resume
+
+TARGETS = {'resumes': Resume, 'jobs': Job}
+
+
+class Command(BaseCommand):
+    help = "Rebuild or compact the shared memory-mapped embedding matrices (EMBEDDING_MATRIX_STORE = 'mmap')"
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help="resumes and/or jobs (default: both)")
+        parser.add_argument('--compact', action='store_true',
+                            help="Only drop superseded and deleted rows instead of rebuilding from the DB")
+        parser.add_argument('--next-model', action='store_true',
+                            help="Build from the backfilled EMBEDDING_NEXT_MODEL embeddings ahead of the switch")
+
+    def handle(self, *args, **options):
+        targets = options['targets'] or ['resumes', 'jobs']
+        if set(targets) - set(TARGETS):
+            raise CommandError("Targets must be resumes and/or jobs")
+        tag = None
+        if options['next_model']:
+            if next_model() is None:
+                raise CommandError("EMBEDDING_NEXT_MODEL is not set")
+            tag = model_tag(next_model())
+
+        for key in targets:
+            matrix = SharedEmbeddingMatrix(store_dir(key, tag))
+            if options['compact']:
+                if not matrix.built:
+                    self.stdout.write(self.style.WARNING(f"Skipped {key}: no shared matrix built yet"))
+                    continue
+                matrix.compact()
+            else:
+                matrix.rebuild(TARGETS[key].objects.all(), tag=tag)
+            self.stdout.write(self.style.SUCCESS(f"{key}: {len(matrix)} rows in {matrix.path}"))
@@ -0,0 +1,26 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from ai_engine.embedding_cache import get_embedding_cache, embedding_cache_stats
+from ai_engine.parse_cache import cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show embedding and parsed-resume cache statistics"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trim', action='store_true', help="Trim the embedding disk cache to EMBEDDING_CACHE_DISK_MB")
+        parser.add_argument('--clear-embeddings', action='store_true', help="Empty the embedding disk cache")
+
+    def handle(self, *args, **options):
+        cache = get_embedding_cache()
+        if cache is not None and cache.disk is not None:
+            if options['clear_embeddings']:
+                cache.disk.clear()
+                self.stdout.write(self.style.WARNING("Embedding disk cache cleared"))
+            elif options['trim']:
+                cache.disk.trim()
+
+        stats = {'embeddings': embedding_cache_stats(), 'parsed_documents': cache_stats()}
+        self.stdout.write(json.dumps(stats, indent=2))
@@ -0,0 +1,171 @@
+import csv
+import gzip
+import json
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ai_engine.codec import encode_embedding
+from ai_engine.embeddings import get_embeddings
+from ai_engine.ingestion import enqueue_scores
+from ai_engine.model_registry import model_tag
+from ai_engine.signals import sync_saved_rows
+from ai_engine.skill_bits import encode_skills
+from ai_engine.taxonomy import get_taxonomy
+from jobs.models import Job
+
+UPDATE_FIELDS = ['title', 'description', 'required_skills', 'skill_bits', 'embedding', 'embedding_model']
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def iter_records(path, fmt=None):
+    """Stream feed records as dicts from a JSONL or CSV file (optionally .gz)"""
+    name = path[:-3] if path.endswith('.gz') else path
+    fmt = fmt or ('csv' if name.endswith('.csv') else 'jsonl')
+    with _open(path) as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                print(f"❌ Line {line_no}: invalid JSON ({e})")
+
+
+def _feed_skills(value):
+    """Skills given by the feed, as a list (JSON list or comma-separated string)"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [s.strip() for s in value.split(',') if s.strip()]
+    return [str(s) for s in value]
+
+
+class Command(BaseCommand):
+    help = "Upsert jobs from a JSONL or CSV feed, batch-encoding their descriptions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Feed file (.jsonl, .csv, optionally .gz)")
+        parser.add_argument('--format', choices=['jsonl', 'csv'], default=None, help="Default: from the file name")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Records upserted per transaction")
+        parser.add_argument('--embed-batch', type=int, default=128, help="Texts per model.encode batch")
+        parser.add_argument('--poster', default=None, help="Username recorded as poster of new jobs")
+        parser.add_argument('--id-field', default='id', help="Feed field holding the stable job ID")
+        parser.add_argument('--title-field', default='title')
+        parser.add_argument('--description-field', default='description')
+        parser.add_argument('--skills-field', default='skills', help="Optional feed field with explicit skills")
+        parser.add_argument('--reembed', action='store_true', help="Re-encode unchanged jobs too")
+
+    def handle(self, *args, **options):
+        poster = None
+        if options['poster']:
+            try:
+                poster = get_user_model().objects.get(username=options['poster'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User {options['poster']} not found")
+        try:
+            records = iter_records(options['path'], options['format'])
+            first = next(records, None)
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+        if first is None:
+            self.stdout.write("Feed is empty")
+            return
+
+        records = _chain_first(first, records)
+        batch_size = max(1, options['batch_size'])
+        totals = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+        started = time.perf_counter()
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            self._upsert_batch(batch, options, poster, totals)
+            done = sum(totals.values())
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"📥 {done} records: {totals['created']} created, {totals['updated']} updated, "
+                f"{totals['unchanged']} unchanged ({done / elapsed:.0f} records/s)"
+            )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported feed in {elapsed:.1f}s: {totals['created']} created, {totals['updated']} updated, "
+            f"{totals['unchanged']} unchanged, {totals['skipped']} skipped"
+        ))
+
+    def _upsert_batch(self, batch, options, poster, totals):
+        taxonomy = get_taxonomy()
+        matcher = taxonomy.matcher()
+        dtype = getattr(settings, 'EMBEDDING_STORAGE_DTYPE', 'float32')
+
+        # Last record wins when a feed repeats an ID inside one batch
+        by_id, anonymous = {}, []
+        for record in batch:
+            title = (record.get(options['title_field']) or '').strip()
+            description = (record.get(options['description_field']) or '').strip()
+            if not title or not description:
+                totals['skipped'] += 1
+                continue
+            external_id = str(record.get(options['id_field']) or '').strip() or None
+            item = (external_id, title[:200], description, record.get(options['skills_field']))
+            if external_id is None:
+                anonymous.append(item)
+            else:
+                by_id[external_id] = item
+
+        existing = Job.objects.only('id', 'external_id', 'title', 'description').in_bulk(
+            list(by_id), field_name='external_id'
+        )
+        to_create, to_update, to_encode = [], [], []
+        for external_id, title, description, feed_skills in list(by_id.values()) + anonymous:
+            job = existing.get(external_id) if external_id else None
+            changed = job is None or job.title != title or job.description != description
+            if not changed and not options['reembed']:
+                totals['unchanged'] += 1
+                continue
+
+            skills = matcher.skills(description)
+            skills += [s for s in taxonomy.canonicalize(_feed_skills(feed_skills)) if s not in skills]
+            if job is None:
+                job = Job(external_id=external_id, poster=poster)
+                to_create.append(job)
+            else:
+                to_update.append(job)
+            job.title, job.description = title, description
+            job.required_skills = skills
+            job.skill_bits = encode_skills(skills)
+            to_encode.append(job)
+
+        vectors = get_embeddings([job.description for job in to_encode], batch_size=options['embed_batch'])
+        tag = model_tag()
+        for job, vector in zip(to_encode, vectors):
+            job.embedding = encode_embedding(vector, dtype=dtype) if vector is not None else None
+            job.embedding_model = tag if vector is not None else ''
+
+        with transaction.atomic():
+            Job.objects.bulk_create(to_create, batch_size=500)
+            Job.objects.bulk_update(to_update, UPDATE_FIELDS, batch_size=500)
+        # bulk writes send no post_save: bring the matrices and indexes up to date here
+        sync_saved_rows(Job, to_create + to_update)
+        enqueue_scores(job_ids=[job.pk for job in to_create + to_update if job.pk is not None])
+        totals['created'] += len(to_create)
+        totals['updated'] += len(to_update)
+
+
+def _chain_first(first, rest):
+    yield first
+    yield from rest
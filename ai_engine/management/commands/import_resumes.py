@@ -0,0 +1,242 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import zipfile
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from ai_engine.embeddings import get_embeddings, chunking_enabled, embed_documents
+from ai_engine.codec import encode_embedding, encode_embedding_matrix
+from ai_engine.ingestion import enqueue_resume, enqueue_scores
+from ai_engine.inverted_index import get_inverted_index
+from ai_engine.model_registry import model_tag
+from ai_engine.parse_cache import lookup_parsed, store_parsed, evict_to_limit, cached_vectors
+from ai_engine.parsers import extract_text_from_file, extract_skills_many
+from ai_engine.signals import sync_saved_rows
+from ai_engine.skill_bits import encode_skills
+from resumes.models import Resume
+
+EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+
+def iter_sources(source, extensions=EXTENSIONS):
+    """Yield (path, zip member or None) for every resume file, in a stable order.
+
+    Directories are walked lazily (sorted per directory), so only one
+    directory listing is in memory at a time and the order is the same on
+    every run, which is what the checkpoint relies on.
+    """
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            members = sorted(info.filename for info in archive.infolist() if not info.is_dir())
+        for member in members:
+            if member.lower().endswith(extensions):
+                yield source, member
+        return
+    for dirpath, dirnames, filenames in os.walk(source):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(extensions):
+                yield os.path.join(dirpath, name), None
+
+
+_archives = {}
+
+
+def _init_worker():
+    # Each forked worker opens its own DB connection
+    connections.close_all()
+
+
+def _read(path, member):
+    if member is None:
+        with open(path, 'rb') as f:
+            return f.read()
+    archive = _archives.get(path)
+    if archive is None:
+        archive = _archives[path] = zipfile.ZipFile(path)
+    return archive.read(member)
+
+
+def parse_file(task):
+    """Store one file in MEDIA and extract its text (or reuse its cached parse); runs in a pool process.
+
+    Skills of fresh parses are left as None and extracted for the whole batch at once.
+    """
+    path, member = task
+    label = member or path
+    try:
+        data = _read(path, member)
+        content_hash = hashlib.sha256(data).hexdigest()
+        file_field = Resume._meta.get_field('file')
+        name = default_storage.save(file_field.generate_filename(None, os.path.basename(label)), ContentFile(data))
+
+        cached = lookup_parsed(content_hash)
+        if cached is not None:
+            embedding, chunks = cached_vectors(cached, model_tag(), chunking_enabled()) or (None, None)
+            return {'label': label, 'name': name, 'hash': content_hash, 'text': cached.text,
+                    'skills': cached.skills, 'embedding': embedding, 'chunks': chunks, 'cached': True}
+
+        text = extract_text_from_file(default_storage.path(name))
+        if not text:
+            default_storage.delete(name)
+            return {'label': label, 'error': "no text extracted"}
+        return {'label': label, 'name': name, 'hash': content_hash, 'text': text,
+                'skills': None, 'embedding': None, 'chunks': None, 'cached': False}
+    except Exception as e:
+        return {'label': label, 'error': str(e)}
+
+
+class Command(BaseCommand):
+    help = "Bulk-import a directory or zip archive of resumes for one user"
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Directory or .zip file of resumes (.pdf, .docx, .txt)")
+        parser.add_argument('--user', required=True, help="Username that will own the imported resumes")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Parsing processes")
+        parser.add_argument('--batch-size', type=int, default=500, help="Resumes written per transaction")
+        parser.add_argument('--embed-batch', type=int, default=128, help="Texts per model.encode batch")
+        parser.add_argument('--nlp-processes', type=int, default=None,
+                            help="Processes for the batched spaCy NER pass (default: SPACY_N_PROCESS)")
+        parser.add_argument('--checkpoint', default=None,
+                            help="Checkpoint file (default: <source>.import-checkpoint.json)")
+        parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint")
+
+    def handle(self, *args, **options):
+        source = os.path.abspath(options['source'])
+        if not os.path.exists(source):
+            raise CommandError(f"{source} does not exist")
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['user']} not found")
+
+        checkpoint_path = options['checkpoint'] or f"{source.rstrip(os.sep)}.import-checkpoint.json"
+        done = 0 if options['restart'] else self._load_checkpoint(checkpoint_path, source)
+        if done:
+            self.stdout.write(f"Resuming after {done} files (checkpoint {checkpoint_path})")
+
+        tasks = islice(iter_sources(source), done, None)
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+        tag = model_tag()
+        dtype = getattr(settings, 'EMBEDDING_STORAGE_DTYPE', 'float32')
+        text_index = get_inverted_index()
+
+        connections.close_all()
+        pool = multiprocessing.Pool(workers, initializer=_init_worker) if workers > 1 else None
+        totals = {'imported': 0, 'failed': 0, 'cached': 0, 'queued': 0}
+        started = time.perf_counter()
+        try:
+            while True:
+                batch = list(islice(tasks, batch_size))
+                if not batch:
+                    break
+                t0 = time.perf_counter()
+                if pool is not None:
+                    results = pool.map(parse_file, batch, chunksize=max(1, len(batch) // (workers * 4)))
+                else:
+                    results = [parse_file(task) for task in batch]
+                t1 = time.perf_counter()
+
+                parsed = [r for r in results if 'error' not in r]
+                for r in results:
+                    if 'error' in r:
+                        self.stderr.write(f"❌ {r['label']}: {r['error']}")
+                fresh = [r for r in parsed if r['skills'] is None]
+                skill_lists = extract_skills_many([r['text'] for r in fresh], n_process=options['nlp_processes'])
+                for r, skills in zip(fresh, skill_lists):
+                    r['skills'] = skills
+                t_skills = time.perf_counter()
+                # Parses cached with vectors for the current model are not encoded again
+                need = [r for r in parsed if r['embedding'] is None]
+                if chunking_enabled():
+                    # Chunks of every resume in the batch are encoded together
+                    encoded = embed_documents([r['text'] for r in need], batch_size=options['embed_batch'])
+                else:
+                    vectors = get_embeddings([r['text'] for r in need], batch_size=options['embed_batch'])
+                    encoded = [(vector, None) for vector in vectors]
+                for r, (vector, chunks) in zip(need, encoded):
+                    r['chunks'] = encode_embedding_matrix(chunks, dtype=dtype) if chunks is not None else None
+                    r['embedding'] = encode_embedding(vector, dtype=dtype) if vector is not None else None
+                    r['fresh'] = vector is not None
+                t2 = time.perf_counter()
+
+                rows = [
+                    Resume(
+                        user=user, file=r['name'], text=r['text'], skills=r['skills'],
+                        skill_bits=encode_skills(r['skills']), embedding=r['embedding'],
+                        embedding_model=tag if r['embedding'] else '',
+                        chunk_embeddings=r.get('chunks'), chunk_embedding_model=tag if r.get('chunks') else '',
+                        content_hash=r['hash'],
+                        status=Resume.STATUS_READY if r['embedding'] else Resume.STATUS_PENDING,
+                    )
+                    for r in parsed
+                ]
+                with transaction.atomic():
+                    created = Resume.objects.bulk_create(rows)
+                    for r in parsed:
+                        if not r['cached'] or r.get('fresh'):
+                            store_parsed(r['hash'], r['text'], r['skills'], r['embedding'], tag, evict=False,
+                                         chunk_embeddings=r['chunks'])
+                evict_to_limit()
+
+                # bulk_create sends no post_save: bring the matrices and indexes up to date here
+                sync_saved_rows(Resume, created)
+                text_index.add_many((resume.pk, resume.text) for resume in created if resume.pk is not None)
+                for resume in created:
+                    if resume.pk is not None and resume.status == Resume.STATUS_PENDING:
+                        enqueue_resume(resume)  # embedding failed; a worker retries it
+                        totals['queued'] += 1
+                enqueue_scores(resume_ids=[resume.pk for resume in created
+                                           if resume.pk is not None and resume.status == Resume.STATUS_READY])
+
+                done += len(batch)
+                self._save_checkpoint(checkpoint_path, source, done)
+                totals['imported'] += len(created)
+                totals['failed'] += len(results) - len(parsed)
+                totals['cached'] += sum(1 for r in parsed if r['cached'])
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"📥 {done} files done, {totals['imported']} imported this run "
+                    f"({totals['imported'] / elapsed:.1f} docs/s; batch parse {t1 - t0:.1f}s, "
+                    f"skills {t_skills - t1:.1f}s, embed {t2 - t_skills:.1f}s, write {time.perf_counter() - t2:.1f}s)"
+                )
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            text_index.flush()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['imported']} resumes in {elapsed:.1f}s "
+            f"({totals['imported'] / max(elapsed, 1e-9):.1f} docs/s); {totals['cached']} from the parse cache, "
+            f"{totals['failed']} failed, {totals['queued']} queued for embedding"
+        ))
+
+    @staticmethod
+    def _load_checkpoint(path, source):
+        try:
+            with open(path) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if checkpoint.get('source') != source:
+            raise CommandError(f"Checkpoint {path} belongs to {checkpoint.get('source')}; use --restart")
+        return int(checkpoint.get('done', 0))
+
+    @staticmethod
+    def _save_checkpoint(path, source, done):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'source': source, 'done': done}, f)
+        os.replace(tmp_path, path)
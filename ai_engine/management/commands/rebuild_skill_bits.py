@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from jobs.models import Job
+from resumes.models import Resume
+from ai_engine.index_sync import record_reset
+from ai_engine.skill_bits import fill_skill_bits, invalidate_bit_matrix
+
+
+class Command(BaseCommand):
+    help = "Recompute skill bitsets from the skills JSON (after changing the taxonomy)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model, field, key in ((Resume, 'skills', 'resumes'), (Job, 'required_skills', 'jobs')):
+            updated = fill_skill_bits(model, field, batch_size=options['batch_size'])
+            record_reset(key)  # bulk_update sends no signals: running processes reload their bit matrices
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt skill bits for {updated} {model._meta.verbose_name_plural}"))
+        invalidate_bit_matrix()
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai_engine.match_store import refresh_resume, refresh_job, prune, rebuild, top_n
+from jobs.models import Job
+from resumes.models import Resume
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized MatchScore table (top N jobs per resume and resumes per job)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resume', type=int, action='append', default=[],
+                            help="Only refresh this resume (repeatable); others are left alone")
+        parser.add_argument('--job', type=int, action='append', default=[],
+                            help="Only refresh this job (repeatable); others are left alone")
+        parser.add_argument('--prune-only', action='store_true', help="Only drop pairs outside every top N")
+
+    def handle(self, *args, **options):
+        if options['prune_only']:
+            self.stdout.write(f"Pruned {prune()} match scores")
+            return
+
+        if options['resume'] or options['job']:
+            # Incremental: rescore those rows and slot them into the other side's lists
+            for resume in Resume.objects.filter(id__in=options['resume']):
+                self.stdout.write(f"Resume {resume.id}: {refresh_resume(resume)} pairs")
+            for job in Job.objects.filter(id__in=options['job']):
+                self.stdout.write(f"Job {job.id}: {refresh_job(job)} pairs")
+            return
+
+        t0 = time.perf_counter()
+        rows = rebuild(progress=lambda done: self.stdout.write(
+            f"🔄 {done} resumes ({done / (time.perf_counter() - t0):.1f}/s)"
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Materialized {rows} match scores (top {top_n()}) in {time.perf_counter() - t0:.1f}s"
+        ))
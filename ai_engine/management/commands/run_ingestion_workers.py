@@ -0,0 +1,56 @@
+import multiprocessing
+import signal
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from ai_engine.ingestion import run_worker
+
+
+def _worker_main(worker_id, poll_interval, max_tasks):
+    # Each forked worker opens its own DB connection
+    connections.close_all()
+    stop = multiprocessing.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    try:
+        run_worker(worker_id, poll_interval=poll_interval, max_tasks=max_tasks, stop_event=stop)
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = "Run N background workers that process queued resume uploads"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Number of worker processes")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--max-tasks', type=int, default=None, help="Exit each worker after this many tasks")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval, max_tasks = options['poll_interval'], options['max_tasks']
+
+        if workers == 1:
+            _worker_main('worker-1', poll_interval, max_tasks)
+            return
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=_worker_main,
+                args=(f"worker-{n}", poll_interval, max_tasks),
+                name=f"ingestion-worker-{n}",
+            )
+            for n in range(1, workers + 1)
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(self.style.SUCCESS(f"Started {workers} ingestion workers"))
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
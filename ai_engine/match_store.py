@@ -0,0 +1,255 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .bm25 import get_bm25_index, tokenize
+from .embeddings import served_embedding
+from .hybrid import hybrid_scores, breakdown_at
+from .matrix import top_k_indices
+from .models import MatchScore
+from .skill_bits import decode_bits, bits_to_names
+
+# Every stored score is the resume's view of the pair: the resume's text is the
+# BM25 query against all jobs, exactly what match_result shows (hybrid_match_score).
+
+
+def top_n():
+    return getattr(settings, 'MATCH_SCORE_TOP_N', 100)
+
+
+def materialization_enabled():
+    return getattr(settings, 'MATCH_SCORES_ENABLED', True)
+
+
+def _catch_up(*keys):
+    """Apply rows other processes saved to this process's copies before scoring against them"""
+    from .index_sync import catch_up
+    for key in keys:
+        catch_up(key, force=True)
+
+
+def _resume_scores(resume):
+    """(job ids, scores, dense, skills, bm25) of one resume against every job.
+
+    Also stores the resume's BM25 normalizer (its best raw BM25 over all
+    jobs) as bm25_norm, so refresh_job can score it without that scan.
+    """
+    from resumes.models import Resume
+
+    bm25 = get_bm25_index('jobs').scores(tokenize(resume.text))
+    norm = float(bm25[1].max()) if bm25[1].shape[0] else 0.0
+    if resume.bm25_norm != norm:
+        Resume.objects.filter(pk=resume.pk).update(bm25_norm=norm)
+        resume.bm25_norm = norm
+    return hybrid_scores('jobs', served_embedding(resume), decode_bits(resume.skill_bits), resume.text,
+                         everything=True, bm25=bm25)
+
+
+def _cutoffs(field, n, ids, chunk=500):
+    """{id: score a new pair must beat to enter that id's top n} for the given ids in the table.
+
+    Ids with fewer than n pairs take anything; ids with no pairs are not
+    materialized yet (refresh_match_scores fills them) and are left out.
+    Only the given ids' rows are counted and ranked.
+    """
+    ids = sorted(set(ids))
+    cutoffs = {}
+    for start in range(0, len(ids), chunk):
+        rows = MatchScore.objects.filter(**{f'{field}__in': ids[start:start + chunk]})
+        counts = rows.values(field).annotate(pairs=Count('id')).values_list(field, 'pairs')
+        cutoffs.update((pk, -np.inf) for pk, pairs in counts if pairs < n)
+        nth = (
+            rows
+            .annotate(rank=Window(RowNumber(), partition_by=[F(field)], order_by=F('score').desc()))
+            .filter(rank=n)
+            .values_list(field, 'score')
+        )
+        cutoffs.update(nth)
+    return cutoffs
+
+
+def _write(pairs):
+    """Upsert [(resume_id, job_id, score, breakdown), ...]"""
+    now = timezone.now()
+    rows = [
+        MatchScore(resume_id=resume_id, job_id=job_id, score=score, breakdown=breakdown, updated_at=now)
+        for resume_id, job_id, score, breakdown in pairs
+    ]
+    with transaction.atomic():
+        MatchScore.objects.bulk_create(
+            rows, batch_size=500, update_conflicts=True,
+            unique_fields=['resume', 'job'], update_fields=['score', 'breakdown', 'updated_at'],
+        )
+    return len(rows)
+
+
+def refresh_resume(resume, cross=True):
+    """Score a new or re-embedded resume against every job and store the pairs that belong.
+
+    Writes its top N jobs, rescores the pairs it already has, and with
+    cross=True adds it to the lists it now enters of its best N x
+    MATCH_SCORE_POOL_FACTOR jobs. Jobs further down are not checked, so a
+    job with a thin list may miss it until the next rebuild, which is exact.
+    Only this resume's row of scores is computed. Returns the number of
+    pairs written.
+    """
+    _catch_up('jobs')
+    n = top_n()
+    ids, scores, *parts = _resume_scores(resume)
+    if ids.shape[0] == 0:
+        return 0
+
+    position = {pk: i for i, pk in enumerate(ids.tolist())}
+    keep = set(top_k_indices(scores, n).tolist())
+    existing = MatchScore.objects.filter(resume=resume).values_list('job_id', flat=True)
+    keep.update(position[pk] for pk in existing if pk in position)
+    if cross:
+        pool = top_k_indices(scores, n * getattr(settings, 'MATCH_SCORE_POOL_FACTOR', 3))
+        for pk, cutoff in _cutoffs('job_id', n, ids[pool].tolist()).items():
+            i = position[pk]
+            if scores[i] > cutoff:
+                keep.add(i)
+    return _write(
+        (resume.pk, int(ids[i]), float(scores[i]), breakdown_at(parts, i)) for i in sorted(keep)
+    )
+
+
+def refresh_job(job, cross=True):
+    """Score a new or re-embedded job and store the pairs that belong.
+
+    The job's own hybrid ranking (its text as the query) picks a pool of
+    candidate resumes, which are then scored from each resume's side so they
+    compare with everything else in the table. The job's BM25 weights are
+    computed once and each resume's stored bm25_norm stands in for its scan
+    over every job (see hybrid_match_score).
+    """
+    from resumes.models import Resume
+    from .hybrid import hybrid_match_score
+
+    _catch_up('jobs', 'resumes')
+    n = top_n()
+    ids, scores, *_ = hybrid_scores('resumes', served_embedding(job), decode_bits(job.skill_bits),
+                                    f"{job.title} {job.description}")
+    existing = set(MatchScore.objects.filter(job=job).values_list('resume_id', flat=True))
+    pool_size = n * getattr(settings, 'MATCH_SCORE_POOL_FACTOR', 3)
+    pool = {int(ids[i]) for i in top_k_indices(scores, pool_size)} | existing
+    if not pool:
+        return 0
+
+    weights = get_bm25_index('jobs').weights_for(tokenize(job.description))
+    exact = {resume.pk: hybrid_match_score(resume, job, bm25_weights=weights)
+             for resume in Resume.objects.filter(id__in=pool).defer('file').iterator(chunk_size=200)}
+    keep = set(sorted(exact, key=lambda pk: -exact[pk]['score'])[:n]) | (existing & set(exact))
+    if cross:
+        for pk, cutoff in _cutoffs('resume_id', n, exact).items():
+            if exact[pk]['score'] > cutoff:
+                keep.add(pk)
+    return _write(
+        (pk, job.pk, exact[pk]['score'], {part: exact[pk][part] for part in ('dense', 'skills', 'bm25')})
+        for pk in sorted(keep)
+    )
+
+
+def rebuild(progress=None):
+    """Recompute the whole table exactly in one pass over the resumes.
+
+    Each resume's full row of scores gives its own top N, while a running
+    top N per job (jobs x N arrays) is kept in memory and written at the end.
+    Pairs not rescored are deleted. Returns the number of rows in the table.
+    """
+    from jobs.models import Job
+    from resumes.models import Resume
+
+    _catch_up('jobs')
+    n = top_n()
+    started = timezone.now()
+    job_ids = np.asarray(sorted(Job.objects.values_list('id', flat=True)), dtype=np.int64)
+    if job_ids.shape[0] == 0:
+        return 0
+    best = np.full((job_ids.shape[0], n), -np.inf)
+    best_resume = np.zeros((job_ids.shape[0], n), dtype=np.int64)
+    best_parts = np.zeros((3, job_ids.shape[0], n), dtype=np.float32)  # dense, skills, bm25
+    min_slot = np.zeros(job_ids.shape[0], dtype=np.int64)
+
+    resumes = Resume.objects.filter(status=Resume.STATUS_READY).defer('file')
+    for done, resume in enumerate(resumes.iterator(chunk_size=200), 1):
+        ids, scores, *parts = _resume_scores(resume)
+        if ids.shape[0] == 0:
+            continue
+        _write((resume.pk, int(ids[i]), float(scores[i]), breakdown_at(parts, i))
+               for i in top_k_indices(scores, n))
+
+        # Jobs whose running top N this resume gets into
+        rows = np.minimum(np.searchsorted(job_ids, ids), job_ids.shape[0] - 1)
+        known = job_ids[rows] == ids
+        for i in np.flatnonzero(known & (scores > best[rows, min_slot[rows]])).tolist():
+            row = rows[i]
+            slot = min_slot[row]
+            best[row, slot] = scores[i]
+            best_resume[row, slot] = resume.pk
+            best_parts[:, row, slot] = [part[i] for part in parts]
+            min_slot[row] = np.argmin(best[row])
+        if progress and done % 500 == 0:
+            progress(done)
+
+    rows, slots = np.nonzero(np.isfinite(best))
+    _write(
+        (int(best_resume[row, slot]), int(job_ids[row]), float(best[row, slot]),
+         breakdown_at(best_parts[:, row], slot))
+        for row, slot in zip(rows.tolist(), slots.tolist())
+    )
+    prune(n, before=started)
+    return MatchScore.objects.count()
+
+
+def prune(n=None, before=None):
+    """Delete pairs outside both their resume's and their job's top n.
+
+    With `before`, pairs not rescored since then are deleted first (used
+    after a full refresh). Returns the number of rows deleted.
+    """
+    n = n or top_n()
+    deleted = 0
+    if before is not None:
+        deleted += MatchScore.objects.filter(updated_at__lt=before).delete()[0]
+    ranked = MatchScore.objects.annotate(
+        job_rank=Window(RowNumber(), partition_by=[F('job_id')], order_by=F('score').desc()),
+        resume_rank=Window(RowNumber(), partition_by=[F('resume_id')], order_by=F('score').desc()),
+    )
+    doomed = list(ranked.filter(job_rank__gt=n, resume_rank__gt=n).values_list('id', flat=True))
+    for start in range(0, len(doomed), 500):
+        deleted += MatchScore.objects.filter(id__in=doomed[start:start + 500]).delete()[0]
+    return deleted
+
+
+def top_jobs(resume, n=None):
+    """Stored best jobs of a resume as match_page rows, or [] if it is not materialized"""
+    rows = MatchScore.objects.filter(resume=resume).select_related('job').order_by('-score')[:n or top_n()]
+    resume_bits = decode_bits(resume.skill_bits)
+    return [
+        {
+            'job': row.job,
+            'similarity': row.breakdown.get('dense', 0.0),
+            'score': row.score,
+            'breakdown': row.breakdown,
+            'missing_skills': bits_to_names(decode_bits(row.job.skill_bits) & ~resume_bits),
+        }
+        for row in rows
+    ]
+
+
+def top_resumes(job, n=None):
+    """Stored best resumes of a job as [(resume_id, similarity, score), ...], best first"""
+    rows = MatchScore.objects.filter(job=job).order_by('-score').values_list('resume_id', 'score', 'breakdown')
+    return [(pk, breakdown.get('dense', 0.0), score) for pk, score, breakdown in rows[:n or top_n()]]
+
+
+def stored_score(resume, job):
+    """The stored {'score', 'dense', 'skills', 'bm25'} of a pair, or None"""
+    row = MatchScore.objects.filter(resume=resume, job=job).values_list('score', 'breakdown').first()
+    if row is None:
+        return None
+    return {'score': row[0], **row[1]}
@@ -0,0 +1,599 @@
+import threading
+import numpy as np
+
+from .embeddings import load_embedding, served_embedding
+
+
+def normalize_rows(vectors):
+    """L2-normalize a 2-D array row by row as contiguous float32"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def similarity_to_score(similarity):
+    """Map cosine similarity to the 0-100 match score used by compute_match_score"""
+    return np.clip((np.asarray(similarity, dtype=np.float32) + 1) * 50, 0.0, 100.0)
+
+
+def top_k_indices(scores, k):
+    """Return indices of the k highest scores, best first"""
+    n = scores.shape[0]
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= n:
+        return np.argsort(-scores, kind='stable')
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind='stable')]
+
+
+def served_pairs(queryset, tag=None):
+    """(id, blob) pairs of the embeddings a model tag serves, one blob per row.
+
+    A row's vector for `tag` is in `embedding` normally and in `next_embedding`
+    while backfill_embeddings rolls out a new model, so the same loaders serve
+    the old model until it is switched and the new one right after. Only the
+    matching column is read.
+    """
+    from django.db.models import BinaryField, Case, F, Q, When
+    from .model_registry import model_tag
+
+    tag = tag or model_tag()
+    return (
+        queryset
+        .filter(Q(embedding_model=tag, embedding__isnull=False)
+                | Q(next_embedding_model=tag, next_embedding__isnull=False))
+        .annotate(served=Case(When(embedding_model=tag, then=F('embedding')),
+                              default=F('next_embedding'), output_field=BinaryField()))
+        .values_list('id', 'served')
+    )
+
+
+def served_vectors(queryset, ids, tag=None):
+    """{id: vector} of the serving model's (or tag's) embeddings for ids, one query reading one blob per row"""
+    found = {}
+    for pk, blob in served_pairs(queryset.filter(id__in=list(ids)), tag):
+        vec = load_embedding(blob)
+        if vec is not None:
+            found[pk] = vec
+    return found
+
+
+def score_matrix(row_vectors, col_vectors):
+    """Cosine similarity of every row vector against every column vector, one matrix product"""
+    return normalize_rows(row_vectors) @ normalize_rows(col_vectors).T
+
+
+class EmbeddingMatrix:
+    """Contiguous, pre-normalized float32 matrix of stored embeddings with their row IDs"""
+
+    def __init__(self, ids=None, vectors=None, dim=None):
+        self._lock = threading.Lock()
+        if vectors is None or len(ids) == 0:
+            self._set_state(np.empty(0, dtype=np.int64), np.empty((0, dim or 0), dtype=np.float32))
+        else:
+            self._set_state(np.asarray(ids, dtype=np.int64), normalize_rows(vectors))
+
+    def _set_state(self, ids, vectors):
+        # Swap everything at once so readers never see ids and rows out of step
+        self._state = (ids, vectors, {int(pk): row for row, pk in enumerate(ids)})
+
+    @classmethod
+    def from_queryset(cls, queryset, chunk_size=2000, tag=None):
+        """Load every embedding of a queryset served by tag (default: the serving model) into one matrix"""
+        ids, rows, dim = [], [], None
+        pairs = served_pairs(queryset, tag)
+        for pk, blob in pairs.iterator(chunk_size=chunk_size):
+            vec = load_embedding(blob)
+            if vec is None:
+                continue
+            vec = np.asarray(vec, dtype=np.float32).ravel()
+            if dim is None:
+                dim = vec.shape[0]
+            elif vec.shape[0] != dim:
+                print(f"⚠️ Skipping row {pk}: embedding dim {vec.shape[0]} != {dim}")
+                continue
+            ids.append(pk)
+            rows.append(vec)
+
+        matrix = cls(ids, np.vstack(rows) if rows else None, dim=dim)
+        print(f"✅ Loaded embedding matrix with {len(ids)} rows")
+        return matrix
+
+    @property
+    def ids(self):
+        return self._state[0]
+
+    @property
+    def vectors(self):
+        return self._state[1]
+
+    @property
+    def dim(self):
+        return self._state[1].shape[1]
+
+    def __len__(self):
+        return self._state[0].shape[0]
+
+    def __contains__(self, pk):
+        return int(pk) in self._state[2]
+
+    def upsert(self, pk, vector):
+        """Insert or replace the row for pk"""
+        vec = normalize_rows(np.asarray(vector, dtype=np.float32).ravel())
+        with self._lock:
+            ids, vectors, index = self._state
+            if vectors.shape[0] and vectors.shape[1] != vec.shape[1]:
+                print(f"⚠️ Not indexing row {pk}: embedding dim {vec.shape[1]} != {vectors.shape[1]}")
+                return
+            row = index.get(int(pk))
+            if row is not None:
+                vectors = vectors.copy()
+                vectors[row] = vec[0]
+            else:
+                ids = np.append(ids, np.int64(pk))
+                vectors = np.vstack([vectors, vec]) if vectors.shape[0] else vec
+            self._set_state(ids, vectors)
+
+    def upsert_many(self, pks, vectors):
+        """Insert or replace many rows with one copy of the matrix (bulk imports)"""
+        vecs = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(pks), -1))
+        latest = {int(pk): i for i, pk in enumerate(pks)}  # last write of a repeated pk wins
+        with self._lock:
+            ids, matrix, index = self._state
+            if not latest or (matrix.shape[0] and matrix.shape[1] != vecs.shape[1]):
+                if latest:
+                    print(f"⚠️ Not indexing {len(latest)} rows: embedding dim {vecs.shape[1]} != {matrix.shape[1]}")
+                return
+            present = [(index[pk], i) for pk, i in latest.items() if pk in index]
+            new = [(pk, i) for pk, i in latest.items() if pk not in index]
+            if present:
+                matrix = matrix.copy()
+                rows, order = zip(*present)
+                matrix[list(rows)] = vecs[list(order)]
+            if new:
+                new_ids, order = zip(*new)
+                ids = np.concatenate([ids, np.asarray(new_ids, dtype=np.int64)])
+                matrix = np.vstack([matrix, vecs[list(order)]]) if matrix.shape[0] else vecs[list(order)]
+            self._set_state(ids, matrix)
+
+    def remove(self, pk):
+        """Drop the row for pk if present"""
+        with self._lock:
+            ids, vectors, index = self._state
+            row = index.get(int(pk))
+            if row is None:
+                return
+            keep = np.ones(ids.shape[0], dtype=bool)
+            keep[row] = False
+            self._set_state(ids[keep], np.ascontiguousarray(vectors[keep]))
+
+    def similarities(self, query):
+        """Cosine similarity of query against every row"""
+        ids, vectors, _ = self._state
+        if vectors.shape[0] == 0 or query is None:
+            return ids, np.empty(0, dtype=np.float32)
+        q = normalize_rows(np.asarray(query, dtype=np.float32).ravel())[0]
+        if q.shape[0] != vectors.shape[1]:
+            print(f"❌ Query dim {q.shape[0]} does not match matrix dim {vectors.shape[1]}")
+            return ids[:0], np.empty(0, dtype=np.float32)
+        return ids, vectors @ q
+
+    def rows_for(self, pks):
+        """(ids, vectors) for the given ids that are present, in the given order"""
+        ids, vectors, index = self._state
+        rows = [index[int(pk)] for pk in pks if int(pk) in index]
+        rows = np.asarray(rows, dtype=np.int64)
+        return ids[rows], vectors[rows]
+
+    def iter_blocks(self, block_rows):
+        """Yield (ids, vectors) slices of at most block_rows rows"""
+        ids, vectors, _ = self._state
+        for start in range(0, ids.shape[0], block_rows):
+            yield ids[start:start + block_rows], vectors[start:start + block_rows]
+
+    def top_k(self, query, k=10, exclude=None, only=None):
+        """Return [(id, similarity), ...] for the k most similar rows (among `only` ids if given)"""
+        ids, sims = self.similarities(query)
+        if exclude or only is not None:
+            sims = sims.copy()
+            if exclude:
+                sims[np.isin(ids, list(exclude))] = -np.inf
+            if only is not None:
+                sims[~np.isin(ids, np.asarray(only, dtype=np.int64))] = -np.inf
+        best = top_k_indices(sims, k)
+        return [(int(ids[i]), float(sims[i])) for i in best if np.isfinite(sims[i])]
+
+
+def iter_queryset_blocks(queryset, block_rows, chunk_size=2000):
+    """Stream (ids, normalized vectors) blocks straight from the DB"""
+    ids, rows, dim = [], [], None
+    pairs = served_pairs(queryset).order_by('id')
+    for pk, blob in pairs.iterator(chunk_size=chunk_size):
+        vec = load_embedding(blob)
+        if vec is None:
+            continue
+        vec = np.asarray(vec, dtype=np.float32).ravel()
+        if dim is None:
+            dim = vec.shape[0]
+        elif vec.shape[0] != dim:
+            continue
+        ids.append(pk)
+        rows.append(vec)
+        if len(ids) >= block_rows:
+            yield np.asarray(ids, dtype=np.int64), normalize_rows(np.vstack(rows))
+            ids, rows = [], []
+    if ids:
+        yield np.asarray(ids, dtype=np.int64), normalize_rows(np.vstack(rows))
+
+
+def blocked_top_k(query, blocks, k):
+    """Top-k (id, similarity) over an iterable of (ids, normalized vectors) blocks.
+
+    Only one block plus the running top-k is ever held, so the full matrix
+    never has to fit in memory at once.
+    """
+    q = normalize_rows(np.asarray(query, dtype=np.float32).ravel())[0]
+    best_ids = np.empty(0, dtype=np.int64)
+    best_sims = np.empty(0, dtype=np.float32)
+    for ids, vectors in blocks:
+        if vectors.shape[1] != q.shape[0]:
+            continue
+        sims = vectors @ q
+        local = top_k_indices(sims, k)
+        best_ids = np.concatenate([best_ids, ids[local]])
+        best_sims = np.concatenate([best_sims, sims[local]])
+        keep = top_k_indices(best_sims, k)
+        best_ids, best_sims = best_ids[keep], best_sims[keep]
+    return [(int(pk), float(sim)) for pk, sim in zip(best_ids, best_sims)]
+
+
+def _filter_blocks(blocks, allowed_ids):
+    """Keep only rows whose id is in allowed_ids"""
+    for ids, vectors in blocks:
+        keep = np.isin(ids, allowed_ids)
+        if keep.any():
+            yield ids[keep], vectors[keep]
+
+
+# Per-process matrices, built lazily and kept in sync by ai_engine.signals
+# (rows this process saves) and ai_engine.index_sync (rows other processes save)
+_matrices = {}
+_matrices_lock = threading.Lock()
+
+
+def matrix_class():
+    """EmbeddingMatrix, or QuantizedMatrix with EMBEDDING_MATRIX_DTYPE = 'int8'"""
+    from django.conf import settings
+
+    if getattr(settings, 'EMBEDDING_MATRIX_DTYPE', 'float32') == 'int8':
+        from .quantization import QuantizedMatrix
+        return QuantizedMatrix
+    return EmbeddingMatrix
+
+
+def shared_matrix_enabled():
+    """EMBEDDING_MATRIX_STORE = 'mmap': one memory-mapped matrix per host, see ai_engine.vector_store"""
+    from django.conf import settings
+    return getattr(settings, 'EMBEDDING_MATRIX_STORE', 'memory') == 'mmap'
+
+
+def _load_matrix(key, queryset):
+    if shared_matrix_enabled():
+        from .vector_store import open_shared_matrix
+        return open_shared_matrix(key, queryset)
+    return matrix_class().from_queryset(queryset)
+
+
+def _get_matrix(key, queryset_factory):
+    from .index_sync import catch_up, track
+
+    matrix = _matrices.get(key)
+    if matrix is None:
+        with _matrices_lock:
+            matrix = _matrices.get(key)
+            if matrix is None:
+                track(key)
+                matrix = _load_matrix(key, queryset_factory())
+                _matrices[key] = matrix
+    elif not shared_matrix_enabled():
+        catch_up(key)
+    return matrix
+
+
+def get_job_matrix():
+    """Matrix of all Job embeddings for this process"""
+    from jobs.models import Job
+    return _get_matrix('jobs', Job.objects.all)
+
+
+def get_resume_matrix():
+    """Matrix of all Resume embeddings for this process"""
+    from resumes.models import Resume
+    return _get_matrix('resumes', Resume.objects.all)
+
+
+def resume_matrix_fits_in_memory():
+    """Whether all resume embeddings fit in EMBEDDING_MATRIX_MAX_MB"""
+    from django.conf import settings
+    from resumes.models import Resume
+
+    if loaded_matrix('resumes') is not None or shared_matrix_enabled():
+        return True  # a shared matrix lives in the page cache, not in this process
+    budget = getattr(settings, 'EMBEDDING_MATRIX_MAX_MB', 512) * 1024 * 1024
+    dim = getattr(settings, 'EMBEDDING_DIM', 384)
+    rows = Resume.objects.exclude(embedding__isnull=True).count()
+    if getattr(settings, 'EMBEDDING_MATRIX_DTYPE', 'float32') == 'int8':
+        return rows * (dim + 4) <= budget  # int8 codes + a float32 scale per row
+    return rows * dim * 4 <= budget
+
+
+def loaded_matrix(key):
+    """Return the matrix for key only if it is already loaded"""
+    return _matrices.get(key)
+
+
+def matrix_to_sync(key):
+    """The matrix a saved or deleted row must be applied to, or None.
+
+    That is the one loaded in this process or, with the shared store, the
+    on-disk matrix if any process has built it, so every worker sees rows
+    saved by processes that never ranked anything (uploads, imports).
+    """
+    matrix = loaded_matrix(key)
+    if matrix is None and shared_matrix_enabled():
+        from .vector_store import shared_matrix_built
+        if shared_matrix_built(key):
+            matrix = get_job_matrix() if key == 'jobs' else get_resume_matrix()
+    return matrix
+
+
+def invalidate_matrix(key=None):
+    """Forget a loaded matrix (or all of them) so the next call reloads from the DB"""
+    with _matrices_lock:
+        if key is None:
+            _matrices.clear()
+        else:
+            _matrices.pop(key, None)
+
+
+def dense_top_k(key, query, k, nprobe=None, allowed=None):
+    """[(id, similarity), ...] of the k jobs or resumes nearest a query embedding.
+
+    Unfiltered searches use the ANN index when one is built for a large
+    corpus. Otherwise the resident matrix is scanned or, for resumes over
+    EMBEDDING_MATRIX_MAX_MB, blocks streamed from the DB. `allowed`
+    restricts the search to those ids.
+    """
+    from django.conf import settings
+    from resumes.models import Resume
+    from .ann import search_or_none
+
+    if allowed is None:
+        ranked = search_or_none(key, query, k, nprobe=nprobe)
+        if ranked is not None:
+            return ranked
+    if key == 'jobs':
+        return get_job_matrix().top_k(query, k=k, only=allowed)
+    if resume_matrix_fits_in_memory():
+        # One product over the resident matrix (int8 first stage + float re-scoring if quantized)
+        return get_resume_matrix().top_k(query, k=k, only=allowed)
+    print("⚠️ Resume matrix exceeds RAM budget, streaming blocks from DB")
+    blocks = iter_queryset_blocks(Resume.objects.all(), getattr(settings, 'EMBEDDING_BLOCK_ROWS', 8192))
+    if allowed is not None:
+        blocks = _filter_blocks(blocks, allowed)
+    return blocked_top_k(query, blocks, k)
+
+
+def dense_vectors(key, ids):
+    """(ids, vectors) of the given jobs or resumes that have embeddings.
+
+    Read from the resident matrix, or from the DB for resumes over the RAM
+    budget, so only the requested rows are ever loaded.
+    """
+    from jobs.models import Job
+    from resumes.models import Resume
+
+    if key == 'jobs' or resume_matrix_fits_in_memory():
+        matrix = get_job_matrix() if key == 'jobs' else get_resume_matrix()
+        return matrix.rows_for(ids)
+    found = served_vectors(Resume.objects.all() if key == 'resumes' else Job.objects.all(), ids)
+    found_ids = [int(pk) for pk in ids if int(pk) in found]
+    if not found_ids:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+    return np.asarray(found_ids, dtype=np.int64), np.vstack([found[pk] for pk in found_ids])
+
+
+def rank_jobs_for_resume(resume, k=10, nprobe=None):
+    """Rank all jobs for a resume with one matrix-vector product.
+
+    Large corpora with a built ANN index are searched approximately instead;
+    nprobe trades recall for latency there. Returns a list of
+    {'job', 'similarity', 'score'} dicts, best match first.
+    """
+    r_emb = served_embedding(resume)
+    if r_emb is None:
+        print(f"❌ Resume {resume.id} has no embedding to rank with")
+        return []
+    return _job_results(resume, dense_top_k('jobs', r_emb, k, nprobe=nprobe))
+
+
+def rank_jobs_by_chunks(resume, k=10, block_rows=8192):
+    """Rank jobs by the resume chunk that matches them best (max-sim).
+
+    A job's similarity is the highest cosine between it and any chunk of the
+    resume, so one relevant section of a long resume is not averaged away.
+    Costs one (chunks x jobs) product per block of jobs. Resumes without
+    chunk vectors are ranked by their pooled vector instead.
+    """
+    from .embeddings import served_chunks
+
+    chunks = served_chunks(resume)
+    matrix = get_job_matrix()
+    if chunks is None or not len(matrix) or chunks.shape[1] != matrix.dim:
+        return rank_jobs_for_resume(resume, k=k)
+
+    queries = normalize_rows(chunks)
+    ids, sims = [], []
+    for block_ids, block in matrix.iter_blocks(block_rows):
+        ids.append(block_ids)
+        sims.append((queries @ block.T).max(axis=0))
+    ids, sims = np.concatenate(ids), np.concatenate(sims)
+    return _job_results(resume, [(int(ids[i]), float(sims[i])) for i in top_k_indices(sims, k)])
+
+
+def _job_results(resume, ranked):
+    """[(job id, similarity), ...] -> {'job', 'similarity', 'score', 'missing_skills'} dicts"""
+    from jobs.models import Job
+    from .skill_bits import get_job_bit_matrix, decode_bits
+
+    ranked_ids = [pk for pk, _ in ranked]
+    jobs = Job.objects.in_bulk(ranked_ids)
+    missing = get_job_bit_matrix().missing(decode_bits(resume.skill_bits), only=ranked_ids)
+    results = []
+    for pk, similarity in ranked:
+        job = jobs.get(pk)
+        if job is None:
+            continue
+        results.append({
+            'job': job,
+            'similarity': round(similarity, 4),
+            'score': round(float(similarity_to_score(similarity)), 2),
+            'missing_skills': missing.get(pk, []),
+        })
+    print(f"✅ Ranked {len(results)} jobs for resume {resume.id}")
+    return results
+
+
+def allowed_resume_ids(skills=None, query=None):
+    """IDs of resumes passing a skills filter and a keyword query, or None if neither is given"""
+    from .skill_bits import get_resume_bit_matrix, skills_to_bits
+    from .inverted_index import search_resumes
+
+    allowed = None
+    if skills:
+        allowed = get_resume_bit_matrix().ids_having_all(skills_to_bits(skills))
+    if query:
+        matches = np.asarray(search_resumes(query), dtype=np.int64)
+        allowed = matches if allowed is None else np.intersect1d(allowed, matches)
+    return allowed
+
+
+def rank_resumes_for_job(job, limit=None, nprobe=None, skills=None, query=None):
+    """Shortlist the best resumes for a job as [(resume_id, similarity), ...].
+
+    Uses the ANN index when one is built for a large corpus, then the resident
+    resume matrix when it fits the RAM budget, and otherwise streams resume
+    embeddings from the DB in blocks. `skills` restricts the shortlist to
+    resumes having all of those skills (checked on the skill bitsets), and
+    `query` to resumes matching a keyword/boolean query on their text.
+    """
+    from django.conf import settings
+
+    j_emb = served_embedding(job)
+    if j_emb is None:
+        print(f"❌ Job {job.id} has no embedding to rank with")
+        return []
+
+    limit = limit or getattr(settings, 'RECRUITER_SHORTLIST_SIZE', 500)
+    allowed = allowed_resume_ids(skills, query)
+    ranked = dense_top_k('resumes', j_emb, limit, nprobe=nprobe, allowed=allowed)
+    print(f"✅ Shortlisted {len(ranked)} resumes for job {job.id}")
+    return ranked
+
+
+class _StoredShortlist:
+    """A job's stored top N (best first) as a Paginator sequence, topped up live.
+
+    The stored rows hold only MATCH_SCORE_TOP_N resumes, fewer than a live
+    shortlist, and a job that was never refreshed may hold only the few rows
+    resumes inserted into it. A page past the stored rows ranks the job live
+    (rank_resumes_hybrid) once and appends the resumes not stored. Until then
+    its length is the expected size; afterwards it is the rows it holds.
+    """
+
+    def __init__(self, job, stored, size, nprobe=None):
+        self.job = job
+        self.nprobe = nprobe
+        self.size = size
+        self._rows = list(stored)
+        self._topped_up = len(self._rows) >= size
+
+    def __len__(self):
+        return len(self._rows) if self._topped_up else self.size
+
+    def __getitem__(self, index):
+        stop = index.stop if isinstance(index, slice) else index + 1
+        if (stop is None or stop > len(self._rows)) and not self._topped_up:
+            from .hybrid import rank_resumes_hybrid
+
+            stored = {pk for pk, _, _ in self._rows}
+            live = rank_resumes_hybrid(self.job, limit=self.size, nprobe=self.nprobe)
+            self._rows += [row for row in live if row[0] not in stored][:self.size - len(self._rows)]
+            self._topped_up = True
+            print(f"✅ Topped up stored shortlist of job {self.job.id} to {len(self._rows)} resumes")
+        return self._rows[index]
+
+
+def candidate_shortlist_page(job, page_number=1, per_page=20, nprobe=None, skills=None, mode=None, query=None):
+    """One page of the score-sorted candidate shortlist for a job.
+
+    Returns (page, rows) where rows carry the resume, its score and its
+    skill overlap with the job. Resumes are only fetched for the page shown,
+    and overlap is computed bitwise on the stored skill bitsets. mode is
+    'hybrid' (dense + skills + BM25) or 'dense' (embeddings only); unfiltered
+    hybrid shortlists start with the materialized MatchScore rows when the
+    job has some, and pages past them are ranked live.
+    """
+    from django.conf import settings
+    from django.core.paginator import Paginator
+    from resumes.models import Resume
+    from .skill_bits import decode_bits, bits_to_names
+
+    mode = mode or getattr(settings, 'MATCH_RANKING_MODE', 'hybrid')
+    ranked = []
+    if mode == 'hybrid' and not skills and not query:
+        # Unfiltered: the job's materialized top N, one indexed read per page within it
+        from .match_store import materialization_enabled, top_resumes
+        if materialization_enabled():
+            ranked = top_resumes(job)
+    if ranked:
+        print(f"✅ Read {len(ranked)} stored match scores for job {job.id}")
+        size = min(getattr(settings, 'RECRUITER_SHORTLIST_SIZE', 500),
+                   Resume.objects.filter(status=Resume.STATUS_READY).count())
+        ranked = _StoredShortlist(job, ranked, max(size, len(ranked)), nprobe=nprobe)
+    elif mode == 'hybrid':
+        from .hybrid import rank_resumes_hybrid
+        ranked = rank_resumes_hybrid(job, only=allowed_resume_ids(skills, query), nprobe=nprobe)
+    else:
+        ranked = [
+            (pk, similarity, float(similarity_to_score(similarity)))
+            for pk, similarity in rank_resumes_for_job(job, nprobe=nprobe, skills=skills, query=query)
+        ]
+    page = Paginator(ranked, per_page).get_page(page_number)
+    if isinstance(ranked, _StoredShortlist) and len(ranked) != page.paginator.count:
+        # The top-up found fewer resumes than expected: paginate the rows it returned
+        page = Paginator(ranked, per_page).get_page(page_number)
+    resumes = (
+        Resume.objects.select_related('user')
+        .defer('text', 'embedding')
+        .in_bulk([pk for pk, _, _ in page.object_list])
+    )
+    job_bits = decode_bits(job.skill_bits)
+
+    rows = []
+    for pk, similarity, score in page.object_list:
+        resume = resumes.get(pk)
+        if resume is None:
+            continue
+        rows.append({
+            'resume': resume,
+            'similarity': round(similarity, 4),
+            'score': round(score, 2),
+            'matched_skills': bits_to_names(decode_bits(resume.skill_bits) & job_bits),
+            'missing_skills': bits_to_names(job_bits & ~decode_bits(resume.skill_bits)),
+        })
+    return page, rows
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0002_cachecounter_parseddocument'),
+        ('jobs', '0008_job_embedding_model'),
+        ('resumes', '0013_resume_embedding_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('breakdown', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_scores', to='jobs.job')),
+                ('resume', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_scores', to='resumes.resume')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resume', '-score'], name='ai_engine_m_resume__1d1039_idx'), models.Index(fields=['job', '-score'], name='ai_engine_m_job_id_66ff2c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('resume', 'job'), name='unique_match_score_pair')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0003_matchscore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parseddocument',
+            name='chunk_embeddings',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
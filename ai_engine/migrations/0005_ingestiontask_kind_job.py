@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0004_parseddocument_chunk_embeddings'),
+        ('jobs', '0009_fill_job_skill_bits'),
+        ('resumes', '0016_resume_bm25_norm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestiontask',
+            name='job',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ingestion_tasks', to='jobs.job'),
+        ),
+        migrations.AddField(
+            model_name='ingestiontask',
+            name='kind',
+            field=models.CharField(choices=[('resume', 'Parse resume'), ('job_scores', 'Job match scores')], default='resume', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='ingestiontask',
+            name='resume',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ingestion_tasks', to='resumes.resume'),
+        ),
+    ]
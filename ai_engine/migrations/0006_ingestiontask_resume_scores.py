@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0005_ingestiontask_kind_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingestiontask',
+            name='kind',
+            field=models.CharField(choices=[('resume', 'Parse resume'), ('resume_scores', 'Resume match scores'), ('job_scores', 'Job match scores')], default='resume', max_length=20),
+        ),
+    ]
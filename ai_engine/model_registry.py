@@ -0,0 +1,130 @@
+import os
+import sys
+import threading
+import time
+from django.conf import settings
+
+# One SentenceTransformer per model name per process, loaded on first use
+_models = {}
+_lock = threading.Lock()
+# Model name -> time of the last failed load, so callers do not retry it on every request
+_failed_at = {}
+
+# Programs that run Django management commands
+COMMAND_PROGRAMS = {'manage.py', 'django-admin', 'django-admin.py'}
+
+# Management commands that serve requests and so benefit from a warm model
+SERVING_COMMANDS = {'runserver'}
+
+
+def default_model_name():
+    return getattr(settings, 'EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2')
+
+
+def active_model():
+    """Spec of the model that serves queries: {'name', 'version', 'dim'}"""
+    return {
+        'name': default_model_name(),
+        'version': getattr(settings, 'EMBEDDING_MODEL_VERSION', 1),
+        'dim': getattr(settings, 'EMBEDDING_DIM', 384),
+    }
+
+
+def next_model():
+    """Spec of the model being backfilled (EMBEDDING_NEXT_MODEL), or None"""
+    spec = getattr(settings, 'EMBEDDING_NEXT_MODEL', None)
+    if not spec:
+        return None
+    return {'name': spec['name'], 'version': spec.get('version', 1), 'dim': spec['dim']}
+
+
+def model_tag(spec=None):
+    """Identifier stored next to every embedding: name@vVERSION/DIM (active model by default)"""
+    spec = spec or active_model()
+    return f"{spec['name']}@v{spec['version']}/{spec['dim']}"
+
+
+def model_loading_disabled():
+    """True when SRM_SKIP_MODEL_LOAD=1 or EMBEDDING_SKIP_MODEL_LOAD is set"""
+    if os.environ.get('SRM_SKIP_MODEL_LOAD', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return getattr(settings, 'EMBEDDING_SKIP_MODEL_LOAD', False)
+
+
+def management_command_name():
+    """Name of the management command this process runs, or None (web/worker servers)"""
+    if not sys.argv:
+        return None
+    program = os.path.basename(sys.argv[0])
+    command = sys.argv[1] if len(sys.argv) > 1 else 'help'
+    # python -m django runs django/__main__.py
+    in_django = os.path.basename(os.path.dirname(sys.argv[0])) == 'django'
+    if program in COMMAND_PROGRAMS or (program == '__main__.py' and in_django):
+        return command
+    # Custom launchers (e.g. a renamed manage script) still pass a known command name
+    from django.core.management import get_commands
+    return command if command in get_commands() else None
+
+
+def running_management_command():
+    """Whether this process is a non-serving management command (migrate, shell, ...)"""
+    command = management_command_name()
+    if command is None:
+        return False
+    if command not in SERVING_COMMANDS:
+        return True
+    # runserver's autoreloader parent only watches files; the child (RUN_MAIN) serves
+    return '--noreload' not in sys.argv and os.environ.get('RUN_MAIN') != 'true'
+
+
+def get_model(name=None):
+    """Return the shared SentenceTransformer for name, loading it lazily"""
+    name = name or default_model_name()
+    model = _models.get(name)
+    if model is not None or model_loading_disabled() or _recently_failed(name):
+        return model
+
+    with _lock:
+        if name not in _models:
+            if _recently_failed(name):
+                return None
+            try:
+                from sentence_transformers import SentenceTransformer
+                _models[name] = SentenceTransformer(name)
+                _failed_at.pop(name, None)
+                print(f"✅ Embedding model {name} loaded successfully")
+            except Exception as e:
+                _failed_at[name] = time.monotonic()
+                print(f"❌ Error loading embedding model {name}: {e}")
+                return None
+    return _models[name]
+
+
+def _recently_failed(name):
+    """True within EMBEDDING_LOAD_RETRY_SECONDS of a failed load of name"""
+    failed_at = _failed_at.get(name)
+    retry_after = getattr(settings, 'EMBEDDING_LOAD_RETRY_SECONDS', 300)
+    return failed_at is not None and time.monotonic() - failed_at < retry_after
+
+
+def is_loaded(name=None):
+    return (name or default_model_name()) in _models
+
+
+def warm_up(name=None):
+    """Load the model and run one encode so the first request is not slow"""
+    model = get_model(name)
+    if model is None:
+        return False
+    model.encode(["warm up"])
+    print("✅ Embedding model warmed up")
+    return True
+
+
+def should_warm_up():
+    """Warm up web workers only, never migrations and other commands"""
+    return (
+        getattr(settings, 'EMBEDDING_WARMUP', False)
+        and not model_loading_disabled()
+        and not running_management_command()
+    )
@@ -1,3 +1,136 @@
 from django.db import models
 
-# Create your models here.
+from jobs.models import Job
+from resumes.models import Resume
+
+
+class IngestionTask(models.Model):
+    """A queued background job: parse one uploaded resume, or materialize one resume's or job's match scores"""
+
+    KIND_RESUME = 'resume'
+    KIND_RESUME_SCORES = 'resume_scores'
+    KIND_JOB_SCORES = 'job_scores'
+    KIND_CHOICES = [
+        (KIND_RESUME, 'Parse resume'),
+        (KIND_RESUME_SCORES, 'Resume match scores'),
+        (KIND_JOB_SCORES, 'Job match scores'),
+    ]
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_RESUME)
+    resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='ingestion_tasks', null=True, blank=True)
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='ingestion_tasks', null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    available_at = models.DateTimeField()
+    worker = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    timings = models.JSONField(default=dict, blank=True)  # stage name -> seconds
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        if self.kind == self.KIND_JOB_SCORES:
+            return f"Ingestion {self.id}: match scores for Job {self.job_id} ({self.status})"
+        if self.kind == self.KIND_RESUME_SCORES:
+            return f"Ingestion {self.id}: match scores for Resume {self.resume_id} ({self.status})"
+        return f"Ingestion {self.id} for Resume {self.resume_id} ({self.status})"
+
+
+class ParsedDocument(models.Model):
+    """Parse results of an uploaded file, keyed by the SHA-256 of its bytes"""
+
+    content_hash = models.CharField(max_length=64, unique=True)
+    text = models.TextField()
+    skills = models.JSONField(default=list, blank=True)
+    embedding = models.BinaryField(null=True, blank=True)  # SRME binary, see ai_engine.codec
+    embedding_model = models.CharField(max_length=200, blank=True)
+    chunk_embeddings = models.BinaryField(null=True, blank=True)  # SRMC binary, same model as embedding
+    size_bytes = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Parsed {self.content_hash[:12]} ({self.hits} hits)"
+
+
+class CacheCounter(models.Model):
+    """Hit/miss/eviction counts of a named cache, shared by all processes"""
+
+    name = models.CharField(max_length=50, unique=True)
+    hits = models.PositiveBigIntegerField(default=0)
+    misses = models.PositiveBigIntegerField(default=0)
+    evictions = models.PositiveBigIntegerField(default=0)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self):
+        return f"{self.name}: {self.hits} hits / {self.misses} misses"
+
+
+class MatchScore(models.Model):
+    """Materialized hybrid score of a resume/job pair, see ai_engine.match_store.
+
+    The table holds at least the top MATCH_SCORE_TOP_N jobs of every resume and
+    the top MATCH_SCORE_TOP_N resumes of every job.
+    """
+
+    resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='match_scores')
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='match_scores')
+    score = models.FloatField()  # 0-100
+    breakdown = models.JSONField(default=dict, blank=True)  # {'dense', 'skills', 'bm25'}
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['resume', 'job'], name='unique_match_score_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['resume', '-score']),
+            models.Index(fields=['job', '-score']),
+        ]
+
+    def __str__(self):
+        return f"Resume {self.resume_id} / Job {self.job_id}: {self.score}"
+
+
+class IndexChange(models.Model):
+    """A saved or deleted Job/Resume row, for other processes' in-memory indexes to catch up with.
+
+    See ai_engine.index_sync. row_id is null when every row of the key
+    changed at once (e.g. a model switch), which makes readers reload.
+    """
+
+    key = models.CharField(max_length=20)  # 'jobs' or 'resumes'
+    row_id = models.BigIntegerField(null=True, blank=True)
+    origin = models.CharField(max_length=100, blank=True)  # host:pid of the writing process
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['key', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.key} {self.row_id if self.row_id is not None else '*'} from {self.origin}"
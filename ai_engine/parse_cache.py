@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import ParsedDocument, CacheCounter
+
+COUNTER_NAME = 'parsed_documents'
+
+
+def cache_enabled():
+    return getattr(settings, 'PARSE_CACHE_ENABLED', True)
+
+
+def bump_counter(name, field, amount=1):
+    """Atomically add to a CacheCounter column, creating the row on first use"""
+    if not CacheCounter.objects.filter(name=name).update(**{field: F(field) + amount}):
+        try:
+            with transaction.atomic():
+                CacheCounter.objects.create(name=name, **{field: amount})
+        except IntegrityError:  # created concurrently
+            CacheCounter.objects.filter(name=name).update(**{field: F(field) + amount})
+
+
+def lookup_parsed(content_hash):
+    """Cached parse of a file, or None. Counts the hit or miss and marks the entry as recently used."""
+    if not content_hash or not cache_enabled():
+        return None
+    entry = ParsedDocument.objects.filter(content_hash=content_hash).first()
+    if entry is None:
+        bump_counter(COUNTER_NAME, 'misses')
+        return None
+    ParsedDocument.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    bump_counter(COUNTER_NAME, 'hits')
+    return entry
+
+
+def cached_vectors(entry, tag, chunking):
+    """(embedding, chunk_embeddings) blobs of a cache entry usable for model tag, or None.
+
+    With chunking on, both must be cached; otherwise the pooled embedding is enough.
+    """
+    if entry is None or not entry.embedding or entry.embedding_model != tag:
+        return None
+    chunks = bytes(entry.chunk_embeddings) if entry.chunk_embeddings else None
+    if chunking and chunks is None:
+        return None
+    return bytes(entry.embedding), chunks if chunking else None
+
+
+def store_parsed(content_hash, text, skills, embedding, embedding_model, evict=True, chunk_embeddings=None):
+    """Cache a file's parse results, then evict least recently used entries over the size limit.
+
+    chunk_embeddings (per-chunk vectors, when chunking is on) belong to the
+    same embedding_model as the pooled embedding.
+
+    Bulk callers pass evict=False and call evict_to_limit() once per batch.
+    """
+    if not content_hash or not cache_enabled():
+        return
+    embedding = bytes(embedding) if embedding else None
+    chunk_embeddings = bytes(chunk_embeddings) if chunk_embeddings else None
+    size = (len(text.encode('utf-8')) + (len(embedding) if embedding else 0)
+            + (len(chunk_embeddings) if chunk_embeddings else 0) + sum(len(s) for s in skills))
+    ParsedDocument.objects.update_or_create(
+        content_hash=content_hash,
+        defaults={
+            'text': text,
+            'skills': skills,
+            'embedding': embedding,
+            'embedding_model': embedding_model,
+            'chunk_embeddings': chunk_embeddings,
+            'size_bytes': size,
+            'last_used_at': timezone.now(),
+        },
+    )
+    if evict:
+        evict_to_limit()
+
+
+def evict_to_limit(max_bytes=None):
+    """Delete least recently used entries until the cache is under its limit.
+
+    Evicts down to 90% of the limit so the next few stores do not each evict.
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'PARSE_CACHE_MAX_MB', 256) * 1024 * 1024
+    total = ParsedDocument.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+    if total <= max_bytes:
+        return 0
+
+    target = int(max_bytes * 0.9)
+    doomed = []
+    for pk, size in ParsedDocument.objects.order_by('last_used_at').values_list('id', 'size_bytes').iterator():
+        if total <= target:
+            break
+        doomed.append(pk)
+        total -= size
+    ParsedDocument.objects.filter(id__in=doomed).delete()
+    bump_counter(COUNTER_NAME, 'evictions', len(doomed))
+    print(f"🔄 Evicted {len(doomed)} parsed documents from the cache")
+    return len(doomed)
+
+
+def cache_stats(name=COUNTER_NAME):
+    counter = CacheCounter.objects.filter(name=name).first()
+    stats = {
+        'hits': counter.hits if counter else 0,
+        'misses': counter.misses if counter else 0,
+        'evictions': counter.evictions if counter else 0,
+        'hit_rate': round(counter.hit_rate, 4) if counter else 0.0,
+    }
+    if name == COUNTER_NAME:
+        totals = ParsedDocument.objects.aggregate(total=Sum('size_bytes'))
+        stats['entries'] = ParsedDocument.objects.count()
+        stats['size_bytes'] = totals['total'] or 0
+    return stats
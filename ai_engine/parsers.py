@@ -3,27 +3,59 @@ import docx2txt
 import spacy
 import re
 import os
+import atexit
+import threading
+import time
+from contextlib import contextmanager
 from typing import List, Dict
 import numpy as np
+from django.conf import settings
+
+from .taxonomy import get_taxonomy, file_sha256
+from .skill_bits import encode_skills
+from .inverted_index import get_inverted_index
+
+# spaCy NER, loaded on first use with only the components entity recognition needs
+_nlp = None
+_nlp_loaded = False
+_nlp_lock = threading.Lock()
+
+def get_nlp():
+    """Shared trimmed spaCy pipeline, or None if NER is disabled or the model is missing"""
+    global _nlp, _nlp_loaded
+    if _nlp_loaded or not getattr(settings, 'SPACY_NER_ENABLED', True):
+        return _nlp
+    with _nlp_lock:
+        if not _nlp_loaded:
+            name = getattr(settings, 'SPACY_MODEL', 'en_core_web_sm')
+            try:
+                # Tagger, parser and lemmatizer are never used; excluded components are not even loaded
+                _nlp = spacy.load(name, exclude=getattr(settings, 'SPACY_EXCLUDE', []))
+                print(f"✅ spaCy model loaded successfully ({', '.join(_nlp.pipe_names)})")
+            except OSError:
+                print(f"❌ Please download spaCy model: python -m spacy download {name}")
+            _nlp_loaded = True
+    return _nlp
+
+# Skills taxonomy (ai_engine/data/skills_taxonomy.json), shared with job parsing
+TAXONOMY = get_taxonomy()
+SKILLS_DATABASE = TAXONOMY.skills_by_category()
+ALL_SKILLS = sorted({skill for category in SKILLS_DATABASE.values() for skill in category})
+
+# Compiled once at import; one regex pass finds every skill and alias
+SKILL_MATCHER = TAXONOMY.matcher()
+
+def match_skills(text: str) -> Dict[str, Dict]:
+    """Skills found in text with their occurrence count and positions"""
+    return {
+        skill: {'count': len(positions), 'positions': positions}
+        for skill, positions in SKILL_MATCHER.find_all(text).items()
+    }
+
+def char_budget() -> int:
+    """Max characters of resume text to extract (0 = no limit)"""
+    return getattr(settings, 'RESUME_TEXT_CHAR_BUDGET', 50000)
 
-# Initialize spaCy
-try:
-    nlp = spacy.load("en_core_web_sm")
-    print("✅ spaCy model loaded successfully")
-except OSError:
-    print("❌ Please download spaCy model: python -m spacy download en_core_web_sm")
-    nlp = None
-
-# Comprehensive skills database
-SKILLS_DATABASE = {
-    'programming': ['python', 'javascript', 'java', 'c++', 'c#', 'ruby', 'go', 'rust', 'swift', 'kotlin', 'php', 'html', 'css', 'typescript'],
-    'web_frameworks': ['django', 'flask', 'react', 'angular', 'vue', 'spring', 'express', 'laravel', 'bootstrap', 'node.js', 'django rest framework'],
-    'databases': ['mysql', 'postgresql', 'mongodb', 'redis', 'sqlite', 'oracle', 'sql', 'nosql', 'sql server'],
-    'cloud': ['aws', 'azure', 'gcp', 'docker', 'kubernetes', 'terraform', 'jenkins', 'ci/cd', 'cloud formation'],
-    'ml_ai': ['machine learning', 'deep learning', 'tensorflow', 'pytorch', 'nlp', 'computer vision', 'neural networks', 'scikit-learn', 'opencv'],
-    'tools': ['git', 'jenkins', 'linux', 'bash', 'ansible', 'jira', 'confluence', 'gitlab', 'github'],
-    'electronics': ['arduino', 'raspberry pi', 'circuit design', 'embedded systems', 'pcb design', 'iot', 'microcontroller', 'sensors', 'wireless communication']
-}
 
 def extract_text_from_file(file_path: str) -> str:
     """Extract text from PDF or DOCX files"""
@@ -31,31 +63,121 @@ def extract_text_from_file(file_path: str) -> str:
         print(f"❌ File not found: {file_path}")
         return ""
         
+    budget = char_budget() or None
     try:
         if file_path.endswith('.pdf'):
             return extract_text_from_pdf(file_path)
         elif file_path.endswith('.docx'):
-            return extract_text_from_docx(file_path)
+            return extract_text_from_docx(file_path)[:budget]
         else:
             # Try to read as text file
             with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+                return f.read(budget or -1)
     except Exception as e:
         print(f"❌ Error reading file {file_path}: {e}")
         return ""
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extract text from PDF with error handling"""
+def _extract_pdf_pages(file_path: str, start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop) of a PDF; runs in a pool process"""
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [reader.pages[i].extract_text() or '' for i in range(start, stop)]
+
+_pdf_pool = None
+
+def _get_pdf_pool():
+    """Shared PDF pool; workers start via forkserver (spawn where unavailable),
+    never fork, so they do not inherit the web process's threads and locks"""
+    global _pdf_pool
+    if _pdf_pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _pdf_pool = ProcessPoolExecutor(max_workers=getattr(settings, 'PDF_EXTRACT_WORKERS', 4),
+                                        mp_context=multiprocessing.get_context(method))
+        atexit.register(_pdf_pool.shutdown, cancel_futures=True)
+    return _pdf_pool
+
+def _discard_pdf_pool():
+    """Drop a broken pool so the next large PDF starts a fresh one"""
+    global _pdf_pool
+    pool, _pdf_pool = _pdf_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _iter_pdf_pages_parallel(file_path: str, n_pages: int):
+    """Pages extracted in chunks by the process pool, yielded in order.
+
+    Only a few chunks are in flight at a time, so a consumer that stops
+    early (character budget reached) does not pay for the remaining pages.
+    """
+    chunk = getattr(settings, 'PDF_PAGES_PER_TASK', 4)
+    ranges = [(start, min(start + chunk, n_pages)) for start in range(0, n_pages, chunk)]
+    pool = _get_pdf_pool()
+    window = 2 * getattr(settings, 'PDF_EXTRACT_WORKERS', 4)
+    pending = [pool.submit(_extract_pdf_pages, file_path, a, b) for a, b in ranges[:window]]
+    next_range = len(pending)
     try:
-        text = ''
-        with open(file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
+        while pending:
+            pages = pending.pop(0).result()
+            if next_range < len(ranges):
+                pending.append(pool.submit(_extract_pdf_pages, file_path, *ranges[next_range]))
+                next_range += 1
+            yield from pages
+    finally:
+        for future in pending:
+            future.cancel()
+
+def iter_pdf_pages(file_path: str):
+    """Yield the text of each PDF page in order.
+
+    Large files (PDF_PARALLEL_MIN_PAGES or more) are extracted page-parallel
+    in a process pool when PDF_EXTRACT_WORKERS > 1. Stop iterating to skip
+    the remaining pages.
+    """
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        n_pages = len(reader.pages)
+        parallel = (getattr(settings, 'PDF_EXTRACT_WORKERS', 4) > 1
+                    and n_pages >= getattr(settings, 'PDF_PARALLEL_MIN_PAGES', 12))
+        if not parallel:
             for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + '\n'
+                yield page.extract_text() or ''
+            return
+
+    done = 0
+    try:
+        for page_text in _iter_pdf_pages_parallel(file_path, n_pages):
+            yield page_text
+            done += 1
+        return
+    except Exception as e:
+        # e.g. no pool in this process, or a worker died: go on one page at a time
+        from concurrent.futures.process import BrokenProcessPool
+        if isinstance(e, BrokenProcessPool):
+            _discard_pdf_pool()
+        print(f"⚠️ Parallel PDF extraction failed at page {done + 1} ({e}), reading the rest sequentially")
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for i in range(done, n_pages):
+            yield reader.pages[i].extract_text() or ''
+
+def extract_text_from_pdf(file_path: str, max_chars: int = None) -> str:
+    """Extract text from PDF with error handling, stopping at the character budget"""
+    budget = char_budget() if max_chars is None else max_chars
+    try:
+        parts, total, n_pages = [], 0, 0
+        for page_text in iter_pdf_pages(file_path):
+            n_pages += 1
+            if page_text:
+                parts.append(page_text)
+                total += len(page_text) + 1
+            if budget and total >= budget:
+                print(f"⚠️ Character budget reached after {n_pages} PDF pages")
+                break
+        text = '\n'.join(parts).strip()[:budget or None]
         print(f"✅ Extracted {len(text)} characters from PDF")
-        return text.strip()
+        return text
     except Exception as e:
         print(f"❌ Error reading PDF {file_path}: {e}")
         return ""
@@ -70,72 +192,146 @@ def extract_text_from_docx(file_path: str) -> str:
         print(f"❌ Error reading DOCX {file_path}: {e}")
         return ""
 
+def extract_skills_many(texts: List[str], n_process: int = None) -> List[List[str]]:
+    """Skills of many documents, with one batched NER pass over all of them.
+
+    Keyword matching covers each whole text; NER reads the first
+    SPACY_CHAR_BUDGET characters of each (0 = all) through nlp.pipe, in
+    n_process processes (default SPACY_N_PROCESS).
+    """
+    # Method 1: Single-pass keyword matching with skill-aware word boundaries
+    found = [set(SKILL_MATCHER.find_all(text)) if text else set() for text in texts]
+
+    # Method 2: NLP-based extraction if available
+    nlp = get_nlp()
+    todo = [i for i, text in enumerate(texts) if text and len(text) > 50]
+    if nlp is not None and todo:
+        budget = getattr(settings, 'SPACY_CHAR_BUDGET', 50000) or None
+        try:
+            docs = nlp.pipe(
+                (texts[i][:budget] for i in todo),
+                batch_size=getattr(settings, 'SPACY_BATCH_SIZE', 64),
+                n_process=n_process or getattr(settings, 'SPACY_N_PROCESS', 1),
+            )
+            for i, doc in zip(todo, docs):
+                for ent in doc.ents:
+                    if ent.label_ in ["ORG", "PRODUCT"]:
+                        canonical = TAXONOMY.canonical(ent.text)
+                        if canonical:
+                            found[i].add(canonical)
+        except Exception as e:
+            print(f"❌ NLP processing error: {e}")
+
+    return [list(skills) for skills in found]
+
 def extract_skills_enhanced(text: str) -> List[str]:
     """Enhanced skill extraction using multiple methods"""
     if not text:
         print("❌ No text provided for skill extraction")
         return []
-        
-    text_lower = text.lower()
-    found_skills = set()
-    
-    # Method 1: Direct keyword matching with word boundaries
-    all_skills = [skill for category in SKILLS_DATABASE.values() for skill in category]
-    
-    for skill in all_skills:
-        # Use word boundaries to avoid partial matches
-        pattern = r'\b' + re.escape(skill) + r'\b'
-        if re.search(pattern, text_lower):
-            found_skills.add(skill)
-    
-    # Method 2: NLP-based extraction if available
-    if nlp and len(text) > 50:
-        try:
-            doc = nlp(text[:1000])  # Process first 1000 chars for efficiency
-            for ent in doc.ents:
-                if ent.label_ in ["ORG", "PRODUCT"]:
-                    potential_skill = ent.text.lower()
-                    if any(skill in potential_skill for skill in all_skills):
-                        found_skills.add(potential_skill)
-        except Exception as e:
-            print(f"❌ NLP processing error: {e}")
-    
-    print(f"✅ Found {len(found_skills)} skills: {list(found_skills)}")
-    return list(found_skills)
 
-def parse_and_store_resume(resume_instance):
-    """Main function to parse resume and store results"""
+    found_skills = extract_skills_many([text])[0]
+    print(f"✅ Found {len(found_skills)} skills: {found_skills}")
+    return found_skills
+
+class ResumeProcessingError(Exception):
+    """Raised when a resume cannot be turned into text, skills and an embedding"""
+
+
+@contextmanager
+def timed_stage(timings, name):
+    """Record the wall-clock seconds of a block under timings[name]"""
+    start = time.perf_counter()
     try:
-        print(f"🔄 Processing resume: {resume_instance.file.name}")
-        
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = round(time.perf_counter() - start, 4)
+
+
+def process_resume(resume_instance, timings=None):
+    """Parse a resume and store text, skills and embedding; raises on failure.
+
+    Per-stage durations (seconds) are written into `timings` if given.
+    """
+    from .embeddings import chunking_enabled, embed_document, store_embedding, store_chunk_embeddings
+    from .model_registry import model_tag
+    from .parse_cache import lookup_parsed, store_parsed, cached_vectors
+    from .match_store import materialization_enabled, refresh_resume
+
+    print(f"🔄 Processing resume: {resume_instance.file.name}")
+
+    # Identical files (same SHA-256) reuse an earlier parse
+    with timed_stage(timings, 'cache_lookup'):
+        if not resume_instance.content_hash:
+            resume_instance.content_hash = file_sha256(resume_instance.file.path)
+        cached = lookup_parsed(resume_instance.content_hash)
+
+    if cached is not None:
+        print(f"✅ Parse cache hit for {resume_instance.file.name}")
+        text, skills = cached.text, cached.skills
+    else:
         # Extract text
-        text = extract_text_from_file(resume_instance.file.path)
+        with timed_stage(timings, 'extract_text'):
+            text = extract_text_from_file(resume_instance.file.path)
         if not text:
-            print(f"❌ No text extracted from {resume_instance.file.path}")
-            return False
-            
-        # Update resume instance
-        resume_instance.text = text
-        
+            raise ResumeProcessingError(f"No text extracted from {resume_instance.file.path}")
+
         # Extract skills
-        skills = extract_skills_enhanced(text)
-        resume_instance.skills = skills
-        
-        # Generate embeddings
-        from .embeddings import get_embedding, store_embedding
-        embedding = get_embedding(text)
-        if embedding is not None:
-            store_embedding(resume_instance, embedding)
-            print("✅ Embedding generated and stored")
-        else:
-            print("❌ Failed to generate embedding")
-        
-        # Save everything
+        with timed_stage(timings, 'extract_skills'):
+            skills = extract_skills_enhanced(text)
+
+    # Update resume instance
+    resume_instance.text = text
+    resume_instance.skills = skills
+    resume_instance.skill_bits = encode_skills(skills)
+
+    tag = model_tag()
+    vectors = cached_vectors(cached, tag, chunking_enabled())
+    if vectors is not None:
+        resume_instance.embedding, resume_instance.chunk_embeddings = vectors
+        resume_instance.embedding_model = tag
+        resume_instance.chunk_embedding_model = tag if vectors[1] else ''
+    else:
+        # Generate embeddings: one vector per overlapping chunk plus their mean
+        with timed_stage(timings, 'embedding'):
+            embedding, chunks = embed_document(text)
+        if embedding is None:
+            resume_instance.save()  # keep text and skills for the retry
+            raise ResumeProcessingError("Failed to generate embedding")
+        store_embedding(resume_instance, embedding)
+        store_chunk_embeddings(resume_instance, chunks)
+        print("✅ Embedding generated and stored")
+        store_parsed(resume_instance.content_hash, text, skills, resume_instance.embedding, tag,
+                     chunk_embeddings=resume_instance.chunk_embeddings)
+
+    # Save everything
+    resume_instance.status = resume_instance.STATUS_READY
+    with timed_stage(timings, 'save'):
         resume_instance.save()
-        
-        print(f"✅ Successfully processed resume ID {resume_instance.id}: {len(skills)} skills found")
-        return True
-        
+
+    # Make the text searchable by recruiters straight away
+    with timed_stage(timings, 'index'):
+        get_inverted_index().add(resume_instance.id, resume_instance.text)
+
+    # Materialize this resume's best jobs (and its place in the jobs' shortlists)
+    if materialization_enabled():
+        with timed_stage(timings, 'match_scores'):
+            try:
+                refresh_resume(resume_instance)
+            except Exception as e:
+                print(f"⚠️ Could not refresh match scores for resume {resume_instance.id}: {e}")
+
+    print(f"✅ Successfully processed resume ID {resume_instance.id}: {len(skills)} skills found")
+    return True
+
+
+def parse_and_store_resume(resume_instance, timings=None):
+    """Main function to parse resume and store results"""
+    try:
+        return process_resume(resume_instance, timings)
     except Exception as e:
         print(f"❌ Error processing resume {resume_instance.id}: {e}")
-        return False
\ No newline at end of file
+        if resume_instance.pk:
+            type(resume_instance).objects.filter(pk=resume_instance.pk).update(status=resume_instance.STATUS_FAILED)
+        return False
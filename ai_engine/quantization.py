@@ -0,0 +1,266 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from .embeddings import load_embedding
+from .matrix import EmbeddingMatrix, normalize_rows, served_pairs, served_vectors, top_k_indices
+
+# Symmetric int8 scalar quantization of L2-normalized vectors:
+#   code = round(x / scale), scale = max|x| / 127   (one scale per vector)
+# so x ~= code * scale, and the cosine of two vectors is approximately
+#   (codes_a . codes_b) * scale_a * scale_b
+# where |codes_a . codes_b| <= 127 * 127 * dim.
+
+
+def quantize_rows(vectors):
+    """(int8 codes, float32 per-row scales) of L2-normalized rows"""
+    vectors = normalize_rows(vectors)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_rows(codes, scales):
+    """Approximate float32 rows back from codes and scales"""
+    return codes.astype(np.float32) * scales[:, None]
+
+
+# float32 represents every integer up to 2**24 exactly, so while dim * 127**2
+# stays below that (dim <= 1040) the BLAS float product of widened codes is the
+# exact integer dot product; NumPy's own int32 matmul is several times slower.
+EXACT_FLOAT_DIM = 2 ** 24 // 127 ** 2
+
+
+def int8_dot(codes, query_codes, block_rows=8192):
+    """Integer dot product of every int8 row with an int8 query.
+
+    Rows are widened one block at a time, so the temporary copy stays at
+    block_rows x dim however large the matrix is.
+    """
+    wide = np.float32 if codes.shape[1] <= EXACT_FLOAT_DIM else np.int32
+    q = query_codes.astype(wide)
+    out = np.empty(codes.shape[0], dtype=wide)
+    for start in range(0, codes.shape[0], block_rows):
+        out[start:start + block_rows] = codes[start:start + block_rows].astype(wide) @ q
+    return out
+
+
+class QuantizedMatrix(EmbeddingMatrix):
+    """int8 variant of EmbeddingMatrix: a quarter of the memory, approximate first stage.
+
+    Rows are held as int8 codes plus one float32 scale each. top_k ranks by
+    the integer dot product, then re-scores the best k x
+    EMBEDDING_QUANTIZED_RESCORE_FACTOR candidates exactly with their float
+    vectors. Those come from an LRU cache of EMBEDDING_QUANTIZED_FLOAT_CACHE_ROWS
+    float rows, which saved rows are written through. Only cache misses are
+    read from the DB (the model tag's vectors), in one query per top_k.
+    Everything that reads vectors (rows_for, iter_blocks, vectors) gets
+    dequantized floats; iterate blocks rather than build `vectors`.
+
+    This trades latency for memory. NumPy has no int8 BLAS, so the scan
+    widens each block of codes first and is about 1.5x slower than the
+    float32 scan, before any re-scoring. Use it when the float matrix does
+    not fit in RAM, not to speed up queries.
+    """
+
+    def __init__(self, ids=None, vectors=None, dim=None, queryset=None, tag=None):
+        self._lock = threading.Lock()
+        self._queryset = queryset  # where the float vectors for re-scoring live
+        self._tag = tag            # ...and which model's; None for the serving one
+        self._warned = False
+        self._floats = OrderedDict()  # pk -> normalized float32 row, least recently used first
+        self._floats_lock = threading.Lock()
+        self._floats_max = getattr(settings, 'EMBEDDING_QUANTIZED_FLOAT_CACHE_ROWS', 10000)
+        if vectors is None or len(ids) == 0:
+            self._set_state(np.empty(0, dtype=np.int64), np.empty((0, dim or 0), dtype=np.int8),
+                            np.empty(0, dtype=np.float32))
+        else:
+            self._set_state(np.asarray(ids, dtype=np.int64), *quantize_rows(vectors))
+
+    def _set_state(self, ids, codes, scales):
+        # Same (ids, rows, index) prefix as EmbeddingMatrix, scales last
+        self._state = (ids, codes, {int(pk): row for row, pk in enumerate(ids)}, scales)
+
+    @classmethod
+    def from_queryset(cls, queryset, chunk_size=2000, tag=None):
+        """Load and quantize every served embedding of a queryset, chunk by chunk"""
+        ids, codes, scales, dim = [], [], [], None
+        pending, pending_ids = [], []
+
+        def flush():
+            block_codes, block_scales = quantize_rows(np.vstack(pending))
+            codes.append(block_codes)
+            scales.append(block_scales)
+            ids.extend(pending_ids)
+            pending.clear()
+            pending_ids.clear()
+
+        for pk, blob in served_pairs(queryset, tag).iterator(chunk_size=chunk_size):
+            vec = load_embedding(blob)
+            if vec is None:
+                continue
+            vec = np.asarray(vec, dtype=np.float32).ravel()
+            if dim is None:
+                dim = vec.shape[0]
+            elif vec.shape[0] != dim:
+                print(f"⚠️ Skipping row {pk}: embedding dim {vec.shape[0]} != {dim}")
+                continue
+            pending_ids.append(pk)
+            pending.append(vec)
+            if len(pending) >= chunk_size:
+                flush()
+        if pending:
+            flush()
+
+        matrix = cls(dim=dim, queryset=queryset, tag=tag)
+        if ids:
+            matrix._set_state(np.asarray(ids, dtype=np.int64), np.vstack(codes), np.concatenate(scales))
+        print(f"✅ Loaded int8 embedding matrix with {len(ids)} rows ({matrix.nbytes / 2**20:.1f} MB)")
+        return matrix
+
+    @property
+    def vectors(self):
+        """Dequantized float32 copy of every row (builds the full float matrix)"""
+        _, codes, _, scales = self._state
+        return dequantize_rows(codes, scales)
+
+    @property
+    def dim(self):
+        return self._state[1].shape[1]
+
+    @property
+    def nbytes(self):
+        ids, codes, _, scales = self._state
+        return ids.nbytes + codes.nbytes + scales.nbytes
+
+    def _cache_floats(self, rows):
+        """Put {pk: normalized float row} into the re-scoring cache, evicting the least recently used"""
+        with self._floats_lock:
+            for pk, row in rows.items():
+                self._floats[pk] = row
+                self._floats.move_to_end(pk)
+            while len(self._floats) > self._floats_max:
+                self._floats.popitem(last=False)
+
+    def _float_rows(self, pks):
+        """{pk: normalized float row} for re-scoring: cached rows, the rest in one DB read"""
+        found, missing = {}, []
+        with self._floats_lock:
+            for pk in pks:
+                row = self._floats.get(pk)
+                if row is None:
+                    missing.append(pk)
+                else:
+                    self._floats.move_to_end(pk)
+                    found[pk] = row
+        if missing and self._queryset is not None:
+            fetched = served_vectors(self._queryset, missing, tag=self._tag)
+            fetched = {pk: normalize_rows(np.asarray(vec, dtype=np.float32).ravel())[0]
+                       for pk, vec in fetched.items()}
+            self._cache_floats(fetched)
+            found.update(fetched)
+        return found
+
+    def upsert(self, pk, vector):
+        """Insert or replace the row for pk"""
+        self._cache_floats({int(pk): normalize_rows(np.asarray(vector, dtype=np.float32).ravel())[0]})
+        row_codes, row_scale = quantize_rows(np.asarray(vector, dtype=np.float32).ravel())
+        with self._lock:
+            ids, codes, index, scales = self._state
+            if codes.shape[0] and codes.shape[1] != row_codes.shape[1]:
+                print(f"⚠️ Not indexing row {pk}: embedding dim {row_codes.shape[1]} != {codes.shape[1]}")
+                return
+            row = index.get(int(pk))
+            if row is not None:
+                codes, scales = codes.copy(), scales.copy()
+                codes[row], scales[row] = row_codes[0], row_scale[0]
+            else:
+                ids = np.append(ids, np.int64(pk))
+                codes = np.vstack([codes, row_codes]) if codes.shape[0] else row_codes
+                scales = np.append(scales, row_scale)
+            self._set_state(ids, codes, scales)
+
+    def upsert_many(self, pks, vectors):
+        """Insert or replace many rows with one copy of the codes (bulk imports)"""
+        floats = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(pks), -1))
+        self._cache_floats({int(pk): row for pk, row in zip(pks, floats)})
+        new_codes, new_scales = quantize_rows(floats)
+        latest = {int(pk): i for i, pk in enumerate(pks)}
+        with self._lock:
+            ids, codes, index, scales = self._state
+            if not latest or (codes.shape[0] and codes.shape[1] != new_codes.shape[1]):
+                if latest:
+                    print(f"⚠️ Not indexing {len(latest)} rows: embedding dim {new_codes.shape[1]} != {codes.shape[1]}")
+                return
+            present = [(index[pk], i) for pk, i in latest.items() if pk in index]
+            new = [(pk, i) for pk, i in latest.items() if pk not in index]
+            if present:
+                codes, scales = codes.copy(), scales.copy()
+                rows, order = zip(*present)
+                codes[list(rows)], scales[list(rows)] = new_codes[list(order)], new_scales[list(order)]
+            if new:
+                new_ids, order = zip(*new)
+                ids = np.concatenate([ids, np.asarray(new_ids, dtype=np.int64)])
+                codes = np.vstack([codes, new_codes[list(order)]]) if codes.shape[0] else new_codes[list(order)]
+                scales = np.concatenate([scales, new_scales[list(order)]])
+            self._set_state(ids, codes, scales)
+
+    def remove(self, pk):
+        """Drop the row for pk if present"""
+        with self._floats_lock:
+            self._floats.pop(int(pk), None)
+        with self._lock:
+            ids, codes, index, scales = self._state
+            row = index.get(int(pk))
+            if row is None:
+                return
+            keep = np.ones(ids.shape[0], dtype=bool)
+            keep[row] = False
+            self._set_state(ids[keep], np.ascontiguousarray(codes[keep]), scales[keep])
+
+    def similarities(self, query):
+        """Approximate cosine similarity of query against every row (int8 dot products)"""
+        ids, codes, _, scales = self._state
+        if codes.shape[0] == 0 or query is None:
+            return ids, np.empty(0, dtype=np.float32)
+        q_codes, q_scale = quantize_rows(np.asarray(query, dtype=np.float32).ravel())
+        if q_codes.shape[1] != codes.shape[1]:
+            print(f"❌ Query dim {q_codes.shape[1]} does not match matrix dim {codes.shape[1]}")
+            return ids[:0], np.empty(0, dtype=np.float32)
+        block_rows = getattr(settings, 'EMBEDDING_BLOCK_ROWS', 8192)
+        return ids, (int8_dot(codes, q_codes[0], block_rows) * (scales * q_scale[0])).astype(np.float32)
+
+    def rows_for(self, pks):
+        """(ids, dequantized vectors) for the given ids that are present, in the given order"""
+        ids, codes, index, scales = self._state
+        rows = np.asarray([index[int(pk)] for pk in pks if int(pk) in index], dtype=np.int64)
+        return ids[rows], dequantize_rows(codes[rows], scales[rows])
+
+    def iter_blocks(self, block_rows):
+        """Yield (ids, dequantized vectors) slices of at most block_rows rows"""
+        ids, codes, _, scales = self._state
+        for start in range(0, ids.shape[0], block_rows):
+            stop = start + block_rows
+            yield ids[start:stop], dequantize_rows(codes[start:stop], scales[start:stop])
+
+    def top_k(self, query, k=10, exclude=None, only=None):
+        """[(id, similarity), ...] for the k most similar rows, re-scored with float vectors"""
+        factor = getattr(settings, 'EMBEDDING_QUANTIZED_RESCORE_FACTOR', 4)
+        approx = super().top_k(query, k=k * max(1, factor), exclude=exclude, only=only)
+        if not approx:
+            return approx
+
+        exact = self._float_rows([pk for pk, _ in approx])
+        if len(exact) < len(approx) and not self._warned:
+            self._warned = True
+            print(f"⚠️ {len(approx) - len(exact)} int8 rows have no float vector to re-score; "
+                  f"their approximate scores are used")
+        if not exact:
+            return approx[:k]
+        q = normalize_rows(np.asarray(query, dtype=np.float32).ravel())[0]
+        # Rows with no float vector at hand (not cached, none in the DB) keep their int8 score
+        sims = np.asarray([float(exact[pk] @ q) if pk in exact else sim for pk, sim in approx], dtype=np.float32)
+        return [(approx[i][0], float(sims[i])) for i in top_k_indices(sims, k)]
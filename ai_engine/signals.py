@@ -0,0 +1,106 @@
+import numpy as np
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from jobs.models import Job
+from resumes.models import Resume
+from .index_sync import record_changes
+
+# Which per-process matrices/indexes each model feeds
+MATRIX_KEYS = {Job: 'jobs', Resume: 'resumes'}
+MATRIX_MODELS = {key: model for model, key in MATRIX_KEYS.items()}
+# Fields those structures are built from; saves touching none of them are not synced
+SYNCED_FIELDS = {
+    model: ('embedding', 'embedding_model', 'next_embedding', 'next_embedding_model', 'skill_bits', text)
+    for model, text in ((Job, 'description'), (Resume, 'text'))
+}
+
+
+@receiver(pre_save, sender=Resume)
+def record_content_hash(sender, instance, **kwargs):
+    """Copy the SHA-256 computed by the upload handler onto a newly uploaded resume"""
+    uploaded = instance.file
+    if uploaded and not uploaded._committed:
+        instance.content_hash = getattr(uploaded.file, 'content_sha256', '') or instance.content_hash
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_save, sender=Resume)
+def sync_embedding_matrix(sender, instance, update_fields=None, **kwargs):
+    """Keep already-loaded embedding, ANN, BM25 and skill-bit structures in step with saved rows"""
+    if update_fields is not None and not set(update_fields) & set(SYNCED_FIELDS[sender]):
+        return  # e.g. a status-only save
+    record_changes(MATRIX_KEYS[sender], [instance.pk])
+    apply_rows(sender, [instance])
+
+
+def sync_saved_rows(sender, instances):
+    """sync_embedding_matrix for a batch written with bulk_create/bulk_update, which send no signals"""
+    instances = [instance for instance in instances if instance.pk is not None]
+    record_changes(MATRIX_KEYS[sender], [instance.pk for instance in instances])
+    apply_rows(sender, instances)
+
+
+@receiver(post_delete, sender=Job)
+@receiver(post_delete, sender=Resume)
+def drop_from_embedding_matrix(sender, instance, **kwargs):
+    record_changes(MATRIX_KEYS[sender], [instance.pk])
+    apply_rows(sender, [], removed=[instance.pk])
+    if sender is Resume:
+        from .inverted_index import get_inverted_index
+        get_inverted_index().remove(instance.pk)
+
+
+def apply_rows(sender, instances, removed=(), remote=False):
+    """Apply saved rows and deleted ids to this process's structures.
+
+    remote=True is for rows another process wrote (see ai_engine.index_sync):
+    only the copies already loaded here change. The shared mmap matrix was
+    updated by the writer, and the writer saves them to the ANN file.
+    """
+    from .matrix import loaded_matrix, matrix_to_sync, shared_matrix_enabled
+    from .embeddings import served_embedding
+    from .ann import sync_index, sync_index_many
+    from .skill_bits import loaded_bit_matrix, decode_bits
+    from .bm25 import loaded_bm25_index
+
+    key = MATRIX_KEYS[sender]
+    embedded, vectors, unembedded = [], [], list(removed)
+    for instance in instances:
+        embedding = served_embedding(instance)
+        if embedding is None:
+            unembedded.append(instance.pk)
+        else:
+            embedded.append(instance.pk)
+            vectors.append(np.asarray(embedding, dtype=np.float32).ravel())
+    vectors = np.vstack(vectors) if vectors else None
+
+    sync_index_many(key, embedded, vectors, remote=remote)
+    for pk in unembedded:
+        sync_index(key, pk, None, remote=remote)
+
+    bm25 = loaded_bm25_index(key)
+    if bm25 is not None:
+        for instance in instances:
+            bm25.upsert(instance.pk, instance.description if sender is Job else instance.text)
+        for pk in removed:
+            bm25.remove(pk)
+
+    bit_matrix = loaded_bit_matrix(key)
+    if bit_matrix is not None:
+        with_bits = [instance for instance in instances if instance.skill_bits is not None]
+        bit_matrix.upsert_many([instance.pk for instance in with_bits],
+                               [decode_bits(instance.skill_bits) for instance in with_bits])
+        for pk in [instance.pk for instance in instances if instance.skill_bits is None] + list(removed):
+            bit_matrix.remove(pk)
+
+    if remote:
+        matrix = None if shared_matrix_enabled() else loaded_matrix(key)
+    else:
+        matrix = matrix_to_sync(key)
+    if matrix is None:
+        return
+    if embedded:
+        matrix.upsert_many(embedded, vectors)
+    for pk in unembedded:
+        matrix.remove(pk)
@@ -0,0 +1,252 @@
+import threading
+import numpy as np
+
+from .taxonomy import get_taxonomy
+
+# Skill bitsets are little-endian arrays of uint64 words: bit i of the
+# bitset is set when the row has taxonomy skill ID i.
+
+
+def n_words():
+    """Words needed to hold every skill ID of the current taxonomy"""
+    return get_taxonomy().max_id // 64 + 1
+
+
+def skills_to_bits(skills):
+    """Python int bitset of the known skills in a list of names/aliases"""
+    bits = 0
+    for skill_id in get_taxonomy().skill_ids(skills or []):
+        bits |= 1 << skill_id
+    return bits
+
+
+def encode_bits(bits):
+    """Python int bitset -> bytes for a BinaryField"""
+    return int(bits).to_bytes(n_words() * 8, 'little')
+
+
+def decode_bits(blob):
+    """Stored bytes -> Python int bitset (0 for empty)"""
+    return int.from_bytes(bytes(blob), 'little') if blob else 0
+
+
+def encode_skills(skills):
+    """Canonical skill list -> stored bitset bytes"""
+    return encode_bits(skills_to_bits(skills))
+
+
+def fill_skill_bits(model, field, only_missing=False, batch_size=1000):
+    """Encode each row's skills JSON field into skill_bits; returns the rows updated"""
+    rows = model.objects.all()
+    if only_missing:
+        rows = rows.filter(skill_bits__isnull=True)
+    batch, updated = [], 0
+    for pk, skills in rows.values_list('id', field).iterator(chunk_size=batch_size):
+        batch.append(model(id=pk, skill_bits=encode_skills(skills)))
+        if len(batch) >= batch_size:
+            model.objects.bulk_update(batch, ['skill_bits'])
+            updated += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, ['skill_bits'])
+        updated += len(batch)
+    return updated
+
+
+def bits_to_ids(bits):
+    ids, position = [], 0
+    while bits:
+        if bits & 1:
+            ids.append(position)
+        bits >>= 1
+        position += 1
+    return ids
+
+
+def bits_to_names(bits):
+    taxonomy = get_taxonomy()
+    return [taxonomy.name(skill_id) for skill_id in bits_to_ids(bits)]
+
+
+def overlap_bits(resume_bits, job_bits):
+    return resume_bits & job_bits
+
+
+def missing_bits(resume_bits, job_bits):
+    """Job skills the resume lacks"""
+    return job_bits & ~resume_bits
+
+
+def jaccard(a_bits, b_bits):
+    union = (a_bits | b_bits).bit_count()
+    return (a_bits & b_bits).bit_count() / union if union else 0.0
+
+
+def _popcount_rows(words):
+    """Set bits per row of a uint64 matrix"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    return np.unpackbits(words.view(np.uint8), axis=1).sum(axis=1, dtype=np.int64)
+
+
+def _to_words(bits, width):
+    bits = int(bits) & ((1 << (width * 64)) - 1)
+    return np.frombuffer(bits.to_bytes(width * 8, 'little'), dtype='<u8').astype(np.uint64)
+
+
+class SkillBitMatrix:
+    """(rows x words) uint64 matrix of skill bitsets for vectorized set math"""
+
+    def __init__(self, ids, words):
+        self._lock = threading.Lock()
+        self._state = (np.asarray(ids, dtype=np.int64), words)
+
+    @classmethod
+    def from_queryset(cls, queryset, chunk_size=2000):
+        width = n_words()
+        ids, rows = [], []
+        pairs = queryset.exclude(skill_bits__isnull=True).values_list('id', 'skill_bits')
+        for pk, blob in pairs.iterator(chunk_size=chunk_size):
+            row = np.zeros(width * 8, dtype=np.uint8)
+            raw = np.frombuffer(bytes(blob)[:width * 8], dtype=np.uint8)
+            row[:raw.shape[0]] = raw  # older, narrower bitsets are zero-padded
+            ids.append(pk)
+            rows.append(row)
+        words = np.vstack(rows).view('<u8').astype(np.uint64) if rows else np.zeros((0, width), dtype=np.uint64)
+        print(f"✅ Loaded skill bit matrix with {len(ids)} rows")
+        return cls(ids, words)
+
+    @property
+    def ids(self):
+        return self._state[0]
+
+    def __len__(self):
+        return self._state[0].shape[0]
+
+    def upsert(self, pk, bits):
+        with self._lock:
+            ids, words = self._state
+            row = _to_words(bits, words.shape[1])
+            where = np.flatnonzero(ids == pk)
+            if where.shape[0]:
+                words = words.copy()
+                words[where[0]] = row
+            else:
+                ids = np.append(ids, np.int64(pk))
+                words = np.vstack([words, row])
+            self._state = (ids, words)
+
+    def upsert_many(self, pks, bits_list):
+        """Insert or replace many rows with one copy of the matrix (bulk imports)"""
+        latest = {int(pk): bits for pk, bits in zip(pks, bits_list)}
+        if not latest:
+            return
+        with self._lock:
+            ids, words = self._state
+            new_rows = np.vstack([_to_words(bits, words.shape[1]) for bits in latest.values()])
+            new_ids = np.fromiter(latest.keys(), dtype=np.int64, count=len(latest))
+            keep = ~np.isin(ids, new_ids)
+            self._state = (np.concatenate([ids[keep], new_ids]), np.vstack([words[keep], new_rows]))
+
+    def remove(self, pk):
+        with self._lock:
+            ids, words = self._state
+            keep = ids != pk
+            self._state = (ids[keep], words[keep])
+
+    def missing_counts(self, bits):
+        """Per row: how many of the row's skills are absent from `bits`"""
+        ids, words = self._state
+        return ids, _popcount_rows(words & ~_to_words(bits, words.shape[1]))
+
+    def missing(self, bits, only=None):
+        """{row id: missing skill names} for every row (or the `only` ids), in one vectorized pass"""
+        ids, words = self._state
+        if only is not None:
+            keep = np.isin(ids, np.asarray(list(only), dtype=np.int64))
+            ids, words = ids[keep], words[keep]
+        gaps = words & ~_to_words(bits, words.shape[1])
+        has_gap = np.flatnonzero(gaps.any(axis=1))
+        taxonomy = get_taxonomy()
+        result = {int(pk): [] for pk in ids}
+        if has_gap.shape[0]:
+            # Unpack only rows with gaps: (rows, words*64) bit matrix, LSB first
+            unpacked = np.unpackbits(gaps[has_gap].view(np.uint8), axis=1, bitorder='little')
+            for row, skill_id in zip(*np.nonzero(unpacked)):
+                result[int(ids[has_gap[row]])].append(taxonomy.name(int(skill_id)))
+        return result
+
+    def jaccard(self, bits):
+        ids, words = self._state
+        query = _to_words(bits, words.shape[1])
+        inter = _popcount_rows(words & query)
+        union = _popcount_rows(words | query)
+        return ids, np.where(union > 0, inter / np.maximum(union, 1), 0.0)
+
+    def coverage(self, bits, rows_required=True, only=None):
+        """Fraction of required skills that are covered, per row.
+
+        rows_required=True: rows are jobs and `bits` is a resume (share of each
+        job's skills the resume has). False: rows are resumes and `bits` is a
+        job (share of the job's skills each resume has). Rows or queries with
+        no skills score 0. Returns (ids, coverage).
+        """
+        ids, words = self._state
+        if only is not None:
+            keep = np.isin(ids, np.asarray(list(only), dtype=np.int64))
+            ids, words = ids[keep], words[keep]
+        query = _to_words(bits, words.shape[1])
+        inter = _popcount_rows(words & query)
+        if rows_required:
+            total = _popcount_rows(words)
+        else:
+            total = np.full(ids.shape[0], int(bits).bit_count(), dtype=np.int64)
+        return ids, np.where(total > 0, inter / np.maximum(total, 1), 0.0)
+
+    def ids_having_all(self, bits):
+        """IDs of rows that contain every skill in `bits` (a skill filter)"""
+        ids, words = self._state
+        query = _to_words(bits, words.shape[1])
+        return ids[np.all((words & query) == query, axis=1)]
+
+
+_matrices = {}
+_matrices_lock = threading.Lock()
+
+
+def _get_bit_matrix(key, queryset_factory):
+    from .index_sync import catch_up, track
+
+    matrix = _matrices.get(key)
+    if matrix is None:
+        with _matrices_lock:
+            matrix = _matrices.get(key)
+            if matrix is None:
+                track(key)
+                matrix = SkillBitMatrix.from_queryset(queryset_factory())
+                _matrices[key] = matrix
+    else:
+        catch_up(key)
+    return matrix
+
+
+def get_job_bit_matrix():
+    from jobs.models import Job
+    return _get_bit_matrix('jobs', Job.objects.all)
+
+
+def get_resume_bit_matrix():
+    from resumes.models import Resume
+    return _get_bit_matrix('resumes', Resume.objects.all)
+
+
+def loaded_bit_matrix(key):
+    return _matrices.get(key)
+
+
+def invalidate_bit_matrix(key=None):
+    with _matrices_lock:
+        if key is None:
+            _matrices.clear()
+        else:
+            _matrices.pop(key, None)
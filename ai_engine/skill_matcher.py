@@ -0,0 +1,111 @@
+import re
+from collections import defaultdict
+
+# A skill must not be glued to other word characters or to the symbols that
+# are part of skill names themselves, so "c" never matches inside "c++"
+# and "java" never matches inside "javascript".
+BOUNDARY_BEFORE = r'(?<![\w+#])'
+BOUNDARY_AFTER = r'(?![\w+#])'
+
+
+def _build_trie(phrases):
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[''] = True
+    return trie
+
+
+def _trie_to_regex(node):
+    """Turn a character trie into one regex with shared prefixes.
+
+    Alternatives that share a prefix are factored, e.g. {"sql", "sql server"}
+    becomes "sql(?: server)?", so the regex engine does not retry every
+    skill at every position and cost stays flat as the vocabulary grows.
+    """
+    optional = '' in node
+    branches = [re.escape(ch) + _trie_to_regex(child) for ch, child in sorted(node.items()) if ch != '']
+    if not branches:
+        return ''
+    if len(branches) == 1 and not optional:
+        return branches[0]
+    pattern = '(?:' + '|'.join(branches) + ')'
+    return pattern + '?' if optional else pattern
+
+
+class SkillMatcher:
+    """Finds every known skill in a text with a single compiled regex pass.
+
+    `phrases` is an iterable of lowercase skill phrases or a mapping of
+    phrase -> canonical skill name. Matches report the canonical name.
+    """
+
+    def __init__(self, phrases):
+        if not isinstance(phrases, dict):
+            phrases = {phrase: phrase for phrase in phrases}
+        self.canonical = {p.lower().strip(): c for p, c in phrases.items() if p and p.strip()}
+        self._nested = self._find_nested(self.canonical)
+        trie = _trie_to_regex(_build_trie(self.canonical))
+        self._regex = re.compile(BOUNDARY_BEFORE + '(?:' + trie + ')' + BOUNDARY_AFTER) if trie else None
+
+    def __len__(self):
+        return len(self.canonical)
+
+    @staticmethod
+    def _find_nested(phrases):
+        """Phrases that occur as whole words inside longer phrases.
+
+        The single pass reports the longest match at each position, so
+        "django rest framework" would hide "django"; these are added back.
+        Only skill names count, for other skills: "spring" inside its own
+        alias "spring boot" is not a second mention, and the alias "js"
+        inside "node js" is not JavaScript.
+        """
+        nested = {}
+        for phrase in phrases:
+            words = phrase.split(' ')
+            if len(words) < 2:
+                continue
+            found = []
+            offsets = [0]
+            for word in words:
+                offsets.append(offsets[-1] + len(word) + 1)
+            for i in range(len(words)):
+                for j in range(i + 1, len(words) + 1):
+                    if (i, j) == (0, len(words)):
+                        continue
+                    sub = ' '.join(words[i:j])
+                    if sub not in phrases or phrases[sub] == phrases[phrase]:
+                        continue
+                    if sub != phrases[sub].lower():
+                        continue  # an alias fragment, not a name of its own
+                    found.append((sub, offsets[i]))
+            if found:
+                nested[phrase] = found
+        return nested
+
+    def find_all(self, text):
+        """Return {canonical skill: [start offsets]} for text.
+
+        Offsets refer to text.lower(), which is what is scanned.
+        """
+        positions = defaultdict(list)
+        if not text or self._regex is None:
+            return {}
+        for match in self._regex.finditer(text.lower()):
+            phrase = match.group(0)
+            positions[self.canonical[phrase]].append(match.start())
+            for sub, offset in self._nested.get(phrase, ()):
+                positions[self.canonical[sub]].append(match.start() + offset)
+        return {skill: sorted(set(starts)) for skill, starts in positions.items()}
+
+    def count(self, text):
+        """Return {canonical skill: number of occurrences}"""
+        return {skill: len(starts) for skill, starts in self.find_all(text).items()}
+
+    def skills(self, text):
+        """Distinct canonical skills found in text, in order of first appearance"""
+        found = self.find_all(text)
+        return sorted(found, key=lambda skill: found[skill][0])
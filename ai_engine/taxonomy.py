@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+from django.conf import settings
+
+from .skill_matcher import SkillMatcher
+
+INDEX_FORMAT_VERSION = 1
+
+
+def normalize_skill(text):
+    """Lowercase and collapse whitespace; the form every alias is indexed under"""
+    return ' '.join(str(text).lower().split())
+
+
+def alias_hash(alias):
+    """64-bit key of a normalized alias"""
+    return int.from_bytes(hashlib.blake2b(alias.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SkillTaxonomy:
+    """Canonical skills, their categories and aliases, with integer skill IDs.
+
+    Aliases are looked up through a sorted array of 64-bit alias hashes and a
+    parallel array of skill IDs. Both are memory-mapped from SKILLS_INDEX_DIR,
+    so every worker on a host shares the same pages.
+    """
+
+    def __init__(self, skills, categories, keys, ids):
+        self.categories = categories
+        self._names = {skill['id']: skill['name'] for skill in skills}
+        self._category = {skill['id']: skill['category'] for skill in skills}
+        self._aliases = {skill['id']: list(skill.get('aliases', [])) for skill in skills}
+        self._keys = keys
+        self._ids = ids
+        self._matcher = None
+
+    def __len__(self):
+        return len(self._names)
+
+    # -- index build / load ---------------------------------------------
+
+    @staticmethod
+    def read_source(path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return data['skills'], data.get('categories', [])
+
+    @staticmethod
+    def build_index(source_path, index_dir):
+        """Compile the taxonomy file into hash -> skill ID arrays on disk"""
+        skills, categories = SkillTaxonomy.read_source(source_path)
+        by_hash = {}
+        for skill in skills:
+            for alias in [skill['name']] + list(skill.get('aliases', [])):
+                key = alias_hash(normalize_skill(alias))
+                owner = by_hash.setdefault(key, skill['id'])
+                if owner != skill['id']:
+                    raise ValueError(f"Alias '{alias}' maps to skills {owner} and {skill['id']}")
+
+        keys = np.array(sorted(by_hash), dtype=np.uint64)
+        ids = np.array([by_hash[int(k)] for k in keys], dtype=np.int32)
+
+        os.makedirs(index_dir, exist_ok=True)
+        for name, array in (('keys.npy', keys), ('ids.npy', ids)):
+            tmp_path = os.path.join(index_dir, f"{name}.tmp")
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, os.path.join(index_dir, name))
+
+        # Written last: a matching meta.json means the arrays are complete
+        meta = {'format': INDEX_FORMAT_VERSION, 'source_sha256': file_sha256(source_path), 'aliases': len(keys)}
+        tmp_path = os.path.join(index_dir, 'meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(index_dir, 'meta.json'))
+        print(f"✅ Built skills index: {len(skills)} skills, {len(keys)} aliases")
+        return meta
+
+    @staticmethod
+    def index_is_current(source_path, index_dir):
+        try:
+            with open(os.path.join(index_dir, 'meta.json')) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return meta.get('format') == INDEX_FORMAT_VERSION and meta.get('source_sha256') == file_sha256(source_path)
+
+    @classmethod
+    def load(cls, source_path=None, index_dir=None):
+        """Load the taxonomy, rebuilding the on-disk index if the source changed"""
+        source_path = str(source_path or settings.SKILLS_TAXONOMY_PATH)
+        index_dir = str(index_dir or settings.SKILLS_INDEX_DIR)
+        if not cls.index_is_current(source_path, index_dir):
+            cls.build_index(source_path, index_dir)
+
+        skills, categories = cls.read_source(source_path)
+        keys = np.load(os.path.join(index_dir, 'keys.npy'), mmap_mode='r')
+        ids = np.load(os.path.join(index_dir, 'ids.npy'), mmap_mode='r')
+        print(f"✅ Skills taxonomy loaded: {len(skills)} skills")
+        return cls(skills, categories, keys, ids)
+
+    # -- lookups --------------------------------------------------------
+
+    def lookup(self, alias):
+        """Skill ID for a name or alias, or None"""
+        if not alias:
+            return None
+        return self.lookup_many([alias])[0]
+
+    def lookup_many(self, aliases):
+        """Skill IDs (or None) for many names/aliases with one searchsorted"""
+        if not aliases or len(self._keys) == 0:
+            return [None] * len(aliases)
+        hashes = np.array([alias_hash(normalize_skill(a)) for a in aliases], dtype=np.uint64)
+        pos = np.searchsorted(self._keys, hashes)
+        pos = np.minimum(pos, len(self._keys) - 1)
+        hit = self._keys[pos] == hashes
+        return [int(self._ids[p]) if h else None for p, h in zip(pos, hit)]
+
+    def canonical(self, alias):
+        """Canonical skill name for a name or alias, or None"""
+        skill_id = self.lookup(alias)
+        return self._names[skill_id] if skill_id is not None else None
+
+    def canonicalize(self, skills):
+        """Map names/aliases to canonical names; unknown skills are normalized and kept"""
+        result, seen = [], set()
+        for raw, skill_id in zip(skills, self.lookup_many(list(skills))):
+            name = self._names[skill_id] if skill_id is not None else normalize_skill(raw)
+            if name and name not in seen:
+                seen.add(name)
+                result.append(name)
+        return result
+
+    def skill_ids(self, skills):
+        """Integer IDs of the known skills in a list of names/aliases"""
+        return sorted({skill_id for skill_id in self.lookup_many(list(skills)) if skill_id is not None})
+
+    def name(self, skill_id):
+        return self._names.get(skill_id)
+
+    def category(self, skill_id):
+        return self._category.get(skill_id)
+
+    @property
+    def max_id(self):
+        return max(self._names) if self._names else 0
+
+    def skills_by_category(self):
+        """{category: [canonical names]} in taxonomy order"""
+        grouped = {category: [] for category in self.categories}
+        for skill_id, name in self._names.items():
+            grouped.setdefault(self._category[skill_id], []).append(name)
+        return grouped
+
+    def alias_map(self):
+        """{normalized alias or name: canonical name}"""
+        mapping = {}
+        for skill_id, name in self._names.items():
+            mapping[normalize_skill(name)] = name
+            for alias in self._aliases[skill_id]:
+                mapping[normalize_skill(alias)] = name
+        return mapping
+
+    def matcher(self):
+        """Single-pass SkillMatcher over every name and alias"""
+        if self._matcher is None:
+            self._matcher = SkillMatcher(self.alias_map())
+        return self._matcher
+
+
+_taxonomy = None
+_taxonomy_lock = threading.Lock()
+
+
+def get_taxonomy():
+    """Process-wide skills taxonomy shared by resume and job parsing"""
+    global _taxonomy
+    if _taxonomy is None:
+        with _taxonomy_lock:
+            if _taxonomy is None:
+                _taxonomy = SkillTaxonomy.load()
+    return _taxonomy
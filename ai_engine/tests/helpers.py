@@ -0,0 +1,91 @@
+import unittest
+from importlib.util import find_spec
+
+import numpy as np
+from django.contrib.auth import get_user_model
+
+from ai_engine import ann, bm25, index_sync, matrix, skill_bits
+from ai_engine.codec import encode_embedding
+from ai_engine.model_registry import model_tag
+
+
+def vector(*weights, dim=8):
+    """float32 vector of length dim with the given leading components"""
+    out = np.zeros(dim, dtype=np.float32)
+    out[:len(weights)] = weights
+    return out
+
+
+def requires(*modules):
+    """Skip unless the optional modules are installed (parsing needs PyPDF2, docx2txt and spaCy)"""
+    missing = [name for name in modules if not _installed(name)]
+    return unittest.skipIf(missing, f"needs {', '.join(missing)}")
+
+
+def _installed(name):
+    try:
+        return find_spec(name) is not None
+    except ModuleNotFoundError:  # a parent package of a dotted name is missing
+        return False
+
+
+def write_pdf(path, pages):
+    """Write a PDF with one line of Helvetica text per page"""
+    from PyPDF2 import PageObject, PdfWriter
+    from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    font = DictionaryObject({NameObject('/Type'): NameObject('/Font'), NameObject('/Subtype'): NameObject('/Type1'),
+                             NameObject('/BaseFont'): NameObject('/Helvetica')})
+    writer = PdfWriter()
+    for text in pages:
+        page = PageObject.create_blank_page(width=612, height=792)
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode())
+        page[NameObject('/Contents')] = content
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): font}),
+        })
+        writer.add_page(page)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def make_user(username='candidate'):
+    return get_user_model().objects.get_or_create(username=username)[0]
+
+
+def job(title='Job', description='', skills=(), embedding=None, **fields):
+    """Unsaved Job with skill bits and, if given, a served embedding"""
+    from jobs.models import Job
+
+    return Job(title=title, description=description, required_skills=list(skills),
+               skill_bits=skill_bits.encode_skills(list(skills)),
+               embedding=None if embedding is None else encode_embedding(embedding),
+               embedding_model='' if embedding is None else model_tag(), **fields)
+
+
+def resume(user, text='', skills=(), embedding=None, **fields):
+    """Unsaved ready Resume with skill bits and, if given, a served embedding"""
+    from resumes.models import Resume
+
+    fields.setdefault('status', Resume.STATUS_READY)
+    fields.setdefault('file', 'resumes/resume.pdf')
+    return Resume(user=user, text=text, skills=list(skills), skill_bits=skill_bits.encode_skills(list(skills)),
+                  embedding=None if embedding is None else encode_embedding(embedding),
+                  embedding_model='' if embedding is None else model_tag(), **fields)
+
+
+def reset_process_state():
+    """Forget every per-process matrix and index, as in a freshly started process"""
+    for cache in (matrix._matrices, skill_bits._matrices, bm25._indexes, ann._indexes, ann._loaded):
+        cache.clear()
+    index_sync.forget()
+
+
+class ProcessStateMixin:
+    """Start and end each test with no per-process matrices or indexes loaded"""
+
+    def setUp(self):
+        super().setUp()
+        reset_process_state()
+        self.addCleanup(reset_process_state)
@@ -0,0 +1,138 @@
+import shutil
+import tempfile
+import threading
+from threading import Event
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from ai_engine import ann
+from ai_engine.ann import IVFIndex
+from ai_engine.ingestion import run_worker
+from ai_engine.tests.helpers import reset_process_state
+
+
+def random_vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+class IVFIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.vectors = random_vectors(200)
+        self.ids = np.arange(1, 201, dtype=np.int64)
+        self.index = IVFIndex.build(self.ids, self.vectors, nlist=8)
+
+    def test_probing_every_list_is_exact(self):
+        query = self.vectors[17]
+        scores = ann.normalize_rows(self.vectors) @ ann.normalize_rows(query)[0]
+        expected = self.ids[np.argsort(-scores)[:5]].tolist()
+        self.assertEqual([pk for pk, _ in self.index.search(query, k=5, nprobe=8)], expected)
+
+    def test_upserts_and_removes_are_pending_until_saved(self):
+        self.index.upsert(999, self.vectors[3] * -1)
+        self.index.remove(18)
+        self.assertEqual(self.index.pending_writes, 2)
+        self.assertNotIn(18, self.index)
+        self.assertEqual(self.index.search(-self.vectors[3], k=1, nprobe=8)[0][0], 999)
+
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder, ignore_errors=True)
+        path = f"{folder}/jobs.ivf.npz"
+        self.index.save(path)
+        self.assertEqual(self.index.pending_writes, 0)
+        loaded = IVFIndex.load(path)
+        self.assertEqual(len(loaded), 200)
+        self.assertIn(999, loaded)
+        self.assertNotIn(18, loaded)
+
+    def test_searches_during_writes_see_matching_ids_and_vectors(self):
+        stop = Event()
+        errors = []
+
+        def write():
+            rng = np.random.default_rng(1)
+            while not stop.is_set():
+                pk = int(rng.integers(1, 400))
+                if pk in self.index:
+                    self.index.remove(pk)
+                else:
+                    self.index.upsert(pk, rng.standard_normal(16).astype(np.float32))
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            for query in random_vectors(300, seed=2):
+                try:
+                    self.index.search(query, k=5, nprobe=8)
+                except Exception as e:  # mismatched ids/vectors fail inside the scan
+                    errors.append(e)
+        finally:
+            stop.set()
+            writer.join()
+        self.assertEqual(errors, [])
+        self.assertTrue(all(ids.shape[0] == vecs.shape[0] for ids, vecs in self.index._lists))
+
+
+class IndexFileTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        settings = override_settings(ANN_ENABLED=True, ANN_INDEX_DIR=self.dir, ANN_SAVE_EVERY=1000)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        reset_process_state()
+        self.addCleanup(reset_process_state)
+        self.vectors = random_vectors(50)
+        ann.set_index('jobs', IVFIndex.build(np.arange(1, 51), self.vectors, nlist=4))
+
+    def saved_by_another_process(self, pk, vector):
+        other = IVFIndex.load(ann.index_path('jobs'))
+        other.upsert(pk, vector)
+        other.save(ann.index_path('jobs'))
+
+    def on_disk(self):
+        return IVFIndex.load(ann.index_path('jobs'))
+
+    def test_flush_saves_pending_writes(self):
+        ann.sync_index('jobs', 100, self.vectors[0])
+        self.assertNotIn(100, self.on_disk())
+        ann.flush_indexes()
+        self.assertIn(100, self.on_disk())
+        self.assertEqual(ann.get_index('jobs').pending_writes, 0)
+
+    def test_worker_flushes_on_stop(self):
+        stop = Event()
+        stop.set()
+        with mock.patch('ai_engine.ingestion.flush_indexes') as flush, \
+                mock.patch('ai_engine.ingestion._flush_text_index'):
+            run_worker('w1', stop_event=stop)
+        flush.assert_called_once()
+
+    def test_saves_merge_with_other_processes(self):
+        ann.sync_index('jobs', 100, self.vectors[0])
+        self.saved_by_another_process(200, self.vectors[1])
+        index = ann.get_index('jobs')  # reloaded, own unsaved write replayed
+        self.assertIn(200, index)
+        self.assertIn(100, index)
+        ann.save_index('jobs')
+        self.assertTrue({100, 200} <= set(self.on_disk()._where))
+
+    def test_rows_from_other_processes_survive_reloads_but_are_not_saved_here(self):
+        ann.sync_index_many('jobs', [300], self.vectors[:1], remote=True)
+        index = ann.get_index('jobs')
+        self.assertIn(300, index)
+        self.assertEqual(index.pending_writes, 0)
+
+        self.saved_by_another_process(200, self.vectors[1])
+        index = ann.get_index('jobs')
+        self.assertIn(300, index)  # its writer has not saved it yet
+        self.assertEqual(set(index._remote), {300})
+
+        self.saved_by_another_process(300, self.vectors[0])
+        self.assertEqual(ann.get_index('jobs')._remote, {})  # now on disk
+
+    def test_remote_rows_skip_indexes_not_loaded(self):
+        reset_process_state()
+        ann.sync_index('jobs', 300, self.vectors[0], remote=True)
+        self.assertEqual(ann._indexes, {})
@@ -0,0 +1,91 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from ai_engine.embeddings import load_embedding, served_embedding
+from ai_engine.matrix import get_job_matrix
+from ai_engine.model_registry import model_tag
+from ai_engine.models import IndexChange
+from ai_engine.tests.helpers import ProcessStateMixin, job, make_user, resume, vector
+
+NEXT = {'name': 'next-model', 'version': 2, 'dim': 8}
+NEXT_TAG = 'next-model@v2/8'
+
+
+def fake_embeddings(texts, batch_size=None, spec=None):
+    """dim-sized vectors; texts mentioning 'broken' fail to encode"""
+    return [None if 'broken' in text else vector(1, len(text), dim=spec['dim']) for text in texts]
+
+
+@override_settings(ANN_ENABLED=False, EMBEDDING_MATRIX_STORE='memory', EMBEDDING_MATRIX_DTYPE='float32',
+                   EMBEDDING_CHUNKING_ENABLED=False, MATCH_SCORES_ENABLED=False, EMBEDDING_NEXT_MODEL=NEXT)
+class BackfillEmbeddingsTests(ProcessStateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from jobs.models import Job
+
+        self.Job = Job
+        self.jobs = [job(f'Job {n}', f'description {n}', embedding=vector(n)) for n in range(3)]
+        for row in self.jobs:
+            row.save()
+        self.encode = self.enterContext(mock.patch(
+            'ai_engine.management.commands.backfill_embeddings.get_embeddings', side_effect=fake_embeddings))
+
+    def backfill(self, *targets, **options):
+        out = StringIO()
+        call_command('backfill_embeddings', *targets, stdout=out, **options)
+        return out.getvalue()
+
+    def test_next_model_vectors_go_to_the_side_column(self):
+        resume(make_user(), 'python developer', embedding=vector(1)).save()
+        self.backfill(batch_size=2)
+        for row in self.Job.objects.all():
+            self.assertEqual(row.embedding_model, model_tag())
+            self.assertEqual(row.next_embedding_model, NEXT_TAG)
+            self.assertEqual(load_embedding(row.next_embedding).shape, (8,))
+        self.assertEqual(self.encode.call_args.kwargs['spec'], NEXT)
+        # The next run finds nothing left to do
+        self.assertIn(f"All jobs already have {NEXT_TAG}", self.backfill('jobs'))
+
+    def test_limit_and_failures(self):
+        self.Job.objects.filter(pk=self.jobs[0].pk).update(description='broken description')
+        out = self.backfill('jobs', limit=2)
+        self.assertIn('Backfilled 1 jobs', out)
+        self.assertIn('1 failed, 2 still without', out)
+
+    def test_wrong_dimension_stops_the_run(self):
+        self.encode.side_effect = lambda texts, **kwargs: [vector(1, dim=4) for _ in texts]
+        with self.assertRaises(CommandError):
+            self.backfill('jobs')
+        self.assertFalse(self.Job.objects.exclude(next_embedding_model='').exists())
+        with self.assertRaises(CommandError):
+            self.backfill('jobs', model='other')
+        with self.assertRaises(CommandError):
+            self.backfill('teams')
+
+    def test_promote_after_the_switch(self):
+        self.backfill('jobs')
+        with override_settings(EMBEDDING_MODEL_NAME='next-model', EMBEDDING_MODEL_VERSION=2, EMBEDDING_DIM=8):
+            # Before promotion the switched-in model is served from the side column
+            row = self.Job.objects.get(pk=self.jobs[1].pk)
+            self.assertIsNotNone(served_embedding(row))
+            out = self.backfill('jobs', promote=True)
+            self.assertIn(f'Promoted 3 jobs embeddings to {NEXT_TAG}', out)
+            row = self.Job.objects.get(pk=self.jobs[1].pk)
+            self.assertEqual(row.embedding_model, NEXT_TAG)
+            self.assertEqual((row.next_embedding, row.next_embedding_model), (None, ''))
+        # Running processes are told to reload
+        self.assertTrue(IndexChange.objects.filter(key='jobs', row_id=None).exists())
+
+    def test_catching_up_the_serving_model_serves_the_rows_at_once(self):
+        with override_settings(EMBEDDING_NEXT_MODEL=None, EMBEDDING_DIM=8):
+            unencoded = job('New', 'go developer')
+            unencoded.save()
+            self.assertNotIn(unencoded.pk, get_job_matrix())
+            self.backfill('jobs')
+            self.assertIn(unencoded.pk, get_job_matrix())
+            row = self.Job.objects.get(pk=unencoded.pk)
+            self.assertEqual(row.next_embedding_model, model_tag())
+            self.assertIsNotNone(served_embedding(row))
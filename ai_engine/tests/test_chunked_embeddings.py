@@ -0,0 +1,87 @@
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ai_engine import embeddings
+from ai_engine.matrix import rank_jobs_by_chunks
+from ai_engine.tests.helpers import ProcessStateMixin, job, make_user, resume, vector
+
+WORDS = ' '.join(f'w{n}' for n in range(10))
+
+
+def fake_embeddings(texts, batch_size=None, spec=None):
+    """One vector per text, keyed on its first word; 'broken' texts fail"""
+    return [None if 'broken' in text else vector(1, len(text.split()[0])) for text in texts]
+
+
+class ChunkingTests(SimpleTestCase):
+    def test_overlapping_windows(self):
+        chunks = embeddings.chunk_text(WORDS, size=4, overlap=1)
+        self.assertEqual(chunks, ['w0 w1 w2 w3', 'w3 w4 w5 w6', 'w6 w7 w8 w9'])
+        self.assertEqual(embeddings.chunk_text(WORDS, size=4, overlap=1, max_chunks=2), chunks[:2])
+        self.assertEqual(embeddings.chunk_text('short text', size=4, overlap=1), ['short text'])
+        self.assertEqual(embeddings.chunk_text('   '), [])
+        # An overlap as large as the window still advances one word at a time
+        self.assertEqual(len(embeddings.chunk_text(WORDS, size=4, overlap=9)), 7)
+
+    def test_pooled_vector_is_the_mean_of_normalized_chunks(self):
+        pooled = embeddings.pool_chunks([vector(3), vector(0, 5), vector()])
+        np.testing.assert_allclose(pooled, vector(1 / 3, 1 / 3))
+
+    @override_settings(EMBEDDING_CHUNK_WORDS=4, EMBEDDING_CHUNK_OVERLAP=0)
+    def test_chunks_of_every_document_are_encoded_in_one_call(self):
+        with mock.patch.object(embeddings, 'get_embeddings', side_effect=fake_embeddings) as encode:
+            results = embeddings.embed_documents([WORDS, 'one two', '', 'ok broken'])
+        encode.assert_called_once()
+        self.assertEqual(len(encode.call_args.args[0]), 3 + 1 + 1)
+        pooled, chunks = results[0]
+        self.assertEqual(chunks.shape, (3, 8))
+        np.testing.assert_allclose(pooled, embeddings.pool_chunks(chunks))
+        self.assertEqual(results[1][1].shape, (1, 8))
+        self.assertEqual(results[2:], [(None, None), (None, None)])
+
+    def test_chunking_can_be_disabled(self):
+        with override_settings(EMBEDDING_CHUNKING_ENABLED=False), \
+                mock.patch.object(embeddings, 'get_embedding', return_value=vector(1)) as encode:
+            pooled, chunks = embeddings.embed_document(WORDS)
+        encode.assert_called_once_with(WORDS)
+        self.assertIsNone(chunks)
+
+
+class StoredChunksTests(TestCase):
+    def test_round_trip_and_model_tag(self):
+        row = resume(make_user(), 'text')
+        matrix = np.vstack([vector(1), vector(0, 1)])
+        embeddings.store_chunk_embeddings(row, matrix)
+        np.testing.assert_allclose(embeddings.served_chunks(row), matrix)
+        self.assertIsNone(embeddings.served_chunks(row, tag='other@v1/8'))
+        row.chunk_embeddings = b'garbage'
+        self.assertIsNone(embeddings.served_chunks(row))
+        embeddings.store_chunk_embeddings(row, None)
+        self.assertEqual((row.chunk_embeddings, row.chunk_embedding_model), (None, ''))
+
+
+@override_settings(ANN_ENABLED=False, EMBEDDING_MATRIX_STORE='memory', EMBEDDING_MATRIX_DTYPE='float32')
+class ChunkRankingTests(ProcessStateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.first = job('First section', embedding=vector(1))
+        self.second = job('Second section', embedding=vector(0, 1))
+        self.blend = job('Both', embedding=vector(1, 1))
+        for row in (self.first, self.second, self.blend):
+            row.save()
+        chunks = np.vstack([vector(1), vector(0, 1)])
+        self.resume = resume(make_user(), 'two sections', embedding=embeddings.pool_chunks(chunks))
+        embeddings.store_chunk_embeddings(self.resume, chunks)
+
+    def test_jobs_matching_one_chunk_beat_the_average(self):
+        results = rank_jobs_by_chunks(self.resume, k=3, block_rows=2)
+        self.assertEqual({r['job'].pk for r in results[:2]}, {self.first.pk, self.second.pk})
+        self.assertEqual([r['similarity'] for r in results], [1.0, 1.0, round(1 / np.sqrt(2), 4)])
+
+    def test_resumes_without_usable_chunks_rank_by_the_pooled_vector(self):
+        self.resume.chunk_embeddings = None
+        self.assertEqual(rank_jobs_by_chunks(self.resume, k=1)[0]['job'].pk, self.blend.pk)
+        embeddings.store_chunk_embeddings(self.resume, np.vstack([vector(1, dim=4)]))
+        self.assertEqual(rank_jobs_by_chunks(self.resume, k=1)[0]['job'].pk, self.blend.pk)
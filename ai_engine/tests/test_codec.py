@@ -0,0 +1,62 @@
+import pickle
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from ai_engine.codec import (EmbeddingFormatError, HEADER, binary_to_pickled, convert_embeddings, decode_embedding,
+                             decode_embedding_matrix, encode_embedding, encode_embedding_matrix, is_encoded,
+                             pickled_to_binary)
+from ai_engine.embeddings import load_embedding
+
+
+class CodecTests(SimpleTestCase):
+    def test_embedding_round_trip(self):
+        vector = np.arange(384, dtype=np.float32) / 7
+        np.testing.assert_array_equal(decode_embedding(encode_embedding(vector)), vector)
+        half = decode_embedding(encode_embedding(vector, dtype='float16'))
+        self.assertEqual(half.dtype, np.float16)
+        np.testing.assert_allclose(half, vector, rtol=1e-3)
+
+    def test_matrix_round_trip(self):
+        vectors = np.random.default_rng(0).normal(size=(5, 16)).astype(np.float32)
+        np.testing.assert_array_equal(decode_embedding_matrix(encode_embedding_matrix(vectors)), vectors)
+
+    def test_bad_blobs(self):
+        blob = bytearray(encode_embedding(np.ones(4, dtype=np.float32)))
+        bad_version = bytes(blob[:4]) + b'\x09' + bytes(blob[5:])
+        with self.assertRaisesMessage(EmbeddingFormatError, 'version'):
+            decode_embedding(bad_version)
+        bad_dtype = bytes(blob[:5]) + b'\x09' + bytes(blob[6:])
+        with self.assertRaisesMessage(EmbeddingFormatError, 'dtype'):
+            decode_embedding(bad_dtype)
+        with self.assertRaises(EmbeddingFormatError):
+            decode_embedding(bytes(blob[:HEADER.size + 4]))
+        with self.assertRaises(EmbeddingFormatError):
+            decode_embedding_matrix(bytes(blob))
+        with self.assertRaises(ValueError):
+            encode_embedding(np.ones(4), dtype='int8')
+
+    def test_load_embedding_is_a_read_only_view(self):
+        vector = load_embedding(encode_embedding(np.ones(8, dtype=np.float32)))
+        self.assertFalse(vector.flags.writeable)
+        self.assertIsNone(load_embedding(b'not an embedding'))
+        self.assertIsNone(load_embedding(None))
+
+
+class PickleMigrationTests(TestCase):
+    def test_pickled_rows_are_converted_once(self):
+        from jobs.models import Job
+
+        vector = np.linspace(-1, 1, 16).astype(np.float32)
+        legacy = Job.objects.create(title='Legacy', description='x', embedding=pickle.dumps(vector))
+        current = Job.objects.create(title='Current', description='x', embedding=encode_embedding(vector))
+
+        self.assertEqual(convert_embeddings(Job, pickled_to_binary), 1)
+        legacy.refresh_from_db()
+        self.assertTrue(is_encoded(legacy.embedding))
+        np.testing.assert_array_equal(decode_embedding(legacy.embedding), vector)
+        self.assertEqual(convert_embeddings(Job, pickled_to_binary), 0)
+
+        self.assertEqual(convert_embeddings(Job, binary_to_pickled), 2)
+        current.refresh_from_db()
+        np.testing.assert_array_equal(pickle.loads(bytes(current.embedding)), vector)
@@ -0,0 +1,70 @@
+import shutil
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from ai_engine.embedding_cache import EmbeddingCache, MemoryLRU, cache_key
+from ai_engine.tests.helpers import vector
+
+
+class MemoryLRUTests(SimpleTestCase):
+    def test_evicts_least_recently_used_by_bytes(self):
+        lru = MemoryLRU(max_bytes=2 * vector(1).nbytes)
+        lru.put('a', vector(1))
+        lru.put('b', vector(2))
+        lru.get('a')
+        lru.put('c', vector(3))
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual((len(lru), lru.evictions), (2, 1))
+        self.assertFalse(lru.get('a').flags.writeable)
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+    def setUp(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder, ignore_errors=True)
+        self.path = f"{folder}/embeddings.sqlite3"
+
+    def cache(self, memory_bytes=1 << 20):
+        return EmbeddingCache(memory_bytes, disk_path=self.path, disk_bytes=1 << 20, flush_every=10 ** 6)
+
+    def test_texts_differing_in_whitespace_share_a_key(self):
+        self.assertEqual(cache_key('m', 'python  developer\n'), cache_key('m', 'python developer'))
+        self.assertNotEqual(cache_key('m', 'python developer'), cache_key('other', 'python developer'))
+
+    def test_memory_then_disk_then_miss(self):
+        writer = self.cache()
+        keys, found = writer.get_many('m', ['python', 'java'])
+        self.assertEqual(found, {})
+        writer.put_many('m', keys, [vector(1), None])
+
+        _, found = writer.get_many('m', ['python', 'java'])
+        np.testing.assert_array_equal(found[0], vector(1))
+        self.assertNotIn(1, found)
+        # Another process: empty memory, same disk store
+        reader = self.cache()
+        _, found = reader.get_many('m', ['python'])
+        np.testing.assert_array_equal(found[0], vector(1))
+        self.assertEqual((reader.memory_hits, reader.disk_hits, reader.misses), (0, 1, 0))
+        reader.get_many('m', ['python'])
+        self.assertEqual(reader.memory_hits, 1)
+
+    def test_disk_hits_are_returned_without_a_memory_budget(self):
+        writer = self.cache()
+        keys, _ = writer.get_many('m', ['python', 'java'])
+        writer.put_many('m', keys, [vector(1), vector(0, 1)])
+
+        for budget in (0, vector(1).nbytes):  # nothing fits / only the last one fits
+            reader = self.cache(memory_bytes=budget)
+            _, found = reader.get_many('m', ['python', 'java'])
+            self.assertEqual(sorted(found), [0, 1])
+            np.testing.assert_array_equal(found[1], vector(0, 1))
+            self.assertEqual(reader.disk_hits, 2)
+
+    def test_disk_store_trims_least_recently_used(self):
+        cache = EmbeddingCache(0, disk_path=self.path, disk_bytes=1, flush_every=10 ** 6)
+        keys, _ = cache.get_many('m', ['a', 'b', 'c'])
+        cache.put_many('m', keys, [vector(1), vector(2), vector(3)])
+        self.assertGreater(cache.disk.trim(), 0)
+        self.assertLess(cache.disk.stats()['entries'], 3)
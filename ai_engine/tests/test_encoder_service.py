@@ -0,0 +1,74 @@
+import threading
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from ai_engine import encoder_service
+from ai_engine.embeddings import get_embedding, get_embeddings
+from ai_engine.encoder_service import EmbeddingBatcher
+
+
+class FakeModel:
+    """Encodes a text as [its length, 1] and records each batch"""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def encode(self, texts, batch_size=32):
+        self.release.wait(5)
+        self.batches.append(list(texts))
+        return np.asarray([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+
+class EmbeddingBatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.model = FakeModel()
+        for target in ('ai_engine.encoder_service.get_model', 'ai_engine.embeddings.get_model'):
+            patcher = mock.patch(target, return_value=self.model)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_concurrent_requests_share_one_encode(self):
+        batcher = EmbeddingBatcher(max_batch_size=4, max_wait_ms=5000)
+        futures = [batcher.submit('x' * n) for n in (1, 2, 3, 4)]
+        self.assertEqual([f.result(timeout=5)[0] for f in futures], [1, 2, 3, 4])
+        self.assertEqual(self.model.batches, [['x', 'xx', 'xxx', 'xxxx']])
+        self.assertEqual((batcher.batches, batcher.texts), (1, 4))
+
+    def test_batches_stop_at_max_size_or_max_wait(self):
+        self.model.release.clear()  # hold the first batch so the rest queue up behind it
+        batcher = EmbeddingBatcher(max_batch_size=3, max_wait_ms=50)
+        futures = [batcher.submit(str(n)) for n in range(7)]
+        self.model.release.set()
+        for future in futures:
+            future.result(timeout=5)
+        self.assertTrue(all(len(batch) <= 3 for batch in self.model.batches))
+        self.assertEqual(sum(self.model.batches, []), [str(n) for n in range(7)])
+
+    def test_encode_errors_reach_every_caller(self):
+        batcher = EmbeddingBatcher(max_batch_size=2, max_wait_ms=200)
+        with mock.patch.object(self.model, 'encode', side_effect=RuntimeError('CUDA out of memory')):
+            futures = [batcher.submit('a'), batcher.submit('b')]
+            for future in futures:
+                with self.assertRaisesRegex(RuntimeError, 'out of memory'):
+                    future.result(timeout=5)
+        # The worker survives the failure
+        self.assertEqual(batcher.submit('ok').result(timeout=5)[0], 2)
+
+    def test_missing_model_fails_the_request(self):
+        batcher = EmbeddingBatcher(max_wait_ms=0)
+        with mock.patch('ai_engine.encoder_service.get_model', return_value=None):
+            with self.assertRaises(RuntimeError):
+                batcher.submit('a').result(timeout=5)
+
+    @override_settings(EMBEDDING_CACHE_ENABLED=False, EMBEDDING_MAX_BATCH_SIZE=8, EMBEDDING_MAX_WAIT_MS=0)
+    def test_embedding_helpers_go_through_the_shared_encoder(self):
+        with mock.patch.dict(encoder_service._encoders, clear=True):
+            self.assertIs(encoder_service.get_encoder(), encoder_service.get_encoder())
+            self.assertEqual(get_embedding('python  developer')[0], len('python developer'))
+            self.assertEqual([v if v is None else v[0] for v in get_embeddings(['ab', '', 'abc'])], [2, None, 3])
+        # The list was encoded in one call, empty texts skipped
+        self.assertEqual(self.model.batches[-1], ['ab', 'abc'])
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ai_engine.tests.helpers import requires
+
+MODELS = ['models/a', 'models/b']
+
+
+@requires('google.generativeai')
+class ModelSelectorTests(SimpleTestCase):
+    def setUp(self):
+        from ai_engine import gemini_service
+
+        self.service = gemini_service
+        self.now = 1000.0
+        self.genai = mock.Mock()
+        self.genai.get_model.return_value = SimpleNamespace(supported_generation_methods=['generateContent'])
+        self.models = {name: mock.Mock(name=name) for name in MODELS}
+        for name, model in self.models.items():
+            model.generate_content.return_value = SimpleNamespace(text=f'answer from {name}')
+        self.genai.GenerativeModel.side_effect = lambda name: self.models[name]
+        for target, value in (('genai', self.genai), ('time', SimpleNamespace(monotonic=lambda: self.now))):
+            patcher = mock.patch.object(gemini_service, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.selector = gemini_service.ModelSelector(MODELS, ttl=60, max_failures=2, open_seconds=30)
+
+    def fail(self, name):
+        self.models[name].generate_content.side_effect = RuntimeError('503')
+
+    def recover(self, name):
+        self.models[name].generate_content.side_effect = None
+
+    def test_no_probe_prompt_per_request(self):
+        for prompt in ('one', 'two', 'three'):
+            self.assertEqual(self.selector.generate(prompt), 'answer from models/a')
+        self.genai.get_model.assert_called_once_with('models/a')
+        self.assertEqual([c.args[0] for c in self.models['models/a'].generate_content.call_args_list],
+                         ['one', 'two', 'three'])
+
+    def test_model_is_revalidated_after_ttl(self):
+        self.selector.generate('one')
+        self.now += 59
+        self.selector.generate('two')
+        self.assertEqual(self.genai.get_model.call_count, 1)
+        self.now += 2
+        self.selector.generate('three')
+        self.assertEqual(self.genai.get_model.call_count, 2)
+
+    def test_models_without_generate_content_are_skipped(self):
+        self.genai.get_model.side_effect = lambda name: SimpleNamespace(
+            supported_generation_methods=['embedContent'] if name == 'models/a' else ['generateContent'])
+        self.assertEqual(self.selector.generate('one'), 'answer from models/b')
+        self.models['models/a'].generate_content.assert_not_called()
+
+    def test_circuit_opens_after_repeated_failures_then_half_opens(self):
+        selector = self.service.ModelSelector(MODELS, ttl=10, max_failures=2, open_seconds=30)
+        calls = self.models['models/a'].generate_content
+        self.fail('models/a')
+
+        def request_after(seconds):
+            self.now += seconds
+            return selector.generate('q')
+
+        # Each failed request falls over to the next model, without retrying the failed one
+        self.assertEqual(request_after(0), 'answer from models/b')
+        self.assertEqual(calls.call_count, 1)
+        request_after(11)  # the ttl passed, so the first model is tried again: second failure opens it
+        self.assertEqual(calls.call_count, 2)
+        request_after(11)
+        self.assertEqual(calls.call_count, 2)
+
+        # Half-open: one trial request, and one failure opens it again
+        self.assertEqual(request_after(20), 'answer from models/b')
+        self.assertEqual(calls.call_count, 3)
+        request_after(11)
+        self.assertEqual(calls.call_count, 3)
+
+        self.recover('models/a')
+        self.assertEqual(request_after(20), 'answer from models/a')
+        self.assertEqual(selector.candidates(), MODELS)
+
+    def test_every_model_failing_raises(self):
+        self.fail('models/a')
+        self.fail('models/b')
+        with self.assertRaises(self.service.GeminiUnavailable):
+            self.selector.generate('q')
+
+    def test_configure_once_per_key_and_endpoint(self):
+        self.service._configured = None
+        self.addCleanup(setattr, self.service, '_configured', None)
+        with override_settings(GEMINI_API_KEY='key-1', GEMINI_API_ENDPOINT='localhost:8089'):
+            self.assertTrue(self.service.configure_gemini())
+            self.assertTrue(self.service.configure_gemini())
+            self.genai.configure.assert_called_once_with(
+                api_key='key-1', transport='rest', client_options={'api_endpoint': 'localhost:8089'})
+        with override_settings(GEMINI_API_KEY='key-2', GEMINI_API_ENDPOINT=None):
+            self.assertTrue(self.service.configure_gemini())
+        self.assertEqual(self.genai.configure.call_args, mock.call(api_key='key-2'))
+
+    @mock.patch.dict('os.environ', {'GEMINI_API_KEY': ''})
+    def test_no_api_key_disables_generation(self):
+        with override_settings(GEMINI_API_KEY=''):
+            with self.assertRaises(self.service.GeminiUnavailable):
+                self.service.generate_text('q')
+        self.genai.configure.assert_not_called()
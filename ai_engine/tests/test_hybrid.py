@@ -0,0 +1,140 @@
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ai_engine import hybrid
+from ai_engine.bm25 import BM25Index, get_bm25_index, tokenize, weighted_score
+from ai_engine.tests.helpers import ProcessStateMixin, job, make_user, resume, vector
+
+
+class BM25IndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = BM25Index.build([(1, 'python django developer'), (2, 'java spring developer'),
+                                      (3, 'python data engineer python')])
+
+    def scores(self, text):
+        ids, scores = self.index.scores(tokenize(text))
+        return dict(zip(ids.tolist(), scores.tolist()))
+
+    def test_tokenize_keeps_tech_tokens_and_drops_stopwords(self):
+        self.assertEqual(tokenize('The C++ and Node.js dev, with CI/CD'), ['c++', 'node.js', 'dev', 'ci/cd'])
+        self.assertEqual(tokenize(None), [])
+
+    def test_scores_rank_term_matches(self):
+        scores = self.scores('python')
+        self.assertEqual(scores[2], 0.0)
+        self.assertGreater(scores[3], scores[1])  # two occurrences beat one
+        self.assertEqual(self.index.top_k(tokenize('java'), 5), [(2, self.scores('java')[2])])
+        self.assertEqual(self.index.top_k(tokenize('cobol'), 5), [])
+
+    def test_upsert_replaces_and_remove_drops(self):
+        self.index.upsert(2, 'python developer')
+        self.index.upsert(4, 'rust developer')
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.scores('java')[2], 0.0)
+        self.assertGreater(self.scores('python')[2], 0.0)
+        self.assertGreater(self.scores('rust')[4], 0.0)
+
+        self.index.remove(1)
+        self.index.remove(99)
+        self.assertNotIn(1, self.scores('python'))
+        self.assertEqual(len(self.index), 3)
+
+    def test_compaction_keeps_scores(self):
+        before = self.scores('python developer')
+        self.index.upsert(1, 'python django developer')
+        self.index.compact()
+        self.assertEqual(self.index._state[0][3], 3)
+        after = self.scores('python developer')
+        self.assertEqual(after.keys(), before.keys())
+        for pk in before:
+            self.assertAlmostEqual(after[pk], before[pk], places=5)
+
+    def test_dead_rows_trigger_compaction(self):
+        index = BM25Index(compact_ratio=0.2)
+        for pk in range(64):
+            index.upsert(pk, f'doc{pk} python')
+        for pk in range(12):
+            index.remove(pk)
+        self.assertEqual(index._state[0][3], 64)
+        index.remove(12)  # 13 of 64 rows dead is past the ratio
+        self.assertEqual(index._state[0][3], 51)
+        self.assertEqual(len(index.top_k(['python'], 100)), 51)
+
+    def test_weights_for_matches_a_scan(self):
+        weights = self.index.weights_for(tokenize('python data engineer python'))
+        for query in ('python', 'data engineer', 'python python java'):
+            self.assertAlmostEqual(weighted_score(tokenize(query), weights), self.scores(query)[3], places=4)
+        self.assertEqual(BM25Index().weights_for(['python']), {})
+
+
+class CombineTests(SimpleTestCase):
+    def test_weights_are_normalized(self):
+        with override_settings(HYBRID_SCORE_WEIGHTS={'dense': 2, 'skills': 1, 'bm25': 1}):
+            self.assertEqual(hybrid.hybrid_weights(), {'dense': 0.5, 'skills': 0.25, 'bm25': 0.25})
+
+    def test_combine_clips_dense_and_spreads_its_weight_without_embeddings(self):
+        weights = {'dense': 0.5, 'skills': 0.25, 'bm25': 0.25}
+        self.assertEqual(hybrid.combine([1.0, -0.5], [1.0, 0.0], [0.0, 1.0], weights).tolist(), [75.0, 25.0])
+        self.assertEqual(hybrid.combine([1.0], [1.0], [0.0], weights, use_dense=False).tolist(), [50.0])
+
+
+@override_settings(ANN_ENABLED=False, EMBEDDING_MATRIX_STORE='memory', EMBEDDING_MATRIX_DTYPE='float32',
+                   HYBRID_SCORE_WEIGHTS={'dense': 0.5, 'skills': 0.25, 'bm25': 0.25})
+class HybridRankingTests(ProcessStateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.job = job('Backend', 'python django developer', ['python', 'django'], vector(1))
+        self.job.save()
+        self.best = save(resume(make_user(), 'python django developer', ['python', 'django'], vector(1)))
+        self.close = save(resume(make_user('second'), 'python analyst', ['python'], vector(1, 1)))
+        self.far = save(resume(make_user('third'), 'java engineer', ['java'], vector(0, 1)))
+
+    def test_rank_resumes_orders_by_combined_score(self):
+        ranked = hybrid.rank_resumes_hybrid(self.job, limit=3)
+        self.assertEqual([pk for pk, _, _ in ranked], [self.best.pk, self.close.pk, self.far.pk])
+        best_pk, similarity, score = ranked[0]
+        self.assertAlmostEqual(similarity, 1.0, places=4)
+        self.assertEqual(score, 100.0)  # closest embedding, every skill and the best BM25 hit
+        self.assertEqual(ranked[2][2], 0.0)
+
+    def test_breakdown_and_only(self):
+        query_bits = hybrid.decode_bits(self.job.skill_bits)
+        ranked = hybrid.hybrid_rank('resumes', vector(1), query_bits, 'python analyst', 3, only=[self.close.pk])
+        self.assertEqual(len(ranked), 1)
+        pk, score, breakdown = ranked[0]
+        self.assertEqual(pk, self.close.pk)
+        self.assertEqual(breakdown, {'dense': round(1 / np.sqrt(2), 4), 'skills': 0.5, 'bm25': 1.0})
+        self.assertAlmostEqual(score, 100 * (0.5 / np.sqrt(2) + 0.25 * 0.5 + 0.25), places=1)
+
+    def test_rank_jobs_reports_missing_skills(self):
+        other = job('Java', 'java engineer', ['java'], vector(0, 1))
+        other.save()
+        results = hybrid.rank_jobs_hybrid(self.close, k=2)
+        self.assertEqual([r['job'].pk for r in results], [self.job.pk, other.pk])
+        self.assertEqual(results[0]['missing_skills'], ['django'])
+        self.assertEqual(results[1]['missing_skills'], ['java'])
+
+    def test_match_score_with_and_without_stored_norm(self):
+        scanned = hybrid.hybrid_match_score(self.close, self.job)
+        self.assertEqual(scanned['skills'], 0.5)
+        self.assertEqual(scanned['bm25'], 1.0)  # the only job, so the best BM25 hit
+
+        weights = get_bm25_index('jobs').weights_for(tokenize(self.job.description))
+        raw = weighted_score(tokenize(self.close.text), weights)
+        self.close.bm25_norm = 2 * raw
+        stored = hybrid.hybrid_match_score(self.close, self.job, bm25_weights=weights)
+        self.assertEqual(stored['bm25'], 0.5)
+        self.assertEqual(stored['dense'], scanned['dense'])
+        self.assertLess(stored['score'], scanned['score'])
+
+    def test_missing_embeddings_score_on_skills_and_keywords(self):
+        self.close.embedding = None
+        self.close.embedding_model = ''
+        result = hybrid.hybrid_match_score(self.close, self.job)
+        self.assertEqual(result['dense'], 0.0)
+        self.assertEqual(result['score'], 75.0)  # skills 0.5 and bm25 1.0, weighted equally
+
+
+def save(instance):
+    instance.save()
+    return instance
@@ -0,0 +1,112 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from ai_engine.bm25 import get_bm25_index, tokenize
+from ai_engine.matrix import get_job_matrix
+from ai_engine.model_registry import model_tag
+from ai_engine.tests.helpers import ProcessStateMixin, make_user, vector
+
+RECORDS = [
+    {'id': 'j1', 'title': 'Backend', 'description': 'python django developer'},
+    {'id': 'j2', 'title': 'Data', 'description': 'sql analyst', 'skills': 'Tableau, python'},
+    {'id': '', 'title': 'Anonymous', 'description': 'go developer'},
+    {'id': 'j3', 'title': '', 'description': 'no title'},
+]
+
+
+def fake_embeddings(texts, batch_size=None):
+    return [vector(len(text)) for text in texts]
+
+
+@override_settings(ANN_ENABLED=False, EMBEDDING_MATRIX_STORE='memory', EMBEDDING_MATRIX_DTYPE='float32',
+                   MATCH_SCORES_ENABLED=False)
+class ImportJobsTests(ProcessStateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from jobs.models import Job
+
+        self.Job = Job
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.encode = self.enterContext(mock.patch('ai_engine.management.commands.import_jobs.get_embeddings',
+                                                   side_effect=fake_embeddings))
+
+    def feed(self, records, name='feed.jsonl'):
+        path = os.path.join(self.dir, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8', newline='') as f:
+            if '.csv' in name:
+                writer = csv.DictWriter(f, fieldnames=['id', 'title', 'description', 'skills'])
+                writer.writeheader()
+                writer.writerows(records)
+            else:
+                f.writelines(json.dumps(record) + '\n' for record in records)
+        return path
+
+    def run_import(self, path, **options):
+        out = StringIO()
+        call_command('import_jobs', path, stdout=out, **options)
+        return out.getvalue()
+
+    def encoded_texts(self):
+        return [text for call in self.encode.call_args_list for text in call.args[0]]
+
+    def test_creates_jobs_with_skills_and_embeddings(self):
+        out = self.run_import(self.feed(RECORDS), batch_size=2)
+        self.assertIn('3 created, 0 updated, 0 unchanged, 1 skipped', out)
+        data = self.Job.objects.get(external_id='j2')
+        self.assertEqual(sorted(data.required_skills), ['python', 'sql', 'tableau'])
+        self.assertEqual(data.embedding_model, model_tag())
+        self.assertIsNone(self.Job.objects.get(title='Anonymous').external_id)
+
+    def test_bulk_writes_reach_loaded_matrices_and_indexes(self):
+        get_job_matrix(), get_bm25_index('jobs')
+        self.run_import(self.feed(RECORDS))
+        backend = self.Job.objects.get(external_id='j1')
+        self.assertIn(backend.pk, get_job_matrix())
+        ids, scores = get_bm25_index('jobs').scores(tokenize('django'))
+        self.assertEqual(ids[scores > 0].tolist(), [backend.pk])
+
+    def test_reimport_updates_changed_jobs_and_skips_unchanged_ones(self):
+        self.run_import(self.feed(RECORDS))
+        self.encode.reset_mock()
+        changed = [dict(RECORDS[0], description='python flask developer'), RECORDS[1]]
+        out = self.run_import(self.feed(changed))
+        self.assertIn('0 created, 1 updated, 1 unchanged', out)
+        self.assertEqual(self.encoded_texts(), ['python flask developer'])
+        self.assertIn('flask', self.Job.objects.get(external_id='j1').required_skills)
+
+        self.encode.reset_mock()
+        self.run_import(self.feed(changed), reembed=True)
+        self.assertEqual(len(self.encoded_texts()), 2)
+
+    def test_last_record_wins_within_a_batch(self):
+        records = [RECORDS[0], dict(RECORDS[0], title='Backend II')]
+        self.run_import(self.feed(records))
+        self.assertEqual(list(self.Job.objects.values_list('title', flat=True)), ['Backend II'])
+
+    def test_gzipped_csv_feeds_and_poster(self):
+        poster = make_user('recruiter')
+        self.run_import(self.feed(RECORDS[:2], 'feed.csv.gz'), poster='recruiter')
+        self.assertEqual(self.Job.objects.filter(poster=poster).count(), 2)
+        self.assertIn('tableau', self.Job.objects.get(external_id='j2').required_skills)
+
+    def test_bad_input(self):
+        path = self.feed([])
+        with open(path, 'a') as f:
+            f.write('{not json\n\n' + json.dumps(RECORDS[0]) + '\n')
+        self.assertIn('1 created', self.run_import(path))
+        self.assertEqual(self.run_import(self.feed([])).strip(), 'Feed is empty')
+        with self.assertRaises(CommandError):
+            self.run_import(os.path.join(self.dir, 'missing.jsonl'))
+        with self.assertRaises(CommandError):
+            self.run_import(self.feed(RECORDS), poster='nobody')
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from ai_engine import parse_cache
+from ai_engine.codec import encode_embedding
+from ai_engine.model_registry import model_tag
+from ai_engine.models import IngestionTask
+from ai_engine.tests.helpers import ProcessStateMixin, make_user, requires, vector
+
+COMMAND = 'ai_engine.management.commands.import_resumes'
+FILES = {'a.txt': 'python developer', 'b.txt': 'java engineer', 'sub/c.txt': 'go developer',
+         'notes.md': 'not a resume'}
+
+
+def fake_embeddings(texts, batch_size=None):
+    """One vector per text; texts mentioning 'broken' fail to encode"""
+    return [None if 'broken' in text else vector(len(text)) for text in texts]
+
+
+@requires('PyPDF2', 'docx2txt', 'spacy')
+@override_settings(ANN_ENABLED=False, EMBEDDING_MATRIX_STORE='memory', EMBEDDING_MATRIX_DTYPE='float32',
+                   EMBEDDING_CHUNKING_ENABLED=False, MATCH_SCORES_ENABLED=False, SPACY_NER_ENABLED=False)
+class ImportResumesTests(ProcessStateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from resumes.models import Resume
+
+        self.Resume = Resume
+        self.user = make_user()
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.source = os.path.join(self.dir, 'resumes')
+        for name, text in FILES.items():
+            self.write(name, text)
+        self.enterContext(override_settings(MEDIA_ROOT=os.path.join(self.dir, 'media')))
+        self.encode = self.enterContext(mock.patch(f'{COMMAND}.get_embeddings', side_effect=fake_embeddings))
+        self.text_index = self.enterContext(mock.patch(f'{COMMAND}.get_inverted_index')).return_value
+
+    def write(self, name, text):
+        path = os.path.join(self.source, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def run_import(self, source=None, **options):
+        options.setdefault('workers', 1)
+        out = StringIO()
+        call_command('import_resumes', source or self.source, user=self.user.username, stdout=out, stderr=out,
+                     **options)
+        return out.getvalue()
+
+    def texts(self):
+        return list(self.Resume.objects.order_by('id').values_list('text', flat=True))
+
+    def test_imports_every_resume_file_in_a_stable_order(self):
+        out = self.run_import(batch_size=2)
+        self.assertEqual(self.texts(), ['python developer', 'java engineer', 'go developer'])
+        resume = self.Resume.objects.get(text='python developer')
+        self.assertEqual(resume.status, self.Resume.STATUS_READY)
+        self.assertEqual(resume.embedding_model, model_tag())
+        self.assertEqual(resume.skills, ['python'])
+        self.assertEqual(resume.content_hash, hashlib.sha256(b'python developer').hexdigest())
+        self.assertEqual(self.text_index.add_many.call_count, 2)
+        self.assertIn('Imported 3 resumes', out)
+
+    def test_zip_archives_are_imported_like_directories(self):
+        archive = os.path.join(self.dir, 'resumes.zip')
+        with zipfile.ZipFile(archive, 'w') as z:
+            for name, text in FILES.items():
+                z.writestr(name, text)
+        self.run_import(archive)
+        self.assertEqual(self.texts(), ['python developer', 'java engineer', 'go developer'])
+
+    def test_checkpoint_resumes_after_the_files_already_done(self):
+        checkpoint = os.path.join(self.dir, 'checkpoint.json')
+        with open(checkpoint, 'w') as f:
+            json.dump({'source': self.source, 'done': 2}, f)
+        self.run_import(checkpoint=checkpoint)
+        self.assertEqual(self.texts(), ['go developer'])
+        with open(checkpoint) as f:
+            self.assertEqual(json.load(f)['done'], 3)
+
+        self.run_import(checkpoint=checkpoint, restart=True)
+        self.assertEqual(len(self.texts()), 4)
+        with open(checkpoint, 'w') as f:
+            json.dump({'source': '/elsewhere', 'done': 1}, f)
+        with self.assertRaises(CommandError):
+            self.run_import(checkpoint=checkpoint)
+
+    def test_cached_parses_skip_encoding(self):
+        digest = hashlib.sha256(b'python developer').hexdigest()
+        parse_cache.store_parsed(digest, 'cached text', ['python'], encode_embedding(vector(1)), model_tag())
+        out = self.run_import()
+        self.assertIn('1 from the parse cache', out)
+        self.assertIn('cached text', self.texts())
+        encoded = [text for call in self.encode.call_args_list for text in call.args[0]]
+        self.assertNotIn('cached text', encoded)
+        self.assertNotIn('python developer', encoded)
+
+    def test_failed_embeddings_are_queued_for_a_worker(self):
+        self.write('d.txt', 'broken resume')
+        out = self.run_import()
+        resume = self.Resume.objects.get(text='broken resume')
+        self.assertEqual(resume.status, self.Resume.STATUS_PENDING)
+        self.assertTrue(IngestionTask.objects.filter(resume=resume).exists())
+        self.assertIn('1 queued for embedding', out)
+
+    def test_bad_arguments(self):
+        with self.assertRaises(CommandError):
+            self.run_import(os.path.join(self.dir, 'missing'))
+        with self.assertRaises(CommandError):
+            call_command('import_resumes', self.source, user='nobody', stdout=StringIO())
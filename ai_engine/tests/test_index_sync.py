@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ai_engine import index_sync
+from ai_engine.bm25 import get_bm25_index, tokenize
+from ai_engine.matrix import get_resume_matrix, loaded_matrix
+from ai_engine.models import IndexChange
+from ai_engine.skill_bits import get_resume_bit_matrix, skills_to_bits
+from ai_engine.tests.helpers import ProcessStateMixin, make_user, resume, vector
+
+OTHER_PROCESS = 'worker-host:4242'
+
+
+@override_settings(INDEX_SYNC_SECONDS=0, ANN_ENABLED=False, EMBEDDING_MATRIX_STORE='memory',
+                   EMBEDDING_MATRIX_DTYPE='float32')
+class IndexSyncTests(ProcessStateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from resumes.models import Resume
+
+        self.Resume = Resume
+        self.user = make_user()
+        self.first = resume(self.user, 'python developer', ['python'], vector(1))
+        self.first.save()
+        # This process loads its copies
+        get_resume_matrix(), get_bm25_index('resumes'), get_resume_bit_matrix()
+
+    def saved_elsewhere(self, *rows):
+        """Rows written by another process: no signals here, only its log entries"""
+        IndexChange.objects.bulk_create([IndexChange(key='resumes', row_id=row.pk, origin=OTHER_PROCESS)
+                                         for row in rows])
+
+    def bm25_ids(self, text):
+        ids, scores = get_bm25_index('resumes').scores(tokenize(text))
+        return set(ids[scores > 0].tolist())
+
+    def test_rows_saved_by_another_process_reach_every_copy(self):
+        other = self.Resume.objects.bulk_create([resume(self.user, 'java engineer', ['java'], vector(0, 1))])[0]
+        self.saved_elsewhere(other)
+
+        self.assertIn(other.pk, get_resume_matrix())
+        self.assertEqual(get_resume_matrix().top_k(vector(0, 1), k=1)[0][0], other.pk)
+        self.assertEqual(self.bm25_ids('java'), {other.pk})
+        self.assertIn(other.pk, get_resume_bit_matrix().ids_having_all(skills_to_bits(['java'])).tolist())
+
+    def test_updates_and_deletes_by_another_process(self):
+        self.Resume.objects.filter(pk=self.first.pk).update(text='rust developer')
+        self.saved_elsewhere(self.first)
+        self.assertEqual(self.bm25_ids('python'), set())
+        self.assertEqual(self.bm25_ids('rust'), {self.first.pk})
+
+        self.Resume.objects.filter(pk=self.first.pk)._raw_delete('default')
+        self.saved_elsewhere(self.first)
+        self.assertNotIn(self.first.pk, get_resume_matrix())
+        self.assertEqual(self.bm25_ids('rust'), set())
+        self.assertEqual(len(get_resume_bit_matrix()), 0)
+
+    def test_local_saves_are_logged_once_and_status_saves_not_at_all(self):
+        self.assertEqual(list(IndexChange.objects.values_list('row_id', 'origin')),
+                         [(self.first.pk, index_sync.origin())])
+        self.first.status = self.Resume.STATUS_FAILED
+        self.first.save(update_fields=['status'])
+        self.assertEqual(IndexChange.objects.count(), 1)
+        # Its own entries are already applied, so the next check applies nothing
+        self.assertEqual(index_sync.catch_up('resumes', force=True), 0)
+
+    def test_checks_are_throttled_unless_forced(self):
+        other = self.Resume.objects.bulk_create([resume(self.user, 'go developer', ['go'], vector(0, 0, 1))])[0]
+        self.saved_elsewhere(other)
+        with override_settings(INDEX_SYNC_SECONDS=3600):
+            index_sync.catch_up('resumes', force=True)
+            late = self.Resume.objects.bulk_create([resume(self.user, 'ruby developer', [], vector(1, 1))])[0]
+            self.saved_elsewhere(late)
+            self.assertNotIn(late.pk, get_resume_matrix())
+            self.assertEqual(index_sync.catch_up('resumes', force=True), 1)
+            self.assertIn(late.pk, get_resume_matrix())
+
+    def test_entries_committed_out_of_order_are_not_skipped(self):
+        late = self.Resume.objects.bulk_create([resume(self.user, 'scala developer', [], vector(0, 1, 1))])[0]
+        self.saved_elsewhere(late)
+        older = IndexChange.objects.get(row_id=late.pk).id
+        IndexChange.objects.create(key='resumes', row_id=self.first.pk, origin=OTHER_PROCESS)
+        # The newer entry is read first; the older id only commits afterwards
+        IndexChange.objects.filter(id=older).delete()
+        index_sync.catch_up('resumes', force=True)
+        self.assertGreater(index_sync._marks['resumes'], older)
+        IndexChange.objects.create(id=older, key='resumes', row_id=late.pk, origin=OTHER_PROCESS)
+        self.assertEqual(index_sync.catch_up('resumes', force=True), 1)
+        self.assertIn(late.pk, get_resume_matrix())
+
+    def test_reset_entries_and_large_batches_reload_the_copies(self):
+        IndexChange.objects.create(key='resumes', row_id=None, origin=OTHER_PROCESS)
+        index_sync.catch_up('resumes', force=True)
+        self.assertIsNone(loaded_matrix('resumes'))
+        self.assertIn(self.first.pk, get_resume_matrix())
+
+        with override_settings(INDEX_SYNC_MAX_ROWS=1):
+            others = self.Resume.objects.bulk_create([resume(self.user, 'x', [], vector(0, 1)) for _ in range(2)])
+            self.saved_elsewhere(*others)
+            index_sync.catch_up('resumes', force=True)
+            self.assertIsNone(loaded_matrix('resumes'))
+            self.assertEqual(len(get_resume_matrix()), 3)
+
+    def test_old_entries_are_pruned(self):
+        IndexChange.objects.update(created_at=timezone.now() - timedelta(days=2))
+        IndexChange.objects.create(key='jobs', row_id=1, origin=OTHER_PROCESS)
+        self.assertEqual(index_sync.prune_changes(force=True), 1)
+        self.assertEqual(IndexChange.objects.count(), 1)
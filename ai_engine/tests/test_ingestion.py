@@ -0,0 +1,148 @@
+from datetime import timedelta
+from threading import Event
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ai_engine import ingestion
+from ai_engine.models import IngestionTask
+from ai_engine.tests.helpers import ProcessStateMixin, make_user, requires, resume
+
+PARSERS = ('PyPDF2', 'docx2txt', 'spacy')
+
+
+@override_settings(INGESTION_MAX_ATTEMPTS=3, INGESTION_RETRY_BASE_SECONDS=2,
+                   INGESTION_TASK_TIMEOUT_SECONDS=600, ANN_ENABLED=False)
+class IngestionQueueTests(ProcessStateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from resumes.models import Resume
+
+        self.Resume = Resume
+        self.resume = resume(make_user(), status=Resume.STATUS_PENDING)
+        self.resume.save()
+
+    def task(self, delay=0, **fields):
+        fields.setdefault('resume', self.resume)
+        fields.setdefault('max_attempts', 3)
+        return IngestionTask.objects.create(available_at=timezone.now() + timedelta(seconds=delay), **fields)
+
+    def resume_status(self):
+        return self.Resume.objects.get(pk=self.resume.pk).status
+
+    def make_due(self, task):
+        IngestionTask.objects.filter(pk=task.pk).update(available_at=timezone.now())
+
+    def test_enqueue_marks_the_resume_pending(self):
+        self.Resume.objects.filter(pk=self.resume.pk).update(status=self.Resume.STATUS_READY)
+        task = ingestion.enqueue_resume(self.resume)
+        self.assertEqual(self.resume_status(), self.Resume.STATUS_PENDING)
+        self.assertEqual((task.status, task.attempts, task.max_attempts), (IngestionTask.STATUS_QUEUED, 0, 3))
+
+    def test_claims_the_oldest_due_task_once(self):
+        later = self.task(delay=-5)
+        first = self.task(delay=-10)
+        self.task(delay=3600)
+
+        claimed = ingestion.claim_next_task('w1')
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual((claimed.status, claimed.worker, claimed.attempts), (IngestionTask.STATUS_RUNNING, 'w1', 1))
+        self.assertEqual(ingestion.claim_next_task('w2').pk, later.pk)
+        # Only the task that is not due yet is left
+        self.assertIsNone(ingestion.claim_next_task('w3'))
+
+    def test_a_task_claimed_by_another_worker_is_not_claimed_again(self):
+        task = self.task()
+        real_filter = IngestionTask.objects.filter
+
+        def racing_filter(*args, **kwargs):
+            # Another worker wins the row between listing the candidates and the UPDATE
+            if kwargs.get('id') == task.pk:
+                real_filter(pk=task.pk).update(status=IngestionTask.STATUS_RUNNING, worker='other')
+            return real_filter(*args, **kwargs)
+
+        with mock.patch.object(IngestionTask.objects, 'filter', side_effect=racing_filter):
+            self.assertIsNone(ingestion.claim_next_task('w1'))
+        task.refresh_from_db()
+        self.assertEqual((task.worker, task.attempts), ('other', 0))
+
+    def test_failures_back_off_exponentially_then_fail(self):
+        task = self.task()
+        for attempt, backoff in ((1, 2), (2, 4)):
+            claimed = ingestion.claim_next_task('w1')
+            before = timezone.now()
+            ingestion._record_failure(claimed, claimed.resume, {'parse': 0.1}, ValueError('bad file'))
+            claimed.refresh_from_db()
+            self.assertEqual((claimed.status, claimed.attempts), (IngestionTask.STATUS_QUEUED, attempt))
+            self.assertAlmostEqual((claimed.available_at - before).total_seconds(), backoff, delta=1)
+            self.assertEqual(claimed.error, 'ValueError: bad file')
+            self.assertEqual(self.resume_status(), self.Resume.STATUS_PENDING)
+            self.assertIsNone(ingestion.claim_next_task('w1'))  # not due until the backoff passes
+            self.make_due(task)
+
+        claimed = ingestion.claim_next_task('w1')
+        ingestion._record_failure(claimed, claimed.resume, {}, ValueError('bad file'))
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, IngestionTask.STATUS_FAILED)
+        self.assertIsNotNone(claimed.finished_at)
+        self.assertEqual(self.resume_status(), self.Resume.STATUS_FAILED)
+
+    @requires(*PARSERS)
+    def test_run_task_retries_failures_and_records_timings(self):
+        task = self.task()
+        with mock.patch('ai_engine.parsers.process_resume', side_effect=ValueError('bad file')):
+            self.assertFalse(ingestion.run_task(ingestion.claim_next_task('w1')))
+        task.refresh_from_db()
+        self.assertEqual(task.status, IngestionTask.STATUS_QUEUED)
+        self.assertIn('total', task.timings)
+
+        self.make_due(task)
+        with mock.patch('ai_engine.parsers.process_resume') as process:
+            self.assertTrue(ingestion.run_task(ingestion.claim_next_task('w1')))
+        process.assert_called_once()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.error, task.attempts), (IngestionTask.STATUS_DONE, '', 2))
+
+    def test_stale_running_tasks_are_requeued_or_failed(self):
+        started = timezone.now() - timedelta(hours=1)
+        retry = self.task(status=IngestionTask.STATUS_RUNNING, attempts=1, started_at=started, worker='dead')
+        exhausted = self.task(status=IngestionTask.STATUS_RUNNING, attempts=3, started_at=started, worker='dead')
+        fresh = self.task(status=IngestionTask.STATUS_RUNNING, attempts=1, started_at=timezone.now(), worker='alive')
+
+        self.assertEqual(ingestion.requeue_stale_tasks(), 1)
+        retry.refresh_from_db(), exhausted.refresh_from_db(), fresh.refresh_from_db()
+        self.assertEqual((retry.status, retry.worker), (IngestionTask.STATUS_QUEUED, ''))
+        self.assertEqual(exhausted.status, IngestionTask.STATUS_FAILED)
+        self.assertIn('Timed out', exhausted.error)
+        self.assertEqual(fresh.status, IngestionTask.STATUS_RUNNING)
+        self.assertEqual(self.resume_status(), self.Resume.STATUS_FAILED)
+
+    def test_exhausted_score_refreshes_leave_the_resume_status_alone(self):
+        self.Resume.objects.filter(pk=self.resume.pk).update(status=self.Resume.STATUS_READY)
+        task = self.task(kind=IngestionTask.KIND_RESUME_SCORES, status=IngestionTask.STATUS_RUNNING, attempts=3,
+                         started_at=timezone.now() - timedelta(hours=1))
+        ingestion.requeue_stale_tasks()
+        task.refresh_from_db()
+        self.assertEqual(task.status, IngestionTask.STATUS_FAILED)
+        self.assertEqual(self.resume_status(), self.Resume.STATUS_READY)
+
+    def test_status_payload_reports_the_latest_task(self):
+        self.assertEqual(ingestion.resume_status(self.resume),
+                         {'resume_id': self.resume.pk, 'status': self.Resume.STATUS_PENDING})
+        self.task(status=IngestionTask.STATUS_FAILED, attempts=3, error='old')
+        latest = self.task(status=IngestionTask.STATUS_DONE, attempts=1, timings={'parse': 0.5, 'total': 0.7})
+        self.assertEqual(ingestion.resume_status(self.resume)['task'], {
+            'id': latest.pk, 'status': IngestionTask.STATUS_DONE, 'attempts': 1, 'max_attempts': 3,
+            'timings': {'parse': 0.5, 'total': 0.7}, 'error': '',
+        })
+
+    def test_worker_runs_due_tasks_until_max_tasks(self):
+        first, second = self.task(delay=-2), self.task(delay=-1)
+        with mock.patch('ai_engine.ingestion.run_task') as run_task:
+            self.assertEqual(ingestion.run_worker('w1', poll_interval=0, max_tasks=2), 2)
+        self.assertEqual([call.args[0].pk for call in run_task.call_args_list], [first.pk, second.pk])
+
+        stop = Event()
+        stop.set()
+        self.assertEqual(ingestion.run_worker('w1', stop_event=stop), 0)
@@ -0,0 +1,80 @@
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from ai_engine.inverted_index import (InvertedIndex, QuerySyntaxError, decode_postings, decode_varints,
+                                      encode_postings, encode_varints, parse_query)
+
+
+class VarintTests(SimpleTestCase):
+    def test_varints_round_trip(self):
+        values = [0, 1, 127, 128, 300, 16383, 16384, 2 ** 32, 2 ** 63 - 1]
+        self.assertEqual(decode_varints(encode_varints(values)).tolist(), values)
+
+    def test_small_values_take_one_byte(self):
+        self.assertEqual(len(encode_varints([0, 5, 127])), 3)
+        self.assertEqual(len(encode_varints([128])), 2)
+
+    def test_postings_round_trip(self):
+        postings = [(3, [0, 4, 9]), (10, [2]), (1000, []), (100000, [7, 300])]
+        self.assertEqual(decode_postings(encode_postings(postings)), postings)
+        self.assertEqual(decode_postings(encode_postings([])), [])
+
+
+class QueryParserTests(SimpleTestCase):
+    def test_adjacent_terms_are_anded(self):
+        self.assertEqual(parse_query('python django'), ('and', [('phrase', ['python']), ('phrase', ['django'])]))
+
+    def test_and_binds_tighter_than_or(self):
+        self.assertEqual(
+            parse_query('python AND django OR java'),
+            ('or', [('and', [('phrase', ['python']), ('phrase', ['django'])]), ('phrase', ['java'])]),
+        )
+
+    def test_phrases_negation_and_parentheses(self):
+        self.assertEqual(
+            parse_query('"machine learning" -java (aws OR gcp)'),
+            ('and', [('phrase', ['machine', 'learning']), ('not', ('phrase', ['java'])),
+                     ('or', [('phrase', ['aws']), ('phrase', ['gcp'])])]),
+        )
+
+    def test_syntax_errors(self):
+        for query in ('', '(python', 'python OR', 'python )'):
+            with self.assertRaises(QuerySyntaxError, msg=query):
+                parse_query(query)
+
+
+class InvertedIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def open(self):
+        return InvertedIndex(self.dir, flush_docs=2, flush_seconds=3600)
+
+    def test_search_across_segments_and_wal(self):
+        index = self.open()
+        index.add_many([(1, 'Senior Python developer, machine learning'),
+                        (2, 'Java developer with Spring'),
+                        (3, 'Learning machine shop assistant')])
+        self.assertEqual(index.search('developer'), [1, 2])
+        self.assertEqual(index.search('"machine learning"'), [1])
+        self.assertEqual(index.search('developer -java'), [1])
+        self.assertEqual(index.search('python OR spring'), [1, 2])
+
+    def test_unflushed_writes_are_seen_by_another_instance(self):
+        index = self.open()
+        index.add(1, 'python developer')
+        self.assertEqual(self.open().search('python'), [1])
+
+    def test_remove_after_flush_and_update(self):
+        index = self.open()
+        index.add_many([(1, 'python developer'), (2, 'python tester')])
+        index.flush()
+        index.remove(1)
+        index.add(2, 'java tester')
+        self.assertEqual(index.search('python'), [])
+        self.assertEqual(index.search('tester'), [2])
+        index.merge()
+        self.assertEqual(self.open().search('java OR python'), [2])
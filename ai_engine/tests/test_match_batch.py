@@ -0,0 +1,85 @@
+import json
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ai_engine.tests.helpers import ProcessStateMixin, job, make_user, resume, vector
+
+CSRF_TOKEN = 'a' * 32
+
+
+@override_settings(MATCH_BATCH_API_KEYS=['service-key'], MATCH_BATCH_MAX_IDS=3, MATCH_BATCH_MAX_PAIRS=4,
+                   ANN_ENABLED=False)
+class MatchBatchTests(ProcessStateMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from jobs.models import Job
+        from resumes.models import Resume
+
+        cls.owner = make_user('owner')
+        cls.other = make_user('other')
+        cls.jobs = Job.objects.bulk_create([job('Python', skills=['python'], embedding=vector(1)),
+                                            job('Java', skills=['java'], embedding=vector(0, 1))])
+        cls.mine, cls.theirs = Resume.objects.bulk_create([
+            resume(cls.owner, embedding=vector(1, 1)), resume(cls.other, embedding=vector(0, 1))])
+        # Embedded by another model only: not comparable with the served vectors
+        cls.stale = resume(cls.owner, embedding=vector(1))
+        cls.stale.embedding_model = 'retired-model'
+        cls.stale.save()
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client(enforce_csrf_checks=True)
+        self.url = reverse('match_batch')
+
+    def post(self, body, key=None, csrf=True):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {key}'} if key else {}
+        if csrf:
+            self.client.cookies['csrftoken'] = CSRF_TOKEN
+            headers['HTTP_X_CSRFTOKEN'] = CSRF_TOKEN
+        return self.client.post(self.url, json.dumps(body), content_type='application/json', **headers)
+
+    def matrix_body(self, resumes=None):
+        return {'resume_ids': [r.pk for r in resumes or (self.mine, self.theirs)],
+                'job_ids': [j.pk for j in self.jobs]}
+
+    def test_service_key_scores_every_resume_without_csrf(self):
+        response = self.post(self.matrix_body(), key='service-key', csrf=False)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['resume_ids'], [self.mine.pk, self.theirs.pk])
+        self.assertEqual(data['similarities'], [[0.7071, 0.7071], [0.0, 1.0]])
+        self.assertEqual(data['match_scores'][1][1], 100.0)
+
+    def test_bad_key_and_anonymous_callers_are_rejected(self):
+        self.assertEqual(self.post(self.matrix_body(), key='guess').status_code, 401)
+        self.assertEqual(self.post(self.matrix_body()).status_code, 401)
+
+    def test_session_callers_need_a_csrf_token_and_see_their_own_resumes(self):
+        self.client.force_login(self.owner)
+        self.assertEqual(self.post(self.matrix_body(), csrf=False).status_code, 403)
+
+        data = self.post(self.matrix_body()).json()
+        self.assertEqual(data['resume_ids'], [self.mine.pk])
+        self.assertEqual(data['missing']['resume_ids'], [self.theirs.pk])
+
+    def test_only_served_model_vectors_are_scored(self):
+        data = self.post({'pairs': [[self.stale.pk, self.jobs[0].pk], [self.mine.pk, self.jobs[0].pk]]},
+                         key='service-key').json()
+        self.assertEqual(data['results'], [
+            {'resume_id': self.mine.pk, 'job_id': self.jobs[0].pk, 'similarity': 0.7071, 'match_score': 85.36}])
+        self.assertEqual(data['missing'], {'resume_ids': [self.stale.pk], 'job_ids': []})
+
+    def test_batch_limits_and_malformed_bodies(self):
+        too_many_ids = {'resume_ids': [1, 2, 3, 4], 'job_ids': [1]}
+        too_many_pairs = {'pairs': [[1, 1]] * 5}
+        for body in (too_many_ids, too_many_pairs, {'resume_ids': [1, True], 'job_ids': [1]},
+                     {'pairs': [[1]]}, {'resume_ids': '1,2', 'job_ids': []}, [1, 2]):
+            response = self.post(body, key='service-key')
+            self.assertEqual(response.status_code, 400, body)
+            self.assertIn('Invalid request', response.json()['error'])
+        # Duplicates count once
+        self.assertEqual(self.post({'resume_ids': [1] * 5, 'job_ids': [1]}, key='service-key').status_code, 200)
+
+    def test_get_is_not_allowed(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
@@ -0,0 +1,72 @@
+from django.test import TestCase, override_settings
+
+from ai_engine import match_store
+from ai_engine.matrix import candidate_shortlist_page
+from ai_engine.models import IndexChange, MatchScore
+from ai_engine.tests.helpers import ProcessStateMixin, job, make_user, resume, vector
+
+
+@override_settings(MATCH_SCORE_TOP_N=1, MATCH_SCORE_POOL_FACTOR=3, ANN_ENABLED=False, INDEX_SYNC_SECONDS=3600,
+                   EMBEDDING_MATRIX_DTYPE='float32', EMBEDDING_MATRIX_STORE='memory')
+class MatchStoreTests(ProcessStateMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from jobs.models import Job
+        from resumes.models import Resume
+
+        cls.user = make_user('recruiter')
+        cls.jobs = Job.objects.bulk_create([
+            job(f'Job {skill}', f'{skill} developer', [skill], vector(*basis))
+            for skill, basis in (('python', (1,)), ('java', (0, 1)), ('react', (0, 0, 1)))
+        ])
+        cls.react_dev = resume(cls.user, 'react developer', ['react'], vector(0, 0, 1))
+        cls.generalist = resume(cls.user, 'developer', [], vector(0.2, 0.2, 0, 0.1))
+        Resume.objects.bulk_create([cls.react_dev, cls.generalist])
+
+    def setUp(self):
+        super().setUp()
+        match_store.rebuild()
+
+    def pairs(self, **filters):
+        return set(MatchScore.objects.filter(**filters).values_list('resume_id', 'job_id'))
+
+    def test_new_resume_enters_lists_it_beats(self):
+        python_job, java_job, react_job = self.jobs
+        strong = resume(self.user, 'developer', ['python', 'java'], vector(0.8, 0.6))
+        strong.save()
+        match_store.refresh_resume(strong)
+        # Its own top job, plus the java job whose only pair it now beats;
+        # the react job's pair scores higher and keeps it out
+        self.assertEqual(self.pairs(resume=strong), {(strong.pk, python_job.pk), (strong.pk, java_job.pk)})
+        self.assertIsNotNone(type(strong).objects.get(pk=strong.pk).bm25_norm)
+
+    def test_new_job_keeps_its_best_resume_only(self):
+        new_job = job('React lead', 'react developer', ['react'], vector(0, 0, 1))
+        new_job.save()
+        match_store.refresh_job(new_job)
+        self.assertIn((self.react_dev.pk, new_job.pk), self.pairs(job=new_job))
+        self.assertNotIn((self.generalist.pk, new_job.pk), self.pairs(job=new_job))
+
+    def test_refresh_sees_jobs_another_process_saved(self):
+        from jobs.models import Job
+
+        # Posted by a web process: only its log entry reaches this worker
+        go_job = Job.objects.bulk_create([job('Job go', 'go developer', ['go'], vector(0, 0, 0, 0, 1))])[0]
+        IndexChange.objects.create(key='jobs', row_id=go_job.pk, origin='web-host:1')
+        gopher = resume(self.user, 'go developer', ['go'], vector(0, 0, 0, 0, 1))
+        gopher.save()
+        match_store.refresh_resume(gopher, cross=False)
+        self.assertEqual(self.pairs(resume=gopher), {(gopher.pk, go_job.pk)})
+
+    def test_shortlist_length_follows_the_top_up(self):
+        react_job = self.jobs[2]
+        # Ready but never embedded: counted for the expected size, never ranked
+        resume(self.user, 'unparsed', []).save()
+        with override_settings(RECRUITER_SHORTLIST_SIZE=50):
+            page, rows = candidate_shortlist_page(react_job, page_number=1, per_page=1)
+            self.assertEqual(page.paginator.count, 3)
+            self.assertEqual([row['resume'].pk for row in rows], [self.react_dev.pk])
+
+            page, rows = candidate_shortlist_page(react_job, page_number=3, per_page=1)
+        self.assertEqual((page.paginator.count, page.number), (2, 2))
+        self.assertEqual([row['resume'].pk for row in rows], [self.generalist.pk])
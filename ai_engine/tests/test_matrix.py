@@ -0,0 +1,93 @@
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ai_engine.codec import encode_embedding
+from ai_engine.matrix import (EmbeddingMatrix, blocked_top_k, normalize_rows, rank_jobs_for_resume, served_pairs,
+                              served_vectors, top_k_indices)
+from ai_engine.model_registry import model_tag
+from ai_engine.tests.helpers import ProcessStateMixin, job, make_user, resume, vector
+
+
+def random_vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+class TopKTests(SimpleTestCase):
+    def setUp(self):
+        self.vectors = random_vectors(100)
+        self.ids = np.arange(101, 201)
+        self.matrix = EmbeddingMatrix(self.ids, self.vectors)
+        self.query = random_vectors(1, seed=1)[0]
+        self.exact = normalize_rows(self.vectors) @ normalize_rows(self.query)[0]
+
+    def test_top_k_indices(self):
+        scores = np.asarray([0.1, 0.9, 0.5, 0.9])
+        self.assertEqual(top_k_indices(scores, 2).tolist(), [1, 3])
+        self.assertEqual(top_k_indices(scores, 10).tolist(), [1, 3, 2, 0])
+        self.assertEqual(top_k_indices(scores, 0).tolist(), [])
+
+    def test_top_k_matches_a_full_sort(self):
+        ranked = self.matrix.top_k(self.query, k=5)
+        order = np.argsort(-self.exact)[:5]
+        self.assertEqual([pk for pk, _ in ranked], self.ids[order].tolist())
+        np.testing.assert_allclose([sim for _, sim in ranked], self.exact[order], rtol=1e-5)
+
+    def test_exclude_and_only(self):
+        best = self.matrix.top_k(self.query, k=1)[0][0]
+        self.assertNotEqual(self.matrix.top_k(self.query, k=1, exclude={best})[0][0], best)
+        only = self.ids[:10]
+        ranked = self.matrix.top_k(self.query, k=20, only=only)
+        self.assertEqual(len(ranked), 10)
+        self.assertTrue({pk for pk, _ in ranked} <= set(only.tolist()))
+
+    def test_blocked_scan_agrees_with_the_resident_matrix(self):
+        self.assertEqual(blocked_top_k(self.query, self.matrix.iter_blocks(7), 5), self.matrix.top_k(self.query, 5))
+
+    def test_upserts_and_removes(self):
+        self.matrix.upsert(101, -self.query)
+        self.matrix.upsert_many([500, 501], np.vstack([self.query, self.query * 2]))
+        self.assertEqual({pk for pk, _ in self.matrix.top_k(self.query, k=2)}, {500, 501})
+        self.assertEqual(self.matrix.top_k(-self.query, k=1)[0][0], 101)
+        self.matrix.remove(500)
+        self.assertNotIn(500, self.matrix)
+        self.assertEqual(len(self.matrix), 101)
+        # Another model's dimension is not mixed in
+        self.matrix.upsert(600, np.ones(8, dtype=np.float32))
+        self.assertNotIn(600, self.matrix)
+
+
+@override_settings(ANN_ENABLED=False, EMBEDDING_MATRIX_STORE='memory', EMBEDDING_MATRIX_DTYPE='float32')
+class ServedEmbeddingTests(ProcessStateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from jobs.models import Job
+
+        self.Job = Job
+        self.current = job('Current', embedding=vector(1))
+        self.current.next_embedding, self.current.next_embedding_model = encode_embedding(vector(0, 1)), 'next@v1/8'
+        self.retired = job('Retired', embedding=vector(1, 1))
+        self.retired.embedding_model = 'retired@v1/8'
+        self.current.save()
+        self.retired.save()
+
+    def test_served_pairs_follow_the_model_tag(self):
+        served = dict(served_pairs(self.Job.objects.all()))
+        self.assertEqual(set(served), {self.current.pk})
+        upcoming = served_vectors(self.Job.objects.all(), [self.current.pk, self.retired.pk], tag='next@v1/8')
+        np.testing.assert_array_equal(upcoming[self.current.pk], vector(0, 1))
+        self.assertNotIn(self.retired.pk, upcoming)
+
+    def test_switching_models_serves_the_backfilled_column(self):
+        with override_settings(EMBEDDING_MODEL_NAME='next', EMBEDDING_DIM=8):
+            self.assertEqual(model_tag(), 'next@v1/8')
+            served = served_vectors(self.Job.objects.all(), [self.current.pk])
+        np.testing.assert_array_equal(served[self.current.pk], vector(0, 1))
+
+    def test_jobs_are_ranked_for_a_resume_with_missing_skills(self):
+        python_job = job('Python', skills=['python', 'django'], embedding=vector(0.9, 0.1))
+        python_job.save()
+        candidate = resume(make_user(), 'python developer', ['python'], vector(1))
+        results = rank_jobs_for_resume(candidate, k=2)
+        self.assertEqual([r['job'].pk for r in results], [self.current.pk, python_job.pk])
+        self.assertEqual(results[0]['similarity'], 1.0)
+        self.assertEqual(results[1]['missing_skills'], ['django'])
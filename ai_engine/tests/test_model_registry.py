@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ai_engine import model_registry
+
+
+@override_settings(EMBEDDING_SKIP_MODEL_LOAD=False, EMBEDDING_LOAD_RETRY_SECONDS=300)
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.loaded = []
+        self.transformer = mock.Mock(side_effect=self.load)
+        patches = [
+            mock.patch.dict(os.environ, {'SRM_SKIP_MODEL_LOAD': ''}),
+            # Only the class is needed; the real package downloads weights
+            mock.patch.dict('sys.modules', {'sentence_transformers': SimpleNamespace(
+                SentenceTransformer=self.transformer)}),
+            mock.patch.dict(model_registry._models, clear=True),
+            mock.patch.dict(model_registry._failed_at, clear=True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def load(self, name):
+        time.sleep(0.01)  # long enough for concurrent callers to pile up
+        self.loaded.append(name)
+        return mock.Mock(name=name)
+
+    def test_concurrent_callers_share_one_load(self):
+        models = []
+        threads = [threading.Thread(target=lambda: models.append(model_registry.get_model())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.loaded, ['all-MiniLM-L6-v2'])
+        self.assertEqual(len({id(model) for model in models}), 1)
+        self.assertTrue(model_registry.is_loaded())
+
+    def test_skip_flag_never_loads(self):
+        with mock.patch.dict(os.environ, {'SRM_SKIP_MODEL_LOAD': '1'}):
+            self.assertIsNone(model_registry.get_model())
+        self.transformer.assert_not_called()
+
+    def test_failed_loads_are_not_retried_on_every_call(self):
+        self.transformer.side_effect = OSError('no weights')
+        self.assertIsNone(model_registry.get_model())
+        self.assertIsNone(model_registry.get_model())
+        self.assertEqual(self.transformer.call_count, 1)
+
+        model_registry._failed_at['all-MiniLM-L6-v2'] -= 301
+        self.transformer.side_effect = self.load
+        self.assertIsNotNone(model_registry.get_model())
+
+    def test_warm_up_encodes_once(self):
+        with override_settings(EMBEDDING_WARMUP=True):
+            self.assertTrue(model_registry.warm_up())
+        model_registry.get_model().encode.assert_called_once_with(['warm up'])
+
+
+class CommandDetectionTests(SimpleTestCase):
+    def command(self, *argv, **env):
+        with mock.patch('sys.argv', list(argv)), mock.patch.dict(os.environ, env):
+            return model_registry.management_command_name(), model_registry.running_management_command()
+
+    def test_management_commands_are_recognised(self):
+        self.assertEqual(self.command('manage.py', 'migrate'), ('migrate', True))
+        self.assertEqual(self.command('/venv/lib/python3/site-packages/django/__main__.py', 'shell'),
+                         ('shell', True))
+        self.assertEqual(self.command('./srm-admin', 'collectstatic'), ('collectstatic', True))
+
+    def test_servers_are_not_commands(self):
+        self.assertEqual(self.command('gunicorn', 'SmartResumeMatcher.wsgi'), (None, False))
+        self.assertEqual(self.command('manage.py', 'runserver', RUN_MAIN='true'), ('runserver', False))
+        self.assertEqual(self.command('manage.py', 'runserver', '--noreload', RUN_MAIN=''), ('runserver', False))
+        # The autoreloader parent only watches files
+        self.assertEqual(self.command('manage.py', 'runserver', RUN_MAIN=''), ('runserver', True))
+
+    def test_warm_up_only_in_serving_processes(self):
+        with override_settings(EMBEDDING_WARMUP=True, EMBEDDING_SKIP_MODEL_LOAD=False), \
+                mock.patch.dict(os.environ, {'SRM_SKIP_MODEL_LOAD': ''}):
+            with mock.patch('sys.argv', ['gunicorn', 'SmartResumeMatcher.wsgi']):
+                self.assertTrue(model_registry.should_warm_up())
+            with mock.patch('sys.argv', ['manage.py', 'migrate']):
+                self.assertFalse(model_registry.should_warm_up())
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ai_engine import parse_cache
+from ai_engine.codec import encode_embedding
+from ai_engine.model_registry import model_tag
+from ai_engine.models import ParsedDocument
+from ai_engine.tests.helpers import ProcessStateMixin, make_user, requires, vector
+
+HASH = 'a' * 64
+
+
+class ParseCacheTests(TestCase):
+    def store(self, content_hash=HASH, text='python developer', chunks=None, **kwargs):
+        parse_cache.store_parsed(content_hash, text, ['python'], encode_embedding(vector(1)), model_tag(),
+                                 chunk_embeddings=chunks, **kwargs)
+
+    def test_lookup_counts_hits_and_misses(self):
+        self.assertIsNone(parse_cache.lookup_parsed(HASH))
+        self.store()
+        entry = parse_cache.lookup_parsed(HASH)
+        self.assertEqual((entry.text, entry.skills), ('python developer', ['python']))
+        self.assertEqual(ParsedDocument.objects.get().hits, 1)
+        stats = parse_cache.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+        self.assertIsNone(parse_cache.lookup_parsed(''))
+
+    def test_disabled_cache_neither_stores_nor_reads(self):
+        with override_settings(PARSE_CACHE_ENABLED=False):
+            self.store()
+            self.assertIsNone(parse_cache.lookup_parsed(HASH))
+        self.assertFalse(ParsedDocument.objects.exists())
+        self.assertEqual(parse_cache.cache_stats()['misses'], 0)
+
+    def test_vectors_are_reused_only_for_the_same_model(self):
+        self.store()
+        entry = parse_cache.lookup_parsed(HASH)
+        embedding, chunks = parse_cache.cached_vectors(entry, model_tag(), chunking=False)
+        self.assertEqual(embedding, encode_embedding(vector(1)))
+        self.assertIsNone(chunks)
+        self.assertIsNone(parse_cache.cached_vectors(entry, 'other@v1/8', chunking=False))
+        # Chunking needs the per-chunk vectors too
+        self.assertIsNone(parse_cache.cached_vectors(entry, model_tag(), chunking=True))
+        self.store(chunks=b'chunks')
+        entry = parse_cache.lookup_parsed(HASH)
+        self.assertEqual(parse_cache.cached_vectors(entry, model_tag(), chunking=True)[1], b'chunks')
+        self.assertIsNone(parse_cache.cached_vectors(None, model_tag(), chunking=False))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for n in range(4):
+            self.store(f'{n:064d}', text='x' * 1000, evict=False)
+        ParsedDocument.objects.filter(content_hash=f'{0:064d}').update(
+            last_used_at=timezone.now() - timedelta(hours=1))
+        ParsedDocument.objects.filter(content_hash=f'{1:064d}').update(last_used_at=timezone.now() + timedelta(hours=1))
+        size = ParsedDocument.objects.first().size_bytes
+        self.assertEqual(parse_cache.evict_to_limit(max_bytes=4 * size), 0)
+        # Down to 90% of three entries leaves two: the oldest two go
+        self.assertEqual(parse_cache.evict_to_limit(max_bytes=3 * size), 2)
+        kept = set(ParsedDocument.objects.values_list('content_hash', flat=True))
+        self.assertIn(f'{1:064d}', kept)
+        self.assertNotIn(f'{0:064d}', kept)
+        self.assertEqual(parse_cache.cache_stats()['evictions'], 2)
+
+
+@override_settings(RESUME_INGESTION_ASYNC=True)
+class UploadHashTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        self.client.force_login(make_user())
+
+    def upload(self, content):
+        from resumes.models import Resume
+
+        response = self.client.post('/api/resumes/upload/',
+                                    {'file': SimpleUploadedFile('resume.pdf', content, 'application/pdf')})
+        self.assertEqual(response.status_code, 302)
+        return Resume.objects.get()
+
+    def test_hash_is_computed_while_the_upload_streams_in(self):
+        content = b'%PDF-1.4 resume' * 100
+        resume = self.upload(content)
+        self.assertEqual(resume.content_hash, hashlib.sha256(content).hexdigest())
+
+    def test_large_uploads_spooled_to_disk_are_hashed_too(self):
+        content = os.urandom(4096)
+        with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024):
+            resume = self.upload(content)
+        self.assertEqual(resume.content_hash, hashlib.sha256(content).hexdigest())
+
+
+@requires('PyPDF2', 'docx2txt', 'spacy')
+@override_settings(ANN_ENABLED=False, EMBEDDING_MATRIX_STORE='memory', EMBEDDING_MATRIX_DTYPE='float32',
+                   EMBEDDING_CHUNKING_ENABLED=False, MATCH_SCORES_ENABLED=False)
+class ProcessResumeCacheTests(ProcessStateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=directory))
+        self.path = os.path.join(directory, 'resume.txt')
+        with open(self.path, 'w') as f:
+            f.write('cached resume')
+
+    def test_identical_files_skip_extraction_and_embedding(self):
+        from ai_engine import parsers
+        from ai_engine.taxonomy import file_sha256
+        from resumes.models import Resume
+
+        parse_cache.store_parsed(file_sha256(self.path), 'python developer', ['python'],
+                                 encode_embedding(vector(1)), model_tag())
+        resume = Resume.objects.create(user=make_user(), file='resume.txt')
+        with mock.patch.object(parsers, 'extract_text_from_file') as extract, \
+                mock.patch('ai_engine.embeddings.embed_document') as embed, \
+                mock.patch.object(parsers, 'get_inverted_index') as index:
+            self.assertTrue(parsers.process_resume(resume))
+        extract.assert_not_called()
+        embed.assert_not_called()
+        index.return_value.add.assert_called_once_with(resume.pk, 'python developer')
+        resume.refresh_from_db()
+        self.assertEqual((resume.text, resume.skills, resume.status), ('python developer', ['python'], 'ready'))
+        self.assertEqual(bytes(resume.embedding), encode_embedding(vector(1)))
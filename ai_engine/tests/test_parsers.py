@@ -0,0 +1,72 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ai_engine.tests.helpers import requires, write_pdf
+
+PAGES = [f'page {n} python' for n in range(1, 13)]
+
+
+@requires('PyPDF2', 'docx2txt', 'spacy')
+@override_settings(PDF_EXTRACT_WORKERS=2, PDF_PARALLEL_MIN_PAGES=6, PDF_PAGES_PER_TASK=1,
+                   RESUME_TEXT_CHAR_BUDGET=0)
+class PdfExtractionTests(SimpleTestCase):
+    def setUp(self):
+        from ai_engine import parsers
+
+        self.parsers = parsers
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'resume.pdf')
+        write_pdf(self.path, PAGES)
+        # Threads stand in for the process pool; the chunking and ordering are the same
+        self.pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(self.pool.shutdown)
+        self.chunks = []
+        extract = parsers._extract_pdf_pages
+
+        def counted(file_path, start, stop):
+            self.chunks.append((start, stop))
+            return extract(file_path, start, stop)
+
+        patches = [mock.patch.object(parsers, '_get_pdf_pool', return_value=self.pool),
+                   mock.patch.object(parsers, '_extract_pdf_pages', side_effect=counted)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_small_files_are_read_in_process(self):
+        short = self.path.replace('resume', 'short')
+        write_pdf(short, PAGES[:2])
+        self.assertEqual(list(self.parsers.iter_pdf_pages(short)), PAGES[:2])
+        self.assertEqual(self.chunks, [])
+
+    def test_large_files_are_read_in_parallel_in_page_order(self):
+        with override_settings(PDF_PAGES_PER_TASK=5):
+            self.assertEqual(list(self.parsers.iter_pdf_pages(self.path)), PAGES)
+        self.assertEqual(sorted(self.chunks), [(0, 5), (5, 10), (10, 12)])
+
+    def test_budget_stops_before_the_remaining_pages(self):
+        text = self.parsers.extract_text_from_pdf(self.path, max_chars=len(PAGES[0]))
+        self.assertEqual(text, PAGES[0])
+        # Only the window of 2 * PDF_EXTRACT_WORKERS chunks (and one refill) was submitted
+        self.assertLessEqual(len(self.chunks), 5)
+
+    def test_broken_pool_falls_back_to_sequential_reads(self):
+        broken = mock.Mock()
+        broken.submit.side_effect = BrokenProcessPool('worker died')
+        self.parsers._pdf_pool = broken
+        self.addCleanup(setattr, self.parsers, '_pdf_pool', None)
+        with mock.patch.object(self.parsers, '_get_pdf_pool', return_value=broken):
+            self.assertEqual(list(self.parsers.iter_pdf_pages(self.path)), PAGES)
+        self.assertIsNone(self.parsers._pdf_pool)
+        broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+
+    def test_character_budget_setting_applies_to_files(self):
+        with override_settings(RESUME_TEXT_CHAR_BUDGET=20):
+            self.assertEqual(self.parsers.extract_text_from_file(self.path), '\n'.join(PAGES)[:20])
+        self.assertEqual(self.parsers.extract_text_from_file(self.path + '.missing'), '')
@@ -0,0 +1,78 @@
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ai_engine.ann import IVFIndex
+from ai_engine.codec import encode_embedding
+from ai_engine.matrix import normalize_rows
+from ai_engine.quantization import QuantizedMatrix, dequantize_rows, quantize_rows
+from ai_engine.tests.helpers import ProcessStateMixin, job
+
+
+def random_vectors(n, dim, seed):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+class QuantizationTests(SimpleTestCase):
+    def test_dequantized_rows_stay_close(self):
+        vectors = random_vectors(200, 384, seed=0)
+        codes, scales = quantize_rows(vectors)
+        self.assertEqual(codes.dtype, np.int8)
+        error = np.abs(dequantize_rows(codes, scales) - normalize_rows(vectors))
+        # Rounding is off by at most half a step of each row's scale
+        self.assertTrue((error <= scales[:, None] / 2 + 1e-7).all())
+
+    def test_top_k_is_rescored_to_the_exact_order(self):
+        vectors = random_vectors(500, 64, seed=1)
+        ids = np.arange(1, 501)
+        quantized = QuantizedMatrix(ids, vectors)
+        for pk, vector in zip(ids, vectors):
+            quantized.upsert(pk, vector)  # fills the float cache used for re-scoring
+        query = random_vectors(1, 64, seed=2)[0]
+        exact = normalize_rows(vectors) @ normalize_rows(query)[0]
+        expected = ids[np.argsort(-exact)[:10]].tolist()
+        self.assertEqual([pk for pk, _ in quantized.top_k(query, k=10)], expected)
+
+    def test_rows_without_float_vectors_warn_once(self):
+        quantized = QuantizedMatrix(np.arange(1, 51), random_vectors(50, 16, seed=3))
+        with mock.patch('builtins.print') as printed:
+            self.assertEqual(len(quantized.top_k(random_vectors(1, 16, seed=4)[0], k=5)), 5)
+            quantized.top_k(random_vectors(1, 16, seed=5)[0], k=5)
+        warnings = [c for c in printed.call_args_list if 'no float vector' in c.args[0]]
+        self.assertEqual(len(warnings), 1)
+
+    def test_ann_index_is_built_without_dequantizing_everything(self):
+        vectors = random_vectors(300, 32, seed=6)
+        quantized = QuantizedMatrix(np.arange(1, 301), vectors)
+        with mock.patch.object(QuantizedMatrix, 'vectors', new_callable=mock.PropertyMock,
+                               side_effect=AssertionError('full float copy')):
+            index = IVFIndex.from_matrix(quantized, nlist=8, block_rows=64, max_samples=100)
+        self.assertEqual(len(index), 300)
+        query = vectors[10]
+        approx = quantized.similarities(query)[1]
+        top = (np.argsort(-approx)[:5] + 1).tolist()
+        self.assertEqual([pk for pk, _ in index.search(query, k=5, nprobe=8)], top)
+
+
+@override_settings(ANN_ENABLED=False, EMBEDDING_QUANTIZED_RESCORE_FACTOR=4)
+class TaggedQuantizedMatrixTests(ProcessStateMixin, TestCase):
+    def test_rescores_with_the_tags_vectors_from_the_db(self):
+        from jobs.models import Job
+
+        served, upcoming = random_vectors(40, 16, seed=7), random_vectors(40, 16, seed=8)
+        rows = []
+        for vector, next_vector in zip(served, upcoming):
+            row = job(embedding=vector)
+            row.next_embedding, row.next_embedding_model = encode_embedding(next_vector), 'next-model'
+            rows.append(row)
+        ids = np.asarray([row.pk for row in Job.objects.bulk_create(rows)])
+
+        quantized = QuantizedMatrix.from_queryset(Job.objects.all(), tag='next-model')
+        query = random_vectors(1, 16, seed=9)[0]
+        exact = normalize_rows(upcoming) @ normalize_rows(query)[0]
+        with self.assertNumQueries(1):  # one read of the candidates' float vectors
+            ranked = quantized.top_k(query, k=5)
+        self.assertEqual([pk for pk, _ in ranked], ids[np.argsort(-exact)[:5]].tolist())
+        for pk, similarity in ranked:
+            self.assertAlmostEqual(similarity, float(exact[ids.tolist().index(pk)]), places=5)
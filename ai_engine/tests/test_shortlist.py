@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ai_engine.matrix import rank_resumes_for_job
+from ai_engine.tests.helpers import ProcessStateMixin, job, make_user, reset_process_state, resume, vector
+
+
+@override_settings(ANN_ENABLED=False, EMBEDDING_MATRIX_STORE='memory', EMBEDDING_MATRIX_DTYPE='float32',
+                   RECRUITER_SHORTLIST_SIZE=500)
+class RecruiterShortlistTests(ProcessStateMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from resumes.models import Resume
+
+        cls.recruiter = get_user_model().objects.create(username='recruiter', is_recruiter=True)
+        cls.candidate = make_user('candidate')
+        cls.job = job('Backend', 'python django', ['python', 'django'], vector(1))
+        cls.job.save()
+        cls.resumes = Resume.objects.bulk_create([
+            resume(cls.candidate, skills=skills, embedding=vector(*weights))
+            for skills, weights in ((['python'], (1, 0.1)), (['python', 'django'], (1, 0.5)),
+                                    (['java'], (0.1, 1)), ([], (1,)))
+        ])
+        Resume.objects.bulk_create([resume(cls.candidate, skills=['python'])])  # not embedded yet
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.recruiter)
+
+    def shortlist(self, **params):
+        return self.client.get(reverse('rank_resumes_for_job', args=[self.job.pk]), {'mode': 'dense', **params})
+
+    def test_ranks_every_embedded_resume_by_similarity(self):
+        exact, close, full_match, unrelated = (self.resumes[3], self.resumes[0], self.resumes[1], self.resumes[2])
+        self.assertEqual([pk for pk, _ in rank_resumes_for_job(self.job)],
+                         [exact.pk, close.pk, full_match.pk, unrelated.pk])
+
+    def test_pages_carry_skill_overlap(self):
+        data = self.shortlist(page_size=2, page=2).json()
+        self.assertEqual((data['total'], data['num_pages'], data['page']), (4, 2, 2))
+        first, second = data['results']
+        self.assertEqual(first['resume_id'], self.resumes[1].pk)
+        self.assertEqual((sorted(first['matched_skills']), first['missing_skills']), (['django', 'python'], []))
+        self.assertEqual(sorted(second['missing_skills']), ['django', 'python'])
+
+    def test_skills_filter_keeps_resumes_having_all_of_them(self):
+        data = self.shortlist(skills='python,django').json()
+        self.assertEqual([row['resume_id'] for row in data['results']], [self.resumes[1].pk])
+
+    def test_streams_from_the_db_over_the_memory_budget(self):
+        resident = rank_resumes_for_job(self.job)
+        reset_process_state()
+        with override_settings(EMBEDDING_MATRIX_MAX_MB=0):
+            self.assertEqual(rank_resumes_for_job(self.job), resident)
+
+    def test_recruiters_only_and_parameters_checked(self):
+        self.assertEqual(self.shortlist(page_size='many').status_code, 400)
+        self.assertEqual(self.shortlist(mode='chunks').status_code, 400)
+        self.client.force_login(self.candidate)
+        self.assertEqual(self.shortlist().status_code, 403)
@@ -0,0 +1,59 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from ai_engine import skill_bits
+from ai_engine.skill_bits import SkillBitMatrix, skills_to_bits
+
+
+def bit_matrix(rows):
+    """SkillBitMatrix of {id: skill names}"""
+    width = skill_bits.n_words()
+    matrix = SkillBitMatrix(np.empty(0, dtype=np.int64), np.zeros((0, width), dtype=np.uint64))
+    matrix.upsert_many(list(rows), [skills_to_bits(skills) for skills in rows.values()])
+    return matrix
+
+
+class SkillBitsTests(SimpleTestCase):
+    def test_round_trip_through_stored_bytes(self):
+        bits = skills_to_bits(['Python', 'js', 'not a skill'])
+        self.assertEqual(sorted(skill_bits.bits_to_names(bits)), ['javascript', 'python'])
+        self.assertEqual(skill_bits.decode_bits(skill_bits.encode_bits(bits)), bits)
+        self.assertEqual(len(skill_bits.encode_skills(['python'])), skill_bits.n_words() * 8)
+        self.assertEqual(skill_bits.decode_bits(None), 0)
+
+    def test_pair_set_math(self):
+        resume, job = skills_to_bits(['python', 'sql']), skills_to_bits(['python', 'django'])
+        self.assertEqual(skill_bits.bits_to_names(skill_bits.overlap_bits(resume, job)), ['python'])
+        self.assertEqual(skill_bits.bits_to_names(skill_bits.missing_bits(resume, job)), ['django'])
+        self.assertAlmostEqual(skill_bits.jaccard(resume, job), 1 / 3)
+        self.assertEqual(skill_bits.jaccard(0, 0), 0.0)
+
+
+class SkillBitMatrixTests(SimpleTestCase):
+    def setUp(self):
+        self.jobs = bit_matrix({1: ['python', 'django'], 2: ['java'], 3: [], 4: ['python']})
+        self.resume = skills_to_bits(['python'])
+
+    def test_missing_skills_per_row(self):
+        self.assertEqual(self.jobs.missing(self.resume), {1: ['django'], 2: ['java'], 3: [], 4: []})
+        self.assertEqual(self.jobs.missing(self.resume, only=[1]), {1: ['django']})
+        ids, counts = self.jobs.missing_counts(self.resume)
+        self.assertEqual(dict(zip(ids.tolist(), counts.tolist())), {1: 1, 2: 1, 3: 0, 4: 0})
+
+    def test_coverage_in_both_directions(self):
+        ids, coverage = self.jobs.coverage(self.resume)
+        self.assertEqual(dict(zip(ids.tolist(), coverage.tolist())), {1: 0.5, 2: 0.0, 3: 0.0, 4: 1.0})
+        resumes = bit_matrix({7: ['python'], 8: ['python', 'django', 'sql']})
+        ids, coverage = resumes.coverage(skills_to_bits(['python', 'django']), rows_required=False)
+        self.assertEqual(dict(zip(ids.tolist(), coverage.tolist())), {7: 0.5, 8: 1.0})
+
+    def test_filter_keeps_rows_having_every_skill(self):
+        self.assertEqual(sorted(self.jobs.ids_having_all(self.resume).tolist()), [1, 4])
+        self.assertEqual(sorted(self.jobs.ids_having_all(0).tolist()), [1, 2, 3, 4])
+
+    def test_upserts_replace_and_removes_drop(self):
+        self.jobs.upsert(2, skills_to_bits(['python']))
+        self.jobs.upsert(5, skills_to_bits(['python']))
+        self.jobs.remove(1)
+        self.assertEqual(sorted(self.jobs.ids_having_all(self.resume).tolist()), [2, 4, 5])
+        self.assertEqual(len(self.jobs), 4)
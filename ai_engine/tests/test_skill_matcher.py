@@ -0,0 +1,33 @@
+from django.test import SimpleTestCase
+
+from ai_engine.skill_matcher import SkillMatcher
+
+
+class SkillMatcherTests(SimpleTestCase):
+    def test_boundaries(self):
+        matcher = SkillMatcher(['c', 'c++', 'java', 'javascript'])
+        self.assertEqual(matcher.find_all('JavaScript, C++ and C'), {'javascript': [0], 'c++': [12], 'c': [20]})
+        self.assertEqual(matcher.find_all('javac cpp'), {})
+
+    def test_shared_prefixes(self):
+        matcher = SkillMatcher(['sql', 'sql server', 'postgresql'])
+        self.assertEqual(matcher.find_all('SQL Server, sql and PostgreSQL'),
+                         {'sql server': [0], 'sql': [0, 12], 'postgresql': [20]})
+
+    def test_aliases_report_the_canonical_name(self):
+        matcher = SkillMatcher({'js': 'javascript', 'javascript': 'javascript', 'node js': 'node.js',
+                                'node.js': 'node.js'})
+        self.assertEqual(matcher.count('JS and javascript, Node JS'), {'javascript': 2, 'node.js': 1})
+        # "js" inside the alias "node js" is not a second JavaScript mention
+        self.assertEqual(matcher.skills('node js'), ['node.js'])
+
+    def test_nested_skill_names_are_reported(self):
+        matcher = SkillMatcher({'django': 'django', 'django rest framework': 'django rest framework',
+                                'spring': 'spring', 'spring boot': 'spring'})
+        self.assertEqual(matcher.find_all('Django REST framework'), {'django rest framework': [0], 'django': [0]})
+        # An alias of the same skill is one mention, not two
+        self.assertEqual(matcher.find_all('Spring Boot apps'), {'spring': [0]})
+
+    def test_empty_inputs(self):
+        self.assertEqual(SkillMatcher([]).find_all('python'), {})
+        self.assertEqual(SkillMatcher(['python']).find_all(''), {})
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ai_engine.tests.helpers import requires
+
+LONG = 'Experienced engineer who writes python services and deploys them on our cluster. '
+
+
+class FakeNLP:
+    """Stands in for a spaCy pipeline: texts containing a trigger word get its (entity text, label)"""
+
+    pipe_names = ['ner']
+
+    def __init__(self, entities=()):
+        self.entities = entities
+        self.calls = []
+
+    def pipe(self, texts, batch_size, n_process):
+        texts = list(texts)
+        self.calls.append((texts, batch_size, n_process))
+        for text in texts:
+            yield SimpleNamespace(ents=[SimpleNamespace(text=entity, label_=label)
+                                        for trigger, entity, label in self.entities if trigger in text])
+
+
+@requires('PyPDF2', 'docx2txt', 'spacy')
+@override_settings(SPACY_NER_ENABLED=True, SPACY_MODEL='en_core_web_sm', SPACY_EXCLUDE=['parser', 'tagger'],
+                   SPACY_CHAR_BUDGET=0, SPACY_BATCH_SIZE=64, SPACY_N_PROCESS=1)
+class SpacyExtractionTests(SimpleTestCase):
+    def setUp(self):
+        from ai_engine import parsers
+
+        self.parsers = parsers
+        for name in ('_nlp', '_nlp_loaded'):
+            patch = mock.patch.object(parsers, name, None if name == '_nlp' else False)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_pipeline_is_loaded_once_without_unused_components(self):
+        nlp = FakeNLP()
+        with mock.patch.object(self.parsers.spacy, 'load', return_value=nlp) as load:
+            self.assertIs(self.parsers.get_nlp(), nlp)
+            self.assertIs(self.parsers.get_nlp(), nlp)
+        load.assert_called_once_with('en_core_web_sm', exclude=['parser', 'tagger'])
+
+    def test_missing_model_is_not_retried_and_ner_can_be_disabled(self):
+        with mock.patch.object(self.parsers.spacy, 'load', side_effect=OSError) as load:
+            self.assertIsNone(self.parsers.get_nlp())
+            self.assertIsNone(self.parsers.get_nlp())
+        load.assert_called_once()
+        self.parsers._nlp_loaded = False
+        with override_settings(SPACY_NER_ENABLED=False), mock.patch.object(self.parsers.spacy, 'load') as load:
+            self.assertIsNone(self.parsers.get_nlp())
+        load.assert_not_called()
+
+    def test_one_batched_ner_pass_adds_entities_in_the_taxonomy(self):
+        nlp = FakeNLP([('k8s-team', 'Kubernetes', 'ORG'), ('pg-team', 'PostgreSQL', 'PRODUCT'),
+                       ('acme', 'Acme', 'ORG'), ('ops', 'Docker', 'PERSON'), ('late', 'Redis', 'ORG')])
+        texts = [LONG + 'k8s-team at acme', LONG + 'pg-team ops, late', 'python, short', '']
+        with mock.patch.object(self.parsers, 'get_nlp', return_value=nlp), \
+                override_settings(SPACY_BATCH_SIZE=8, SPACY_CHAR_BUDGET=len(LONG) + 16):
+            found = self.parsers.extract_skills_many(texts, n_process=2)
+        self.assertEqual(len(nlp.calls), 1)
+        piped, batch_size, n_process = nlp.calls[0]
+        self.assertEqual((batch_size, n_process), (8, 2))
+        # Short texts skip NER; the rest are cut to the character budget
+        self.assertEqual(piped, [LONG + 'k8s-team at acme', LONG + 'pg-team ops, lat'])
+        # Only ORG/PRODUCT entities that name a known skill are added
+        self.assertEqual([sorted(skills) for skills in found],
+                         [['kubernetes', 'python'], ['postgresql', 'python'], ['python'], []])
+
+    def test_ner_errors_keep_the_keyword_matches(self):
+        nlp = mock.Mock()
+        nlp.pipe.side_effect = RuntimeError('model crashed')
+        with mock.patch.object(self.parsers, 'get_nlp', return_value=nlp):
+            self.assertEqual(self.parsers.extract_skills_many([LONG]), [['python']])
@@ -0,0 +1,64 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from ai_engine.taxonomy import SkillTaxonomy, get_taxonomy
+
+SKILLS = {
+    'categories': ['programming', 'web_frameworks'],
+    'skills': [
+        {'id': 1, 'name': 'python', 'category': 'programming', 'aliases': ['python3', 'Py']},
+        {'id': 2, 'name': 'node.js', 'category': 'web_frameworks', 'aliases': ['node js', 'nodejs']},
+        {'id': 7, 'name': 'c#', 'category': 'programming', 'aliases': ['C Sharp']},
+    ],
+}
+
+
+class SkillTaxonomyTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.source = os.path.join(self.dir, 'skills.json')
+        self.index_dir = os.path.join(self.dir, 'index')
+        self.write(SKILLS)
+
+    def write(self, data):
+        with open(self.source, 'w') as f:
+            json.dump(data, f)
+
+    def load(self):
+        return SkillTaxonomy.load(self.source, self.index_dir)
+
+    def test_lookups_by_name_and_alias(self):
+        taxonomy = self.load()
+        self.assertEqual(taxonomy.lookup_many(['PYTHON', ' c  sharp ', 'NodeJS', 'cobol']), [1, 7, 2, None])
+        self.assertEqual(taxonomy.canonical('py'), 'python')
+        self.assertEqual(taxonomy.canonicalize(['Python3', 'python', 'Go Lang']), ['python', 'go lang'])
+        self.assertEqual(taxonomy.skill_ids(['c#', 'node js', 'rust']), [2, 7])
+        self.assertEqual(taxonomy.skills_by_category(), {'programming': ['python', 'c#'], 'web_frameworks': ['node.js']})
+        self.assertEqual(taxonomy.matcher().find_all('Node JS and C Sharp'), {'node.js': [0], 'c#': [12]})
+
+    def test_index_is_rebuilt_when_the_source_changes(self):
+        self.load()
+        self.assertTrue(SkillTaxonomy.index_is_current(self.source, self.index_dir))
+        changed = json.loads(json.dumps(SKILLS))
+        changed['skills'].append({'id': 9, 'name': 'rust', 'category': 'programming'})
+        self.write(changed)
+        self.assertFalse(SkillTaxonomy.index_is_current(self.source, self.index_dir))
+        self.assertEqual(self.load().lookup('rust'), 9)
+
+    def test_alias_claimed_by_two_skills_is_rejected(self):
+        clash = json.loads(json.dumps(SKILLS))
+        clash['skills'][1]['aliases'].append('python3')
+        self.write(clash)
+        with self.assertRaisesMessage(ValueError, 'python3'):
+            self.load()
+
+    def test_shipped_taxonomy_aliases(self):
+        matcher = get_taxonomy().matcher()
+        self.assertEqual(matcher.find_all('Spring Boot apps'), {'spring': [0]})
+        self.assertEqual(matcher.find_all('Node JS dev'), {'node.js': [0]})
+        self.assertEqual(matcher.find_all('django rest framework'), {'django rest framework': [0], 'django': [0]})
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase, override_settings
+
+from ai_engine.matrix import get_resume_matrix
+from ai_engine.tests.helpers import ProcessStateMixin, make_user, resume, vector
+from ai_engine.vector_store import SharedEmbeddingMatrix, shared_matrix_built
+
+
+@override_settings(ANN_ENABLED=False, EMBEDDING_MATRIX_STORE='mmap', VECTOR_STORE_COMPACT_MIN_ROWS=1000)
+class SharedEmbeddingMatrixTests(ProcessStateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from resumes.models import Resume
+
+        self.Resume = Resume
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.enterContext(override_settings(VECTOR_STORE_DIR=self.dir))
+        self.user = make_user()
+        self.rows = Resume.objects.bulk_create([resume(self.user, 'a', embedding=vector(1)),
+                                                resume(self.user, 'b', embedding=vector(0, 1)),
+                                                resume(self.user, 'c', embedding=vector(1, dim=4))])
+        self.path = os.path.join(self.dir, 'store')
+        self.store = SharedEmbeddingMatrix(self.path)
+        self.store.rebuild(Resume.objects.all())
+
+    def other_process(self):
+        """A second handle on the same files, as another worker would open them"""
+        return SharedEmbeddingMatrix(self.path)
+
+    def generation_files(self):
+        return sorted(name for name in os.listdir(self.path) if name.endswith(('.vec', '.ids')))
+
+    def test_rebuild_maps_normalized_rows_and_skips_other_dims(self):
+        a, b, c = (row.pk for row in self.rows)
+        self.assertEqual(sorted(self.store.ids.tolist()), [a, b])
+        self.assertNotIn(c, self.store)
+        ids, sims = self.store.similarities(vector(2, 2))
+        np.testing.assert_allclose(sims, [1 / np.sqrt(2)] * 2, rtol=1e-6)
+        found, vectors = self.store.rows_for([b, 999, a])
+        self.assertEqual(found.tolist(), [b, a])
+        np.testing.assert_allclose(vectors, [vector(0, 1), vector(1)])
+        self.assertEqual(self.generation_files(), ['00000001.ids', '00000001.vec'])
+
+    def test_writes_are_seen_by_other_processes_after_the_manifest_swap(self):
+        reader = self.other_process()
+        self.assertEqual(len(reader), 2)
+        a, b = self.rows[0].pk, self.rows[1].pk
+        self.store.upsert(a, vector(0, 0, 3))
+        self.store.upsert(12345, vector(1, 1))
+        self.store.remove(b)
+        self.assertEqual(sorted(reader.ids.tolist()), [a, 12345])
+        np.testing.assert_allclose(reader.rows_for([a])[1][0], vector(0, 0, 1))
+        self.assertEqual(reader.top_k(vector(0, 0, 1), k=1)[0][0], a)
+
+    def test_unchanged_rows_and_absent_ids_append_nothing(self):
+        a = self.rows[0].pk
+        self.store.upsert(a, vector(5))  # same row once normalized
+        self.store.remove(999)
+        self.assertEqual(self.store._read_manifest()['rows'], 2)
+        self.store.upsert_many([a, a], [vector(0, 1), vector(0, 0, 1)])
+        self.assertEqual(self.store._read_manifest()['rows'], 4)
+        np.testing.assert_allclose(self.store.rows_for([a])[1][0], vector(0, 0, 1))
+
+    def test_compaction_swaps_in_a_new_generation(self):
+        a, b = self.rows[0].pk, self.rows[1].pk
+        reader = self.other_process()
+        old_view = reader._state_view()
+        for n in range(3):
+            self.store.upsert(a, vector(1, n + 1))
+        self.store.remove(b)
+        self.assertEqual(self.store.compact(), 1)
+        self.assertEqual(self.store._read_manifest(), {'generation': 2, 'rows': 1, 'dim': 8})
+        self.assertEqual(self.generation_files(), ['00000002.ids', '00000002.vec'])
+        # A mapping taken before the swap still reads its pages
+        self.assertEqual(old_view[0].shape[0], 2)
+        self.assertEqual(reader.ids.tolist(), [a])
+        np.testing.assert_allclose(reader.rows_for([a])[1][0], vector(1, 3) / np.sqrt(10), rtol=1e-6)
+
+    def test_rows_appended_during_compaction_are_carried_over(self):
+        a = self.rows[0].pk
+        self.store.remove(self.rows[1].pk)
+        write = SharedEmbeddingMatrix._write_generation
+
+        def write_then_append(store, generation, dim, blocks):
+            rows = write(store, generation, dim, blocks)
+            self.other_process().upsert(a, vector(0, 0, 0, 1))  # lands in the old generation
+            return rows
+
+        with mock.patch.object(SharedEmbeddingMatrix, '_write_generation', write_then_append):
+            self.assertEqual(self.store.compact(), 2)
+        np.testing.assert_allclose(self.other_process().rows_for([a])[1][0], vector(0, 0, 0, 1))
+        self.assertEqual(len(self.store), 1)
+
+    def test_compaction_starts_once_enough_rows_are_dead(self):
+        with override_settings(VECTOR_STORE_COMPACT_MIN_ROWS=2, VECTOR_STORE_COMPACT_RATIO=0.5):
+            self.store.upsert(self.rows[0].pk, vector(1, 1))
+            self.assertIsNone(self.store._compact_thread)
+            self.store.upsert(self.rows[1].pk, vector(1, 1))
+            self.store._compact_thread.join(5)
+        self.assertEqual(self.store._read_manifest()['generation'], 2)
+        self.assertEqual(len(self.store), 2)
+
+    def test_served_matrix_lives_in_the_store(self):
+        matrix = get_resume_matrix()
+        self.assertIsInstance(matrix, SharedEmbeddingMatrix)
+        self.assertTrue(shared_matrix_built('resumes'))
+        reader = SharedEmbeddingMatrix(matrix.path)
+        added = resume(self.user, 'd', embedding=vector(0, 0, 1))
+        added.save()
+        pk = added.pk
+        self.assertEqual(reader.top_k(vector(0, 0, 1), k=1)[0][0], pk)
+        added.delete()
+        self.assertNotIn(pk, reader)
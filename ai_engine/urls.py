@@ -3,4 +3,9 @@ from . import views
 
 urlpatterns = [
     path('match/<int:resume_id>/<int:job_id>/', views.match_resume_to_job, name='match_resume_to_job'),
+    path('match/batch/', views.match_batch, name='match_batch'),
+    path('rank/jobs/<int:resume_id>/', views.rank_jobs_for_resume, name='rank_jobs_for_resume'),
+    path('rank/resumes/<int:job_id>/', views.rank_resumes_for_job, name='rank_resumes_for_job'),
+    path('search/resumes/', views.search_resumes, name='search_resumes'),
+    path('cache/stats/', views.cache_stats, name='cache_stats'),
 ]
@@ -1,16 +1,21 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+from .embeddings import get_embedding, served_embedding
 
 def encode_text(text):
-    return model.encode([text])[0].tolist()
+    # Shares the embedding cache (and micro-batching) with get_embedding
+    embedding = get_embedding(text)
+    if embedding is None:
+        return None
+    return embedding.tolist()
 
 def match_resume_to_job(resume, job):
-    if not resume.embedding or not job.embedding:
+    resume_vec = served_embedding(resume)
+    job_vec = served_embedding(job)
+    if resume_vec is None or job_vec is None:
         return 0
-    resume_vec = np.array(resume.embedding)
-    job_vec = np.array(job.embedding)
+    resume_vec = np.asarray(resume_vec, dtype=np.float32)
+    job_vec = np.asarray(job_vec, dtype=np.float32)
     similarity = np.dot(resume_vec, job_vec) / (np.linalg.norm(resume_vec) * np.linalg.norm(job_vec))
     similarity = max(min(similarity, 1), -1)
     scaled_score = round((similarity + 1) / 2 * 10, 2)  # 0-10 scale
@@ -0,0 +1,365 @@
+import itertools
+import json
+import os
+import re
+import struct
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+from .embeddings import load_embedding
+from .matrix import EmbeddingMatrix, normalize_rows, served_pairs
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+# One store directory per matrix key and model tag:
+#   manifest.json         {"generation": g, "rows": n, "dim": d}, replaced atomically
+#   {g:08d}.vec           header (magic, version, dim) + contiguous float32 rows
+#   {g:08d}.ids           int64 ID of each row; ~id marks a deletion (tombstone)
+# Rows are only ever appended. A saved row appends a new version of its ID and
+# the last row of an ID wins, so readers that map the first `rows` rows of the
+# manifest never see a half-written row. Compaction copies the live rows into
+# generation g + 1 and swaps the manifest; processes still mapping generation g
+# keep their pages until they notice the new manifest.
+STORE_MAGIC = b'SRMV'
+STORE_VERSION = 1
+STORE_HEADER = struct.Struct('<4sB3xII')  # 16 bytes, keeps rows 16-byte aligned
+
+
+def store_dir(key, tag=None):
+    """Directory of the shared matrix for key and model tag"""
+    from .model_registry import model_tag
+
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', tag or model_tag())
+    return os.path.join(str(getattr(settings, 'VECTOR_STORE_DIR', settings.BASE_DIR / 'indexes' / 'vectors')),
+                        f"{key}.{slug}")
+
+
+def _live_rows(row_ids):
+    """(sorted live IDs, their rows, all live rows ascending) from an append log of IDs"""
+    keys = np.where(row_ids < 0, ~row_ids, row_ids)
+    unique, first_from_end = np.unique(keys[::-1], return_index=True)
+    last = keys.shape[0] - 1 - first_from_end
+    alive = row_ids[last] >= 0
+    sorted_ids, sorted_rows = unique[alive], last[alive]
+    return sorted_ids, sorted_rows, np.sort(sorted_rows)
+
+
+class SharedEmbeddingMatrix(EmbeddingMatrix):
+    """EmbeddingMatrix over an append-only file that every process on the host maps.
+
+    Rows live in the OS page cache instead of each worker's heap, so web
+    workers share one copy and their RSS does not grow with the corpus;
+    each process only keeps the ID arrays. Writes take a file lock, append,
+    then swap the manifest; readers re-map when the manifest changes.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.RLock()
+        self._dir_lock = threading.Lock()  # flock does not exclude threads sharing a process
+        self._held = threading.local()
+        self._manifest_key = None
+        self._compact_thread = None
+        self._view = None
+        os.makedirs(self.path, exist_ok=True)
+
+    # -- manifest ----------------------------------------------------------
+
+    @property
+    def _manifest_path(self):
+        return os.path.join(self.path, 'manifest.json')
+
+    def _file(self, generation, ext):
+        return os.path.join(self.path, f"{generation:08d}.{ext}")
+
+    @property
+    def built(self):
+        return os.path.exists(self._manifest_path)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the store directory across processes (re-entrant per thread)"""
+        if getattr(self._held, 'depth', 0):
+            self._held.depth += 1
+            try:
+                yield
+            finally:
+                self._held.depth -= 1
+            return
+        with self._dir_lock, open(os.path.join(self.path, '.lock'), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            self._held.depth = 1
+            try:
+                yield
+            finally:
+                self._held.depth = 0
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, manifest):
+        tmp_path = f"{self._manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+        self._manifest_key = None
+
+    def _state_view(self):
+        """(row ids, row vectors, sorted live ids, their rows, live rows), re-mapped if the manifest changed"""
+        try:
+            stat = os.stat(self._manifest_path)
+            key = (stat.st_ino, stat.st_mtime_ns)  # replaced, not rewritten, on change
+        except OSError:
+            key = None
+        if key is not None and key == self._manifest_key and self._view is not None:
+            return self._view
+        with self._lock, self._file_lock():  # compaction may delete the files an old manifest lists
+            manifest = self._read_manifest()
+            self._view = self._map(manifest)
+            self._manifest_key = key
+        return self._view
+
+    def _map_rows(self, manifest):
+        """Read-only maps of the first `rows` IDs and vectors a manifest publishes"""
+        dim = manifest['dim'] if manifest else 0
+        rows = manifest['rows'] if manifest else 0
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty((0, dim), dtype=np.float32)
+        vec_path = self._file(manifest['generation'], 'vec')
+        with open(vec_path, 'rb') as f:
+            magic, version, stored_dim, _ = STORE_HEADER.unpack(f.read(STORE_HEADER.size))
+        if magic != STORE_MAGIC or version != STORE_VERSION or stored_dim != dim:
+            raise ValueError(f"{vec_path} is not a version {STORE_VERSION} vector file of dim {dim}")
+        vectors = np.memmap(vec_path, dtype='<f4', mode='r', offset=STORE_HEADER.size, shape=(rows, dim))
+        row_ids = np.memmap(self._file(manifest['generation'], 'ids'), dtype='<i8', mode='r', shape=(rows,))
+        return row_ids, vectors
+
+    def _map(self, manifest):
+        row_ids, vectors = self._map_rows(manifest)
+        return (row_ids, vectors, *_live_rows(np.asarray(row_ids)))
+
+    # -- writes ------------------------------------------------------------
+
+    def _write_generation(self, generation, dim, blocks):
+        """Write (ids, vectors) blocks as the files of a new generation; returns the row count"""
+        rows = 0
+        with open(self._file(generation, 'vec'), 'wb') as vec_file, open(self._file(generation, 'ids'), 'wb') as ids_file:
+            vec_file.write(STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, dim, 0))
+            for ids, vectors in blocks:
+                vec_file.write(np.ascontiguousarray(vectors, dtype='<f4').tobytes())
+                ids_file.write(np.ascontiguousarray(ids, dtype='<i8').tobytes())
+                rows += len(ids)
+        return rows
+
+    def _remove_generation(self, generation):
+        for ext in ('vec', 'ids'):
+            try:
+                os.remove(self._file(generation, ext))
+            except OSError:
+                pass  # still mapped elsewhere (Windows); removed with the next generation
+
+    def rebuild(self, queryset, tag=None, chunk_size=2000):
+        """Replace the store with the served embeddings of a queryset, streamed in chunks"""
+        def blocks():
+            ids, rows, dim = [], [], None
+            for pk, blob in served_pairs(queryset, tag).iterator(chunk_size=chunk_size):
+                vec = load_embedding(blob)
+                if vec is None:
+                    continue
+                vec = np.asarray(vec, dtype=np.float32).ravel()
+                if dim is None:
+                    dim = vec.shape[0]
+                elif vec.shape[0] != dim:
+                    print(f"⚠️ Skipping row {pk}: embedding dim {vec.shape[0]} != {dim}")
+                    continue
+                ids.append(pk)
+                rows.append(vec)
+                if len(ids) >= chunk_size:
+                    yield np.asarray(ids, dtype=np.int64), normalize_rows(np.vstack(rows))
+                    ids, rows = [], []
+            if ids:
+                yield np.asarray(ids, dtype=np.int64), normalize_rows(np.vstack(rows))
+
+        with self._lock, self._file_lock():
+            old = self._read_manifest()
+            generation = old['generation'] + 1 if old else 1
+            stream = blocks()
+            first = next(stream, None)
+            if first is None:
+                dim, stream = getattr(settings, 'EMBEDDING_DIM', 384), iter(())
+            else:
+                dim, stream = first[1].shape[1], itertools.chain([first], stream)
+            rows = self._write_generation(generation, dim, stream)
+            self._write_manifest({'generation': generation, 'rows': rows, 'dim': dim})
+            if old:
+                self._remove_generation(old['generation'])
+        print(f"✅ Built shared embedding matrix with {rows} rows in {self.path}")
+        return rows
+
+    def append(self, ids, vectors):
+        """Append rows (tombstones for ids < 0) and publish them with a manifest swap"""
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock, self._file_lock():
+            manifest = self._read_manifest()
+            if manifest is None:
+                return
+            rows, dim, generation = manifest['rows'], manifest['dim'], manifest['generation']
+            if vectors.shape[1] != dim:
+                print(f"⚠️ Not storing rows {ids.tolist()}: embedding dim {vectors.shape[1]} != {dim}")
+                return
+            # Bytes past `rows` (a writer that died before its manifest swap) are overwritten
+            with open(self._file(generation, 'vec'), 'r+b') as f:
+                f.seek(STORE_HEADER.size + rows * dim * 4)
+                f.write(np.ascontiguousarray(vectors, dtype='<f4').tobytes())
+            with open(self._file(generation, 'ids'), 'r+b') as f:
+                f.seek(rows * 8)
+                f.write(ids.astype('<i8').tobytes())
+            self._write_manifest({'generation': generation, 'rows': rows + ids.shape[0], 'dim': dim})
+        self._maybe_compact()
+
+    def upsert(self, pk, vector):
+        """Append a new version of the row for pk (nothing if the stored row is the same)"""
+        vec = normalize_rows(np.asarray(vector, dtype=np.float32).ravel())
+        found, current = self.rows_for([pk])
+        if found.shape[0] and current.shape[1] == vec.shape[1] and np.array_equal(current[0], vec[0]):
+            return  # e.g. a status-only save
+        self.append([int(pk)], vec)
+
+    def upsert_many(self, pks, vectors):
+        """Append new versions of many rows with one manifest swap (bulk imports)"""
+        if len(pks):
+            self.append([int(pk) for pk in pks],
+                        normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(pks), -1)))
+
+    def remove(self, pk):
+        """Append a tombstone for pk if it is present"""
+        if pk in self:
+            self.append([~int(pk)], np.zeros((1, self.dim), dtype=np.float32))
+
+    def _maybe_compact(self):
+        row_ids, _, sorted_ids, _, _ = self._state_view()
+        dead = row_ids.shape[0] - sorted_ids.shape[0]
+        if dead < getattr(settings, 'VECTOR_STORE_COMPACT_MIN_ROWS', 1000):
+            return
+        if dead < getattr(settings, 'VECTOR_STORE_COMPACT_RATIO', 0.25) * row_ids.shape[0]:
+            return
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            return
+        self._compact_thread = threading.Thread(target=self.compact, name='vector-store-compact', daemon=True)
+        self._compact_thread.start()
+
+    def compact(self, block_rows=8192):
+        """Copy the live rows into a new generation, dropping superseded rows and tombstones"""
+        with self._file_lock():
+            snapshot = self._read_manifest()
+        if not snapshot:
+            return 0
+        row_ids, vectors, _, _, live = self._map(snapshot)
+        generation, dim = snapshot['generation'] + 1, snapshot['dim']
+        blocks = (
+            (row_ids[live[start:start + block_rows]], vectors[live[start:start + block_rows]])
+            for start in range(0, live.shape[0], block_rows)
+        )
+        rows = self._write_generation(generation, dim, blocks)
+
+        with self._lock, self._file_lock():
+            manifest = self._read_manifest()
+            if manifest is None or manifest['generation'] != snapshot['generation']:
+                # Rebuilt or compacted by another process meanwhile; keep its result
+                self._remove_generation(generation)
+                return 0
+            # Rows appended while copying are carried over as they are (last one still wins)
+            if manifest['rows'] > snapshot['rows']:
+                tail_ids, tail_vectors = self._map_rows(manifest)
+                with open(self._file(generation, 'vec'), 'ab') as vec_file, \
+                        open(self._file(generation, 'ids'), 'ab') as ids_file:
+                    vec_file.write(np.ascontiguousarray(tail_vectors[snapshot['rows']:]).tobytes())
+                    ids_file.write(np.ascontiguousarray(tail_ids[snapshot['rows']:]).tobytes())
+                rows += manifest['rows'] - snapshot['rows']
+            self._write_manifest({'generation': generation, 'rows': rows, 'dim': dim})
+            self._remove_generation(snapshot['generation'])
+        print(f"✅ Compacted shared embedding matrix to {rows} rows (generation {generation})")
+        return rows
+
+    # -- reads -------------------------------------------------------------
+
+    @property
+    def ids(self):
+        row_ids, _, _, _, live = self._state_view()
+        return np.asarray(row_ids[live])
+
+    @property
+    def vectors(self):
+        """Copy of every live row (builds the full matrix in this process)"""
+        _, vectors, _, _, live = self._state_view()
+        return np.asarray(vectors[live])
+
+    @property
+    def dim(self):
+        return self._state_view()[1].shape[1]
+
+    def __len__(self):
+        return self._state_view()[2].shape[0]
+
+    def __contains__(self, pk):
+        sorted_ids = self._state_view()[2]
+        i = np.searchsorted(sorted_ids, int(pk))
+        return i < sorted_ids.shape[0] and sorted_ids[i] == int(pk)
+
+    def similarities(self, query):
+        """Cosine similarity of query against every live row, scanned block by block"""
+        row_ids, vectors, _, _, live = self._state_view()
+        if live.shape[0] == 0 or query is None:
+            return row_ids[:0], np.empty(0, dtype=np.float32)
+        q = normalize_rows(np.asarray(query, dtype=np.float32).ravel())[0]
+        if q.shape[0] != vectors.shape[1]:
+            print(f"❌ Query dim {q.shape[0]} does not match matrix dim {vectors.shape[1]}")
+            return row_ids[:0], np.empty(0, dtype=np.float32)
+        block_rows = getattr(settings, 'EMBEDDING_BLOCK_ROWS', 8192)
+        sims = np.empty(vectors.shape[0], dtype=np.float32)
+        for start in range(0, vectors.shape[0], block_rows):
+            sims[start:start + block_rows] = vectors[start:start + block_rows] @ q
+        return np.asarray(row_ids[live]), sims[live]
+
+    def rows_for(self, pks):
+        """(ids, vectors) for the given ids that are present, in the given order"""
+        _, vectors, sorted_ids, sorted_rows, _ = self._state_view()
+        pks = np.asarray([int(pk) for pk in pks], dtype=np.int64)
+        where = np.minimum(np.searchsorted(sorted_ids, pks), max(sorted_ids.shape[0] - 1, 0))
+        found = sorted_ids[where] == pks if sorted_ids.shape[0] else np.zeros(pks.shape[0], dtype=bool)
+        return pks[found], np.asarray(vectors[sorted_rows[where[found]]])
+
+    def iter_blocks(self, block_rows):
+        """Yield (ids, vectors) of at most block_rows live rows"""
+        row_ids, vectors, _, _, live = self._state_view()
+        for start in range(0, live.shape[0], block_rows):
+            rows = live[start:start + block_rows]
+            yield np.asarray(row_ids[rows]), np.asarray(vectors[rows])
+
+
+def shared_matrix_built(key, tag=None):
+    """Whether some process has already built the shared matrix for key"""
+    return os.path.exists(os.path.join(store_dir(key, tag), 'manifest.json'))
+
+
+def open_shared_matrix(key, queryset, tag=None):
+    """The shared matrix for key, built from queryset by the first process that needs it"""
+    matrix = SharedEmbeddingMatrix(store_dir(key, tag))
+    if not matrix.built:
+        with matrix._file_lock():
+            if not matrix.built:  # another worker may have built it while we waited
+                matrix.rebuild(queryset, tag=tag)
+    return matrix
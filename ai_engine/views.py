@@ -1,30 +1,319 @@
 from django.http import JsonResponse
+from django.contrib.auth.decorators import login_required
 from resumes.models import Resume
 from jobs.models import Job
-from sklearn.metrics.pairwise import cosine_similarity
+from .inverted_index import QuerySyntaxError
+import json
 import numpy as np
+from django.conf import settings
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
 def match_resume_to_job(request, resume_id, job_id):
+    from .matrix import served_vectors, score_matrix, similarity_to_score
+
+    if not Resume.objects.filter(id=resume_id).exists():
+        return JsonResponse({"error": "Resume not found"}, status=404)
+    if not Job.objects.filter(id=job_id).exists():
+        return JsonResponse({"error": "Job not found"}, status=404)
+
+    resume_vec = served_vectors(Resume.objects, [resume_id]).get(resume_id)
+    job_vec = served_vectors(Job.objects, [job_id]).get(job_id)
+    if resume_vec is None or job_vec is None:
+        return JsonResponse({"error": "Embeddings not found for Resume or Job"}, status=400)
+
+    similarity = float(score_matrix(resume_vec, job_vec)[0, 0])
+    return JsonResponse({
+        "resume_id": resume_id,
+        "job_id": job_id,
+        "similarity": round(similarity, 4),
+        "match_score": round(float(similarity_to_score(similarity)), 2),
+        "status": "success"
+    })
+
+
+def _id_list(value, name):
+    """Validated list of integer IDs from a JSON body field"""
+    if not isinstance(value, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in value):
+        raise ValueError(f"{name} must be a list of integers")
+    return list(dict.fromkeys(value))
+
+
+def _api_key_valid(request):
+    """True/False for an `Authorization: Bearer <key>` header checked against MATCH_BATCH_API_KEYS, None without one"""
+    import hmac
+
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    key = header[len('Bearer '):].strip().encode()
+    return any(hmac.compare_digest(key, allowed.encode()) for allowed in getattr(settings, 'MATCH_BATCH_API_KEYS', []))
+
+
+def _csrf_failure(request):
+    """The 403 response CsrfViewMiddleware would give a session caller, or None"""
+    from django.middleware.csrf import CsrfViewMiddleware
+
+    return CsrfViewMiddleware(lambda req: None).process_view(request, None, (), {})
+
+
+@csrf_exempt  # key callers have no CSRF token; session callers are checked in the view
+@require_POST
+def match_batch(request):
+    """Embedding match scores for many resume/job pairs in one call.
+
+    POST JSON {"resume_ids": [...], "job_ids": [...]} for the full resume x job
+    matrix, or {"pairs": [[resume_id, job_id], ...]} for just those pairs.
+    Scores are the dense ones (mode=dense): similarity is the cosine, match_score 0-100.
+
+    Services call it with `Authorization: Bearer <key>` (a MATCH_BATCH_API_KEYS
+    entry) and may score every resume. Logged-in users call it with their
+    session and CSRF token; non-recruiters can only score their own resumes.
+    """
+    from .matrix import served_vectors, similarity_to_score, normalize_rows
+
+    key_valid = _api_key_valid(request)
+    if key_valid is False:
+        return JsonResponse({"error": "Invalid API key"}, status=401)
+    if key_valid is None:
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "Authentication required"}, status=401)
+        rejected = _csrf_failure(request)
+        if rejected is not None:
+            return rejected
+    all_resumes = key_valid or request.user.is_recruiter or request.user.is_staff
+
+    max_ids = getattr(settings, 'MATCH_BATCH_MAX_IDS', 1000)
+    max_pairs = getattr(settings, 'MATCH_BATCH_MAX_PAIRS', 100000)
+    try:
+        body = json.loads(request.body or b'{}')
+        if not isinstance(body, dict):
+            raise ValueError("body must be a JSON object")
+        if 'pairs' in body:
+            pairs = body['pairs']
+            if not isinstance(pairs, list) or not all(isinstance(p, list) and len(p) == 2 for p in pairs):
+                raise ValueError("pairs must be a list of [resume_id, job_id]")
+            if len(pairs) > max_pairs:
+                raise ValueError(f"at most {max_pairs} pairs per call")
+            resume_ids = _id_list([p[0] for p in pairs], "pair resume IDs")
+            job_ids = _id_list([p[1] for p in pairs], "pair job IDs")
+        else:
+            pairs = None
+            resume_ids = _id_list(body.get('resume_ids'), "resume_ids")
+            job_ids = _id_list(body.get('job_ids'), "job_ids")
+        if len(resume_ids) > max_ids or len(job_ids) > max_ids:
+            raise ValueError(f"at most {max_ids} resume and {max_ids} job IDs per call")
+    except ValueError as e:  # includes malformed JSON
+        return JsonResponse({"error": f"Invalid request: {e}"}, status=400)
+
+    resumes = Resume.objects.all()
+    if not all_resumes:
+        resumes = resumes.filter(user=request.user)
+    resume_vecs = served_vectors(resumes, resume_ids)
+    job_vecs = served_vectors(Job.objects.all(), job_ids)
+
+    found_resumes = [pk for pk in resume_ids if pk in resume_vecs]
+    found_jobs = [pk for pk in job_ids if pk in job_vecs]
+    missing = {
+        "resume_ids": [pk for pk in resume_ids if pk not in resume_vecs],
+        "job_ids": [pk for pk in job_ids if pk not in job_vecs],
+    }
+    resume_matrix = normalize_rows(np.vstack([resume_vecs[pk] for pk in found_resumes])) if found_resumes else None
+    job_matrix = normalize_rows(np.vstack([job_vecs[pk] for pk in found_jobs])) if found_jobs else None
+
+    if pairs is None:
+        if resume_matrix is None or job_matrix is None:
+            sims = np.empty((len(found_resumes), len(found_jobs)), dtype=np.float32)
+        else:
+            sims = resume_matrix @ job_matrix.T
+        return JsonResponse({
+            "resume_ids": found_resumes,
+            "job_ids": found_jobs,
+            "similarities": np.round(sims.astype(np.float64), 4).tolist(),
+            "match_scores": np.round(similarity_to_score(sims).astype(np.float64), 2).tolist(),
+            "missing": missing,
+            "status": "success"
+        })
+
+    # Only the requested pairs: gather both sides' rows and take row-wise dot products
+    resume_row = {pk: i for i, pk in enumerate(found_resumes)}
+    job_row = {pk: i for i, pk in enumerate(found_jobs)}
+    scored = [(r, j) for r, j in pairs if r in resume_row and j in job_row]
+    sims = np.empty(0, dtype=np.float32)
+    if scored:
+        rows = np.fromiter((resume_row[r] for r, _ in scored), dtype=np.int64, count=len(scored))
+        cols = np.fromiter((job_row[j] for _, j in scored), dtype=np.int64, count=len(scored))
+        sims = np.einsum('ij,ij->i', resume_matrix[rows], job_matrix[cols])
+    scores = similarity_to_score(sims)
+    return JsonResponse({
+        "results": [
+            {"resume_id": r, "job_id": j, "similarity": round(float(sim), 4), "match_score": round(float(score), 2)}
+            for (r, j), sim, score in zip(scored, sims, scores)
+        ],
+        "missing": missing,
+        "status": "success"
+    })
+
+
+def _nprobe_param(request):
+    """Optional ANN recall/latency knob: more probed lists = higher recall"""
+    nprobe = request.GET.get('nprobe')
+    return max(1, int(nprobe)) if nprobe else None
+
+
+def _mode_param(request, modes=('hybrid', 'dense')):
+    """'hybrid' (dense + skills + BM25), 'dense' or, where offered, 'chunks' (max-sim) ranking"""
+    from django.conf import settings
+    mode = request.GET.get('mode') or getattr(settings, 'MATCH_RANKING_MODE', 'hybrid')
+    if mode not in modes:
+        raise ValueError(mode)
+    return mode
+
+
+@login_required
+def rank_jobs_for_resume(request, resume_id):
+    """Top-K jobs for one of the current user's resumes"""
+    from .matrix import rank_jobs_for_resume as rank_jobs, rank_jobs_by_chunks
+    from .hybrid import rank_jobs_hybrid
+
     try:
-        resume = Resume.objects.get(id=resume_id)
+        resume = Resume.objects.get(id=resume_id, user=request.user)
     except Resume.DoesNotExist:
         return JsonResponse({"error": "Resume not found"}, status=404)
 
+    try:
+        k = max(1, min(int(request.GET.get('k', 10)), 100))
+        nprobe = _nprobe_param(request)
+    except ValueError:
+        return JsonResponse({"error": "k and nprobe must be integers"}, status=400)
+    try:
+        mode = _mode_param(request, modes=('hybrid', 'dense', 'chunks'))
+    except ValueError:
+        return JsonResponse({"error": "mode must be 'hybrid', 'dense' or 'chunks'"}, status=400)
+
+    if not resume.embedding:
+        return JsonResponse({"error": "Embedding not found for Resume"}, status=400)
+
+    if mode == 'hybrid':
+        ranked = rank_jobs_hybrid(resume, k=k, nprobe=nprobe)
+    elif mode == 'chunks':
+        ranked = rank_jobs_by_chunks(resume, k=k)
+    else:
+        ranked = rank_jobs(resume, k=k, nprobe=nprobe)
+    return JsonResponse({
+        "resume_id": resume.id,
+        "mode": mode,
+        "results": [
+            {
+                "job_id": item['job'].id,
+                "title": item['job'].title,
+                "similarity": item['similarity'],
+                "match_score": item['score'],
+                "breakdown": item.get('breakdown'),
+                "missing_skills": item['missing_skills'],
+            }
+            for item in ranked
+        ],
+        "status": "success"
+    })
+
+
+@login_required
+def rank_resumes_for_job(request, job_id):
+    """Paginated, score-sorted candidate shortlist for a job (recruiters only)"""
+    from .matrix import candidate_shortlist_page
+
+    if not (request.user.is_recruiter or request.user.is_staff):
+        return JsonResponse({"error": "Recruiter access required"}, status=403)
+
     try:
         job = Job.objects.get(id=job_id)
     except Job.DoesNotExist:
         return JsonResponse({"error": "Job not found"}, status=404)
 
-    if not resume.embedding or not job.embedding:
-        return JsonResponse({"error": "Embeddings not found for Resume or Job"}, status=400)
+    if not job.embedding:
+        return JsonResponse({"error": "Embedding not found for Job"}, status=400)
 
-    resume_vec = np.array(resume.embedding).reshape(1, -1)
-    job_vec = np.array(job.embedding).reshape(1, -1)
+    try:
+        page_size = max(1, min(int(request.GET.get('page_size', 20)), 100))
+        nprobe = _nprobe_param(request)
+    except ValueError:
+        return JsonResponse({"error": "page_size and nprobe must be integers"}, status=400)
+    try:
+        mode = _mode_param(request)
+    except ValueError:
+        return JsonResponse({"error": "mode must be 'hybrid' or 'dense'"}, status=400)
 
-    score = cosine_similarity(resume_vec, job_vec)[0][0]
+    skills = [s for s in request.GET.get('skills', '').split(',') if s.strip()]
+    try:
+        page, rows = candidate_shortlist_page(job, request.GET.get('page', 1), page_size, nprobe=nprobe,
+                                              skills=skills, mode=mode, query=request.GET.get('q'))
+    except QuerySyntaxError as e:
+        return JsonResponse({"error": f"Invalid query: {e}"}, status=400)
     return JsonResponse({
-        "resume_id": resume.id,
         "job_id": job.id,
-        "match_score": round(float(score), 4),
+        "mode": mode,
+        "page": page.number,
+        "num_pages": page.paginator.num_pages,
+        "total": page.paginator.count,
+        "results": [
+            {
+                "resume_id": row['resume'].id,
+                "username": row['resume'].user.username,
+                "similarity": row['similarity'],
+                "match_score": row['score'],
+                "matched_skills": row['matched_skills'],
+                "missing_skills": row['missing_skills'],
+            }
+            for row in rows
+        ],
+        "status": "success"
+    })
+
+
+@login_required
+def search_resumes(request):
+    """Keyword/boolean/phrase search over resume text (recruiters only)"""
+    from django.core.paginator import Paginator
+    from .inverted_index import search_resumes as run_search
+
+    if not (request.user.is_recruiter or request.user.is_staff):
+        return JsonResponse({"error": "Recruiter access required"}, status=403)
+
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({"error": "q is required"}, status=400)
+    try:
+        page_size = max(1, min(int(request.GET.get('page_size', 50)), 200))
+        ids = run_search(query)
+    except ValueError as e:
+        return JsonResponse({"error": f"Invalid request: {e}"}, status=400)
+
+    page = Paginator(ids, page_size).get_page(request.GET.get('page', 1))
+    resumes = Resume.objects.select_related('user').only('id', 'user__username').in_bulk(list(page.object_list))
+    return JsonResponse({
+        "query": query,
+        "page": page.number,
+        "num_pages": page.paginator.num_pages,
+        "total": page.paginator.count,
+        "results": [
+            {"resume_id": pk, "username": resumes[pk].user.username}
+            for pk in page.object_list if pk in resumes
+        ],
+        "status": "success"
+    })
+
+
+@login_required
+def cache_stats(request):
+    """Embedding and parsed-resume cache statistics (staff only)"""
+    from .embedding_cache import embedding_cache_stats
+    from .parse_cache import cache_stats as parse_cache_stats
+
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff access required"}, status=403)
+    return JsonResponse({
+        "embeddings": embedding_cache_stats(),
+        "parsed_documents": parse_cache_stats(),
         "status": "success"
     })
@@ -8,6 +8,7 @@ urlpatterns = [
     path('upload-job/', views.upload_job, name='upload_job'),
     path('match_page/', views.match_page, name='match_page'),
     path('match_result/<int:resume_id>/<int:job_id>/', views.match_result, name='match_result'),
+    path('candidates/', views.job_candidates, name='job_candidates'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),  # ✅ Only once
     path('register/', views.register_view, name='register'),
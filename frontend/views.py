@@ -22,10 +22,10 @@ def upload_resume(request):
             # Create resume
             resume = Resume.objects.create(user=request.user, file=resume_file)
             
-            # AI processing
+            # AI processing (queued for a background worker unless RESUME_INGESTION_ASYNC is off)
             try:
-                from ai_engine.parsers import parse_and_store_resume
-                parse_and_store_resume(resume)
+                from ai_engine.ingestion import submit_resume
+                submit_resume(resume)
             except Exception as e:
                 print(f"DEBUG: AI error - {e}")
             
@@ -63,16 +63,38 @@ def match_page(request):
         if resume_id and job_id:
             return redirect('match_result', resume_id=resume_id, job_id=job_id)
     
+    # Rank every job for the chosen resume in one pass
+    ranked_jobs = []
+    selected_resume = None
+    resume_id = request.GET.get('resume', '')
+    if resume_id.isdigit():
+        selected_resume = resumes.filter(id=resume_id).first()
+        if selected_resume:
+            try:
+                # One indexed read when the resume's scores are materialized; fewer
+                # stored rows than asked for means it was never refreshed itself
+                from ai_engine.match_store import top_jobs
+                ranked_jobs = top_jobs(selected_resume, n=10)
+                if len(ranked_jobs) < 10:
+                    from ai_engine.hybrid import rank_jobs_hybrid
+                    ranked_jobs = rank_jobs_hybrid(selected_resume, k=10)
+            except Exception as e:
+                print(f"❌ Ranking error: {e}")
+    
     return render(request, 'frontend/match_page.html', {
         'resumes': resumes,
-        'jobs': jobs
+        'jobs': jobs,
+        'selected_resume': selected_resume,
+        'ranked_jobs': ranked_jobs,
     })
 
 @login_required
 def match_latest(request):
     # FIXED: Changed 'owner' to 'user'
     resume = Resume.objects.filter(user=request.user).order_by('-id').first()
-    job = Job.objects.order_by('-id').first()
+    # Best stored match for the newest resume, else the newest job
+    best = resume.match_scores.order_by('-score').select_related('job').first() if resume else None
+    job = best.job if best else Job.objects.order_by('-id').first()
 
     if not resume:
         messages.error(request, "No resume found. Please upload a resume first.")
@@ -83,6 +105,45 @@ def match_latest(request):
 
     return redirect('match_result', resume_id=resume.id, job_id=job.id)
 
+@login_required
+def job_candidates(request):
+    """Recruiter view: best candidates for a job posting"""
+    if not (request.user.is_recruiter or request.user.is_staff):
+        messages.error(request, "Only recruiters can browse candidates.")
+        return redirect('home')
+
+    jobs = Job.objects.all()
+    job = None
+    page = None
+    candidates = []
+
+    skills_query = request.GET.get('skills', '')
+    skills = [s for s in skills_query.split(',') if s.strip()]
+    text_query = request.GET.get('q', '')
+    job_id = request.GET.get('job')
+    if job_id:
+        job = Job.objects.filter(id=job_id).first()
+        if job and job.embedding:
+            try:
+                from ai_engine.matrix import candidate_shortlist_page
+                page, candidates = candidate_shortlist_page(job, request.GET.get('page', 1), skills=skills,
+                                                            query=text_query.strip() or None)
+            except ValueError as e:
+                messages.error(request, f"Invalid search: {e}")
+            except Exception as e:
+                print(f"❌ Candidate ranking error: {e}")
+        elif job:
+            messages.error(request, "This job has not been processed yet.")
+
+    return render(request, 'frontend/job_candidates.html', {
+        'jobs': jobs,
+        'job': job,
+        'page': page,
+        'candidates': candidates,
+        'skills_query': skills_query,
+        'text_query': text_query,
+    })
+
 @login_required
 def job_list(request):
     jobs = Job.objects.all()
@@ -98,34 +159,32 @@ def match_result(request, resume_id, job_id):
     print(f"Job: {job.title}")
     
     match_score = None
-    
-    try:
-        from ai_engine.embeddings import compute_match_score
-        print("✓ AI engine imported successfully")
-        match_score = compute_match_score(resume, job)
-        print(f"✓ Match score calculated: {match_score}")
-        
-    except Exception as e:
-        print(f"❌ Matching error: {e}")
-        # Simple fallback: extract skills from description
-        job_description = job.description.lower()
-        common_skills = ['python', 'c++', 'arduino', 'raspberry', 'circuit', 'embedded']
-        found_skills = [skill for skill in common_skills if skill in job_description]
-        match_score = min(len(found_skills) * 20, 100)  # Simple scoring
+    breakdown = None
 
     # Safe skill extraction
     resume_skills = getattr(resume, 'skills', []) or []
     
-    # Extract skills from job description as fallback
-    job_description = job.description.lower()
-    common_tech_skills = ['python', 'c++', 'c', 'arduino', 'raspberry pi', 'circuit design', 'embedded systems', 'pcb', 'iot']
-    job_skills = [skill for skill in common_tech_skills if skill in job_description]
+    # Job skills from ingest, or from the shared skills taxonomy as fallback
+    from ai_engine.taxonomy import get_taxonomy
+    from ai_engine.embeddings import get_missing_skills, get_skill_overlap
+    job_skills = job.required_skills or get_taxonomy().matcher().skills(job.description)
     
-    missing_skills = []
-    if job_skills and resume_skills:
-        resume_skills_lower = [str(s).lower() for s in resume_skills]
-        job_skills_lower = [str(s).lower() for s in job_skills]
-        missing_skills = [skill for skill in job_skills_lower if skill not in resume_skills_lower]
+    missing_skills = get_missing_skills(resume_skills, job_skills)
+
+    try:
+        from ai_engine.match_store import stored_score
+        breakdown = stored_score(resume, job)
+        if breakdown is None:
+            from ai_engine.hybrid import hybrid_match_score
+            breakdown = hybrid_match_score(resume, job)
+        match_score = breakdown['score']
+        print(f"✓ Match score calculated: {match_score} {breakdown}")
+        
+    except Exception as e:
+        print(f"❌ Matching error: {e}")
+        # Fallback: share of the job's skills the resume covers
+        overlap = get_skill_overlap(resume_skills, job_skills)
+        match_score = round(100 * len(overlap) / len(job_skills), 2) if job_skills else 0
 
     print(f"Final match score: {match_score}")
     print(f"Resume skills: {resume_skills}")
@@ -136,6 +195,7 @@ def match_result(request, resume_id, job_id):
         'resume': resume,
         'job': job,
         'match_score': match_score,
+        'breakdown': breakdown,
         'missing_skills': missing_skills,
         'resume_skills': resume_skills,
         'job_skills': job_skills,
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from ai_engine.codec import convert_embeddings, pickled_to_binary, binary_to_pickled
+
+
+def forwards(apps, schema_editor):
+    Job = apps.get_model('jobs', 'Job')
+    converted = convert_embeddings(Job, pickled_to_binary)
+    print(f"\n  Converted {converted} job embeddings to binary format")
+
+
+def backwards(apps, schema_editor):
+    Job = apps.get_model('jobs', 'Job')
+    convert_embeddings(Job, binary_to_pickled)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_job_poster_job_required_skills_alter_job_embedding'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
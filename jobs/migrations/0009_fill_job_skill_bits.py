@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from ai_engine.skill_bits import fill_skill_bits
+
+
+def forwards(apps, schema_editor):
+    Job = apps.get_model('jobs', 'Job')
+    filled = fill_skill_bits(Job, 'required_skills', only_missing=True)
+    print(f"\n  Encoded skill bits for {filled} jobs")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_job_embedding_model'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -5,10 +5,15 @@ User = get_user_model()
 
 class Job(models.Model):
     poster = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    external_id = models.CharField(max_length=200, null=True, blank=True, unique=True)  # ID in an imported feed
     title = models.CharField(max_length=200)
     description = models.TextField()
     required_skills = models.JSONField(default=list, blank=True)
-    embedding = models.BinaryField(null=True, blank=True)  # ✅ BinaryField for pickle data
+    skill_bits = models.BinaryField(null=True, blank=True)  # taxonomy skill-ID bitset, see ai_engine.skill_bits
+    embedding = models.BinaryField(null=True, blank=True)  # SRME binary float32/float16, see ai_engine.codec
+    embedding_model = models.CharField(max_length=200, blank=True, db_index=True)  # model_tag() of `embedding`
+    next_embedding = models.BinaryField(null=True, blank=True)  # written by backfill_embeddings, see ai_engine.matrix.served_pairs
+    next_embedding_model = models.CharField(max_length=200, blank=True, db_index=True)
     #created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
 
     def __str__(self):
@@ -22,6 +22,7 @@ def upload_job(request):
             try:
                 from ai_engine.embeddings import get_embedding, store_embedding
                 from ai_engine.parsers import extract_skills_enhanced
+                from ai_engine.skill_bits import encode_skills
                 
                 # Generate embedding
                 embedding = get_embedding(description)
@@ -31,7 +32,12 @@ def upload_job(request):
                 # Extract skills
                 skills = extract_skills_enhanced(description)
                 job.required_skills = skills
+                job.skill_bits = encode_skills(skills)
                 job.save()
+
+                # Match scores are materialized by an ingestion worker, off the request path
+                from ai_engine.ingestion import submit_job_scores
+                submit_job_scores(job)
                 
                 messages.success(request, "Job posted and processed successfully!")
             except Exception as e:
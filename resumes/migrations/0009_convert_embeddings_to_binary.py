@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from ai_engine.codec import convert_embeddings, pickled_to_binary, binary_to_pickled
+
+
+def forwards(apps, schema_editor):
+    Resume = apps.get_model('resumes', 'Resume')
+    converted = convert_embeddings(Resume, pickled_to_binary)
+    print(f"\n  Converted {converted} resume embeddings to binary format")
+
+
+def backwards(apps, schema_editor):
+    Resume = apps.get_model('resumes', 'Resume')
+    convert_embeddings(Resume, binary_to_pickled)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resumes', '0008_resume_skills_resume_text_alter_resume_embedding'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+def mark_processed_ready(apps, schema_editor):
+    # Resumes uploaded before the queue existed were processed synchronously
+    Resume = apps.get_model('resumes', 'Resume')
+    Resume.objects.exclude(text='').update(status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resumes', '0009_convert_embeddings_to_binary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.RunPython(mark_processed_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resumes', '0010_resume_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='skill_bits',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
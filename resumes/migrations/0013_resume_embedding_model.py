@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:16
+
+from django.db import migrations, models
+
+from ai_engine.model_registry import model_tag
+
+
+def tag_existing(apps, schema_editor):
+    # Everything stored so far was encoded with the configured model
+    Resume = apps.get_model('resumes', 'Resume')
+    Resume.objects.exclude(embedding__isnull=True).update(embedding_model=model_tag())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resumes', '0012_resume_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='embedding_model',
+            field=models.CharField(blank=True, db_index=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='resume',
+            name='next_embedding',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='resume',
+            name='next_embedding_model',
+            field=models.CharField(blank=True, db_index=True, max_length=200),
+        ),
+        migrations.RunPython(tag_existing, migrations.RunPython.noop),
+    ]
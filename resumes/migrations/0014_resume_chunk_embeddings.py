@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resumes', '0013_resume_embedding_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='chunk_embedding_model',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='resume',
+            name='chunk_embeddings',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from ai_engine.skill_bits import fill_skill_bits
+
+
+def forwards(apps, schema_editor):
+    Resume = apps.get_model('resumes', 'Resume')
+    filled = fill_skill_bits(Resume, 'skills', only_missing=True)
+    print(f"\n  Encoded skill bits for {filled} resumes")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resumes', '0014_resume_chunk_embeddings'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
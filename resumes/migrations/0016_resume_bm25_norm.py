@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resumes', '0015_fill_resume_skill_bits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='bm25_norm',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
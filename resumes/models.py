@@ -4,11 +4,31 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 class Resume(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_READY, 'Ready'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     file = models.FileField(upload_to='resumes/')
     text = models.TextField(blank=True)
     skills = models.JSONField(default=list, blank=True)
-    embedding = models.BinaryField(null=True, blank=True)  # ✅ BinaryField for pickle data
+    skill_bits = models.BinaryField(null=True, blank=True)  # taxonomy skill-ID bitset, see ai_engine.skill_bits
+    embedding = models.BinaryField(null=True, blank=True)  # SRME binary float32/float16, see ai_engine.codec
+    embedding_model = models.CharField(max_length=200, blank=True, db_index=True)  # model_tag() of `embedding`
+    next_embedding = models.BinaryField(null=True, blank=True)  # written by backfill_embeddings, see ai_engine.matrix.served_pairs
+    next_embedding_model = models.CharField(max_length=200, blank=True, db_index=True)
+    chunk_embeddings = models.BinaryField(null=True, blank=True)  # SRMC per-chunk vectors, `embedding` is their mean
+    chunk_embedding_model = models.CharField(max_length=200, blank=True)
+    bm25_norm = models.FloatField(null=True, blank=True)  # best BM25 of `text` against all jobs, see ai_engine.match_store
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # SHA-256 of the uploaded file
     #created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import upload_resume
+from .views import upload_resume, resume_status
 
 urlpatterns = [
     path('upload/', upload_resume, name='upload_resume'),
+    path('<int:resume_id>/status/', resume_status, name='resume_status'),
 ]
@@ -1,5 +1,6 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from .forms import ResumeUploadForm
 from .models import Resume
 
@@ -15,11 +16,19 @@ def upload_resume(request):
             resume.user = request.user
             resume.save()
             
-            # ✅ ADD ONLY THESE 2 LINES:
-            from ai_engine.parsers import parse_and_store_resume
-            parse_and_store_resume(resume)
+            from ai_engine.ingestion import submit_resume
+            submit_resume(resume)
             
             return redirect('home')
     else:
         form = ResumeUploadForm()
-    return render(request, 'frontend/upload_resume.html', {'form': form})
\ No newline at end of file
+    return render(request, 'frontend/upload_resume.html', {'form': form})
+
+
+@login_required
+def resume_status(request, resume_id):
+    """Poll the processing status of an uploaded resume"""
+    from ai_engine.ingestion import resume_status as status_payload
+
+    resume = get_object_or_404(Resume, id=resume_id, user=request.user)
+    return JsonResponse(status_payload(resume))